@@ -45,6 +45,16 @@ GPTCLI_VERIFICATION_PLAINTEXT: bytes = b"gptcli-verify"
 
 
 # Storage
-GPTCLI_MANIFEST_FILENAME: str = ".manifest.json"
-GPTCLI_SESSION_FILENAME: str = "session.json"
+GPTCLI_MANIFEST_FILENAME: str = ".manifest.json"  # legacy, migrated to the manifest log on write
+GPTCLI_MANIFEST_LOG_FILENAME: str = ".manifest.log"
+GPTCLI_MANIFEST_LATEST_FILENAME: str = ".manifest.latest"
+GPTCLI_SESSION_FILENAME: str = "session.json"  # legacy, chat sessions are now stored as a message log
+GPTCLI_JOURNAL_FILENAME: str = "journal.log"
+GPTCLI_MESSAGES_LOG_FILENAME: str = "messages.log"
+GPTCLI_MESSAGES_INDEX_FILENAME: str = "messages.idx"
 GPTCLI_METADATA_FILENAME: str = "metadata.json"
+GPTCLI_HASH_INDEX_FILENAME: str = ".hash_index.json"
+GPTCLI_GENERATION_FILENAME: str = ".generation"
+GPTCLI_SESSION_STORE_FILENAME: str = "sessions.db"
+GPTCLI_BLOBS_DIRNAME: str = "blobs"
+GPTCLI_BLOB_REFS_FILENAME: str = "refs.log"
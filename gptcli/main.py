@@ -9,13 +9,19 @@ from logging import Logger
 from gptcli.constants import (
     GPTCLI_PROVIDER_MISTRAL,
     GPTCLI_PROVIDER_MISTRAL_KEY_FILE,
+    GPTCLI_PROVIDER_MISTRAL_STORAGE_CHAT_DIR,
+    GPTCLI_PROVIDER_MISTRAL_STORAGE_OCR_DIR,
     GPTCLI_PROVIDER_OPENAI,
     GPTCLI_PROVIDER_OPENAI_KEY_FILE,
+    GPTCLI_PROVIDER_OPENAI_STORAGE_CHAT_DIR,
+    GPTCLI_PROVIDER_OPENAI_STORAGE_OCR_DIR,
     GPTCLI_ROOT_FILEPATH,
 )
 from gptcli.src.cli import CommandParser
+from gptcli.src.commands.agent_commands import AgentCommands
 from gptcli.src.commands.encryption_commands import EncryptionCommands
 from gptcli.src.commands.nuke import Nuke
+from gptcli.src.commands.storage_commands import StorageCommands
 from gptcli.src.common.constants import (
     MistralModelRoles,
     MistralModelsChat,
@@ -28,8 +34,16 @@ from gptcli.src.common.constants import (
     SearchActions,
     SearchTargets,
 )
+from gptcli.src.common.embeddings import EmbeddingClient, has_numpy
 from gptcli.src.common.encryption import Encryption
-from gptcli.src.common.key_management import KeyManager, make_key_manager
+from gptcli.src.common.fts import SearchSource
+from gptcli.src.common.key_management import (
+    KeyManager,
+    ScryptParams,
+    agent_socket_path,
+    calibrate_scrypt,
+    make_key_manager,
+)
 from gptcli.src.common.passphrase import PassphrasePrompt
 from gptcli.src.common.storage import Storage
 from gptcli.src.install import Mistral, Openai
@@ -38,7 +52,7 @@ from gptcli.src.modes.ocr import (
     OpticalCharacterRecognition,
 )
 from gptcli.src.modes.se import SingleExchange
-from gptcli.src.modes.search import ChatSearch, OcrSearch
+from gptcli.src.modes.search import ChatSearch, OcrSearch, UnifiedSearch
 
 logger: Logger = logging.getLogger(__name__)
 
@@ -51,36 +65,66 @@ def _create_command_parser() -> CommandParser:
 
 
 _PROVIDER_DIRS: list[str] = [GPTCLI_PROVIDER_MISTRAL, GPTCLI_PROVIDER_OPENAI]
+_STORAGE_DIRS: list[str] = [
+    GPTCLI_PROVIDER_MISTRAL_STORAGE_CHAT_DIR,
+    GPTCLI_PROVIDER_MISTRAL_STORAGE_OCR_DIR,
+    GPTCLI_PROVIDER_OPENAI_STORAGE_CHAT_DIR,
+    GPTCLI_PROVIDER_OPENAI_STORAGE_OCR_DIR,
+]
 
 
-def _handle_rekey(no_cache: bool) -> None:
-    encryption: Encryption | None = _load_encryption(no_cache=no_cache)
+def _calibrate_kdf(args: Namespace) -> ScryptParams | None:
+    """Calibrate scrypt for this machine if the command asks for it.
+
+    Args:
+        args (Namespace): The parsed CLI arguments of the encrypt or rekey command.
+
+    Returns:
+        ScryptParams | None: The calibrated parameters, or None if calibration was not requested.
+    """
+    if not args.calibrate_kdf:
+        return None
+    print("Calibrating key derivation for this machine...")
+    params: ScryptParams = calibrate_scrypt(
+        target_seconds=args.kdf_time, max_memory=max(1, args.kdf_memory) * 1024 * 1024
+    )
+    print(f"Using scrypt {params}.")
+    return params
+
+
+def _handle_rekey(args: Namespace) -> None:
+    encryption: Encryption | None = _load_encryption(no_cache=args.no_cache)
     if encryption is None:
         print("Encryption is not initialized. Nothing to rekey.")
         return None
-    if not EncryptionCommands.rekey(old_encryption=encryption, providers=_PROVIDER_DIRS):
+    kdf_params: ScryptParams | None = _calibrate_kdf(args)
+    if not EncryptionCommands.rekey(
+        old_encryption=encryption, providers=_PROVIDER_DIRS, jobs=args.jobs, kdf_params=kdf_params
+    ):
         sys.exit(1)
     return None
 
 
-def _handle_encrypt(no_cache: bool) -> None:
-    km: KeyManager = make_key_manager(no_cache=no_cache)
+def _handle_encrypt(args: Namespace) -> None:
+    km: KeyManager = make_key_manager(no_cache=args.no_cache)
     if not km.is_initialized():
         passphrase: str | None = PassphrasePrompt.create_with_confirmation()
         if passphrase is None:
             sys.exit(1)
-        key: bytes = km.initialize(passphrase)
+        key: bytes = km.initialize(passphrase, params=_calibrate_kdf(args))
     else:
+        if args.calibrate_kdf:
+            print("Encryption is already initialized. Use 'gptcli all rekey --calibrate-kdf' to recalibrate.")
         loaded_key: bytes | None = km.load_key()
         if loaded_key is None:
             sys.exit(1)
         key = loaded_key
     enc = Encryption(key=key)
     for provider_dir in _PROVIDER_DIRS:
-        EncryptionCommands(provider_dir=provider_dir, encryption=enc).encrypt_provider()
+        EncryptionCommands(provider_dir=provider_dir, encryption=enc, jobs=args.jobs).encrypt_provider()
 
 
-def _handle_decrypt() -> None:
+def _handle_decrypt(jobs: int) -> None:
     encryption: Encryption | None = _load_encryption()
     if encryption is None:
         print("Encryption is not initialized. Nothing to decrypt.")
@@ -89,12 +133,31 @@ def _handle_decrypt() -> None:
     print("Decrypting should only be done if you plan to migrate data to another platform.")
     print("Re-encrypt when done.")
     for provider_dir in _PROVIDER_DIRS:
-        EncryptionCommands(provider_dir=provider_dir, encryption=encryption).decrypt_provider()
+        EncryptionCommands(provider_dir=provider_dir, encryption=encryption, jobs=jobs).decrypt_provider()
+    return None
+
+
+def _handle_agent(args: Namespace) -> None:
+    socket_path: str = agent_socket_path()
+    succeeded: bool
+    match args.agent_action:
+        case "start":
+            succeeded = AgentCommands.start(make_key_manager(no_cache=args.no_cache), socket_path, args.ttl)
+        case "unlock":
+            succeeded = AgentCommands.unlock(make_key_manager(no_cache=args.no_cache), socket_path, args.ttl)
+        case "lock":
+            succeeded = AgentCommands.lock(socket_path)
+        case "stop":
+            succeeded = AgentCommands.stop(socket_path)
+        case _:
+            succeeded = AgentCommands.status(socket_path)
+    if not succeeded:
+        sys.exit(1)
     return None
 
 
 def _handle_all_provider_command(args: Namespace) -> None:
-    """Handle commands that apply to all providers: encrypt, decrypt, rekey, and nuke.
+    """Handle commands that apply to all providers: encrypt, decrypt, rekey, nuke, pack, unpack, and agent.
 
     Args:
         args (Namespace): The parsed CLI arguments.
@@ -103,11 +166,17 @@ def _handle_all_provider_command(args: Namespace) -> None:
         case ModeNames.NUKE.value:
             Nuke.nuke(root_dir=GPTCLI_ROOT_FILEPATH)
         case ModeNames.REKEY.value:
-            _handle_rekey(no_cache=args.no_cache)
+            _handle_rekey(args)
         case ModeNames.ENCRYPT.value:
-            _handle_encrypt(no_cache=args.no_cache)
+            _handle_encrypt(args)
         case ModeNames.DECRYPT.value:
-            _handle_decrypt()
+            _handle_decrypt(jobs=args.jobs)
+        case ModeNames.PACK.value:
+            StorageCommands.pack(storage_dirs=_STORAGE_DIRS)
+        case ModeNames.UNPACK.value:
+            StorageCommands.unpack(storage_dirs=_STORAGE_DIRS)
+        case ModeNames.AGENT.value:
+            _handle_agent(args)
 
 
 def _load_encryption(no_cache: bool = False) -> Encryption | None:
@@ -165,6 +234,26 @@ def _read_encrypted_key(filepath: str, encryption: Encryption) -> str:
     return api_key_bytes.decode("utf-8")
 
 
+def _install_provider(provider: str, no_cache: bool) -> None:
+    """Install a provider, prompting for its API key, unless it is already installed.
+
+    Args:
+        provider (str): The provider to install.
+        no_cache (bool): Whether to bypass the encryption key cache.
+
+    Raises:
+        NotImplementedError: If the provider is not supported.
+    """
+    match provider:
+        case ProviderNames.MISTRAL.value:
+            Mistral(no_cache=no_cache).install()
+        case ProviderNames.OPENAI.value:
+            Openai(no_cache=no_cache).install()
+        case _:
+            raise NotImplementedError(f"Provider '{provider}' not yet supported.")
+    return None
+
+
 def load_api_key(args: Namespace, encryption: Encryption | None = None) -> str:
     """Load the API key from CLI arguments or encrypted file.
 
@@ -217,6 +306,8 @@ def _enter_chat_mode(args: Namespace, encryption: Encryption | None = None, api_
         filepath=args.filepath,
         store=args.store,
         load_last=args.load_last,
+        tail=args.tail,
+        tail_tokens=args.tail_tokens,
         encryption=encryption,
         api_key=api_key,
     ).start()
@@ -255,6 +346,25 @@ def _provider_defaults(provider: str) -> tuple[str, str, str]:
     return OpenaiModelsChat.default(), OpenaiUserRoles.default(), OpenaiModelRoles.default()
 
 
+def _embedding_client(args: Namespace, api_key: str) -> EmbeddingClient | None:
+    """Return the client to embed sessions with if --semantic was given, or None.
+
+    Args:
+        args (Namespace): The parsed CLI arguments.
+        api_key (str): The API key to embed sessions with.
+
+    Returns:
+        EmbeddingClient | None: The client, or None without --semantic.
+    """
+    if not args.semantic:
+        return None
+    if not has_numpy():
+        args.parser.error(
+            "--semantic requires the 'numpy' package; install it with 'pip install dbc-gptcli[semantic]'."
+        )
+    return EmbeddingClient(args.provider, api_key)
+
+
 def _enter_chat_search_mode(args: Namespace, encryption: Encryption | None = None, api_key: str = "") -> None:
     """Launch the chat full-text search TUI and handle the user's chosen action.
 
@@ -266,11 +376,36 @@ def _enter_chat_search_mode(args: Namespace, encryption: Encryption | None = Non
     provider: str = args.provider
     storage = Storage(provider=provider, encryption=encryption)
 
-    action, session_uuid = ChatSearch(
+    search = ChatSearch(
         chat_dir=storage.chat_dir,
         encryption=encryption,
-    ).run()
+        trigram=args.substring_index,
+        embeddings=_embedding_client(args, api_key),
+    )
+    action, session_uuid = search.run()
+    _act_on_chat_session(provider, storage, action, session_uuid, search.selected_position or 0, encryption, api_key)
+
+
+def _act_on_chat_session(
+    provider: str,
+    storage: Storage,
+    action: str | None,
+    session_uuid: str | None,
+    position: int,
+    encryption: Encryption | None,
+    api_key: str,
+) -> None:
+    """Carry out the action chosen in a search TUI on a chat session.
 
+    Args:
+        provider (str): The provider of the session.
+        storage (Storage): The storage of the provider.
+        action (str | None): The chosen action, or None if the user quit.
+        session_uuid (str | None): The selected session, or None.
+        position (int): The index of the message to display the session from.
+        encryption (Encryption | None): Encryption instance or None.
+        api_key (str): The API key to use if loading the session in chat.
+    """
     if action == SearchActions.LOAD.value and session_uuid:
         default_model, role_user, role_model = _provider_defaults(provider)
         model: str = storage.read_session_model(session_uuid) or default_model
@@ -280,19 +415,21 @@ def _enter_chat_search_mode(args: Namespace, encryption: Encryption | None = Non
             role_user=role_user,
             role_model=role_model,
             load_session_uuid=session_uuid,
+            show_from=position,
             encryption=encryption,
             api_key=api_key,
         ).start()
     elif action == SearchActions.PRINT.value and session_uuid:
-        storage.display_chat_by_uuid(session_uuid)
+        storage.display_chat_by_uuid(session_uuid, start=position)
 
 
-def _enter_ocr_search_mode(args: Namespace, encryption: Encryption | None = None) -> None:
+def _enter_ocr_search_mode(args: Namespace, encryption: Encryption | None = None, api_key: str = "") -> None:
     """Launch the OCR full-text search TUI and handle the user's chosen action.
 
     Args:
         args (Namespace): The parsed CLI arguments.
         encryption (Encryption | None, optional): Encryption instance. Defaults to None.
+        api_key (str, optional): The API key to embed documents with for semantic search. Defaults to "".
     """
     provider: str = args.provider
     storage = Storage(provider=provider, encryption=encryption)
@@ -300,12 +437,60 @@ def _enter_ocr_search_mode(args: Namespace, encryption: Encryption | None = None
     action, session_uuid = OcrSearch(
         ocr_dir=storage.ocr_dir,
         encryption=encryption,
+        trigram=args.substring_index,
+        embeddings=_embedding_client(args, api_key),
     ).run()
+    _act_on_ocr_session(storage, action, session_uuid, args.output_dir)
+
 
+def _act_on_ocr_session(storage: Storage, action: str | None, session_uuid: str | None, output_dir: str) -> None:
+    """Carry out the action chosen in a search TUI on an OCR session.
+
+    Args:
+        storage (Storage): The storage of the session's provider.
+        action (str | None): The chosen action, or None if the user quit.
+        session_uuid (str | None): The selected session, or None.
+        output_dir (str): The directory to write the OCR result to.
+    """
     if action == SearchActions.PRINT.value and session_uuid:
         storage.display_ocr_by_uuid(session_uuid)
     elif action == SearchActions.WRITE.value and session_uuid:
-        storage.write_ocr_by_uuid(session_uuid, args.output_dir)
+        storage.write_ocr_by_uuid(session_uuid, output_dir)
+
+
+def _enter_unified_search_mode(args: Namespace, encryption: Encryption | None = None) -> None:
+    """Launch the search TUI over the chat and OCR history of every provider and handle the chosen action.
+
+    No provider is installed up front. Loading a chat in the chat TUI installs
+    the provider of the session, if need be, and uses its stored API key.
+
+    Args:
+        args (Namespace): The parsed CLI arguments.
+        encryption (Encryption | None, optional): Encryption instance. Defaults to None.
+    """
+    sources: list[SearchSource] = []
+    for provider in ProviderNames.to_list():
+        storage = Storage(provider=provider, encryption=encryption)
+        sources.append(SearchSource(provider, SearchTargets.CHAT.value, storage.chat_dir))
+        sources.append(SearchSource(provider, SearchTargets.OCR.value, storage.ocr_dir))
+
+    search = UnifiedSearch(sources=sources, encryption=encryption, trigram=args.substring_index)
+    action, session_uuid = search.run()
+    source: SearchSource | None = search.selected_source
+    if source is None:
+        return None
+
+    storage = Storage(provider=source.provider, encryption=encryption)
+    if source.target == SearchTargets.CHAT.value:
+        api_key: str = ""
+        if action == SearchActions.LOAD.value:
+            _install_provider(source.provider, no_cache=args.no_cache)
+            api_key = load_api_key(args=Namespace(provider=source.provider, key=None), encryption=encryption)
+        position: int = search.selected_position or 0
+        _act_on_chat_session(source.provider, storage, action, session_uuid, position, encryption, api_key)
+    else:
+        _act_on_ocr_session(storage, action, session_uuid, args.output_dir)
+    return None
 
 
 def main() -> None:
@@ -332,16 +517,19 @@ def main() -> None:
         _handle_all_provider_command(args)
         return None
 
+    # Search all providers with the history already stored, without installing any of them
+    if args.mode_name == ModeNames.SEARCH.value and args.search_target == SearchTargets.ALL.value:
+        if args.semantic:
+            args.parser.error(
+                "--semantic is not supported when searching all providers; "
+                "use '<provider> search chat --semantic' or '<provider> search ocr --semantic'."
+            )
+        _enter_unified_search_mode(args=args, encryption=_load_encryption(no_cache=args.no_cache))
+        return None
+
     no_cache: bool = args.no_cache
 
-    # install
-    match args.provider:
-        case ProviderNames.MISTRAL.value:
-            Mistral(no_cache=no_cache).install()
-        case ProviderNames.OPENAI.value:
-            Openai(no_cache=no_cache).install()
-        case _:
-            raise NotImplementedError(f"Provider '{args.provider}' not yet supported.")
+    _install_provider(args.provider, no_cache=no_cache)
 
     encryption: Encryption | None = _load_encryption(no_cache=no_cache)
     api_key: str = load_api_key(args=args, encryption=encryption)
@@ -357,7 +545,7 @@ def main() -> None:
             if args.search_target == SearchTargets.CHAT.value:
                 _enter_chat_search_mode(args=args, encryption=encryption, api_key=api_key)
             elif args.search_target == SearchTargets.OCR.value:
-                _enter_ocr_search_mode(args=args, encryption=encryption)
+                _enter_ocr_search_mode(args=args, encryption=encryption, api_key=api_key)
 
     return None
 
@@ -25,6 +25,11 @@ from gptcli.src.common.constants import (
     ProviderNames,
     SearchTargets,
 )
+from gptcli.src.common.key_agent import DEFAULT_AGENT_TTL
+from gptcli.src.common.key_management import (
+    DEFAULT_KDF_MAX_MEMORY,
+    DEFAULT_KDF_TARGET_SECONDS,
+)
 
 logger: Logger = logging.getLogger(__name__)
 
@@ -195,6 +200,20 @@ def add_common_mode_arguments(subparser_modes: Any, provider: str) -> Any:
         default=False,
         help="Enable or disable loading your last chat session from storage.",
     )
+    parser_chat.add_argument(
+        "--tail",
+        type=int,
+        default=None,
+        help="Only load the last N messages of a loaded session, plus its system messages.",
+        metavar="<int>",
+    )
+    parser_chat.add_argument(
+        "--tail-tokens",
+        type=int,
+        default=None,
+        help="Only load the most recent messages of a loaded session that fit in N tokens, plus its system messages.",
+        metavar="<int>",
+    )
     parser_chat.set_defaults(parser=parser_chat)
 
     # parser options for 'search' mode
@@ -210,6 +229,23 @@ def add_common_mode_arguments(subparser_modes: Any, provider: str) -> Any:
         formatter_class=custom_formatter,
         help="Search chat history.",
     )
+    parser_search_chat.add_argument(
+        "--substring-index",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Add or drop the index `backquoted` search terms are looked up in as substrings.",
+    )
+    parser_search_chat.add_argument(
+        "--semantic",
+        action="store_true",
+        help="Also find sessions similar in meaning to the query, using provider embeddings. Requires numpy.",
+    )
+    parser_search_chat.add_argument(
+        "--key",
+        type=str,
+        help=f"Defaults to the value in '{default_key}'. The API key to embed sessions with.",
+        metavar="<string>",
+    )
     parser_search_chat.set_defaults(parser=parser_search_chat)
 
     if provider == ProviderNames.MISTRAL.value:
@@ -225,6 +261,23 @@ def add_common_mode_arguments(subparser_modes: Any, provider: str) -> Any:
             help="Defaults to '.'. Directory to write selected OCR result to.",
             metavar="<string>",
         )
+        parser_search_ocr.add_argument(
+            "--substring-index",
+            action=argparse.BooleanOptionalAction,
+            default=None,
+            help="Add or drop the index `backquoted` search terms are looked up in as substrings.",
+        )
+        parser_search_ocr.add_argument(
+            "--semantic",
+            action="store_true",
+            help="Also find documents similar in meaning to the query, using provider embeddings. Requires numpy.",
+        )
+        parser_search_ocr.add_argument(
+            "--key",
+            type=str,
+            help=f"Defaults to the value in '{default_key}'. The API key to embed documents with.",
+            metavar="<string>",
+        )
         parser_search_ocr.set_defaults(parser=parser_search_ocr)
 
     parser_search.set_defaults(parser=parser_search)
@@ -418,12 +471,103 @@ class CommandParser:
         )
         parser_all_rekey.set_defaults(parser=parser_all_rekey)
 
+        for parser_crypto in (parser_all_encrypt, parser_all_decrypt, parser_all_rekey):
+            parser_crypto.add_argument(
+                "--jobs",
+                type=int,
+                default=1,
+                help="Defaults to 1. The number of files to process concurrently.",
+                metavar="<int>",
+            )
+        for parser_crypto in (parser_all_encrypt, parser_all_rekey):
+            parser_crypto.add_argument(
+                "--calibrate-kdf",
+                action="store_true",
+                default=False,
+                help="Benchmark scrypt on this machine and derive the new key with the strongest parameters that "
+                "fit --kdf-time and --kdf-memory.",
+            )
+            parser_crypto.add_argument(
+                "--kdf-time",
+                type=float,
+                default=DEFAULT_KDF_TARGET_SECONDS,
+                help=f"Defaults to {DEFAULT_KDF_TARGET_SECONDS:g}. The time in seconds unlocking may take "
+                "when calibrating.",
+                metavar="<float>",
+            )
+            parser_crypto.add_argument(
+                "--kdf-memory",
+                type=int,
+                default=DEFAULT_KDF_MAX_MEMORY // (1024 * 1024),
+                help=f"Defaults to {DEFAULT_KDF_MAX_MEMORY // (1024 * 1024)}. The memory in MiB unlocking may use "
+                "when calibrating.",
+                metavar="<int>",
+            )
+
         parser_all_nuke = subparser_modes_all.add_parser(
             ModeNames.NUKE.value,
             formatter_class=custom_formatter,
             help="Permanently delete all gptcli data. This action is irreversible.",
         )
         parser_all_nuke.set_defaults(parser=parser_all_nuke)
+
+        parser_all_pack = subparser_modes_all.add_parser(
+            ModeNames.PACK.value,
+            formatter_class=custom_formatter,
+            help="Pack stored sessions into a single database file per storage directory.",
+        )
+        parser_all_pack.set_defaults(parser=parser_all_pack)
+
+        parser_all_unpack = subparser_modes_all.add_parser(
+            ModeNames.UNPACK.value,
+            formatter_class=custom_formatter,
+            help="Unpack stored sessions back into one directory per session.",
+        )
+        parser_all_unpack.set_defaults(parser=parser_all_unpack)
+
+        parser_all_agent = subparser_modes_all.add_parser(
+            ModeNames.AGENT.value,
+            formatter_class=custom_formatter,
+            help="Run a local agent that holds the encryption key so gptcli does not prompt for the passphrase.",
+        )
+        parser_all_agent.set_defaults(parser=parser_all_agent)
+        parser_all_agent.add_argument(
+            "agent_action",
+            choices=["start", "stop", "lock", "unlock", "status"],
+            help="Start the agent, stop it, make it forget the key, hand it the key again, or show its state.",
+        )
+        parser_all_agent.add_argument(
+            "--ttl",
+            type=float,
+            default=DEFAULT_AGENT_TTL,
+            help=f"Defaults to {DEFAULT_AGENT_TTL:g}. The number of seconds the agent holds the key.",
+            metavar="<float>",
+        )
+
+        parser_all_search = subparser_modes_all.add_parser(
+            ModeNames.SEARCH.value,
+            formatter_class=custom_formatter,
+            help="Search the chat and OCR history of all providers at once.",
+        )
+        parser_all_search.add_argument(
+            "--output-dir",
+            type=str,
+            default=".",
+            help="Defaults to '.'. Directory to write selected OCR result to.",
+            metavar="<string>",
+        )
+        parser_all_search.add_argument(
+            "--substring-index",
+            action=argparse.BooleanOptionalAction,
+            default=None,
+            help="Add or drop the index `backquoted` search terms are looked up in as substrings.",
+        )
+        parser_all_search.add_argument(
+            "--semantic",
+            action="store_true",
+            help="Not supported across providers; use '<provider> search chat --semantic' instead.",
+        )
+        parser_all_search.set_defaults(parser=parser_all_search, search_target=SearchTargets.ALL.value)
         self.parser._subparsers.title = "commands"  # type: ignore[union-attr]
 
         add_common_mode_arguments(subparser_modes=subparser_modes_mistral, provider=ProviderNames.MISTRAL.value)
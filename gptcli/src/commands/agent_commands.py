@@ -0,0 +1,177 @@
+"""Logic for starting, unlocking, locking and stopping the local key agent."""
+
+import os
+import sys
+import time
+
+from gptcli.src.common.key_agent import (
+    KeyAgent,
+    KeyAgentClient,
+    ensure_socket_dir,
+)
+from gptcli.src.common.key_management import KeyManager
+
+_START_TIMEOUT: float = 5.0
+_START_POLL_INTERVAL: float = 0.05
+
+
+class AgentCommands:
+    """Handles the 'gptcli all agent' actions."""
+
+    @staticmethod
+    def _spawn(socket_path: str, key: bytes, ttl: float) -> None:
+        """Run an agent holding the key in a detached background process.
+
+        Args:
+            socket_path (str): Path of the Unix socket the agent listens on.
+            key (bytes): The derived encryption key.
+            ttl (float): How long the agent holds the key, in seconds.
+        """
+        if os.fork() != 0:
+            os.wait()
+            return None
+        os.setsid()
+        if os.fork() != 0:
+            os._exit(0)
+        devnull: int = os.open(os.devnull, os.O_RDWR)
+        for fd in (sys.stdin.fileno(), sys.stdout.fileno(), sys.stderr.fileno()):
+            os.dup2(devnull, fd)
+        status: int = 0
+        try:
+            agent = KeyAgent(socket_path)
+            agent.unlock(key, ttl)
+            agent.serve()
+        except Exception:
+            status = 1
+        os._exit(status)
+
+    @staticmethod
+    def start(km: KeyManager, socket_path: str, ttl: float) -> bool:
+        """Unlock the encryption key and hand it to a new background agent.
+
+        Args:
+            km (KeyManager): The key manager to load the key with.
+            socket_path (str): Path of the Unix socket the agent listens on.
+            ttl (float): How long the agent holds the key, in seconds.
+
+        Returns:
+            bool: True if the agent is running and holds the key.
+        """
+        try:
+            ensure_socket_dir(socket_path)
+        except RuntimeError as e:
+            print(f"Cannot start an agent: {e}")
+            return False
+        client = KeyAgentClient(socket_path)
+        if client.status() is not None:
+            print(f"An agent is already running on {socket_path}. Use 'gptcli all agent unlock' to unlock it.")
+            return False
+        if not km.is_initialized():
+            print("Encryption is not initialized. Run 'gptcli all encrypt' first.")
+            return False
+        key: bytes | None = km.load_key()
+        if key is None:
+            return False
+        AgentCommands._spawn(socket_path, key, ttl)
+        deadline: float = time.monotonic() + _START_TIMEOUT
+        while time.monotonic() < deadline:
+            status = client.status()
+            if status is not None:
+                print(f"Agent started (pid {status.get('pid')}) on {socket_path}.")
+                print(f"The key is held for {AgentCommands._format_duration(ttl)} unless the agent is locked.")
+                return True
+            time.sleep(_START_POLL_INTERVAL)
+        print(f"The agent did not start on {socket_path}.")
+        return False
+
+    @staticmethod
+    def unlock(km: KeyManager, socket_path: str, ttl: float) -> bool:
+        """Hand the encryption key to a running, possibly locked, agent.
+
+        Args:
+            km (KeyManager): The key manager to load the key with.
+            socket_path (str): Path of the agent's Unix socket.
+            ttl (float): How long the agent holds the key, in seconds.
+
+        Returns:
+            bool: True if the agent holds the key.
+        """
+        client = KeyAgentClient(socket_path)
+        if client.status() is None:
+            print("No agent is running. Use 'gptcli all agent start' to start one.")
+            return False
+        if not km.is_initialized():
+            print("Encryption is not initialized. Run 'gptcli all encrypt' first.")
+            return False
+        key: bytes | None = km.load_key()
+        if key is None or not client.unlock(key, ttl):
+            print("Failed to unlock the agent.")
+            return False
+        print(f"Agent unlocked for {AgentCommands._format_duration(ttl)}.")
+        return True
+
+    @staticmethod
+    def lock(socket_path: str) -> bool:
+        """Make the running agent forget the key.
+
+        Args:
+            socket_path (str): Path of the agent's Unix socket.
+
+        Returns:
+            bool: True if an agent was running.
+        """
+        if not KeyAgentClient(socket_path).lock():
+            print("No agent is running.")
+            return False
+        print("Agent locked.")
+        return True
+
+    @staticmethod
+    def stop(socket_path: str) -> bool:
+        """Make the running agent forget the key and exit.
+
+        Args:
+            socket_path (str): Path of the agent's Unix socket.
+
+        Returns:
+            bool: True if an agent was running.
+        """
+        if not KeyAgentClient(socket_path).stop():
+            print("No agent is running.")
+            return False
+        print("Agent stopped.")
+        return True
+
+    @staticmethod
+    def status(socket_path: str) -> bool:
+        """Print whether an agent is running and whether it holds the key.
+
+        Args:
+            socket_path (str): Path of the agent's Unix socket.
+
+        Returns:
+            bool: True if an agent is running.
+        """
+        status = KeyAgentClient(socket_path).status()
+        if status is None:
+            print("No agent is running.")
+            return False
+        if status.get("unlocked"):
+            remaining: str = AgentCommands._format_duration(float(status.get("expires_in", 0.0)))
+            print(f"Agent running (pid {status.get('pid')}) on {socket_path}, unlocked for {remaining}.")
+        else:
+            print(f"Agent running (pid {status.get('pid')}) on {socket_path}, locked.")
+        return True
+
+    @staticmethod
+    def _format_duration(seconds: float) -> str:
+        """Format a duration as hours and minutes.
+
+        Args:
+            seconds (float): The duration in seconds.
+
+        Returns:
+            str: The duration, e.g. '11h 59m'.
+        """
+        minutes: int = int(seconds) // 60
+        return f"{minutes // 60}h {minutes % 60:02d}m"
@@ -2,36 +2,140 @@
 
 import logging
 import os
-from collections.abc import Callable
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from logging import Logger
+from typing import TypeVar
 
+from gptcli.constants import (
+    GPTCLI_GENERATION_FILENAME,
+    GPTCLI_SESSION_STORE_FILENAME,
+)
 from gptcli.src.common.api import SpinnerProgress
-from gptcli.src.common.encryption import Encryption
-from gptcli.src.common.key_management import KeyManager, make_key_manager
+from gptcli.src.common.encryption import ENVELOPE_HEADER_SIZE, Encryption
+from gptcli.src.common.key_management import (
+    KeyManager,
+    ScryptParams,
+    make_key_manager,
+)
 from gptcli.src.common.passphrase import PassphrasePrompt
+from gptcli.src.common.record_log import (
+    decrypt_frames,
+    encrypt_frames,
+    is_record_log,
+)
+from gptcli.src.common.session_store import PackedStore
 
 logger: Logger = logging.getLogger(__name__)
 
-_SKIP_FILES: set[str] = {".install_successful"}
+# The OCR generation counter is not secret, and must keep counting up across encrypt and decrypt.
+_SKIP_FILES: set[str] = {".install_successful", GPTCLI_SESSION_STORE_FILENAME, GPTCLI_GENERATION_FILENAME}
+
+_T = TypeVar("_T")
+
+
+def _run_jobs(task: Callable[[str], _T], paths: list[str], jobs: int) -> Iterator[tuple[str, _T]]:
+    """Run a task on every path, on a pool of worker threads when more than one job is requested.
+
+    Results are yielded in the calling thread as the tasks complete, so progress
+    can be reported from there. If a task raises, the tasks not yet started are
+    cancelled and the running ones are waited for before the exception is re-raised,
+    so no worker is still writing files once the caller handles the failure.
+
+    Args:
+        task (Callable[[str], _T]): The task to run on each path.
+        paths (list[str]): The paths to run the task on.
+        jobs (int): The number of worker threads. 1 runs the tasks one at a time in the calling thread.
+
+    Yields:
+        tuple[str, _T]: Each path and the result of its task, in completion order.
+    """
+    if jobs <= 1 or len(paths) <= 1:
+        for filepath in paths:
+            yield filepath, task(filepath)
+        return None
+    executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="gptcli-crypto")
+    try:
+        futures = {executor.submit(task, filepath): filepath for filepath in paths}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return None
 
 
 class EncryptionCommands:
     """Handles encrypt, decrypt, and rekey operations for provider storage.
 
+    Files are processed on a pool of worker threads when more than one job is
+    requested. AES-GCM, compression and file I/O release the GIL, so threads
+    scale with the number of cores without copying file contents between processes.
+
     Attributes:
         _provider_dir: The root directory for the provider's data.
         _encryption: The Encryption instance to use for operations.
+        _jobs: The number of files processed concurrently.
     """
 
-    def __init__(self, provider_dir: str, encryption: Encryption) -> None:
+    def __init__(self, provider_dir: str, encryption: Encryption, jobs: int = 1) -> None:
         """Initialize with a provider directory and encryption instance.
 
         Args:
             provider_dir (str): The root directory for the provider (e.g., ~/.gptcli/mistral).
             encryption (Encryption): The Encryption instance to use.
+            jobs (int, optional): The number of files processed concurrently. Defaults to 1.
         """
         self._provider_dir: str = provider_dir
         self._encryption: Encryption = encryption
+        self._jobs: int = max(1, jobs)
+
+    @staticmethod
+    def _encrypt_bytes(filepath: str, plaintext: bytes, encryption: Encryption) -> bytes:
+        """Encrypt file contents, sealing record logs one frame at a time and compressing other files.
+
+        Args:
+            filepath (str): Path of the file the contents belong to.
+            plaintext (bytes): The plaintext file contents.
+            encryption (Encryption): The Encryption instance to encrypt with.
+
+        Returns:
+            bytes: The encrypted file contents.
+        """
+        if is_record_log(filepath):
+            return encrypt_frames(plaintext, encryption)
+        return encryption.encrypt_envelope(plaintext)
+
+    @staticmethod
+    def _decrypt_file(enc_filepath: str, encryption: Encryption) -> bytes | None:
+        """Decrypt an .enc file, opening record logs one frame at a time.
+
+        Args:
+            enc_filepath (str): Path to the .enc file.
+            encryption (Encryption): The Encryption instance to decrypt with.
+
+        Returns:
+            bytes | None: The plaintext file contents, or None if decryption fails.
+        """
+        if not is_record_log(enc_filepath):
+            return encryption.decrypt_file(enc_filepath)
+        with open(enc_filepath, "rb") as fp:
+            return decrypt_frames(fp.read(), encryption)
+
+    def _encrypt_file(self, filepath: str) -> None:
+        """Encrypt a cleartext file in place, writing filepath + '.enc' and removing the original.
+
+        Args:
+            filepath (str): Path to the cleartext file.
+        """
+        if not is_record_log(filepath):
+            self._encryption.encrypt_file(filepath)
+            return None
+        with open(filepath, "rb") as fp:
+            encrypted: bytes = self._encrypt_bytes(filepath, fp.read(), self._encryption)
+        with open(filepath + ".enc", "wb") as fp:
+            fp.write(encrypted)
+        os.remove(filepath)
+        return None
 
     def _collect_files(self, include: Callable[[str], bool], skip_log: str) -> list[str]:
         """Collect file paths matching a predicate, skipping install markers.
@@ -76,17 +180,94 @@ class EncryptionCommands:
             skip_log="Skipping non-encrypted file",
         )
 
+    @staticmethod
+    def _collect_packed_stores(providers: list[str]) -> list[str]:
+        """Collect the paths of all packed session databases across provider directories.
+
+        Args:
+            providers (list[str]): List of provider directory paths.
+
+        Returns:
+            list[str]: List of absolute paths to packed session databases.
+        """
+        db_files: list[str] = []
+        for provider_dir in providers:
+            for dirpath, _, filenames in os.walk(provider_dir):
+                if GPTCLI_SESSION_STORE_FILENAME in filenames:
+                    db_files.append(os.path.join(dirpath, GPTCLI_SESSION_STORE_FILENAME))
+        return db_files
+
+    def _encrypt_path(self, filepath: str) -> None:
+        """Encrypt a cleartext file, or the cleartext rows of a packed session database.
+
+        Args:
+            filepath (str): Path to the cleartext file or packed session database.
+        """
+        if os.path.basename(filepath) != GPTCLI_SESSION_STORE_FILENAME:
+            self._encrypt_file(filepath)
+            logger.info(f"Encrypted: {filepath}")
+            return None
+        store = PackedStore(os.path.dirname(filepath), filepath)
+        try:
+            count: int = store.recrypt(None, self._encryption)
+        finally:
+            store.close()
+        logger.info(f"Encrypted {count} row(s) in: {filepath}")
+        return None
+
+    def _decrypt_path(self, filepath: str) -> bool:
+        """Decrypt an .enc file, or the encrypted rows of a packed session database.
+
+        The cleartext is written to a temporary file, synced, and renamed over
+        the original filename before the .enc file is removed, so a crash never
+        leaves a file without a readable copy.
+
+        Args:
+            filepath (str): Path to the .enc file or packed session database.
+
+        Returns:
+            bool: True if the file was decrypted, False if it failed.
+        """
+        if os.path.basename(filepath) == GPTCLI_SESSION_STORE_FILENAME:
+            store = PackedStore(os.path.dirname(filepath), filepath)
+            try:
+                count: int = store.recrypt(self._encryption, None)
+                logger.info(f"Decrypted {count} row(s) in: {filepath}")
+            except RuntimeError:
+                logger.exception(f"Failed to decrypt: {filepath}")
+                return False
+            finally:
+                store.close()
+            return True
+        try:
+            plaintext: bytes | None = self._decrypt_file(filepath, self._encryption)
+            if plaintext is None:
+                logger.error(f"Failed to decrypt: {filepath}")
+                return False
+            cleartext_filepath: str = filepath[: -len(".enc")]
+            tmp_filepath: str = cleartext_filepath + ".tmp"
+            with open(tmp_filepath, "wb") as fp:
+                fp.write(plaintext)
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.rename(tmp_filepath, cleartext_filepath)
+            os.remove(filepath)
+            logger.info(f"Decrypted: {cleartext_filepath}")
+        except Exception:
+            logger.exception(f"Failed to decrypt: {filepath}")
+            return False
+        return True
+
     def encrypt_provider(self) -> None:
         """Encrypt all cleartext files for the provider.
 
         Collects eligible files and encrypts any file that does not
         already have an .enc extension. Skips install marker files.
+        Cleartext rows in packed session databases are encrypted in place.
         """
-        files: list[str] = self._collect_encryptable_files()
-        with SpinnerProgress(total=len(files), label="Encrypting") as spinner:
-            for filepath in files:
-                self._encryption.encrypt_file(filepath)
-                logger.info(f"Encrypted: {filepath}")
+        paths: list[str] = self._collect_encryptable_files() + self._collect_packed_stores([self._provider_dir])
+        with SpinnerProgress(total=len(paths), label="Encrypting") as spinner:
+            for _ in _run_jobs(self._encrypt_path, paths, self._jobs):
                 spinner.advance()
 
     def decrypt_provider(self) -> None:
@@ -96,29 +277,12 @@ class EncryptionCommands:
         to the original filename and removing the .enc file. Errors on
         individual files are logged but do not abort the batch.
         """
-        files: list[str] = self._collect_decryptable_files()
+        paths: list[str] = self._collect_decryptable_files() + self._collect_packed_stores([self._provider_dir])
         failed: list[str] = []
-        with SpinnerProgress(total=len(files), label="Decrypting") as spinner:
-            for enc_filepath in files:
-                try:
-                    plaintext: bytes | None = self._encryption.decrypt_file(enc_filepath)
-                    if plaintext is None:
-                        logger.error(f"Failed to decrypt: {enc_filepath}")
-                        failed.append(enc_filepath)
-                        spinner.advance()
-                        continue
-                    cleartext_filepath: str = enc_filepath[: -len(".enc")]
-                    tmp_filepath: str = cleartext_filepath + ".tmp"
-                    with open(tmp_filepath, "wb") as fp:
-                        fp.write(plaintext)
-                        fp.flush()
-                        os.fsync(fp.fileno())
-                    os.rename(tmp_filepath, cleartext_filepath)
-                    os.remove(enc_filepath)
-                    logger.info(f"Decrypted: {cleartext_filepath}")
-                except Exception:
-                    logger.exception(f"Failed to decrypt: {enc_filepath}")
-                    failed.append(enc_filepath)
+        with SpinnerProgress(total=len(paths), label="Decrypting") as spinner:
+            for filepath, decrypted in _run_jobs(self._decrypt_path, paths, self._jobs):
+                if not decrypted:
+                    failed.append(filepath)
                 spinner.advance()
         if failed:
             print(f"Warning: {len(failed)} file(s) failed to decrypt. Check logs for details.")
@@ -142,19 +306,104 @@ class EncryptionCommands:
         return enc_files
 
     @staticmethod
-    def rekey(old_encryption: Encryption, providers: list[str]) -> bool:
-        """Re-encrypt all files with a new passphrase using atomic operations.
+    def _rekey_path(filepath: str, old_encryption: Encryption, new_encryption: Encryption) -> bytes | None:
+        """Prepare an .enc file for a new key.
+
+        Files sealed with a data key of their own, record logs included, only need
+        their envelope header rewrapped, which is returned without touching the file.
+        Files written before envelope encryption are re-encrypted into filepath + '.new'.
+
+        Args:
+            filepath (str): Path to the .enc file.
+            old_encryption (Encryption): The Encryption instance with the old key.
+            new_encryption (Encryption): The Encryption instance with the new key.
+
+        Returns:
+            bytes | None: The rewrapped envelope header, or None if the file was re-encrypted into filepath + '.new'.
+
+        Raises:
+            RuntimeError: If the file cannot be decrypted with the old key.
+        """
+        with open(filepath, "rb") as fp:
+            header: bytes | None = old_encryption.rewrap(fp.read(ENVELOPE_HEADER_SIZE), new_encryption)
+        if header is not None:
+            return header
+        plaintext: bytes | None = EncryptionCommands._decrypt_file(filepath, old_encryption)
+        if plaintext is None:
+            raise RuntimeError(f"Failed to decrypt file during rekey: {filepath}")
+        encrypted: bytes = EncryptionCommands._encrypt_bytes(filepath, plaintext, new_encryption)
+        new_filepath: str = filepath + ".new"
+        with open(new_filepath, "wb") as fp:
+            fp.write(encrypted)
+        logger.info(f"Re-encrypted to temp file: {new_filepath}")
+        return None
+
+    @staticmethod
+    def _replace_header(filepath: str, header: bytes) -> bytes:
+        """Overwrite the envelope header at the start of a file in place.
+
+        Args:
+            filepath (str): Path to the .enc file.
+            header (bytes): The new header, ENVELOPE_HEADER_SIZE bytes long.
+
+        Returns:
+            bytes: The header that was replaced.
+        """
+        with open(filepath, "r+b") as fp:
+            replaced: bytes = fp.read(ENVELOPE_HEADER_SIZE)
+            fp.seek(0)
+            fp.write(header)
+            fp.flush()
+            os.fsync(fp.fileno())
+        return replaced
+
+    @staticmethod
+    def _recrypt_store(db_file: str, old_encryption: Encryption, new_encryption: Encryption) -> None:
+        """Move the rows of a packed session database to a new key in a single transaction.
+
+        Args:
+            db_file (str): Path to the packed session database.
+            old_encryption (Encryption): The Encryption instance with the old key.
+            new_encryption (Encryption): The Encryption instance with the new key.
+
+        Raises:
+            RuntimeError: If a row fails to decrypt; no rows are changed.
+        """
+        store = PackedStore(os.path.dirname(db_file), db_file)
+        try:
+            count: int = store.recrypt(old_encryption, new_encryption)
+        finally:
+            store.close()
+        logger.info(f"Re-encrypted {count} row(s) in: {db_file}")
+
+    @staticmethod
+    def rekey(
+        old_encryption: Encryption, providers: list[str], jobs: int = 1, kdf_params: ScryptParams | None = None
+    ) -> bool:
+        """Re-encrypt all files with a new passphrase.
+
+        Files sealed with a data key of their own, record logs included, are moved
+        to the new key by rewrapping their envelope header, a few dozen bytes per
+        file. Files written before envelope encryption are decrypted and re-encrypted,
+        which also gives them a header for the next rekey.
 
         Three-phase approach for crash safety:
-        1. Decrypt each .enc file with old key, re-encrypt with new key, write to .enc.new
-        2. Swap: remove old .enc, rename .enc.new to .enc
+        1. Rewrap the envelope header of each .enc file with the new key, in memory. Decrypt
+           every other .enc file with the old key, re-encrypt it with the new key, and write
+           it to .enc.new. Files are processed concurrently when more than one job is requested.
+        2. Move packed session databases to the new key, each in a single transaction, then
+           overwrite each envelope header in place and rename each .new file over the original.
         3. Delete old key material, write new salt/verify/key files
 
-        On failure, cleans up all .enc.new files. Old .enc files remain valid.
+        On failure, restores the headers and databases already moved to the new key and
+        cleans up all .enc.new files. Old .enc files remain valid.
 
         Args:
             old_encryption (Encryption): The Encryption instance with the old key.
             providers (list[str]): List of provider directory paths to rekey.
+            jobs (int, optional): The number of files prepared concurrently. Defaults to 1.
+            kdf_params (ScryptParams | None, optional): The scrypt parameters to derive the new key with,
+                e.g. from calibrate_scrypt. Defaults to None, which keeps the current parameters.
 
         Returns:
             bool: True if rekey succeeded, False if passphrase verification failed.
@@ -173,39 +422,51 @@ class EncryptionCommands:
         )
         if new_passphrase is None:
             return False
+        params: ScryptParams = kdf_params or km.load_scrypt_params()
         new_salt: bytes = Encryption.generate_salt()
-        new_key: bytes = Encryption.derive_key(new_passphrase, new_salt)
+        new_key: bytes = Encryption.derive_key(new_passphrase, new_salt, n=params.n, r=params.r, p=params.p)
         new_encryption = Encryption(key=new_key)
 
         enc_files: list[str] = EncryptionCommands._collect_enc_files(providers)
-        new_files: list[str] = []
+        db_files: list[str] = EncryptionCommands._collect_packed_stores(providers)
+        headers: dict[str, bytes] = {}
+        replaced: dict[str, bytes] = {}
+        recrypted: list[str] = []
+
+        def prepare(filepath: str) -> bytes | None:
+            return EncryptionCommands._rekey_path(filepath, old_encryption, new_encryption)
 
         try:
-            # Phase 1: Decrypt with old key, re-encrypt with new key, write to .enc.new
-            for enc_filepath in enc_files:
-                plaintext: bytes | None = old_encryption.decrypt_file(enc_filepath)
-                if plaintext is None:
-                    raise RuntimeError(f"Failed to decrypt file during rekey: {enc_filepath}")
-                encrypted: bytes = new_encryption.encrypt(plaintext)
-                new_filepath: str = enc_filepath + ".new"
-                with open(new_filepath, "wb") as fp:
-                    fp.write(encrypted)
-                new_files.append(new_filepath)
-                logger.info(f"Re-encrypted to temp file: {new_filepath}")
-
-            # Phase 2: Atomically swap .enc.new -> .enc (os.rename replaces on POSIX)
-            for enc_filepath in enc_files:
-                new_filepath = enc_filepath + ".new"
-                os.rename(new_filepath, enc_filepath)
-                logger.info(f"Swapped: {enc_filepath}")
+            # Phase 1: Rewrap envelope headers in memory, re-encrypt other files to .enc.new
+            with SpinnerProgress(total=len(enc_files), label="Re-encrypting") as spinner:
+                for filepath, header in _run_jobs(prepare, enc_files, max(1, jobs)):
+                    if header is not None:
+                        headers[filepath] = header
+                    spinner.advance()
+
+            # Phase 2: Move databases to the new key, then swap headers and .new files
+            for db_file in db_files:
+                EncryptionCommands._recrypt_store(db_file, old_encryption, new_encryption)
+                recrypted.append(db_file)
+            for filepath in enc_files:
+                if filepath in headers:
+                    replaced[filepath] = EncryptionCommands._replace_header(filepath, headers[filepath])
+                else:
+                    # os.rename replaces on POSIX
+                    os.rename(filepath + ".new", filepath)
+                logger.info(f"Swapped: {filepath}")
 
         except Exception:
-            # Clean up .enc.new files on failure
-            for new_filepath in new_files:
-                if os.path.exists(new_filepath):
-                    os.remove(new_filepath)
+            # Put back what was already moved to the new key and clean up .enc.new files
+            for filepath, header in replaced.items():
+                EncryptionCommands._replace_header(filepath, header)
+            for db_file in recrypted:
+                EncryptionCommands._recrypt_store(db_file, new_encryption, old_encryption)
+            for filepath in enc_files:
+                if os.path.exists(filepath + ".new"):
+                    os.remove(filepath + ".new")
             raise
 
         # Phase 3: Update key material
-        km.replace_key_material(salt=new_salt, key=new_key)
+        km.replace_key_material(salt=new_salt, key=new_key, params=params)
         return True
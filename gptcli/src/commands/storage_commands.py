@@ -0,0 +1,89 @@
+"""Logic for converting storage directories between session store backends."""
+
+import logging
+import os
+from logging import Logger
+from os import path
+
+from gptcli.constants import GPTCLI_SESSION_STORE_FILENAME
+from gptcli.src.common.session_store import (
+    DirectoryStore,
+    PackedStore,
+    copy_sessions,
+    is_packed,
+)
+
+logger: Logger = logging.getLogger(__name__)
+
+
+class StorageCommands:
+    """Handles packing session directories into a single database and back."""
+
+    @staticmethod
+    def pack(storage_dirs: list[str]) -> int:
+        """Pack the session directories of each storage directory into one database.
+
+        The database is built under a temporary name and moved into place
+        before any session directory is removed, so an interrupted pack never
+        loses data. If a packed database already exists, any session
+        directories left behind are copied into it.
+
+        Args:
+            storage_dirs (list[str]): The storage directories (chat_dir or ocr_dir) to pack.
+
+        Returns:
+            int: The total number of sessions packed.
+        """
+        total: int = 0
+        for storage_dir in storage_dirs:
+            if not os.path.isdir(storage_dir):
+                continue
+            source = DirectoryStore(storage_dir)
+            db_path: str = path.join(storage_dir, GPTCLI_SESSION_STORE_FILENAME)
+            if is_packed(storage_dir):
+                target = PackedStore(storage_dir)
+                try:
+                    count: int = copy_sessions(source, target)
+                finally:
+                    target.close()
+            else:
+                tmp_path: str = db_path + ".tmp"
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                target = PackedStore(storage_dir, tmp_path)
+                try:
+                    count = copy_sessions(source, target)
+                finally:
+                    target.close()
+                os.replace(tmp_path, db_path)
+            for session_uuid in source.session_uuids():
+                source.delete_session(session_uuid)
+            logger.info(f"Packed {count} session(s) into: {db_path}")
+            total += count
+        print(f"Packed {total} session(s).")
+        return total
+
+    @staticmethod
+    def unpack(storage_dirs: list[str]) -> int:
+        """Unpack the packed database of each storage directory into session directories.
+
+        Args:
+            storage_dirs (list[str]): The storage directories (chat_dir or ocr_dir) to unpack.
+
+        Returns:
+            int: The total number of sessions unpacked.
+        """
+        total: int = 0
+        for storage_dir in storage_dirs:
+            if not is_packed(storage_dir):
+                continue
+            source = PackedStore(storage_dir)
+            try:
+                count: int = copy_sessions(source, DirectoryStore(storage_dir))
+            finally:
+                source.close()
+            os.remove(source.db_path)
+            logger.info(f"Unpacked {count} session(s) from: {source.db_path}")
+            total += count
+        print(f"Unpacked {total} session(s).")
+        return total
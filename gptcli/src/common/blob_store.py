@@ -0,0 +1,330 @@
+"""Content-addressed, reference-counted storage for OCR images and chat attachments."""
+
+import hashlib
+import logging
+import os
+from collections.abc import Iterable
+from logging import Logger
+from os import path
+from typing import Any
+
+from gptcli.constants import GPTCLI_BLOB_REFS_FILENAME, GPTCLI_BLOBS_DIRNAME
+from gptcli.src.common.encryption import Encryption
+from gptcli.src.common.record_log import RecordLog
+from gptcli.src.common.session_store import SessionStore
+
+logger: Logger = logging.getLogger(__name__)
+
+_COMPACTION_SLACK: int = 1000
+# Marks blob names that are keyed digests, which only the key they were made with can check.
+_KEYED_PREFIX: str = "hmac-"
+
+
+def blob_dir_for(storage_dir: str) -> str:
+    """Return the blob directory shared by the chat and OCR storage directories of a provider.
+
+    Args:
+        storage_dir (str): A storage directory (chat_dir or ocr_dir).
+
+    Returns:
+        str: The blob directory next to it.
+    """
+    return path.join(path.dirname(path.normpath(storage_dir)), GPTCLI_BLOBS_DIRNAME)
+
+
+def blob_owner(store: SessionStore, session_uuid: str) -> str:
+    """Return the name a session references blobs under, e.g. 'ocr/<uuid>'.
+
+    Args:
+        store (SessionStore): The session store holding the session.
+        session_uuid (str): The UUID of the session.
+
+    Returns:
+        str: The owner name.
+    """
+    return f"{path.basename(path.normpath(store.storage_dir))}/{session_uuid}"
+
+
+def blob_digest(data: bytes, encryption: Encryption | None = None) -> str:
+    """Return the address of a blob.
+
+    Without encryption it is the SHA-256 hex digest of the plaintext. With
+    encryption it is the keyed digest of the plaintext, see
+    Encryption.keyed_digest, so the names of the blobs do not reveal which
+    known files are stored to anyone without the key.
+
+    Args:
+        data (bytes): The plaintext blob.
+        encryption (Encryption | None, optional): Encryption instance the blob is stored with. Defaults to None.
+
+    Returns:
+        str: The hex digest, prefixed with 'hmac-' if it is keyed.
+    """
+    if encryption is not None:
+        return _KEYED_PREFIX + encryption.keyed_digest(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+class BlobStore:
+    """Stores each distinct blob once, and deletes it once no session references it.
+
+    Blobs live under ``<digest[:2]>/<digest>``, encrypted on their own with an
+    ``.enc`` suffix when encryption is enabled; see blob_digest. Which
+    sessions reference which blobs is kept in a record log. Adding blobs
+    appends the digests an owner (a session) gained, without reading the log.
+    Releasing them appends the full set it still references, which replaces
+    every earlier record for the same owner. A blob is deleted when the last
+    owner referencing it drops it.
+
+    Attributes:
+        _blob_dir: The directory holding the blobs and the reference log.
+        _encryption: Encryption instance for new blobs, or None for plaintext.
+        _refs: The record log of blob references.
+    """
+
+    @classmethod
+    def for_store(cls, store: SessionStore, encryption: Encryption | None) -> "BlobStore":
+        """Open the blob store shared by a session store and the other storage directories of its provider.
+
+        Args:
+            store (SessionStore): The session store.
+            encryption (Encryption | None): Encryption instance for the blobs, or None for plaintext.
+
+        Returns:
+            BlobStore: The blob store.
+        """
+        return cls(blob_dir_for(store.storage_dir), encryption)
+
+    def __init__(self, blob_dir: str, encryption: Encryption | None) -> None:
+        """Initialize the blob store.
+
+        Args:
+            blob_dir (str): The directory holding the blobs and the reference log.
+            encryption (Encryption | None): Encryption instance for the blobs, or None for plaintext.
+        """
+        self._blob_dir: str = blob_dir
+        self._encryption: Encryption | None = encryption
+        self._refs: RecordLog = RecordLog(path.join(blob_dir, GPTCLI_BLOB_REFS_FILENAME), encryption)
+
+    def _blob_path(self, digest: str) -> str:
+        safe_digest: str = path.basename(digest)
+        return path.join(self._blob_dir, safe_digest.removeprefix(_KEYED_PREFIX)[:2], safe_digest)
+
+    def _read_refs(self) -> tuple[dict[str, set[str]], int] | None:
+        """Replay the reference log.
+
+        Returns:
+            tuple[dict[str, set[str]], int] | None: The digests each owner references and the
+                number of records read, or None if the log is encrypted and no key is available.
+        """
+        records: list[dict[str, Any]] | None = self._refs.read()
+        if records is None:
+            return None
+        owners: dict[str, set[str]] = {}
+        for record in records:
+            if "owner" not in record:
+                continue
+            if "added" in record:
+                owners.setdefault(record["owner"], set()).update(record["added"])
+            else:
+                owners[record["owner"]] = set(record.get("blobs", []))
+        return {owner: digests for owner, digests in owners.items() if digests}, len(records)
+
+    def _write_refs(self, owner: str, digests: set[str], owners: dict[str, set[str]], records: int) -> None:
+        """Record an owner's references, compacting the log once it is mostly superseded records.
+
+        Args:
+            owner (str): The owner whose references changed.
+            digests (set[str]): The digests the owner now references.
+            owners (dict[str, set[str]]): The references of every owner, including the change.
+            records (int): The number of records in the log before the change.
+        """
+        os.makedirs(self._blob_dir, exist_ok=True)
+        if records + 1 >= len(owners) + _COMPACTION_SLACK:
+            self._refs.rewrite([{"owner": o, "blobs": sorted(d)} for o, d in sorted(owners.items())])
+        else:
+            self._refs.append({"owner": owner, "blobs": sorted(digests)})
+
+    def _write_blob(self, digest: str, data: bytes) -> None:
+        blob_path: str = self._blob_path(digest)
+        if os.path.exists(blob_path) or os.path.exists(blob_path + ".enc"):
+            return None
+        os.makedirs(path.dirname(blob_path), exist_ok=True)
+        target: str = blob_path + ".enc" if self._encryption else blob_path
+        tmp_path: str = target + ".tmp"
+        with open(tmp_path, "wb") as fp:
+            fp.write(self._encryption.encrypt_envelope(data) if self._encryption else data)
+        os.replace(tmp_path, target)
+        return None
+
+    def _delete_blob(self, digest: str) -> None:
+        blob_path: str = self._blob_path(digest)
+        for candidate in (blob_path, blob_path + ".enc"):
+            if os.path.exists(candidate):
+                os.remove(candidate)
+
+    def add(self, owner: str, blobs: list[bytes]) -> list[str]:
+        """Store blobs and reference them from an owner.
+
+        Blobs that are already stored are not written again. The references
+        are appended before the blobs are written, so a crash in between
+        leaves a reference to a missing blob, which release() drops, rather
+        than a blob that nothing references and nothing ever deletes.
+
+        Args:
+            owner (str): The session referencing the blobs, e.g. 'ocr/<uuid>'.
+            blobs (list[bytes]): The plaintext blobs.
+
+        Returns:
+            list[str]: The digest of each blob, in order.
+        """
+        digests: list[str] = [blob_digest(data, self._encryption) for data in blobs]
+        if not digests:
+            return digests
+        if self._encryption is None and os.path.exists(self._refs.path + ".enc"):
+            logger.warning("Blob references are encrypted and no key was provided; blobs left unreferenced.")
+        else:
+            os.makedirs(self._blob_dir, exist_ok=True)
+            self._refs.append({"owner": owner, "added": sorted(set(digests))})
+        for digest, data in zip(digests, blobs):
+            self._write_blob(digest, data)
+        return digests
+
+    def share(self, owner: str, source: str) -> int:
+        """Reference every blob another owner references from an owner too.
+
+        Args:
+            owner (str): The session taking the references, e.g. 'chat/<uuid>'.
+            source (str): The session whose references are shared.
+
+        Returns:
+            int: The number of blobs shared, 0 if the references are unreadable.
+        """
+        state = self._read_refs()
+        if state is None:
+            logger.warning("Blob references are encrypted and no key was provided; blobs left unshared.")
+            return 0
+        digests: set[str] = state[0].get(source, set())
+        if digests:
+            self._refs.append({"owner": owner, "added": sorted(digests)})
+        return len(digests)
+
+    def get(self, digest: str) -> bytes | None:
+        """Read a blob.
+
+        Args:
+            digest (str): The digest of the blob.
+
+        Returns:
+            bytes | None: The plaintext blob, or None if it is missing, unreadable, or corrupt.
+        """
+        blob_path: str = self._blob_path(digest)
+        data: bytes | None = None
+        if os.path.exists(blob_path + ".enc"):
+            if self._encryption is None:
+                return None
+            data = self._encryption.decrypt_file(blob_path + ".enc")
+        elif os.path.exists(blob_path):
+            with open(blob_path, "rb") as fp:
+                data = fp.read()
+        if data is None:
+            return None
+        # A keyed name may have been made with an earlier key; an encrypted blob is authenticated anyway.
+        if not digest.startswith(_KEYED_PREFIX) and blob_digest(data) != digest:
+            logger.warning(f"Ignoring corrupt blob {digest}.")
+            return None
+        return data
+
+    def release(self, owner: str, keep: Iterable[str] = ()) -> int:
+        """Drop an owner's references, except those it keeps, and delete unreferenced blobs.
+
+        Args:
+            owner (str): The session whose references are dropped.
+            keep (Iterable[str], optional): Digests the owner still references. Defaults to none.
+
+        Returns:
+            int: The number of blobs deleted.
+        """
+        state = self._read_refs()
+        if state is None:
+            logger.warning("Blob references are encrypted and no key was provided; skipping release.")
+            return 0
+        owners, records = state
+        current: set[str] = owners.get(owner, set())
+        updated: set[str] = current & set(keep)
+        if updated == current:
+            return 0
+        if updated:
+            owners[owner] = updated
+        else:
+            owners.pop(owner, None)
+        self._write_refs(owner, updated, owners, records)
+        referenced: set[str] = set().union(*owners.values()) if owners else set()
+        dropped: set[str] = current - updated - referenced
+        for digest in dropped:
+            self._delete_blob(digest)
+        logger.info(f"Deleted {len(dropped)} unreferenced blob(s).")
+        return len(dropped)
+
+    def references(self, digest: str) -> int:
+        """Return the number of owners referencing a blob.
+
+        Args:
+            digest (str): The digest of the blob.
+
+        Returns:
+            int: The reference count, 0 if the blob is unreferenced or the references are unreadable.
+        """
+        state = self._read_refs()
+        if state is None:
+            return 0
+        return sum(1 for digests in state[0].values() if digest in digests)
+
+
+def store_attachments(messages: list[dict[str, Any]], blobs: BlobStore, owner: str) -> list[dict[str, Any]]:
+    """Move the content of attachment messages into the blob store.
+
+    Each attachment message is replaced by a copy whose content is empty and
+    whose 'blob' field holds the digest of the content.
+
+    Args:
+        messages (list[dict[str, Any]]): Stored messages, as produced by Message.to_dict_full_context.
+        blobs (BlobStore): The blob store to move the content to.
+        owner (str): The session referencing the attachments, e.g. 'chat/<uuid>'.
+
+    Returns:
+        list[dict[str, Any]]: The messages to store, in order.
+    """
+    attached: list[int] = [i for i, m in enumerate(messages) if m.get("attachment") and "blob" not in m]
+    if not attached:
+        return messages
+    digests: list[str] = blobs.add(owner, [str(messages[i]["content"]).encode("utf-8") for i in attached])
+    stored: list[dict[str, Any]] = list(messages)
+    for index, digest in zip(attached, digests):
+        stored[index] = {**messages[index], "content": "", "blob": digest}
+    return stored
+
+
+def load_attachments(messages: list[dict[str, Any]], blobs: BlobStore) -> list[dict[str, Any]]:
+    """Put the content of attachment messages back from the blob store; see store_attachments.
+
+    Args:
+        messages (list[dict[str, Any]]): Stored messages, some of which may reference a blob.
+        blobs (BlobStore): The blob store holding the content.
+
+    Returns:
+        list[dict[str, Any]]: The messages with their content, in order. Content that cannot be read
+            is left empty.
+    """
+    loaded: list[dict[str, Any]] = []
+    for message in messages:
+        if "blob" not in message:
+            loaded.append(message)
+            continue
+        data: bytes | None = blobs.get(str(message["blob"]))
+        if data is None:
+            logger.warning(f"Attachment blob {message['blob']} is missing or unreadable.")
+        restored: dict[str, Any] = {k: v for k, v in message.items() if k != "blob"}
+        restored["content"] = data.decode("utf-8") if data is not None else ""
+        loaded.append(restored)
+    return loaded
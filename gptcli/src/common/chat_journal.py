@@ -0,0 +1,250 @@
+"""Per-turn journal that persists chat messages as they are produced."""
+
+import logging
+from collections.abc import Callable
+from logging import Logger
+from typing import Any
+
+from gptcli.constants import GPTCLI_JOURNAL_FILENAME
+from gptcli.src.common.blob_store import (
+    BlobStore,
+    blob_owner,
+    store_attachments,
+)
+from gptcli.src.common.constants import MistralUserRoles, OpenaiUserRoles
+from gptcli.src.common.encryption import Encryption
+from gptcli.src.common.message import Message, Messages
+from gptcli.src.common.record_log import decode_records, encode_record
+from gptcli.src.common.session_store import SessionStore
+
+logger: Logger = logging.getLogger(__name__)
+
+_OP_ADD: str = "add"
+_OP_RESET: str = "reset"
+_OP_BASE: str = "base"
+_SYSTEM_ROLES: tuple[str, str] = (MistralUserRoles.system_role(), OpenaiUserRoles.system_role())
+
+SessionLoader = Callable[[str], list[dict[str, Any]] | None]
+
+
+def is_system_message(message: dict[str, Any]) -> bool:
+    """Return True if a stored message has a system/developer role.
+
+    Args:
+        message (dict[str, Any]): The message, as stored by Message.to_dict_full_context.
+
+    Returns:
+        bool: True if the message is a system message.
+    """
+    return message.get("role") in _SYSTEM_ROLES
+
+
+class ChatJournal:
+    """An append-only record of the messages in a live chat session.
+
+    Every new message is appended as its own record, encrypted on its own
+    when encryption is enabled, so persisting a turn costs the same no matter
+    how long the session is. When messages are removed from the session, a
+    single reset record holding the remaining messages is appended instead.
+
+    A session continued from only the tail of another session starts with a
+    base record naming that session; its unloaded messages are merged back in
+    when the journal is read. The content of attachment messages is kept in
+    the blob store rather than in the records.
+
+    Attributes:
+        _store: The session store holding the journal.
+        _session_uuid: The UUID of the session being journaled.
+        _encryption: Encryption instance for the records, or None for plaintext.
+        _frame_encryption: The data key the records are sealed with, wrapped in the header written
+            with the first record, or None until then or without encryption.
+        _count: The number of messages already journaled.
+        _last: The last message journaled, used to detect removals.
+        _base: The base record of the journal, or None if it has none.
+        _reset: Whether a reset record was journaled.
+        _blobs: The blob store holding attachment content, or None to keep it in the records.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        session_uuid: str,
+        encryption: Encryption | None,
+        blobs: BlobStore | None = None,
+    ) -> None:
+        """Initialize the journal for a session.
+
+        Args:
+            store (SessionStore): The session store holding the journal.
+            session_uuid (str): The UUID of the session being journaled.
+            encryption (Encryption | None): Encryption instance for the records, or None for plaintext.
+            blobs (BlobStore | None, optional): The blob store for attachment content. Defaults to None,
+                which keeps attachment content in the records.
+        """
+        self._store: SessionStore = store
+        self._session_uuid: str = session_uuid
+        self._encryption: Encryption | None = encryption
+        self._frame_encryption: Encryption | None = None
+        self._count: int = 0
+        self._last: Message | None = None
+        self._base: dict[str, Any] | None = None
+        self._reset: bool = False
+        self._blobs: BlobStore | None = blobs
+
+    @property
+    def session_uuid(self) -> str:
+        """The UUID of the session being journaled."""
+        return self._session_uuid
+
+    @property
+    def base(self) -> dict[str, Any] | None:
+        """The base record of the journal, or None if the session was not continued from a tail."""
+        return self._base
+
+    @property
+    def reset(self) -> bool:
+        """Whether messages were removed from the session since it was started."""
+        return self._reset
+
+    def set_base(self, session_uuid: str, count: int, anchor: str) -> None:
+        """Record that the session continues the tail of another session.
+
+        Args:
+            session_uuid (str): The UUID of the session that was loaded.
+            count (int): The number of messages of that session before the loaded tail.
+            anchor (str): The UUID of the first non-system message of the loaded tail. If it
+                is removed from the session, the unloaded messages are dropped with it.
+        """
+        self._base = {"op": _OP_BASE, "session": session_uuid, "count": count, "anchor": anchor}
+        self._append(self._base)
+
+    def _append(self, record: dict[str, Any]) -> None:
+        header: bytes = b""
+        if self._encryption is not None and self._frame_encryption is None:
+            header, self._frame_encryption = self._encryption.new_envelope()
+        self._store.append_file(
+            self._session_uuid,
+            GPTCLI_JOURNAL_FILENAME,
+            header + encode_record(record, self._frame_encryption),
+            encrypted=self._encryption is not None,
+        )
+
+    def _stored(self, messages: list[Message]) -> list[dict[str, Any]]:
+        stored: list[dict[str, Any]] = [m.to_dict_full_context() for m in messages]
+        if self._blobs is None:
+            return stored
+        return store_attachments(stored, self._blobs, blob_owner(self._store, self._session_uuid))
+
+    def sync(self, messages: Messages) -> None:
+        """Journal the messages added or removed since the last sync.
+
+        Args:
+            messages (Messages): The current messages of the session.
+        """
+        count: int = len(messages)
+        unchanged: bool = self._count == 0 or (count >= self._count and messages[self._count - 1] is self._last)
+        if unchanged:
+            for message in self._stored([messages[index] for index in range(self._count, count)]):
+                self._append({"op": _OP_ADD, "message": message})
+        else:
+            logger.info("Messages were removed; journaling a reset record.")
+            self._append({"op": _OP_RESET, "messages": self._stored(list(messages))})
+            self._reset = True
+        self._count = count
+        self._last = messages[count - 1] if count > 0 else None
+
+    def remove(self) -> None:
+        """Delete the journal, once its messages are stored in the session's message log."""
+        self._store.delete_file(self._session_uuid, GPTCLI_JOURNAL_FILENAME)
+
+
+def expand_base(
+    base: dict[str, Any], messages: list[dict[str, Any]], load_session: SessionLoader
+) -> list[dict[str, Any]]:
+    """Merge the unloaded messages of a base session back into a continued session.
+
+    The messages before the loaded tail are put back in front. System messages
+    among them were loaded, so they are kept where they were only if they are
+    still in the session.
+
+    Args:
+        base (dict[str, Any]): The base record of the journal.
+        messages (list[dict[str, Any]]): The messages of the continued session.
+        load_session (SessionLoader): Reads every message of a session by UUID.
+
+    Returns:
+        list[dict[str, Any]]: The messages of the continued session, including the unloaded ones.
+    """
+    source: list[dict[str, Any]] | None = load_session(base["session"])
+    if source is None:
+        logger.warning(f"Base session {base['session']} is unreadable; keeping only the loaded messages.")
+        return messages
+    present: set[Any] = {m.get("uuid") for m in messages}
+    keep_history: bool = base.get("anchor") in present
+    merged: list[dict[str, Any]] = []
+    placed: set[Any] = set()
+    for message in source[: base["count"]]:
+        if is_system_message(message):
+            if message.get("uuid") in present:
+                merged.append(message)
+                placed.add(message.get("uuid"))
+        elif keep_history:
+            merged.append(message)
+    merged.extend(m for m in messages if m.get("uuid") not in placed)
+    return merged
+
+
+def replay_journal(records: list[dict[str, Any]], load_session: SessionLoader | None = None) -> list[dict[str, Any]]:
+    """Rebuild the message list of a session from its journal records.
+
+    Args:
+        records (list[dict[str, Any]]): The decoded journal records, in append order.
+        load_session (SessionLoader | None): Reads every message of a session by UUID, used to
+            merge in the unloaded messages of a base session. If None, they are left out.
+
+    Returns:
+        list[dict[str, Any]]: The messages of the session.
+    """
+    messages: list[dict[str, Any]] = []
+    base: dict[str, Any] | None = None
+    for record in records:
+        op = record.get("op")
+        if op == _OP_ADD:
+            messages.append(record["message"])
+        elif op == _OP_RESET:
+            messages = list(record["messages"])
+        elif op == _OP_BASE:
+            base = record
+        else:
+            logger.warning(f"Skipping unknown journal record: {op!r}")
+    if base is not None and load_session is not None:
+        return expand_base(base, messages, load_session)
+    return messages
+
+
+def read_journal(
+    store: SessionStore,
+    session_uuid: str,
+    encryption: Encryption | None,
+    load_session: SessionLoader | None = None,
+) -> list[dict[str, Any]] | None:
+    """Read the messages left in a session's journal.
+
+    Args:
+        store (SessionStore): The session store holding the journal.
+        session_uuid (str): The UUID of the session.
+        encryption (Encryption | None): Encryption instance for decryption, or None.
+        load_session (SessionLoader | None): Reads every message of a session by UUID; see replay_journal.
+
+    Returns:
+        list[dict[str, Any]] | None: The journaled messages, or None if the session has no
+            journal or it is encrypted and no key is available.
+    """
+    stored = store.read_file(session_uuid, GPTCLI_JOURNAL_FILENAME)
+    if stored is None:
+        return None
+    data, encrypted = stored
+    if encrypted and encryption is None:
+        return None
+    records = decode_records(data, encryption if encrypted else None, f"{session_uuid}/{GPTCLI_JOURNAL_FILENAME}")
+    return replay_journal(records, load_session)
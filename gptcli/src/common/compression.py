@@ -0,0 +1,244 @@
+"""Compression of stored files before they are encrypted, behind a small versioned header."""
+
+import logging
+import lzma
+import struct
+import zlib
+from collections.abc import Callable
+from logging import Logger
+from types import ModuleType
+from typing import Protocol
+
+logger: Logger = logging.getLogger(__name__)
+
+CODEC_NONE: str = "none"
+CODEC_ZLIB: str = "zlib"
+CODEC_LZMA: str = "lzma"
+CODEC_ZSTD: str = "zstd"
+DEFAULT_CODEC: str = CODEC_ZLIB
+
+# A leading NUL keeps the magic apart from the JSON and Markdown files stored so far, and from
+# common image formats, so files written before compression existed are read back unchanged.
+_MAGIC: bytes = b"\x00GPZ"
+_FORMAT_VERSION: int = 1
+_HEADER: struct.Struct = struct.Struct(">4sBB")
+_CODEC_IDS: dict[str, int] = {CODEC_NONE: 0, CODEC_ZLIB: 1, CODEC_LZMA: 2, CODEC_ZSTD: 3}
+_ZLIB_LEVEL: int = 6
+_ZSTD_LEVEL: int = 3
+
+
+def _load_zstd() -> ModuleType | None:
+    """Import the optional zstandard package.
+
+    Returns:
+        ModuleType | None: The zstandard module, or None if it is not installed.
+    """
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    module: ModuleType = zstandard
+    return module
+
+
+def _zstd_compress(data: bytes) -> bytes:
+    zstd = _load_zstd()
+    if zstd is None:
+        raise ValueError("The zstd codec requires the 'zstandard' package.")
+    compressed: bytes = zstd.ZstdCompressor(level=_ZSTD_LEVEL).compress(data)
+    return compressed
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    zstd = _load_zstd()
+    if zstd is None:
+        raise ValueError("The zstd codec requires the 'zstandard' package.")
+    try:
+        decompressed: bytes = zstd.ZstdDecompressor().decompress(data)
+    except zstd.ZstdError as exc:
+        raise ValueError(str(exc)) from exc
+    return decompressed
+
+
+_COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {
+    CODEC_NONE: lambda data: data,
+    CODEC_ZLIB: lambda data: zlib.compress(data, _ZLIB_LEVEL),
+    CODEC_LZMA: lzma.compress,
+    CODEC_ZSTD: _zstd_compress,
+}
+_DECOMPRESSORS: dict[int, Callable[[bytes], bytes]] = {
+    _CODEC_IDS[CODEC_NONE]: lambda data: data,
+    _CODEC_IDS[CODEC_ZLIB]: zlib.decompress,
+    _CODEC_IDS[CODEC_LZMA]: lzma.decompress,
+    _CODEC_IDS[CODEC_ZSTD]: _zstd_decompress,
+}
+
+
+class StreamCompressor(Protocol):
+    """Compresses data fed in pieces, as zlib.compressobj() does."""
+
+    def compress(self, data: bytes, /) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+class StreamDecompressor(Protocol):
+    """Decompresses data fed in pieces, as zlib.decompressobj() does."""
+
+    def decompress(self, data: bytes, /) -> bytes: ...
+
+
+class _Passthrough:
+    def compress(self, data: bytes, /) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+    def decompress(self, data: bytes, /) -> bytes:
+        return data
+
+
+def codec_id(codec: str) -> int:
+    """Return the id a codec is recorded under in headers.
+
+    Args:
+        codec (str): The codec name.
+
+    Returns:
+        int: The codec id.
+
+    Raises:
+        ValueError: If the codec is unknown.
+    """
+    if codec not in _CODEC_IDS:
+        raise ValueError(f"Unknown compression codec '{codec}'.")
+    return _CODEC_IDS[codec]
+
+
+def stream_compressor(codec: str) -> StreamCompressor:
+    """Return a compressor for data that is compressed piece by piece.
+
+    Args:
+        codec (str): The codec to compress with; see available_codecs.
+
+    Returns:
+        StreamCompressor: The compressor.
+
+    Raises:
+        ValueError: If the codec is unknown or not installed.
+    """
+    if codec == CODEC_NONE:
+        return _Passthrough()
+    if codec == CODEC_ZLIB:
+        return zlib.compressobj(_ZLIB_LEVEL)
+    if codec == CODEC_LZMA:
+        return lzma.LZMACompressor()
+    if codec == CODEC_ZSTD:
+        zstd = _load_zstd()
+        if zstd is None:
+            raise ValueError("The zstd codec requires the 'zstandard' package.")
+        compressor: StreamCompressor = zstd.ZstdCompressor(level=_ZSTD_LEVEL).compressobj()
+        return compressor
+    raise ValueError(f"Unknown compression codec '{codec}'.")
+
+
+def stream_decompressor(codec: int) -> StreamDecompressor:
+    """Return a decompressor for data compressed by stream_compressor.
+
+    Args:
+        codec (int): The id of the codec the data was compressed with; see codec_id.
+
+    Returns:
+        StreamDecompressor: The decompressor.
+
+    Raises:
+        ValueError: If the codec id is unknown or the codec is not installed.
+    """
+    if codec == _CODEC_IDS[CODEC_NONE]:
+        return _Passthrough()
+    if codec == _CODEC_IDS[CODEC_ZLIB]:
+        return zlib.decompressobj()
+    if codec == _CODEC_IDS[CODEC_LZMA]:
+        return lzma.LZMADecompressor()
+    if codec == _CODEC_IDS[CODEC_ZSTD]:
+        zstd = _load_zstd()
+        if zstd is None:
+            raise ValueError("The zstd codec requires the 'zstandard' package.")
+        decompressor: StreamDecompressor = zstd.ZstdDecompressor().decompressobj()
+        return decompressor
+    raise ValueError(f"Unknown compression codec id {codec}.")
+
+
+def available_codecs() -> list[str]:
+    """Return the codecs that can be used here; zstd needs the optional 'zstandard' package.
+
+    Returns:
+        list[str]: The codec names.
+    """
+    codecs: list[str] = [CODEC_NONE, CODEC_ZLIB, CODEC_LZMA]
+    if _load_zstd() is not None:
+        codecs.append(CODEC_ZSTD)
+    return codecs
+
+
+def is_compressed(data: bytes) -> bool:
+    """Return True if the data starts with a compression header.
+
+    Args:
+        data (bytes): Stored file contents.
+
+    Returns:
+        bool: True if the data was written by compress().
+    """
+    return data.startswith(_MAGIC)
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    """Compress data and prepend the header that tells decompress() how to read it.
+
+    Data that does not shrink is stored as it is, without a header, unless it
+    happens to start with the header magic.
+
+    Args:
+        data (bytes): The data to compress.
+        codec (str): The codec to compress with; see available_codecs.
+
+    Returns:
+        bytes: The data to store.
+
+    Raises:
+        ValueError: If the codec is unknown or not installed.
+    """
+    if codec not in _COMPRESSORS:
+        raise ValueError(f"Unknown compression codec '{codec}'.")
+    compressed: bytes = _COMPRESSORS[codec](data)
+    if len(compressed) + _HEADER.size < len(data):
+        return _HEADER.pack(_MAGIC, _FORMAT_VERSION, _CODEC_IDS[codec]) + compressed
+    if is_compressed(data):
+        return _HEADER.pack(_MAGIC, _FORMAT_VERSION, _CODEC_IDS[CODEC_NONE]) + data
+    return data
+
+
+def decompress(data: bytes) -> bytes | None:
+    """Undo compress(). Data without a header is returned unchanged.
+
+    Args:
+        data (bytes): Stored file contents.
+
+    Returns:
+        bytes | None: The original data, or None if the header is not understood or the data is corrupt.
+    """
+    if not is_compressed(data):
+        return data
+    if len(data) < _HEADER.size:
+        return None
+    _, version, codec_id = _HEADER.unpack_from(data)
+    if version != _FORMAT_VERSION or codec_id not in _DECOMPRESSORS:
+        logger.warning(f"Unsupported compression header (version {version}, codec {codec_id}).")
+        return None
+    try:
+        return _DECOMPRESSORS[codec_id](data[_HEADER.size :])
+    except (zlib.error, lzma.LZMAError, ValueError) as exc:
+        logger.warning(f"Failed to decompress data: {exc}")
+        return None
@@ -210,11 +210,22 @@ class ModeNames(BaseEnum):
     DECRYPT = "decrypt"
     REKEY = "rekey"
     NUKE = "nuke"
+    PACK = "pack"
+    UNPACK = "unpack"
+    AGENT = "agent"
 
     @classmethod
     def all_provider_modes(cls) -> tuple[str, ...]:
         """Return mode names that apply to all providers (under 'gptcli all')."""
-        return (cls.ENCRYPT.value, cls.DECRYPT.value, cls.REKEY.value, cls.NUKE.value)
+        return (
+            cls.ENCRYPT.value,
+            cls.DECRYPT.value,
+            cls.REKEY.value,
+            cls.NUKE.value,
+            cls.PACK.value,
+            cls.UNPACK.value,
+            cls.AGENT.value,
+        )
 
 
 class SearchActions(BaseEnum):
@@ -230,6 +241,7 @@ class SearchTargets(BaseEnum):
 
     CHAT = "chat"
     OCR = "ocr"
+    ALL = "all"
 
 
 class ProviderNames(BaseEnum):
@@ -426,6 +438,32 @@ class MistralModelsOcr(BaseEnum):
         return cls.MISTRAL_OCR.value
 
 
+class MistralModelsEmbeddings(BaseEnum):
+    """The models that can be used to embed sessions for semantic search."""
+
+    MISTRAL_EMBED = "mistral-embed"
+
+    @classmethod
+    def default(cls) -> str:
+        """Returns the default value."""
+        return cls.MISTRAL_EMBED.value
+
+
+class OpenaiModelsEmbeddings(BaseEnum):
+    """The models that can be used to embed sessions for semantic search.
+
+    See here for more details: https://platform.openai.com/docs/guides/embeddings
+    """
+
+    TEXT_EMBEDDING_3_SMALL = "text-embedding-3-small"
+    TEXT_EMBEDDING_3_LARGE = "text-embedding-3-large"
+
+    @classmethod
+    def default(cls) -> str:
+        """Returns the default value."""
+        return cls.TEXT_EMBEDDING_3_SMALL.value
+
+
 class OutputTypes(BaseEnum):
     """Used exclusively with the single-exchange option to determine how to print the output."""
 
@@ -0,0 +1,482 @@
+"""Semantic search over chat and OCR sessions with a local index of embedding vectors.
+
+Full-text search only finds sessions that use the words of the query. The
+embedding index finds sessions that are about the same thing in other words:
+every session is embedded once by the provider's embeddings endpoint, the
+vectors are kept next to the full-text index, encrypted like the sessions,
+and a query is compared to all of them at once as a NumPy matrix product.
+
+NumPy is an optional dependency; only the embedding index needs it.
+"""
+
+import io
+import json
+import logging
+import os
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import replace
+from logging import Logger
+from os import path
+from types import ModuleType
+from typing import Any, Generic, TypeVar
+
+import requests
+from requests.exceptions import RequestException
+
+from gptcli.src.common.constants import (
+    MISTRAL,
+    OPENAI,
+    MistralModelsEmbeddings,
+    OpenaiModelsEmbeddings,
+)
+from gptcli.src.common.encryption import Encryption
+from gptcli.src.common.fts import (
+    IndexProgress,
+    OcrHit,
+    SessionHit,
+    _BaseFTS,
+    is_browse_query,
+    query_text,
+)
+from gptcli.src.common.manifest import Manifest
+from gptcli.src.common.session_store import SessionStore, open_session_store
+
+logger: Logger = logging.getLogger(__name__)
+
+T = TypeVar("T", SessionHit, OcrHit)
+
+_EMBEDDINGS_FILENAME: str = "embeddings.npz"
+_ENCRYPTED_EMBEDDINGS_FILENAME: str = _EMBEDDINGS_FILENAME + ".enc"
+
+_MAX_RESULTS: int = 50
+_EMBED_BATCH_SIZE: int = 32
+# Roughly 2,000 tokens: the start of a session says what it is about, and fits every model's input limit.
+_MAX_EMBED_CHARS: int = 8000
+_QUERY_CACHE_SIZE: int = 32
+_SEMANTIC_WEIGHT: float = 0.5
+
+
+class EmbeddingError(Exception):
+    """Raised when the embeddings endpoint cannot embed texts."""
+
+
+def _load_numpy() -> ModuleType | None:
+    """Import the optional numpy package.
+
+    Returns:
+        ModuleType | None: The numpy module, or None if it is not installed.
+    """
+    try:
+        import numpy
+    except ImportError:
+        return None
+    module: ModuleType = numpy
+    return module
+
+
+def has_numpy() -> bool:
+    """Return True if numpy, which the embedding index requires, is installed."""
+    return _load_numpy() is not None
+
+
+class EmbeddingClient:
+    """Embeds texts with the embeddings endpoint of a provider."""
+
+    def __init__(self, provider: str, api_key: str, url: str = "", model: str = "") -> None:
+        """Initialise a client for the provider's endpoint and default embedding model.
+
+        Args:
+            provider (str): The provider name.
+            api_key (str): The API key to authenticate with.
+            url (str, optional): The endpoint to post to instead of the provider's, e.g. a local
+                server that stands in for it. Defaults to "".
+            model (str, optional): The embedding model. Defaults to "", for the provider's default.
+
+        Raises:
+            NotImplementedError: Raised when the provider is not supported.
+        """
+        if provider == MISTRAL:
+            default_url, default_model = "https://api.mistral.ai/v1/embeddings", MistralModelsEmbeddings.default()
+        elif provider == OPENAI:
+            default_url, default_model = "https://api.openai.com/v1/embeddings", OpenaiModelsEmbeddings.default()
+        else:
+            raise NotImplementedError(f"Provider '{provider}' not yet supported.")
+        self._api_key: str = api_key
+        self._url: str = url or default_url
+        self._model: str = model or default_model
+
+    @property
+    def model(self) -> str:
+        """The embedding model, which the vectors of an index must all come from."""
+        return self._model
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """Embed texts in a single request.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Raises:
+            EmbeddingError: Raised when the request fails or the response is not one embedding per text.
+
+        Returns:
+            list[list[float]]: The embedding of every text, in the same order.
+        """
+        if not texts:
+            return []
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            "Authorization": f"Bearer {self._api_key}",
+        }
+        try:
+            response = requests.post(
+                url=self._url, headers=headers, json={"model": self._model, "input": texts}, timeout=30
+            )
+        except RequestException as exc:
+            raise EmbeddingError(f"Could not reach the embeddings endpoint: {exc}") from exc
+        if not response.ok:
+            raise EmbeddingError(f"The embeddings endpoint answered {response.status_code}.")
+        try:
+            data: list[dict[str, Any]] = sorted(response.json()["data"], key=lambda d: d.get("index", 0))
+            embeddings: list[list[float]] = [d["embedding"] for d in data]
+        except (ValueError, KeyError, TypeError, AttributeError) as exc:
+            raise EmbeddingError("The embeddings endpoint sent a malformed response.") from exc
+        if len(embeddings) != len(texts):
+            raise EmbeddingError(f"Expected {len(texts)} embeddings, received {len(embeddings)}.")
+        return embeddings
+
+
+class EmbeddingIndex:
+    """The embedding vectors of the sessions of a storage directory, searched by cosine similarity.
+
+    The vectors are the rows of one float32 matrix, normalised to unit length
+    so that the cosine similarity of a query to every session is one matrix
+    product. Without encryption the matrix, the UUIDs and the stamps of the
+    sessions are saved as ``embeddings.npz`` next to the sessions; with
+    encryption the same file is sealed as ``embeddings.npz.enc``. Each build
+    embeds only the sessions stored or rewritten since the last one.
+
+    Like the full-text index, it may be searched from a thread other than the
+    one that built it, as long as one thread uses it at a time.
+    """
+
+    def __init__(self, client: EmbeddingClient) -> None:
+        """Initialise an empty index whose vectors come from the client.
+
+        Args:
+            client (EmbeddingClient): The client to embed sessions and queries with.
+
+        Raises:
+            ValueError: Raised when numpy is not installed.
+        """
+        numpy = _load_numpy()
+        if numpy is None:
+            raise ValueError("Semantic search requires the 'numpy' package.")
+        self._np: ModuleType = numpy
+        self._client: EmbeddingClient = client
+        self._uuids: list[str] = []
+        self._stamps: list[str] = []
+        self._vectors: Any = numpy.zeros((0, 0), dtype=numpy.float32)
+        self._cache: OrderedDict[str, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._uuids)
+
+    def build(
+        self,
+        storage_dir: str,
+        encryption: Encryption | None,
+        session_text: Callable[[SessionStore, dict[str, Any], Encryption | None], str | None],
+        progress: IndexProgress | None = None,
+    ) -> int:
+        """Load the saved index and embed the sessions that are new or changed since it was saved.
+
+        Sessions deleted since are dropped. A failing request stops embedding
+        without raising: what was embedded is saved and the rest is embedded
+        on the next build.
+
+        Args:
+            storage_dir (str): Path to the provider's storage directory.
+            encryption (Encryption | None): Encryption instance or None.
+            session_text (Callable[[SessionStore, dict[str, Any], Encryption | None], str | None]): Reads the
+                text of a session given its store, manifest entry and encryption, e.g. _BaseFTS.session_text.
+            progress (IndexProgress | None, optional): Called after every request with the number of
+                sessions embedded so far and the number to embed. Defaults to None.
+
+        Returns:
+            int: The number of sessions in the index after building.
+        """
+        filepath: str = path.join(
+            storage_dir, _ENCRYPTED_EMBEDDINGS_FILENAME if encryption is not None else _EMBEDDINGS_FILENAME
+        )
+        self._load(filepath, encryption)
+        manifest: list[dict[str, Any]] = Manifest(storage_dir, encryption).read() or []
+        store = open_session_store(storage_dir)
+        stamps: dict[str, str] = {
+            session_uuid: json.dumps(stamp)
+            for session_uuid, stamp in store.session_stamps([e["uuid"] for e in manifest if "uuid" in e]).items()
+        }
+
+        kept: list[int] = [i for i, u in enumerate(self._uuids) if stamps.get(u) == self._stamps[i]]
+        changed: bool = len(kept) != len(self._uuids)
+        self._keep(kept)
+
+        embedded: set[str] = set(self._uuids)
+        to_embed: list[dict[str, Any]] = [e for e in manifest if e.get("uuid") in stamps and e["uuid"] not in embedded]
+        for start in range(0, len(to_embed), _EMBED_BATCH_SIZE):
+            batch: list[tuple[str, str]] = []
+            for entry in to_embed[start : start + _EMBED_BATCH_SIZE]:
+                text = session_text(store, entry, encryption)
+                if text and text.strip():
+                    batch.append((entry["uuid"], text[:_MAX_EMBED_CHARS]))
+            try:
+                self._append([u for u, _ in batch], self._client.embed([t for _, t in batch]), stamps)
+            except EmbeddingError as exc:
+                logger.warning(f"Stopped embedding sessions: {exc}")
+                break
+            changed = changed or bool(batch)
+            if progress is not None:
+                progress(min(start + _EMBED_BATCH_SIZE, len(to_embed)), len(to_embed))
+
+        if changed:
+            self._save(filepath, encryption)
+        return len(self._uuids)
+
+    def has_query(self, query: str) -> bool:
+        """Return True if the embedding of a query is cached, so nearest() finds its sessions offline."""
+        return query in self._cache
+
+    def embed_queries(self, queries: list[str]) -> None:
+        """Embed the queries that are not cached yet in one request and cache them.
+
+        Args:
+            queries (list[str]): The query texts.
+
+        Raises:
+            EmbeddingError: Raised when a query cannot be embedded.
+        """
+        np = self._np
+        missing: list[str] = list(dict.fromkeys(q for q in queries if q not in self._cache))
+        for query, vector in zip(missing, self._client.embed(missing)):
+            self._cache[query] = self._normalise(np.asarray([vector], dtype=np.float32))[0]
+            if len(self._cache) > _QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return None
+
+    def nearest(self, queries: list[str], k: int = _MAX_RESULTS, embed: bool = True) -> list[list[tuple[str, float]]]:
+        """Find the sessions most similar to each query, all queries in one matrix product.
+
+        The embeddings of recent queries are cached.
+
+        Args:
+            queries (list[str]): The query texts.
+            k (int, optional): The number of sessions to return per query. Defaults to 50.
+            embed (bool, optional): False to send nothing to the endpoint; queries that are not
+                cached get no sessions. Defaults to True.
+
+        Raises:
+            EmbeddingError: Raised when a query cannot be embedded.
+
+        Returns:
+            list[list[tuple[str, float]]]: For every query, up to k (UUID, cosine similarity) pairs,
+                most similar first.
+        """
+        np = self._np
+        if not queries or not self._uuids:
+            return [[] for _ in queries]
+        if embed:
+            self.embed_queries(queries)
+        known: list[str] = [q for q in queries if q in self._cache]
+        if not known:
+            return [[] for _ in queries]
+        query_vectors = np.stack([self._cache[q] for q in known])
+        if query_vectors.shape[1] != self._vectors.shape[1]:
+            raise EmbeddingError("The query embeddings do not have the dimension of the index.")
+
+        scores = query_vectors @ self._vectors.T
+        k = min(k, len(self._uuids))
+        # argpartition finds the k best of every row in linear time; only those k are sorted.
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        found: dict[str, list[tuple[str, float]]] = {
+            query: [(self._uuids[i], float(scores[row, i])) for i in top[row]] for row, query in enumerate(known)
+        }
+        return [found.get(q, []) for q in queries]
+
+    def _normalise(self, vectors: Any) -> Any:
+        """Scale the rows of a matrix to unit length, leaving zero rows as they are."""
+        norms = self._np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / self._np.where(norms == 0, 1, norms)
+
+    def _keep(self, rows: list[int]) -> None:
+        """Drop every session but those at the given rows."""
+        self._uuids = [self._uuids[i] for i in rows]
+        self._stamps = [self._stamps[i] for i in rows]
+        self._vectors = self._vectors[rows] if rows else self._np.zeros((0, 0), dtype=self._np.float32)
+
+    def _append(self, session_uuids: list[str], embeddings: list[list[float]], stamps: dict[str, str]) -> None:
+        """Add the embeddings of sessions to the matrix."""
+        if not session_uuids:
+            return None
+        vectors = self._normalise(self._np.asarray(embeddings, dtype=self._np.float32))
+        if self._uuids and vectors.shape[1] != self._vectors.shape[1]:
+            raise EmbeddingError("The embeddings do not have the dimension of the index.")
+        self._vectors = self._np.vstack([self._vectors, vectors]) if self._uuids else vectors
+        self._uuids.extend(session_uuids)
+        self._stamps.extend(stamps[u] for u in session_uuids)
+        return None
+
+    def _load(self, filepath: str, encryption: Encryption | None) -> None:
+        """Load the saved index, or start empty if it is missing, unreadable or from another model."""
+        self._keep([])
+        if not os.path.exists(filepath):
+            return None
+        if encryption is not None:
+            data: bytes | None = encryption.decrypt_file(filepath)
+        else:
+            with open(filepath, "rb") as fp:
+                data = fp.read()
+        if not data:
+            logger.warning("Embedding index is unreadable; embedding every session again.")
+            return None
+        try:
+            with self._np.load(io.BytesIO(data), allow_pickle=False) as saved:
+                model, uuids, stamps, vectors = saved["model"], saved["uuids"], saved["stamps"], saved["vectors"]
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning(f"Embedding index is corrupt; embedding every session again: {exc}")
+            return None
+        if str(model) != self._client.model:
+            logger.info("Embedding model changed; embedding every session again.")
+            return None
+        self._uuids, self._stamps = [str(u) for u in uuids], [str(s) for s in stamps]
+        self._vectors = vectors.astype(self._np.float32, copy=False)
+        return None
+
+    def _save(self, filepath: str, encryption: Encryption | None) -> None:
+        """Atomically replace the saved index. Failing only costs embedding again, so errors are logged."""
+        buffer = io.BytesIO()
+        self._np.savez(
+            buffer,
+            model=self._np.array(self._client.model),
+            uuids=self._np.array(self._uuids, dtype=str),
+            stamps=self._np.array(self._stamps, dtype=str),
+            vectors=self._vectors,
+        )
+        data: bytes = buffer.getvalue()
+        if encryption is not None:
+            data = encryption.encrypt_envelope(data)
+        tmp_path: str = filepath + ".tmp"
+        try:
+            with open(tmp_path, "wb") as fp:
+                fp.write(data)
+            os.replace(tmp_path, filepath)
+        except OSError as exc:
+            logger.warning(f"Could not save the embedding index: {exc}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return None
+
+
+class SemanticFTS(Generic[T]):
+    """A full-text index whose query results are blended with the sessions nearest the query in meaning.
+
+    Each hit is scored by a weighted sum of its BM25 rank, scaled so that the
+    best hit of the query scores 1, and the cosine similarity of its session
+    to the query. Sessions the full-text index did not match but that are
+    among the nearest are added, so a query finds sessions in other words.
+    Scores are stored negated in the hit, lower is better, like BM25 ranks.
+
+    Embedding a query is a request to the provider, which is slow and billed,
+    so search() never makes one: it blends in only queries already embedded
+    with embed_query(), which the caller runs once the query has settled.
+    Other queries, and queries that cannot be embedded, e.g. offline, get the
+    full-text hits alone. Browsing is left to the full-text index.
+    """
+
+    def __init__(self, fts: _BaseFTS[T], embeddings: EmbeddingIndex, weight: float = _SEMANTIC_WEIGHT) -> None:
+        """Blend a built full-text index with a built embedding index of the same sessions.
+
+        Args:
+            fts (_BaseFTS[T]): The full-text index.
+            embeddings (EmbeddingIndex): The embedding index.
+            weight (float, optional): The weight of the cosine similarity, from 0 for full-text ranking
+                alone to 1 for similarity alone. Defaults to 0.5.
+        """
+        self._fts: _BaseFTS[T] = fts
+        self._embeddings: EmbeddingIndex = embeddings
+        self._weight: float = min(max(weight, 0.0), 1.0)
+
+    @property
+    def has_substring_index(self) -> bool:
+        """Whether the full-text index has the trigram index."""
+        return self._fts.has_substring_index
+
+    def embed_query(self, query: str) -> bool:
+        """Embed a query, blocking on the request, so that search() blends in the sessions nearest it.
+
+        Args:
+            query (str): The search query string.
+
+        Returns:
+            bool: True if the query was embedded now, False if it has no text, was embedded already
+                or cannot be embedded.
+        """
+        text: str = query_text(query)
+        if is_browse_query(query) or self._embeddings.has_query(text):
+            return False
+        try:
+            self._embeddings.embed_queries([text])
+        except EmbeddingError as exc:
+            logger.warning(f"Searching without embeddings: {exc}")
+            return False
+        return True
+
+    def search(self, query: str) -> list[T]:
+        """Search the full-text index and blend its hits with the sessions nearest the query.
+
+        Only a query embedded with embed_query() is blended; see the class docstring.
+
+        Args:
+            query (str): The search query string. A query without text returns the first page of browse().
+
+        Returns:
+            list[T]: Up to 50 sessions ordered by blended score (or recency if no query).
+        """
+        if is_browse_query(query):
+            return self._fts.browse(query=query)
+        hits: list[T] = self._fts.search(query)
+        try:
+            similarities: dict[str, float] = dict(self._embeddings.nearest([query_text(query)], embed=False)[0])
+        except EmbeddingError as exc:
+            logger.warning(f"Searching without embeddings: {exc}")
+            return hits
+        if not similarities:
+            return hits
+
+        matched: set[str] = {h.uuid for h in hits}
+        hits += self._fts.lookup([u for u in similarities if u not in matched], query)
+        best: float = min((h.score for h in hits if h.uuid in matched), default=0.0)
+        blended: list[T] = [
+            replace(
+                hit,
+                score=-(
+                    (1 - self._weight) * (hit.score / best if hit.uuid in matched and best < 0 else 0.0)
+                    + self._weight * max(similarities.get(hit.uuid, 0.0), 0.0)
+                ),
+            )
+            for hit in hits
+        ]
+        blended.sort(key=lambda h: (h.score, -h.created, h.uuid))
+        return blended[:_MAX_RESULTS]
+
+    def browse(self, after: tuple[float, str] | None = None, query: str = "") -> list[T]:
+        """Return a page of the history of the full-text index; see _BaseFTS.browse."""
+        return self._fts.browse(after, query)
+
+    def interrupt(self) -> None:
+        """Abort the full-text query running on another thread."""
+        self._fts.interrupt()
+        return None
@@ -1,13 +1,27 @@
 """Handles encryption and decryption of data at rest using AES-256-GCM."""
 
+import hashlib
 import hmac
+import io
 import os
+import struct
+from collections.abc import Iterator
+from typing import BinaryIO
 
 from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
 
 from gptcli.constants import GPTCLI_VERIFICATION_PLAINTEXT
+from gptcli.src.common.compression import (
+    CODEC_NONE,
+    DEFAULT_CODEC,
+    codec_id,
+    compress,
+    decompress,
+    stream_compressor,
+    stream_decompressor,
+)
 
 _NONCE_SIZE: int = 12
 _TAG_SIZE: int = 16
@@ -16,20 +30,73 @@ _SALT_SIZE: int = 32
 _SCRYPT_N: int = 2**17
 _SCRYPT_R: int = 8
 _SCRYPT_P: int = 1
+# Label of the key derived from the master key for keyed_digest(), so it is never used for anything else.
+_DIGEST_KEY_LABEL: bytes = b"gptcli keyed digest"
+
+# bytes added to every payload sealed without compression: the nonce in front and the tag at the end
+CIPHERTEXT_OVERHEAD: int = _NONCE_SIZE + _TAG_SIZE
+
+# Streams are sealed in the style of the STREAM construction: a header, then fixed-size
+# chunks each sealed with the nonce <prefix><chunk counter><last-chunk flag> and the header
+# as associated data. A stream cut short at a chunk boundary lacks the flagged last chunk and
+# fails to decrypt. The leading NUL keeps the magic apart from the random nonce that starts
+# single-shot ciphertexts, except for a negligible fraction that decrypt() still falls back for.
+_STREAM_MAGIC: bytes = b"\x00GPS"
+_STREAM_VERSION: int = 1
+_STREAM_HEADER: struct.Struct = struct.Struct(">4sBBI7s")
+_STREAM_NONCE_PREFIX_SIZE: int = 7
+_STREAM_CHUNK_SIZE: int = 64 * 1024
+
+# Whole files are sealed with envelope encryption: a random data key per file, wrapped by the
+# master key in a fixed-size header, followed by the file sealed with the data key as a
+# single-shot ciphertext or a stream. Encrypted record logs start with the same header, followed
+# by frames sealed with the data key. Changing the master key only rewrites the header.
+_ENVELOPE_MAGIC: bytes = b"\x00GPE"
+_ENVELOPE_VERSION: int = 1
+_ENVELOPE_HEADER: struct.Struct = struct.Struct(f">4sB{_NONCE_SIZE}s{_KEY_SIZE + _TAG_SIZE}s")
+ENVELOPE_HEADER_SIZE: int = _ENVELOPE_HEADER.size
+
+
+def is_envelope(data: bytes) -> bool:
+    """Return True if the data starts with an envelope header, as whole files sealed by encrypt_envelope() and encrypted record logs do.
+
+    Args:
+        data (bytes): Sealed data, or at least its first ENVELOPE_HEADER_SIZE bytes.
+
+    Returns:
+        bool: True if the data has an envelope header.
+    """
+    return len(data) >= ENVELOPE_HEADER_SIZE and data.startswith(_ENVELOPE_MAGIC)
+
+
+class DecryptionError(Exception):
+    """Raised when a stream fails to decrypt, is truncated, or fails to decompress."""
 
 
 class Encryption:
     """Provides AES-256-GCM encryption and decryption for data at rest.
 
+    Whole files can be compressed before they are sealed; decryption undoes
+    the compression, so compressed and uncompressed files read the same.
+    Files larger than a chunk are sealed as a stream of chunks, so they can be
+    encrypted and decrypted with bounded memory; see encrypt_stream. Whole
+    files are sealed with a data key of their own, wrapped by this instance's
+    key in a header, so that they can be moved to another key by rewrapping
+    the header alone; see rewrap.
+
     Attributes:
         _aesgcm: The AES-GCM cipher instance initialized with the provided key.
+        _digest_key: The key of keyed_digest(), derived from the provided key.
+        _codec: The compression codec for whole files, or None to store them uncompressed.
     """
 
-    def __init__(self, key: bytes) -> None:
+    def __init__(self, key: bytes, codec: str | None = DEFAULT_CODEC) -> None:
         """Initialize with a 256-bit encryption key.
 
         Args:
             key (bytes): A 32-byte encryption key.
+            codec (str | None, optional): The compression codec for whole files; see
+                compression.available_codecs. None disables compression. Defaults to DEFAULT_CODEC.
 
         Raises:
             ValueError: If the key is not exactly 32 bytes.
@@ -37,9 +104,32 @@ class Encryption:
         if len(key) != _KEY_SIZE:
             raise ValueError(f"Key must be exactly {_KEY_SIZE} bytes, got {len(key)}.")
         self._aesgcm: AESGCM = AESGCM(key)
+        self._digest_key: bytes = hmac.new(key, _DIGEST_KEY_LABEL, hashlib.sha256).digest()
+        self._codec: str | None = codec
+
+    @property
+    def codec(self) -> str | None:
+        """The compression codec for whole files and record log frames, or None to store them uncompressed."""
+        return self._codec
+
+    def keyed_digest(self, data: bytes) -> str:
+        """Return the HMAC-SHA256 of data under a key derived from this instance's key.
+
+        Unlike a plain hash, it does not let anyone without the key confirm that known data is stored.
+
+        Args:
+            data (bytes): The data to digest.
+
+        Returns:
+            str: The hex digest.
+        """
+        return hmac.new(self._digest_key, data, hashlib.sha256).hexdigest()
 
     def encrypt(self, plaintext: bytes) -> bytes:
-        """Encrypt plaintext using AES-256-GCM.
+        """Encrypt plaintext using AES-256-GCM, as is, with this instance's key.
+
+        The result is always CIPHERTEXT_OVERHEAD bytes longer than the plaintext,
+        as record log frames and other payloads located by offset require.
 
         Args:
             plaintext (bytes): The data to encrypt.
@@ -51,6 +141,107 @@ class Encryption:
         ciphertext: bytes = self._aesgcm.encrypt(nonce, plaintext, None)
         return nonce + ciphertext
 
+    def encrypt_envelope(self, plaintext: bytes) -> bytes:
+        """Encrypt the contents of a whole file in the envelope format.
+
+        The plaintext is compressed with the instance's codec, then sealed with a
+        data key of its own, as a stream if it is larger than a chunk. The data
+        key is wrapped by this instance's key in an envelope header in front.
+
+        Args:
+            plaintext (bytes): The file contents.
+
+        Returns:
+            bytes: An envelope header followed by the file sealed with its data key.
+        """
+        header, data_encryption = self.new_envelope()
+        return header + data_encryption._seal_file(plaintext)
+
+    def _seal_file(self, plaintext: bytes) -> bytes:
+        """Compress and seal a whole file with this instance's key, as a stream if it is larger than a chunk.
+
+        Args:
+            plaintext (bytes): The file contents.
+
+        Returns:
+            bytes: A single-shot ciphertext or a sealed stream.
+        """
+        if len(plaintext) > _STREAM_CHUNK_SIZE:
+            sealed = io.BytesIO()
+            self.encrypt_stream(io.BytesIO(plaintext), sealed, compressed=True)
+            return sealed.getvalue()
+        if self._codec is not None:
+            plaintext = compress(plaintext, self._codec)
+        nonce: bytes = os.urandom(_NONCE_SIZE)
+        return nonce + self._aesgcm.encrypt(nonce, plaintext, None)
+
+    def new_envelope(self) -> tuple[bytes, "Encryption"]:
+        """Generate a data key and wrap it with this instance's key.
+
+        Returns:
+            tuple[bytes, Encryption]: The envelope header, and an Encryption instance for the data key.
+        """
+        data_key: bytes = os.urandom(_KEY_SIZE)
+        return self._wrap(data_key), Encryption(key=data_key, codec=self._codec)
+
+    def _wrap(self, data_key: bytes) -> bytes:
+        nonce: bytes = os.urandom(_NONCE_SIZE)
+        aad: bytes = _ENVELOPE_MAGIC + bytes([_ENVELOPE_VERSION])
+        return _ENVELOPE_HEADER.pack(
+            _ENVELOPE_MAGIC, _ENVELOPE_VERSION, nonce, self._aesgcm.encrypt(nonce, data_key, aad)
+        )
+
+    def _unwrap(self, header: bytes) -> bytes | None:
+        """Recover the data key from an envelope header.
+
+        Args:
+            header (bytes): Sealed data starting with an envelope header.
+
+        Returns:
+            bytes | None: The data key, or None if the data has no envelope header or it was not
+                wrapped with this instance's key.
+        """
+        if not is_envelope(header):
+            return None
+        _, version, nonce, wrapped = _ENVELOPE_HEADER.unpack_from(header)
+        if version != _ENVELOPE_VERSION:
+            return None
+        try:
+            data_key: bytes = self._aesgcm.decrypt(nonce, wrapped, _ENVELOPE_MAGIC + bytes([version]))
+        except InvalidTag:
+            return None
+        return data_key
+
+    def open_envelope(self, header: bytes) -> "Encryption | None":
+        """Recover the data key of an envelope header made by new_envelope.
+
+        Args:
+            header (bytes): Sealed data starting with an envelope header.
+
+        Returns:
+            Encryption | None: An Encryption instance for the data key, or None if the data has no
+                envelope header or it was not wrapped with this instance's key.
+        """
+        data_key: bytes | None = self._unwrap(header)
+        return Encryption(key=data_key, codec=self._codec) if data_key is not None else None
+
+    def rewrap(self, header: bytes, new_encryption: "Encryption") -> bytes | None:
+        """Rewrap the data key of a whole file for another key, leaving the sealed file itself as it is.
+
+        Args:
+            header (bytes): The sealed file, or at least its first ENVELOPE_HEADER_SIZE bytes.
+            new_encryption (Encryption): The Encryption instance whose key should wrap the data key.
+
+        Returns:
+            bytes | None: The new envelope header, ENVELOPE_HEADER_SIZE bytes long, to replace the
+                first ENVELOPE_HEADER_SIZE bytes of the file with; or None if the file has no envelope
+                header or its data key was not wrapped with this instance's key.
+        """
+        data_key: bytes | None = self._unwrap(header)
+        if data_key is None:
+            return None
+        return new_encryption._wrap(data_key)
+
     @staticmethod
     def _has_encrypted_content(ciphertext: bytes) -> bool:
         """Check if ciphertext is long enough to contain valid encrypted content.
@@ -66,26 +257,167 @@ class Encryption:
         return len(ciphertext) >= _NONCE_SIZE + _TAG_SIZE
 
     def decrypt(self, ciphertext: bytes) -> bytes | None:
-        """Decrypt ciphertext produced by encrypt().
+        """Decrypt ciphertext produced by encrypt() or encrypt_stream(), decompressing it if it was compressed.
+
+        Args:
+            ciphertext (bytes): The nonce + ciphertext + tag blob, or a sealed stream.
+
+        Returns:
+            bytes | None: The original plaintext, or None if decryption or decompression fails.
+        """
+        if is_envelope(ciphertext):
+            data_encryption: Encryption | None = self.open_envelope(ciphertext)
+            if data_encryption is not None:
+                return data_encryption._decrypt_sealed(ciphertext[ENVELOPE_HEADER_SIZE:])
+        return self._decrypt_sealed(ciphertext)
+
+    def _decrypt_sealed(self, ciphertext: bytes) -> bytes | None:
+        if ciphertext.startswith(_STREAM_MAGIC):
+            try:
+                return b"".join(self.decrypt_stream(io.BytesIO(ciphertext)))
+            except DecryptionError:
+                pass
+        return self._decrypt_single(ciphertext)
+
+    def decrypt_payload(self, ciphertext: bytes) -> bytes | None:
+        """Decrypt a ciphertext produced by encrypt(), returning exactly the bytes that were encrypted.
+
+        Unlike decrypt(), compressed data is left compressed, e.g. so that a record
+        log frame keeps its length when the log is decrypted frame by frame.
 
         Args:
             ciphertext (bytes): The nonce + ciphertext + tag blob.
 
         Returns:
-            bytes | None: The original plaintext, or None if decryption fails.
+            bytes | None: The encrypted bytes, or None if decryption fails.
         """
         if not self._has_encrypted_content(ciphertext):
             return None
-        nonce: bytes = ciphertext[:_NONCE_SIZE]
-        encrypted_data: bytes = ciphertext[_NONCE_SIZE:]
+        view: memoryview = memoryview(ciphertext)
         try:
-            result: bytes = self._aesgcm.decrypt(nonce, encrypted_data, None)
-            return result
+            result: bytes = self._aesgcm.decrypt(view[:_NONCE_SIZE], view[_NONCE_SIZE:], None)
         except InvalidTag:
             return None
+        return result
+
+    def _decrypt_single(self, ciphertext: bytes) -> bytes | None:
+        result: bytes | None = self.decrypt_payload(ciphertext)
+        return None if result is None else decompress(result)
+
+    @staticmethod
+    def _stream_nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+        return prefix + counter.to_bytes(4, "big") + (b"\x01" if last else b"\x00")
+
+    def encrypt_stream(self, source: BinaryIO, target: BinaryIO, compressed: bool = True) -> None:
+        """Encrypt a stream chunk by chunk, holding at most a few chunks in memory.
+
+        Args:
+            source (BinaryIO): The plaintext to read.
+            target (BinaryIO): Where the sealed stream is written.
+            compressed (bool, optional): Compress the plaintext with the instance's codec. Defaults to True.
+        """
+        codec: str = self._codec if compressed and self._codec is not None else CODEC_NONE
+        compressor = stream_compressor(codec)
+        prefix: bytes = os.urandom(_STREAM_NONCE_PREFIX_SIZE)
+        header: bytes = _STREAM_HEADER.pack(
+            _STREAM_MAGIC, _STREAM_VERSION, codec_id(codec), _STREAM_CHUNK_SIZE, prefix
+        )
+        target.write(header)
+        pending: bytearray = bytearray()
+        counter: int = 0
+        while True:
+            block: bytes = source.read(_STREAM_CHUNK_SIZE)
+            pending += compressor.compress(block) if block else compressor.flush()
+            # Keep at least one chunk back until the source is exhausted: only then is it known to be the last.
+            while len(pending) > _STREAM_CHUNK_SIZE:
+                chunk: bytes = bytes(pending[:_STREAM_CHUNK_SIZE])
+                del pending[:_STREAM_CHUNK_SIZE]
+                target.write(self._aesgcm.encrypt(self._stream_nonce(prefix, counter, False), chunk, header))
+                counter += 1
+            if not block:
+                break
+        target.write(self._aesgcm.encrypt(self._stream_nonce(prefix, counter, True), bytes(pending), header))
+
+    def decrypt_stream(self, source: BinaryIO) -> Iterator[bytes]:
+        """Decrypt a stream chunk by chunk, yielding plaintext as soon as each chunk is authenticated.
+
+        Ciphertexts produced by encrypt() without streaming are read whole and yielded at once.
+        Whole files behind an envelope header are decrypted with their data key.
+
+        Args:
+            source (BinaryIO): The sealed data to read.
+
+        Yields:
+            bytes: Pieces of the plaintext, in order.
+
+        Raises:
+            DecryptionError: If a chunk fails to authenticate, the stream is truncated, or the
+                plaintext fails to decompress. Pieces yielded before the error are authentic.
+        """
+        head: bytes = source.read(len(_ENVELOPE_MAGIC))
+        if head == _ENVELOPE_MAGIC:
+            head += source.read(ENVELOPE_HEADER_SIZE - len(head))
+            data_encryption: Encryption | None = self.open_envelope(head)
+            if data_encryption is not None:
+                yield from data_encryption._decrypt_sealed_stream(source, b"")
+                return
+        yield from self._decrypt_sealed_stream(source, head)
+
+    def _decrypt_sealed_stream(self, source: BinaryIO, head: bytes) -> Iterator[bytes]:
+        """Decrypt a stream or single-shot ciphertext sealed with this instance's key; see decrypt_stream.
+
+        Args:
+            source (BinaryIO): The sealed data to read.
+            head (bytes): Bytes already read from the start of the sealed data.
+
+        Yields:
+            bytes: Pieces of the plaintext, in order.
+
+        Raises:
+            DecryptionError: If the data fails to decrypt or decompress.
+        """
+        if len(head) < _STREAM_HEADER.size:
+            head += source.read(_STREAM_HEADER.size - len(head))
+        if not head.startswith(_STREAM_MAGIC):
+            single: bytes | None = self._decrypt_single(head + source.read())
+            if single is None:
+                raise DecryptionError("Failed to decrypt data.")
+            yield single
+            return
+        if len(head) < _STREAM_HEADER.size:
+            raise DecryptionError("Truncated stream header.")
+        _, version, codec, chunk_size, prefix = _STREAM_HEADER.unpack(head)
+        if version != _STREAM_VERSION or chunk_size == 0:
+            raise DecryptionError(f"Unsupported stream version {version}.")
+        try:
+            decompressor = stream_decompressor(codec)
+        except ValueError as exc:
+            raise DecryptionError(str(exc)) from exc
+        sealed_size: int = chunk_size + _TAG_SIZE
+        counter: int = 0
+        current: bytes = source.read(sealed_size)
+        while True:
+            following: bytes = source.read(sealed_size) if len(current) == sealed_size else b""
+            last: bool = not following
+            try:
+                chunk: bytes = self._aesgcm.decrypt(self._stream_nonce(prefix, counter, last), current, head)
+            except InvalidTag as exc:
+                raise DecryptionError("Stream chunk failed to authenticate or the stream is truncated.") from exc
+            try:
+                plaintext: bytes = decompressor.decompress(chunk)
+            except Exception as exc:
+                raise DecryptionError(f"Failed to decompress stream: {exc}") from exc
+            if plaintext:
+                yield plaintext
+            if last:
+                return
+            counter += 1
+            current = following
 
     def encrypt_file(self, source_path: str) -> None:
-        """Encrypt a file and write the result to source_path + '.enc'.
+        """Compress and encrypt a file as a stream and write the result to source_path + '.enc'.
+
+        The file is sealed with a data key of its own behind an envelope header.
 
         The original file is removed after successful encryption.
 
@@ -95,12 +427,11 @@ class Encryption:
         Raises:
             FileNotFoundError: If the source file does not exist.
         """
-        with open(source_path, "rb") as fp:
-            plaintext: bytes = fp.read()
-        encrypted: bytes = self.encrypt(plaintext)
         enc_path: str = source_path + ".enc"
-        with open(enc_path, "wb") as fp:
-            fp.write(encrypted)
+        with open(source_path, "rb") as source, open(enc_path, "wb") as target:
+            header, data_encryption = self.new_envelope()
+            target.write(header)
+            data_encryption.encrypt_stream(source, target, compressed=True)
         os.remove(source_path)
 
     def decrypt_file(self, source_path: str) -> bytes | None:
@@ -133,18 +464,20 @@ class Encryption:
         return os.urandom(_SALT_SIZE)
 
     @staticmethod
-    def derive_key(passphrase: str, salt: bytes, n: int = _SCRYPT_N) -> bytes:
+    def derive_key(passphrase: str, salt: bytes, n: int = _SCRYPT_N, r: int = _SCRYPT_R, p: int = _SCRYPT_P) -> bytes:
         """Derive a 256-bit key from a passphrase and salt using scrypt.
 
         Args:
             passphrase (str): The user's passphrase.
             salt (bytes): A random salt for key derivation.
             n (int): The CPU/memory cost parameter for scrypt. Defaults to _SCRYPT_N (2**17).
+            r (int): The block size parameter for scrypt. Defaults to _SCRYPT_R (8).
+            p (int): The parallelization parameter for scrypt. Defaults to _SCRYPT_P (1).
 
         Returns:
             bytes: A 32-byte derived key.
         """
-        kdf: Scrypt = Scrypt(salt=salt, length=_KEY_SIZE, n=n, r=_SCRYPT_R, p=_SCRYPT_P)
+        kdf: Scrypt = Scrypt(salt=salt, length=_KEY_SIZE, n=n, r=r, p=p)
         key: bytes = kdf.derive(passphrase.encode("utf-8"))
         return key
 
@@ -1,52 +1,357 @@
 """SQLite FTS5-backed full-text search index for chat and OCR sessions."""
 
 import json
+import logging
 import os
 import re
 import sqlite3
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from collections import OrderedDict, deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime
+from logging import Logger
 from os import path
-from typing import Any, Generic, TypeVar
+from typing import Any, Generic, Protocol, TypeVar
 
 from gptcli.constants import (
-    GPTCLI_MANIFEST_FILENAME,
     GPTCLI_METADATA_FILENAME,
-    GPTCLI_SESSION_FILENAME,
 )
+from gptcli.src.common.blob_store import BlobStore
 from gptcli.src.common.encryption import Encryption
-from gptcli.src.common.file_io import read_text_file
+from gptcli.src.common.manifest import Manifest
+from gptcli.src.common.message_log import SessionLocked, read_chat_session
+from gptcli.src.common.record_log import RecordLog
+from gptcli.src.common.session_store import SessionStore, open_session_store
+
+logger: Logger = logging.getLogger(__name__)
 
 _SNIPPET_MAX_LENGTH: int = 120
+_SNIPPET_TOKENS: int = 16
+_SNIPPETS_PER_HIT: int = 2
+# Control characters FTS5 snippet() wraps matched terms in; they cannot occur in tokenized text.
+_MATCH_START: str = "\x02"
+_MATCH_END: str = "\x03"
 _MAX_RESULTS: int = 50
+_BROWSE_PAGE_SIZE: int = 50
+# Prefix queries shorter than the smallest prefix index would scan a large part of the full-text index.
+_MIN_PREFIX_LENGTH: int = 2
+_QUERY_CACHE_SIZE: int = 32
+# Shorter substrings have no trigram to look up, so finding them would scan every row.
+_MIN_SUBSTRING_LENGTH: int = 3
+# A quoted phrase or backquoted substring, possibly negated and still unterminated while it is
+# typed, or any other run of characters.
+_QUERY_PIECE: re.Pattern[str] = re.compile(r'-?"[^"]*"?|-?`[^`]*`?|\S+')
+_QUERY_FACET: re.Pattern[str] = re.compile(r"(?<!\S)(model|provider|after|before|role):(\S+)")
+_DATE_FORMATS: tuple[str, ...] = ("%Y-%m-%d", "%Y-%m", "%Y")
+DEFAULT_INDEX_JOBS: int = min(8, os.cpu_count() or 1)
+_INDEX_BATCH_SIZE: int = 256
+_PREFETCH_PER_JOB: int = 4
+# Orphaned rows are compacted away once there are at least this many and they outnumber this share of live rows.
+_MIN_ORPHANS_TO_COMPACT: int = 64
+_MAX_ORPHAN_RATIO: float = 0.25
 _DB_FILENAME: str = "search.db"
+_ENCRYPTED_DB_FILENAME: str = _DB_FILENAME + ".enc"
+# Sessions indexed since the encrypted snapshot was saved, appended one record each and merged in by build().
+_DELTA_FILENAME: str = "search.delta.log"
+# Stored as PRAGMA user_version once an index is migrated; indexes created earlier have 0.
+_SCHEMA_VERSION: int = 1
+# Bytes 18 and 19 of the SQLite header are the file format write/read versions: 2 marks a WAL
+# database, which sqlite3_deserialize() cannot open, 1 the rollback journal an in-memory one uses.
+_FORMAT_VERSION_OFFSET: int = 18
+_ROLLBACK_FORMAT_VERSIONS: bytes = b"\x01\x01"
 
 T = TypeVar("T")
 
+IndexProgress = Callable[[int, int], None]
+"""Called with the number of sessions indexed so far and the number to index."""
+
 
 def tokenize(text: str) -> list[str]:
     """Tokenize text into lowercase alphanumeric tokens."""
     return re.findall(r"[a-z0-9]+", text.lower())
 
 
+@dataclass
+class _QueryTerm:
+    """A word, quoted phrase or backquoted substring of a search query.
+
+    Attributes:
+        tokens: The tokens of the term, matched as a phrase if there are several.
+        negated: Whether sessions matching the term are excluded.
+        prefix: Whether the last token also matches the longer tokens it starts.
+        text: The term as typed, without its quotes, matched as is by the trigram index.
+        substring: Whether the term was backquoted, asking for a substring search.
+    """
+
+    tokens: list[str]
+    negated: bool = False
+    prefix: bool = False
+    text: str = ""
+    substring: bool = False
+
+    def expression(self, substring: bool = False) -> str:
+        """Return the term as an FTS5 phrase, of its tokens or, for the trigram index, of its text."""
+        if substring:
+            return '"' + self.text.replace('"', '""') + '"'
+        return '"' + " ".join(self.tokens) + '"' + ("*" if self.prefix else "")
+
+
+@dataclass
+class _Filters:
+    """The facets of a search query, which narrow it down by session metadata rather than text.
+
+    Attributes:
+        model: The start of the model name, case-insensitive.
+        provider: The start of the provider name, case-insensitive.
+        after: The timestamp sessions must be created at or after.
+        before: The timestamp sessions must be created before.
+        role: The role of the message that matched, case-insensitive. Chat only.
+    """
+
+    model: str | None = None
+    provider: str | None = None
+    after: float | None = None
+    before: float | None = None
+    role: str | None = None
+
+    def session_conditions(self, table: str) -> tuple[list[str], list[Any]]:
+        """Return the SQL conditions on the sessions table and their parameters.
+
+        Args:
+            table (str): The name or alias of the sessions table in the query.
+
+        Returns:
+            tuple[list[str], list[Any]]: The conditions, to be ANDed, and their parameters in order.
+        """
+        conditions: list[str] = []
+        params: list[Any] = []
+        for column, prefix in (("model", self.model), ("provider", self.provider)):
+            if prefix is not None:
+                # A prefix LIKE is answered from the column's NOCASE index.
+                conditions.append(f"{table}.{column} LIKE ? ESCAPE '\\'")
+                params.append(re.sub(r"([\\%_])", r"\\\1", prefix) + "%")
+        if self.after is not None:
+            conditions.append(f"{table}.created >= ?")
+            params.append(self.after)
+        if self.before is not None:
+            conditions.append(f"{table}.created < ?")
+            params.append(self.before)
+        return conditions, params
+
+
+def _parse_date(value: str) -> float | None:
+    """Return the local timestamp a YYYY, YYYY-MM or YYYY-MM-DD date starts at, or None if it is not one."""
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).timestamp()
+        except ValueError:
+            continue
+    return None
+
+
+def _split_filters(query: str) -> tuple[str, _Filters]:
+    """Take the facets out of a search query.
+
+    A facet is a key:value term: model:, provider: and role: match values
+    that start with it, after: and before: take a YYYY, YYYY-MM or YYYY-MM-DD
+    date, after: from its start and before: up to it. A date that cannot be
+    parsed leaves the term in the text.
+
+    Args:
+        query (str): The query as typed.
+
+    Returns:
+        tuple[str, _Filters]: The text of the query without its facets, and the facets.
+    """
+    filters = _Filters()
+
+    def _take(facet: re.Match[str]) -> str:
+        key, value = facet.group(1), facet.group(2)
+        if key in ("after", "before"):
+            timestamp = _parse_date(value)
+            if timestamp is None:
+                return facet.group(0)
+            setattr(filters, key, timestamp)
+        else:
+            setattr(filters, key, value)
+        return ""
+
+    return _QUERY_FACET.sub(_take, query), filters
+
+
+def is_browse_query(query: str) -> bool:
+    """Return True if a search query has no text, only facets if any, so it browses the history."""
+    return not _split_filters(query)[0].strip()
+
+
+def is_substring_query(query: str) -> bool:
+    """Return True if a search query has a `backquoted` term, asking for a substring search."""
+    return "`" in _split_filters(query)[0]
+
+
+def query_text(query: str) -> str:
+    """Return the text of a search query without its facets and surrounding whitespace."""
+    return " ".join(_split_filters(query)[0].split())
+
+
+def _parse_query(query: str, substring: bool = False) -> list[list[_QueryTerm]]:
+    """Split a search query into alternatives, each a list of terms that must all match.
+
+    Words match anywhere, "quoted words" as a phrase. OR separates alternatives,
+    and NOT or a leading '-' excludes a term. The last term is matched as a
+    prefix while it is typed, i.e. unless the query ends with a space or a
+    closing quote. Alternatives with no term to include are dropped, since
+    finding what they match would scan every row. Facets are left out; see
+    _split_filters.
+
+    A `backquoted` term is a substring. For the trigram index every term is
+    matched as a substring of at least 3 characters, otherwise backquotes
+    are read as double quotes.
+
+    Args:
+        query (str): The query as typed.
+        substring (bool, optional): Parse the terms for the trigram index. Defaults to False.
+
+    Returns:
+        list[list[_QueryTerm]]: The alternatives that include at least one term.
+    """
+    query = _split_filters(query)[0]
+    alternatives: list[list[_QueryTerm]] = [[]]
+    negate_next: bool = False
+    pieces: list[str] = _QUERY_PIECE.findall(query)
+    for i, piece in enumerate(pieces):
+        if piece == "OR":
+            alternatives.append([])
+            negate_next = False
+            continue
+        if piece in ("AND", "NOT"):
+            negate_next = piece == "NOT"
+            continue
+        negated: bool = negate_next or (piece.startswith("-") and len(piece) > 1)
+        negate_next = False
+        piece = piece[1:] if piece.startswith("-") else piece
+        quote: str = piece[:1] if piece[:1] in ('"', "`") else ""
+        closed: bool = bool(quote) and len(piece) > 1 and piece.endswith(quote)
+        text: str = piece[1:-1] if closed else piece[1:] if quote else piece
+        term = _QueryTerm(tokenize(text), negated, text=text, substring=quote == "`")
+        if substring:
+            if len(text) < _MIN_SUBSTRING_LENGTH:
+                continue
+        elif not term.tokens:
+            continue
+        else:
+            typing: bool = i == len(pieces) - 1 and not query[-1].isspace() and not closed and not term.substring
+            term.prefix = typing and len(term.tokens[-1]) >= _MIN_PREFIX_LENGTH
+        alternatives[-1].append(term)
+    return [terms for terms in alternatives if any(not t.negated for t in terms)]
+
+
+def match_expression(query: str, substring: bool = False) -> str | None:
+    """Translate a search query into an FTS5 MATCH expression.
+
+    Args:
+        query (str): The query as typed. See _parse_query for its syntax.
+        substring (bool, optional): Translate it for the trigram index. Defaults to False.
+
+    Returns:
+        str | None: The expression, or None if the query has no term to include.
+    """
+    clauses: list[str] = []
+    for terms in _parse_query(query, substring):
+        included: str = " AND ".join(t.expression(substring) for t in terms if not t.negated)
+        excluded: str = " OR ".join(t.expression(substring) for t in terms if t.negated)
+        clauses.append(f"({included}) NOT ({excluded})" if excluded else f"({included})")
+    return " OR ".join(clauses) or None
+
+
+def query_terms(query: str, substring: bool = False) -> list[str]:
+    """Return the tokens a search query includes, e.g. to highlight them, leaving out excluded terms.
+
+    Args:
+        query (str): The query as typed.
+        substring (bool, optional): Return the substrings the trigram index matches instead. Defaults to False.
+
+    Returns:
+        list[str]: The tokens or substrings, lowercase.
+    """
+    if substring:
+        return [t.text.lower() for terms in _parse_query(query, True) for t in terms if not t.negated]
+    return [token for terms in _parse_query(query) for t in terms if not t.negated for token in t.tokens]
+
+
+def _substring_spans(text: str, substrings: list[str]) -> list[tuple[int, int]]:
+    """Return the sorted, non-overlapping (start, end) offsets of the substrings in text, ignoring case."""
+    spans: list[tuple[int, int]] = []
+    if substrings:
+        pattern = re.compile("|".join(re.escape(s) for s in sorted(substrings, key=len, reverse=True)), re.IGNORECASE)
+        spans = [m.span() for m in pattern.finditer(text)]
+    return spans
+
+
 def _placeholders(n: int) -> str:
     return ",".join("?" * n)
 
 
 def _load_manifest(storage_dir: str, encryption: Encryption | None) -> list[dict[str, Any]]:
-    raw = read_text_file(path.join(storage_dir, GPTCLI_MANIFEST_FILENAME), encryption)
-    if raw is None:
-        return []
-    try:
-        result: list[dict[str, Any]] = json.loads(raw)
-        return result
-    except json.JSONDecodeError:
-        return []
+    return Manifest(storage_dir, encryption).read() or []
+
+
+def _truncate(text: str) -> str:
+    single_line = text.replace("\n", " ").replace("\r", " ")
+    return single_line[:_SNIPPET_MAX_LENGTH] + ("..." if len(single_line) > _SNIPPET_MAX_LENGTH else "")
+
 
+def _parse_excerpt(excerpt: str) -> tuple[str, list[tuple[int, int]]]:
+    """Split an FTS5 snippet() excerpt into its text and the spans of the matched terms.
 
-def _load_metadata(session_dir: str, encryption: Encryption | None) -> dict[str, Any] | None:
-    raw = read_text_file(path.join(session_dir, GPTCLI_METADATA_FILENAME), encryption)
+    Args:
+        excerpt (str): The excerpt, with matched terms wrapped in _MATCH_START and _MATCH_END.
+
+    Returns:
+        tuple[str, list[tuple[int, int]]]: The truncated single-line text and the (start, end) offsets
+            of the matched terms in it.
+    """
+    text: str = ""
+    spans: list[tuple[int, int]] = []
+    start: int = 0
+    for part in re.split(f"([{_MATCH_START}{_MATCH_END}])", excerpt):
+        if part == _MATCH_START:
+            start = len(text)
+        elif part == _MATCH_END:
+            spans.append((start, len(text)))
+        else:
+            text += part
+    truncated: str = _truncate(text)
+    return truncated, [(a, min(b, _SNIPPET_MAX_LENGTH)) for a, b in spans if a < _SNIPPET_MAX_LENGTH]
+
+
+def _substring_excerpt(content: str, substrings: list[str]) -> tuple[str, list[tuple[int, int]]]:
+    """Cut an excerpt around the first of the substrings in a message, as _parse_excerpt returns it.
+
+    snippet() cannot be used with the trigram index, whose matches it does not fully highlight.
+
+    Args:
+        content (str): The message.
+        substrings (list[str]): The substrings the message matched.
+
+    Returns:
+        tuple[str, list[tuple[int, int]]]: The truncated single-line text and the (start, end) offsets
+            of the substrings in it.
+    """
+    single_line: str = content.replace("\n", " ").replace("\r", " ")
+    spans: list[tuple[int, int]] = _substring_spans(single_line, substrings)
+    start: int = 0
+    if spans and spans[0][1] > _SNIPPET_MAX_LENGTH:
+        start = spans[0][0] - _SNIPPET_MAX_LENGTH // 4
+    text: str = ("…" + single_line[start:]) if start else single_line
+    shifted = [(a - start + bool(start), b - start + bool(start)) for a, b in spans if a >= start]
+    return _truncate(text), [(a, min(b, _SNIPPET_MAX_LENGTH)) for a, b in shifted if a < _SNIPPET_MAX_LENGTH]
+
+
+def _load_metadata(store: SessionStore, session_uuid: str, encryption: Encryption | None) -> dict[str, Any] | None:
+    raw = store.read_text(session_uuid, GPTCLI_METADATA_FILENAME, encryption)
     if raw is None:
         return None
     try:
@@ -56,17 +361,40 @@ def _load_metadata(session_dir: str, encryption: Encryption | None) -> dict[str,
         return None
 
 
+@dataclass
+class _IndexedSession:
+    """The rows of one session, loaded and parsed, ready to be inserted.
+
+    Attributes:
+        session_row: The row of the ``sessions`` table, without the id and stamp columns.
+        content: The text indexed for the session as a whole, if the index has one row per session.
+        aux_rows: The rows of the auxiliary detail table.
+        stamp: The serialized session stamp the rows were loaded at.
+    """
+
+    session_row: tuple[Any, ...]
+    content: str = ""
+    aux_rows: list[tuple[Any, ...]] = field(default_factory=list)
+    stamp: str = ""
+
+
 @dataclass
 class MessageSnippet:
     """A truncated message used as a search result preview.
 
     Attributes:
         role: The role of the message sender (e.g. 'user', 'assistant', 'system', 'developer').
-        content: The message content, truncated to 120 characters, newlines removed.
+        content: The message content, or the excerpt around the matched terms, truncated to
+            120 characters, newlines removed.
+        position: The index of the message in its session.
+        highlights: The (start, end) offsets of the terms the query matched in content. Empty
+            when browsing without a query.
     """
 
     role: str
     content: str
+    position: int = 0
+    highlights: list[tuple[int, int]] = field(default_factory=list)
 
 
 @dataclass
@@ -79,7 +407,10 @@ class SessionHit:
         model: The model used in the session.
         provider: The provider name.
         message_count: Total number of messages in the session.
-        snippets: First user message and first assistant message from the session.
+        snippets: The best-matching messages of the session, or its first user message and first
+            assistant message when browsing without a query.
+        position: The index of the best-matching message, or None when browsing without a query.
+        score: The BM25 rank of the best-matching message, lower is better, or 0 when browsing.
     """
 
     uuid: str
@@ -88,6 +419,8 @@ class SessionHit:
     provider: str
     message_count: int
     snippets: list[MessageSnippet]
+    position: int | None = None
+    score: float = 0.0
 
     @property
     def created_display(self) -> str:
@@ -107,6 +440,7 @@ class OcrHit:
         source_filename: The filename of the source document.
         page_count: Total number of pages processed.
         snippet: First 120 characters of the Markdown output, newlines removed.
+        score: The BM25 rank of the document, lower is better, or 0 when browsing.
     """
 
     uuid: str
@@ -116,6 +450,7 @@ class OcrHit:
     source_filename: str
     page_count: int
     snippet: str
+    score: float = 0.0
 
     @property
     def created_display(self) -> str:
@@ -126,12 +461,35 @@ class OcrHit:
 class _BaseFTS(ABC, Generic[T]):
     """Abstract base for SQLite FTS5-backed search indexes.
 
-    Subclasses define schema, column selection, session indexing, and result
-    construction. The shared build, search, and incremental-update logic lives here.
+    Subclasses define schema, column selection, session indexing, the
+    full-text table and its queries, and result construction. The shared
+    build, search, and incremental-update logic lives here.
+
+    The index may be searched from a thread other than the one that built it,
+    such as a search worker, as long as one thread uses it at a time. Any
+    thread may interrupt() it.
+
+    Next to the word index it may keep a trigram index, which `backquoted`
+    query terms are looked up in as substrings, such as identifiers, paths
+    or parts of words. It is optional because it is several times larger.
     """
 
-    def __init__(self) -> None:
+    def __init__(self, trigram: bool | None = None) -> None:
+        """Initialise a closed index.
+
+        Args:
+            trigram (bool | None, optional): True to add the trigram index when the index is opened,
+                False to drop it. Defaults to None, which keeps the index as it is.
+        """
         self.__conn: sqlite3.Connection | None = None
+        self._cache: OrderedDict[str, list[T]] = OrderedDict()
+        self._want_trigram: bool | None = trigram
+        self._trigram: bool = False
+
+    @property
+    def has_substring_index(self) -> bool:
+        """Whether the open index has the trigram index, so `backquoted` terms match as substrings."""
+        return self._trigram
 
     @property
     def _conn(self) -> sqlite3.Connection:
@@ -139,93 +497,654 @@ class _BaseFTS(ABC, Generic[T]):
             raise RuntimeError("Call build() before using the index.")
         return self.__conn
 
-    def build(self, storage_dir: str, encryption: Encryption | None) -> int:
+    def build(
+        self,
+        storage_dir: str,
+        encryption: Encryption | None,
+        jobs: int = DEFAULT_INDEX_JOBS,
+        progress: IndexProgress | None = None,
+    ) -> int:
         """Build or incrementally update the FTS index.
 
+        Without encryption the index is a ``search.db`` file next to the sessions.
+        With encryption it is held in memory and persisted as an encrypted snapshot,
+        ``search.db.enc``, which is loaded on the next build so that only sessions
+        stored in between are indexed. Sessions that update_sessions() already
+        indexed into the encrypted delta log are merged in from it without being
+        read again, and the delta is dropped once the snapshot is saved.
+
+        Sessions are read, decrypted and parsed on a pool of worker threads while
+        this thread inserts them in batches, all in one transaction.
+
         Args:
             storage_dir (str): Path to the provider's storage directory.
             encryption (Encryption | None): Encryption instance or None.
+            jobs (int, optional): The number of sessions loaded concurrently. Defaults to the
+                number of CPUs, at most 8. Stores that cannot be read concurrently use 1.
+            progress (IndexProgress | None, optional): Called after every batch of sessions with the
+                number indexed so far and the number to index. Defaults to None.
 
         Returns:
             int: Total number of sessions in the index after building.
         """
-        in_memory = encryption is not None
-        db_path = ":memory:" if in_memory else path.join(storage_dir, _DB_FILENAME)
-        self.__conn = sqlite3.connect(db_path)
-        self.__conn.execute("PRAGMA journal_mode=WAL")
-        self._create_schema()
+        migrated: bool = self._open(storage_dir, encryption)
+        changes_before: int = self._conn.total_changes
         manifest = _load_manifest(storage_dir, encryption)
-        if in_memory:
-            return self._full_build(storage_dir, manifest, encryption)
-        return self._incremental_build(storage_dir, manifest, encryption)
+        store = open_session_store(storage_dir)
+        delta: RecordLog | None = None
+        if encryption is not None:
+            delta = RecordLog(path.join(storage_dir, _DELTA_FILENAME), encryption)
+        count: int = self._incremental_build(store, manifest, encryption, jobs, progress, self._read_delta(delta))
+        if encryption is None or delta is None:
+            return count
+        if migrated or self._conn.total_changes != changes_before or delta.exists():
+            # A session appended to the delta after it was read is found again through its stamp.
+            if self._save_snapshot(path.join(storage_dir, _ENCRYPTED_DB_FILENAME), encryption):
+                delta.remove()
+        return count
+
+    def update_sessions(
+        self, store: SessionStore, entries: list[dict[str, Any]], encryption: Encryption | None
+    ) -> bool:
+        """Index sessions that were just stored or rewritten into an existing index.
+
+        This is the write-through path: storing a session updates the index at
+        once, so the next search does not have to. Nothing is done while there is
+        no index yet, since the first build() indexes every session anyway, nor
+        while its schema is out of date, which build() migrates. If the process
+        dies before the update, or the update fails, build() still finds the
+        sessions through the manifest and their stamps.
+
+        An encrypted index is saved as one snapshot, which every update would
+        have to decrypt and re-encrypt. The rows of the sessions are appended to
+        an encrypted delta log next to it instead, one record per session, and
+        the next build() merges them in.
+
+        Args:
+            store (SessionStore): The store holding the sessions.
+            entries (list[dict[str, Any]]): The manifest entries of the sessions, with 'uuid' and 'created'.
+            encryption (Encryption | None): Encryption instance or None.
+
+        Returns:
+            bool: True if the index or its delta was updated, False if there is no index to update
+                or its schema is out of date.
+        """
+        storage_dir: str = store.storage_dir
+        session_uuids: list[str] = [e["uuid"] for e in entries if "uuid" in e]
+        if encryption is not None:
+            if not path.exists(path.join(storage_dir, _ENCRYPTED_DB_FILENAME)):
+                return False
+            stamps: dict[str, str] = {
+                session_uuid: json.dumps(stamp) for session_uuid, stamp in store.session_stamps(session_uuids).items()
+            }
+            delta = RecordLog(path.join(storage_dir, _DELTA_FILENAME), encryption)
+            for indexed in self._load_sessions(store, entries, encryption, 1):
+                if indexed is not None:
+                    indexed.stamp = stamps.get(indexed.session_row[0], "")
+                    delta.append(
+                        {
+                            "session_row": indexed.session_row,
+                            "content": indexed.content,
+                            "aux_rows": indexed.aux_rows,
+                            "stamp": indexed.stamp,
+                        }
+                    )
+            return True
+        if not path.exists(path.join(storage_dir, _DB_FILENAME)) or not self._open_current(storage_dir):
+            return False
+        stamps = {
+            session_uuid: json.dumps(stamp) for session_uuid, stamp in store.session_stamps(session_uuids).items()
+        }
+        self._delete_sessions(set(session_uuids))
+        self._index_sessions(store, entries, encryption, 1, None, stamps)
+        self._conn.commit()
+        return True
+
+    def interrupt(self) -> None:
+        """Abort the query the index is running on another thread, whose search() then returns no hits.
+
+        This is a no-op if no query is running.
+        """
+        if self.__conn is not None:
+            self.__conn.interrupt()
+        return None
+
+    def close(self) -> None:
+        """Close the index. It can be opened again with build() or update_sessions()."""
+        self._cache.clear()
+        self._trigram = False
+        if self.__conn is not None:
+            self.__conn.close()
+            self.__conn = None
+        return None
+
+    def _open(self, storage_dir: str, encryption: Encryption | None) -> bool:
+        """Open the index of a storage directory, creating or migrating its schema.
+
+        Args:
+            storage_dir (str): Path to the provider's storage directory.
+            encryption (Encryption | None): Encryption instance or None.
+
+        Returns:
+            bool: True if the schema of an existing index was migrated.
+        """
+        self.close()
+        if encryption is None:
+            self.__conn = sqlite3.connect(path.join(storage_dir, _DB_FILENAME), check_same_thread=False)
+            self.__conn.execute("PRAGMA journal_mode=WAL")
+        else:
+            self.__conn = self._open_snapshot(path.join(storage_dir, _ENCRYPTED_DB_FILENAME), encryption)
+        self._create_schema()
+        migrated: bool = self._migrate_schema()
+        self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        return self._sync_trigram() or migrated
+
+    def _open_current(self, storage_dir: str) -> bool:
+        """Open the plaintext index of a storage directory as it is, without creating or migrating its schema.
+
+        Migrating may rebuild and vacuum the whole index, which is left to build().
+
+        Args:
+            storage_dir (str): Path to the provider's storage directory.
+
+        Returns:
+            bool: True if the index is open, False if its schema is out of date and it was closed again.
+        """
+        self.close()
+        self.__conn = sqlite3.connect(path.join(storage_dir, _DB_FILENAME), check_same_thread=False)
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            self.close()
+            return False
+        self._trigram = self._has_trigram()
+        return True
+
+    def _has_trigram(self) -> bool:
+        """Return True if the open index has the trigram table."""
+        return bool(
+            self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (self._trigram_table(),)).fetchone()
+        )
+
+    def _sync_trigram(self) -> bool:
+        """Add or drop the trigram index as asked for on initialisation, and commit.
+
+        Returns:
+            bool: True if the index was added or dropped.
+        """
+        exists: bool = self._has_trigram()
+        self._trigram = exists
+        if self._want_trigram is None or self._want_trigram == exists:
+            return False
+        if self._want_trigram:
+            logger.info("Adding the substring index to the search index.")
+            self._trigram = True
+            self._create_trigram()
+            self._conn.commit()
+        else:
+            logger.info("Dropping the substring index from the search index.")
+            self._trigram = False
+            self._conn.execute(f"DROP TABLE {self._trigram_table()}")
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+        return True
+
+    @staticmethod
+    def _open_snapshot(snapshot_path: str, encryption: Encryption) -> sqlite3.Connection:
+        """Open an in-memory database, loaded from the encrypted snapshot if there is a readable one.
+
+        Temporary tables and indices are kept in memory too, so decrypted content never touches disk.
+
+        Args:
+            snapshot_path (str): Path to the encrypted snapshot.
+            encryption (Encryption): Encryption instance to decrypt the snapshot with.
+
+        Returns:
+            sqlite3.Connection: The connection, to an empty database if the snapshot is missing or unreadable.
+        """
+        conn = sqlite3.connect(":memory:", check_same_thread=False)
+        conn.execute("PRAGMA temp_store=MEMORY")
+        if not os.path.exists(snapshot_path):
+            return conn
+        image: bytes | None = encryption.decrypt_file(snapshot_path)
+        if not image:
+            logger.warning("Search index snapshot is unreadable; rebuilding it.")
+            return conn
+        image = (
+            image[:_FORMAT_VERSION_OFFSET]
+            + _ROLLBACK_FORMAT_VERSIONS
+            + image[_FORMAT_VERSION_OFFSET + len(_ROLLBACK_FORMAT_VERSIONS) :]
+        )
+        try:
+            conn.deserialize(image)
+            conn.execute("SELECT count(*) FROM sqlite_master").fetchone()
+        except sqlite3.DatabaseError:
+            logger.warning("Search index snapshot is corrupt; rebuilding it.")
+            conn.close()
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+            conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+
+    def _save_snapshot(self, snapshot_path: str, encryption: Encryption) -> bool:
+        """Encrypt the in-memory database and atomically replace the snapshot with it.
+
+        Failing to save only costs re-indexing on the next build, so errors are logged, not raised.
+
+        Args:
+            snapshot_path (str): Path to the encrypted snapshot.
+            encryption (Encryption): Encryption instance to encrypt the snapshot with.
+
+        Returns:
+            bool: True if the snapshot was saved.
+        """
+        sealed: bytes = encryption.encrypt_envelope(self._conn.serialize())
+        tmp_path: str = snapshot_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as fp:
+                fp.write(sealed)
+            os.replace(tmp_path, snapshot_path)
+        except OSError as exc:
+            logger.warning(f"Could not save the search index snapshot: {exc}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        return True
+
+    @staticmethod
+    def _read_delta(delta: RecordLog | None) -> dict[str, _IndexedSession]:
+        """Read the sessions indexed into the encrypted delta log since the snapshot was saved.
+
+        Args:
+            delta (RecordLog | None): The delta log, or None without encryption.
+
+        Returns:
+            dict[str, _IndexedSession]: The latest rows of each session in the delta, by UUID.
+        """
+        sessions: dict[str, _IndexedSession] = {}
+        for record in (delta.read() if delta is not None else None) or []:
+            try:
+                indexed = _IndexedSession(
+                    session_row=tuple(record["session_row"]),
+                    content=record["content"],
+                    aux_rows=[tuple(row) for row in record["aux_rows"]],
+                    stamp=record["stamp"],
+                )
+            except (KeyError, TypeError):
+                logger.warning("Skipping malformed record in the search index delta.")
+                continue
+            sessions[indexed.session_row[0]] = indexed
+        return sessions
+
+    def _migrate_schema(self) -> bool:
+        """Bring an index created by an earlier version up to the current schema.
+
+        Indexes created before sessions were stamped get an empty stamp, so
+        their sessions are indexed again once. Tables whose layout changed are
+        rebuilt from their own rows, without re-reading any session, and the
+        database is then vacuumed to release the space.
+
+        Returns:
+            bool: True if the schema was changed.
+        """
+        columns: list[str] = [row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")]
+        if "stamp" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN stamp TEXT NOT NULL DEFAULT ''")
+        rebuilt: bool = False
+        if "id" not in columns:
+            logger.info("Migrating the search index sessions table.")
+            # Indexes would follow the renamed table and keep the new one from getting its own.
+            for (index,) in self._conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'sessions' AND sql IS NOT NULL"
+            ).fetchall():
+                self._conn.execute(f"DROP INDEX {index}")
+            self._conn.execute("ALTER TABLE sessions RENAME TO legacy_sessions")
+            self._create_schema()
+            session_columns: str = f"{self._select_columns()}, stamp"
+            self._conn.execute(
+                f"INSERT INTO sessions({session_columns}) "
+                f"SELECT {session_columns} FROM legacy_sessions ORDER BY created"
+            )
+            self._conn.execute("DROP TABLE legacy_sessions")
+            rebuilt = True
+        rebuilt = self._migrate_fts() or rebuilt
+        if rebuilt:
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+        return rebuilt or "stamp" not in columns
 
     def search(self, query: str) -> list[T]:
         """Search sessions using FTS5 BM25 ranking, or return recent sessions for an empty query.
 
+        The last word of the query also matches the words it starts, so results
+        follow the query as it is typed. "Quoted words" match as a phrase, OR
+        separates alternatives, and NOT or a leading '-' excludes a word.
+        Facets such as model:mistral-large or after:2026-01 narrow the results
+        down by session metadata; see _split_filters. The results of recent
+        queries are cached until the index is closed.
+
+        A query with a `backquoted` term is answered by the trigram index, if
+        there is one, every term matching as a substring. Without it,
+        backquoted terms match as phrases.
+
+        A query that fails, e.g. because it was interrupted, returns no hits.
+
         Args:
-            query (str): The search query string. Empty string returns the most recent sessions.
+            query (str): The search query string. A query without text returns the first page of browse().
 
         Returns:
             list[T]: Up to 50 matching sessions ordered by relevance (or recency if no query).
         """
-        if not query.strip():
-            return self._all_sessions()
+        if is_browse_query(query):
+            return self.browse(query=query)
 
-        tokens = tokenize(query)
-        if not tokens:
+        substring: bool = self._trigram and is_substring_query(query)
+        expression = match_expression(query, substring)
+        if expression is None:
             return []
 
-        cols = self._select_columns()
-        prefixed = ", ".join(f"s.{c.strip()}" for c in cols.split(","))
+        filters: _Filters = _split_filters(query)[1]
+        key: str = f"{substring} {expression} {filters}"
+        hits: list[T] | None = self._cache.get(key)
+        if hits is None:
+            try:
+                hits = self._match(expression, filters, query_terms(query, True) if substring else None)
+            except sqlite3.OperationalError:
+                return []
+            self._cache[key] = hits
+            if len(self._cache) > _QUERY_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        self._cache.move_to_end(key)
+        return list(hits)
+
+    def browse(self, after: tuple[float, str] | None = None, query: str = "") -> list[T]:
+        """Return a page of the full history, most recent first, for browsing without a query.
+
+        Pages are keyed on (created, uuid) rather than offset, so every page
+        costs the same however far into the history it is.
+
+        Args:
+            after (tuple[float, str] | None, optional): The created timestamp and UUID of the last
+                session of the previous page. Defaults to None, for the first page.
+            query (str, optional): A query whose facets the sessions must match; its text is ignored.
+                Defaults to "".
+
+        Returns:
+            list[T]: Up to 50 sessions, none past the end of the history or if the query fails,
+                e.g. because it was interrupted.
+        """
+        conditions, params = self._browse_conditions(_split_filters(query)[1])
+        if after is not None:
+            conditions.append("(sessions.created, sessions.uuid) < (?, ?)")
+            params.extend(after)
+        where: str = f"WHERE {' AND '.join(conditions)}" if conditions else ""
         try:
             rows = self._conn.execute(
-                f"""
-                SELECT {prefixed}
-                FROM sessions_fts f
-                JOIN sessions s ON f.uuid = s.uuid
-                WHERE sessions_fts MATCH ?
-                ORDER BY rank
-                LIMIT ?
-                """,
-                (" ".join(tokens), _MAX_RESULTS),
+                f"SELECT {self._select_columns()} FROM sessions {where} ORDER BY created DESC, uuid DESC LIMIT ?",
+                (*params, _BROWSE_PAGE_SIZE),
             ).fetchall()
+            return self._build_hits(rows)
         except sqlite3.OperationalError:
             return []
 
-        return self._build_hits(rows)
+    def _browse_conditions(self, filters: _Filters) -> tuple[list[str], list[Any]]:
+        """Return the SQL conditions and parameters that select the browsed sessions matching the facets."""
+        return filters.session_conditions("sessions")
 
-    def _all_sessions(self) -> list[T]:
-        # No LIMIT here by design: empty query means "browse full history",
-        # whereas a typed query is capped at _MAX_RESULTS by BM25 relevance.
-        rows = self._conn.execute(
-            f"SELECT {self._select_columns()} FROM sessions ORDER BY created DESC",
-        ).fetchall()
-        return self._build_hits(rows)
+    def lookup(self, session_uuids: list[str], query: str = "") -> list[T]:
+        """Return the indexed sessions with the given UUIDs, as browse() shows them.
 
-    def _full_build(self, storage_dir: str, manifest: list[dict[str, Any]], encryption: Encryption | None) -> int:
-        count = sum(1 for entry in manifest if self._index_session(storage_dir, entry, encryption))
-        self._conn.commit()
-        return count
+        Args:
+            session_uuids (list[str]): The UUIDs of the sessions.
+            query (str, optional): A query whose facets the sessions must match; its text is ignored.
+                Defaults to "".
+
+        Returns:
+            list[T]: The sessions that are indexed and match the facets, in the order of session_uuids,
+                none if the query fails, e.g. because it was interrupted.
+        """
+        if not session_uuids:
+            return []
+        conditions, params = self._browse_conditions(_split_filters(query)[1])
+        conditions.append(f"sessions.uuid IN ({_placeholders(len(session_uuids))})")
+        try:
+            rows = self._conn.execute(
+                f"SELECT {self._select_columns()} FROM sessions WHERE {' AND '.join(conditions)}",
+                (*params, *session_uuids),
+            ).fetchall()
+            hits_by_uuid: dict[str, T] = {row[0]: hit for row, hit in zip(rows, self._build_hits(rows))}
+        except sqlite3.OperationalError:
+            return []
+        return [hits_by_uuid[u] for u in session_uuids if u in hits_by_uuid]
+
+    def session_text(self, store: SessionStore, entry: dict[str, Any], encryption: Encryption | None) -> str | None:
+        """Read the text of a session as it is indexed, e.g. to embed it. Does not touch the index.
+
+        Args:
+            store (SessionStore): The store holding the session.
+            entry (dict[str, Any]): The manifest entry of the session.
+            encryption (Encryption | None): Encryption instance or None.
+
+        Returns:
+            str | None: The text of the session, or None if it cannot be read.
+        """
+        indexed = self._load_session(store, entry, encryption)
+        return None if indexed is None else self._indexed_text(indexed)
+
+    def _indexed_text(self, indexed: _IndexedSession) -> str:
+        """Return the text of a loaded session as a whole."""
+        return indexed.content
 
     def _incremental_build(
-        self, storage_dir: str, manifest: list[dict[str, Any]], encryption: Encryption | None
+        self,
+        store: SessionStore,
+        manifest: list[dict[str, Any]],
+        encryption: Encryption | None,
+        jobs: int = 1,
+        progress: IndexProgress | None = None,
+        delta: dict[str, _IndexedSession] | None = None,
     ) -> int:
-        manifest_uuids = {e["uuid"] for e in manifest if "uuid" in e}
-        existing_uuids = {row[0] for row in self._conn.execute("SELECT uuid FROM sessions")}
+        manifest_uuids = [e["uuid"] for e in manifest if "uuid" in e]
+        if self._needs_compaction():
+            self._clear()
+        indexed_stamps: dict[str, str] = dict(self._conn.execute("SELECT uuid, stamp FROM sessions").fetchall())
+        stamps: dict[str, str] = {
+            session_uuid: json.dumps(stamp) for session_uuid, stamp in store.session_stamps(manifest_uuids).items()
+        }
+
+        # Sessions whose files changed since they were indexed, e.g. an overwritten OCR result,
+        # are dropped and indexed again. Rows indexed before stamps were recorded have an empty one.
+        removed = set(indexed_stamps) - set(manifest_uuids)
+        changed = {u for u, stamp in indexed_stamps.items() if u in stamps and stamps[u] != stamp}
+        self._delete_sessions(removed | changed)
+
+        kept: int = len(indexed_stamps) - len(removed) - len(changed)
+        to_add = [e for e in manifest if e.get("uuid") not in indexed_stamps or e.get("uuid") in changed]
+        # Sessions in the delta are inserted as they are, unless they changed again since.
+        merged: list[_IndexedSession] = [
+            delta[u]
+            for u in (e.get("uuid") for e in to_add)
+            if delta and u in delta and delta[u].stamp == stamps.get(u)
+        ]
+        merged_uuids: set[str] = {indexed.session_row[0] for indexed in merged}
+        if merged:
+            self._insert_sessions(merged)
+        to_add = [e for e in to_add if e.get("uuid") not in merged_uuids]
+        added = len(merged) + self._index_sessions(store, to_add, encryption, jobs, progress, stamps)
+
+        self._conn.commit()
+        return kept + added
+
+    def _needs_compaction(self) -> bool:
+        """Return True if the index has gathered enough dead rows to be rebuilt from scratch."""
+        return False
 
-        to_delete = existing_uuids - manifest_uuids
-        if to_delete:
-            placeholders = _placeholders(len(to_delete))
-            args = list(to_delete)
-            self._conn.execute(f"DELETE FROM sessions WHERE uuid IN ({placeholders})", args)
-            self._conn.execute(f"DELETE FROM sessions_fts WHERE uuid IN ({placeholders})", args)
-            self._conn.execute(f"DELETE FROM {self._aux_table()} WHERE session_uuid IN ({placeholders})", args)
+    def _clear(self) -> None:
+        """Empty every table, so that every session is indexed again; the caller commits."""
+        logger.info("Compacting the search index.")
+        self._conn.execute("DELETE FROM sessions")
+        self._conn.execute(f"DELETE FROM {self._aux_table()}")
+        return None
 
-        to_add = [e for e in manifest if e.get("uuid") not in existing_uuids]
-        added = sum(1 for entry in to_add if self._index_session(storage_dir, entry, encryption))
+    def _delete_sessions(self, session_uuids: set[str]) -> None:
+        """Remove sessions from every table; the caller commits.
 
-        self._conn.commit()
-        return len(existing_uuids) - len(to_delete) + added
+        Args:
+            session_uuids (set[str]): The UUIDs of the sessions to remove.
+        """
+        if not session_uuids:
+            return None
+        # One JSON array parameter instead of one placeholder per UUID, which SQLite limits.
+        uuids: str = json.dumps(sorted(session_uuids))
+        self._delete_fts_rows(uuids)
+        self._conn.execute("DELETE FROM sessions WHERE uuid IN (SELECT value FROM json_each(?))", (uuids,))
+        self._conn.execute(
+            f"DELETE FROM {self._aux_table()} WHERE session_uuid IN (SELECT value FROM json_each(?))", (uuids,)
+        )
+        return None
+
+    def _index_sessions(
+        self,
+        store: SessionStore,
+        entries: list[dict[str, Any]],
+        encryption: Encryption | None,
+        jobs: int,
+        progress: IndexProgress | None,
+        stamps: dict[str, str],
+    ) -> int:
+        """Load sessions and insert them in batches; the caller commits.
+
+        Args:
+            store (SessionStore): The store holding the sessions.
+            entries (list[dict[str, Any]]): The manifest entries of the sessions to index.
+            encryption (Encryption | None): Encryption instance or None.
+            jobs (int): The number of sessions loaded concurrently.
+            progress (IndexProgress | None): Called after every batch, or None.
+            stamps (dict[str, str]): The serialized stamp of each session, taken before it is loaded.
+
+        Returns:
+            int: The number of sessions indexed.
+        """
+        batch: list[_IndexedSession] = []
+        added: int = 0
+        for done, indexed in enumerate(self._load_sessions(store, entries, encryption, jobs), start=1):
+            if indexed is not None:
+                indexed.stamp = stamps.get(indexed.session_row[0], "")
+                batch.append(indexed)
+            if len(batch) >= _INDEX_BATCH_SIZE or done == len(entries):
+                self._insert_sessions(batch)
+                added += len(batch)
+                batch = []
+                if progress is not None:
+                    progress(done, len(entries))
+        return added
+
+    def _load_sessions(
+        self, store: SessionStore, entries: list[dict[str, Any]], encryption: Encryption | None, jobs: int
+    ) -> Iterator[_IndexedSession | None]:
+        """Load sessions on worker threads, yielding them in manifest order.
+
+        At most a few sessions per worker are loaded ahead of the consumer, so
+        memory stays bounded however many sessions there are.
+
+        Args:
+            store (SessionStore): The store holding the sessions.
+            entries (list[dict[str, Any]]): The manifest entries of the sessions to load.
+            encryption (Encryption | None): Encryption instance or None.
+            jobs (int): The number of worker threads. 1 loads in the calling thread.
+
+        Yields:
+            _IndexedSession | None: Each loaded session, or None if it could not be loaded.
+        """
+        if jobs <= 1 or len(entries) <= 1 or not store.concurrent_reads:
+            for entry in entries:
+                yield self._load_session(store, entry, encryption)
+            return None
+        executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="gptcli-index")
+        try:
+            pending: deque[Future[_IndexedSession | None]] = deque()
+            remaining: Iterator[dict[str, Any]] = iter(entries)
+            for entry in remaining:
+                pending.append(executor.submit(self._load_session, store, entry, encryption))
+                if len(pending) >= jobs * _PREFETCH_PER_JOB:
+                    break
+            while pending:
+                indexed = pending.popleft().result()
+                next_entry = next(remaining, None)
+                if next_entry is not None:
+                    pending.append(executor.submit(self._load_session, store, next_entry, encryption))
+                yield indexed
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return None
+
+    def _insert_sessions(self, sessions: list[_IndexedSession]) -> None:
+        """Insert loaded sessions into every table with one statement per table.
+
+        Args:
+            sessions (list[_IndexedSession]): The sessions to insert.
+        """
+        if not sessions:
+            return None
+        self._conn.executemany(
+            f"INSERT INTO sessions({self._select_columns()}, stamp) "
+            f"VALUES ({_placeholders(len(sessions[0].session_row) + 1)})",
+            [s.session_row + (s.stamp,) for s in sessions],
+        )
+        aux_rows: list[tuple[Any, ...]] = [row for s in sessions for row in s.aux_rows]
+        if aux_rows:
+            self._conn.executemany(
+                f"INSERT INTO {self._aux_table()} VALUES ({_placeholders(len(aux_rows[0]))})", aux_rows
+            )
+        self._insert_fts_rows(sessions)
+        return None
+
+    @abstractmethod
+    def _insert_fts_rows(self, sessions: list[_IndexedSession]) -> None:
+        """Index sessions whose ``sessions`` and auxiliary rows were just inserted."""
+
+    @abstractmethod
+    def _delete_fts_rows(self, uuids: str) -> None:
+        """Remove sessions from the full-text index, before their other rows are deleted.
+
+        Args:
+            uuids (str): The UUIDs of the sessions, as a JSON array.
+        """
+
+    @abstractmethod
+    def _migrate_fts(self) -> bool:
+        """Rebuild a full-text table created by an earlier version; the caller commits.
+
+        Returns:
+            bool: True if a table was rebuilt.
+        """
+
+    def _has_prefix_index(self, table: str) -> bool:
+        """Return True if a full-text table was created with prefix indexes, which cannot be added later."""
+        row = self._conn.execute("SELECT sql FROM sqlite_master WHERE name = ?", (table,)).fetchone()
+        return row is not None and "prefix=" in row[0]
+
+    @abstractmethod
+    def _trigram_table(self) -> str:
+        """Return the name of the trigram full-text table."""
+
+    @abstractmethod
+    def _create_trigram(self) -> None:
+        """Create the trigram full-text table and index every session in it; the caller commits."""
+
+    @abstractmethod
+    def _match(self, query: str, filters: _Filters, substrings: list[str] | None) -> list[T]:
+        """Run a full-text query and return up to _MAX_RESULTS hits, best first.
+
+        Args:
+            query (str): The FTS5 query.
+            filters (_Filters): The facets the hits must match.
+            substrings (list[str] | None): The substrings the query looks up in the trigram index,
+                or None to query the word index.
+
+        Returns:
+            list[T]: The hits.
+
+        Raises:
+            sqlite3.OperationalError: If the query is invalid.
+        """
 
     @abstractmethod
     def _create_schema(self) -> None:
@@ -240,11 +1159,13 @@ class _BaseFTS(ABC, Generic[T]):
         """Return the name of the auxiliary detail table (e.g. 'messages' or 'snippets')."""
 
     @abstractmethod
-    def _index_session(self, storage_dir: str, entry: dict[str, Any], encryption: Encryption | None) -> bool:
-        """Load and insert one session into the index.
+    def _load_session(
+        self, store: SessionStore, entry: dict[str, Any], encryption: Encryption | None
+    ) -> _IndexedSession | None:
+        """Read, decrypt and parse one session. Runs on worker threads, so must not touch the index.
 
         Returns:
-            bool: True if the session was successfully indexed, False otherwise.
+            _IndexedSession | None: The rows to insert, or None if the session cannot be indexed.
         """
 
     @abstractmethod
@@ -255,35 +1176,47 @@ class _BaseFTS(ABC, Generic[T]):
 class ChatFTS(_BaseFTS[SessionHit]):
     """SQLite FTS5-backed full-text search over chat sessions.
 
-    When encryption is disabled a persistent ``search.db`` file is kept
-    alongside the chat sessions and updated incrementally — only new
-    sessions are indexed on each launch.
+    A persistent index is kept alongside the chat sessions and updated
+    incrementally — only new sessions are indexed on each launch.
 
-    When encryption is enabled an in-memory database is used so that
-    decrypted content is never written to disk.
+    Every message is indexed on its own, so hits point at the messages that
+    matched. Its text is stored once, in ``messages``, which ``messages_fts``
+    and the optional ``messages_trigram`` index as external content.
+
+    When encryption is disabled it is a ``search.db`` file. When encryption
+    is enabled it is an in-memory database saved as an encrypted snapshot,
+    ``search.db.enc``, so that decrypted content is never written to disk.
     """
 
     def _create_schema(self) -> None:
         self._conn.executescript(
             """
             CREATE TABLE IF NOT EXISTS sessions (
-                uuid         TEXT PRIMARY KEY,
+                id           INTEGER PRIMARY KEY AUTOINCREMENT,
+                uuid         TEXT NOT NULL UNIQUE,
                 created      REAL NOT NULL,
                 model        TEXT NOT NULL,
                 provider     TEXT NOT NULL,
-                message_count INTEGER NOT NULL
-            );
-            CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
-                uuid UNINDEXED,
-                content,
-                tokenize='unicode61'
+                message_count INTEGER NOT NULL,
+                stamp        TEXT NOT NULL DEFAULT ''
             );
+            CREATE INDEX IF NOT EXISTS sessions_created ON sessions (created, uuid);
+            CREATE INDEX IF NOT EXISTS sessions_model ON sessions (model COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS sessions_provider ON sessions (provider COLLATE NOCASE);
             CREATE TABLE IF NOT EXISTS messages (
+                id           INTEGER PRIMARY KEY AUTOINCREMENT,
                 session_uuid TEXT    NOT NULL,
                 position     INTEGER NOT NULL,
                 role         TEXT    NOT NULL,
                 content      TEXT    NOT NULL,
-                PRIMARY KEY (session_uuid, position)
+                UNIQUE (session_uuid, position)
+            );
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                content,
+                content='messages',
+                content_rowid='id',
+                prefix='2 3 4',
+                tokenize='unicode61'
             );
         """
         )
@@ -294,43 +1227,173 @@ class ChatFTS(_BaseFTS[SessionHit]):
     def _aux_table(self) -> str:
         return "messages"
 
-    def _index_session(self, storage_dir: str, entry: dict[str, Any], encryption: Encryption | None) -> bool:
+    def _fts_tables(self) -> list[str]:
+        return ["messages_fts", "messages_trigram"] if self._trigram else ["messages_fts"]
+
+    def _insert_fts_rows(self, sessions: list[_IndexedSession]) -> None:
+        uuids: str = json.dumps([s.session_row[0] for s in sessions])
+        for table in self._fts_tables():
+            self._conn.execute(
+                f"""
+                INSERT INTO {table}(rowid, content)
+                SELECT id, content FROM messages WHERE session_uuid IN (SELECT value FROM json_each(?))
+                """,
+                (uuids,),
+            )
+
+    def _delete_fts_rows(self, uuids: str) -> None:
+        # An external-content table is told the text it indexed, which ``messages`` still holds.
+        for table in self._fts_tables():
+            self._conn.execute(
+                f"""
+                INSERT INTO {table}({table}, rowid, content)
+                SELECT 'delete', id, content FROM messages WHERE session_uuid IN (SELECT value FROM json_each(?))
+                """,
+                (uuids,),
+            )
+
+    def _trigram_table(self) -> str:
+        return "messages_trigram"
+
+    def _create_trigram(self) -> None:
+        self._conn.execute(
+            """
+            CREATE VIRTUAL TABLE messages_trigram USING fts5(
+                content,
+                content='messages',
+                content_rowid='id',
+                tokenize='trigram'
+            )
+            """
+        )
+        self._conn.execute("INSERT INTO messages_trigram(messages_trigram) VALUES ('rebuild')")
+
+    def _migrate_fts(self) -> bool:
+        # Earlier indexes kept one full-text row per session in sessions_fts, and messages without an id.
+        rebuilt: bool = False
+        if self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sessions_fts'").fetchone():
+            self._conn.execute("DROP TABLE sessions_fts")
+            rebuilt = True
+        if "id" not in [row[1] for row in self._conn.execute("PRAGMA table_info(messages)")]:
+            logger.info("Migrating the search index to per-message full-text rows.")
+            self._conn.execute("ALTER TABLE messages RENAME TO legacy_messages")
+            self._create_schema()
+            self._conn.execute(
+                """
+                INSERT INTO messages(session_uuid, position, role, content)
+                SELECT session_uuid, position, role, content FROM legacy_messages ORDER BY session_uuid, position
+                """
+            )
+            self._conn.execute("DROP TABLE legacy_messages")
+            self._conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+            rebuilt = True
+        if not self._has_prefix_index("messages_fts"):
+            logger.info("Adding prefix indexes to the search index.")
+            self._conn.execute("DROP TABLE messages_fts")
+            self._create_schema()
+            self._conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')")
+            rebuilt = True
+        return rebuilt
+
+    def _match(self, query: str, filters: _Filters, substrings: list[str] | None) -> list[SessionHit]:
+        # One ranked pass over the matching messages. Rows are consumed best first, so excerpts are
+        # only made for the messages shown, and the scan stops at the first session past the limit.
+        conditions, params = filters.session_conditions("s")
+        join: str = "JOIN sessions s ON s.uuid = m.session_uuid" if conditions else ""
+        if filters.role is not None:
+            conditions.append("m.role = ? COLLATE NOCASE")
+            params.append(filters.role)
+        table: str = "messages_fts" if substrings is None else "messages_trigram"
+        excerpt_column: str = "snippet(messages_fts, 0, ?, ?, '…', ?)" if substrings is None else "m.content"
+        excerpt_params: tuple[Any, ...] = (_MATCH_START, _MATCH_END, _SNIPPET_TOKENS) if substrings is None else ()
+        snippets: dict[str, list[MessageSnippet]] = {}
+        scores: dict[str, float] = {}
+        cursor = self._conn.execute(
+            f"""
+            SELECT m.session_uuid, m.position, m.role, {excerpt_column}, {table}.rank
+            FROM {table}
+            JOIN messages m ON m.id = {table}.rowid
+            {join}
+            WHERE {table} MATCH ? {"".join(f" AND {c}" for c in conditions)}
+            ORDER BY rank
+            """,
+            (*excerpt_params, query, *params),
+        )
+        try:
+            for session_uuid, position, role, excerpt, score in cursor:
+                if session_uuid not in snippets:
+                    if len(snippets) >= _MAX_RESULTS:
+                        break
+                    snippets[session_uuid] = []
+                    scores[session_uuid] = score
+                if len(snippets[session_uuid]) < _SNIPPETS_PER_HIT:
+                    content, highlights = (
+                        _parse_excerpt(excerpt) if substrings is None else _substring_excerpt(excerpt, substrings)
+                    )
+                    snippets[session_uuid].append(MessageSnippet(role, content, position, highlights))
+        finally:
+            cursor.close()
+
+        rows = self._conn.execute(
+            f"SELECT {self._select_columns()} FROM sessions WHERE uuid IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(snippets)),),
+        ).fetchall()
+        rows_by_uuid: dict[str, Any] = {row[0]: row for row in rows}
+        return [
+            SessionHit(
+                uuid=uuid,
+                created=created,
+                model=model,
+                provider=provider,
+                message_count=message_count,
+                snippets=snippets[uuid],
+                position=snippets[uuid][0].position,
+                score=scores[uuid],
+            )
+            for uuid, created, model, provider, message_count in (
+                rows_by_uuid[u] for u in snippets if u in rows_by_uuid
+            )
+        ]
+
+    def _load_session(
+        self, store: SessionStore, entry: dict[str, Any], encryption: Encryption | None
+    ) -> _IndexedSession | None:
         session_uuid = entry.get("uuid", "")
         created = float(entry.get("created", 0.0))
         if not session_uuid:
-            return False
+            return None
 
-        session_dir = path.join(storage_dir, session_uuid)
-        if not os.path.isdir(session_dir):
-            return False
+        if not store.has_session(session_uuid):
+            return None
 
-        messages = self._load_messages(session_dir, encryption)
+        messages = self._load_messages(store, session_uuid, encryption)
         if messages is None:
-            return False
+            return None
 
-        metadata = _load_metadata(session_dir, encryption)
+        metadata = _load_metadata(store, session_uuid, encryption)
         model = metadata.get("chat", {}).get("model", "") if metadata else ""
         provider = metadata.get("chat", {}).get("provider", "") if metadata else ""
 
-        content = " ".join(m.get("content", "") for m in messages if isinstance(m.get("content"), str))
-
-        self._conn.execute(
-            "INSERT INTO sessions VALUES (?, ?, ?, ?, ?)",
-            (session_uuid, created, model, provider, len(messages)),
-        )
-        self._conn.execute(
-            "INSERT INTO sessions_fts(uuid, content) VALUES (?, ?)",
-            (session_uuid, content),
-        )
-        self._conn.executemany(
-            "INSERT INTO messages VALUES (?, ?, ?, ?)",
-            [
-                (session_uuid, i, m.get("role", ""), m.get("content", ""))
+        return _IndexedSession(
+            session_row=(session_uuid, created, model, provider, len(messages)),
+            aux_rows=[
+                (None, session_uuid, i, m.get("role", ""), m.get("content", ""))
                 for i, m in enumerate(messages)
                 if isinstance(m.get("content"), str)
             ],
         )
-        return True
+
+    def _indexed_text(self, indexed: _IndexedSession) -> str:
+        return "\n\n".join(content for *_, content in indexed.aux_rows)
+
+    def _browse_conditions(self, filters: _Filters) -> tuple[list[str], list[Any]]:
+        conditions, params = filters.session_conditions("sessions")
+        if filters.role is not None:
+            conditions.append(
+                "EXISTS (SELECT 1 FROM messages m WHERE m.session_uuid = sessions.uuid AND m.role = ? COLLATE NOCASE)"
+            )
+            params.append(filters.role)
+        return conditions, params
 
     def _build_hits(self, rows: list[Any]) -> list[SessionHit]:
         uuids = [row[0] for row in rows]
@@ -351,63 +1414,75 @@ class ChatFTS(_BaseFTS[SessionHit]):
         if not session_uuids:
             return {}
         placeholders = _placeholders(len(session_uuids))
+        # Only the first non-empty user and assistant message of each session leave SQLite.
         rows = self._conn.execute(
-            f"SELECT session_uuid, role, content FROM messages WHERE session_uuid IN ({placeholders}) ORDER BY session_uuid, position",
+            f"""
+            SELECT session_uuid, position, role, content FROM (
+                SELECT session_uuid, position, role, content, row_number() OVER (
+                    PARTITION BY session_uuid, instr(lower(role), 'user') > 0 ORDER BY position
+                ) AS n
+                FROM messages
+                WHERE session_uuid IN ({placeholders}) AND content != ''
+            )
+            WHERE n = 1
+            ORDER BY session_uuid, position
+            """,
             session_uuids,
         ).fetchall()
 
         result: dict[str, list[MessageSnippet]] = {uuid: [] for uuid in session_uuids}
-        seen_roles: dict[str, set[str]] = {uuid: set() for uuid in session_uuids}
-        for session_uuid, role, content in rows:
-            if not content:
-                continue
-            canonical = "user" if "user" in role.lower() else "assistant"
-            if canonical in seen_roles[session_uuid]:
-                continue
-            seen_roles[session_uuid].add(canonical)
-            single_line = content.replace("\n", " ").replace("\r", " ")
-            truncated = single_line[:_SNIPPET_MAX_LENGTH] + ("..." if len(single_line) > _SNIPPET_MAX_LENGTH else "")
-            result[session_uuid].append(MessageSnippet(role=role, content=truncated))
+        for session_uuid, position, role, content in rows:
+            result[session_uuid].append(MessageSnippet(role=role, content=_truncate(content), position=position))
 
         return result
 
     @staticmethod
-    def _load_messages(session_dir: str, encryption: Encryption | None) -> list[dict[str, Any]] | None:
-        raw = read_text_file(path.join(session_dir, GPTCLI_SESSION_FILENAME), encryption)
-        if raw is None:
-            return None
+    def _load_messages(
+        store: SessionStore, session_uuid: str, encryption: Encryption | None
+    ) -> list[dict[str, Any]] | None:
         try:
-            messages: list[dict[str, Any]] = json.loads(raw).get("messages", [])
-            return messages
-        except (json.JSONDecodeError, AttributeError):
+            return read_chat_session(store, session_uuid, encryption, BlobStore.for_store(store, encryption))
+        except SessionLocked:
             return None
 
 
 class OcrFTS(_BaseFTS[OcrHit]):
     """SQLite FTS5-backed full-text search over OCR sessions.
 
-    When encryption is disabled a persistent ``search.db`` file is kept
-    alongside the OCR sessions and updated incrementally — only new
-    sessions are indexed on each launch.
+    A persistent index is kept alongside the OCR sessions and updated
+    incrementally — only new sessions are indexed on each launch.
 
-    When encryption is enabled an in-memory database is used so that
-    decrypted content is never written to disk.
+    ``sessions_fts`` and the optional ``sessions_trigram`` are contentless:
+    they hold the index of each document but not its text, which stays in the
+    session's Markdown file. Rows of deleted or rewritten documents therefore
+    cannot be removed; they match no ``sessions`` row, so no search returns
+    them, and are compacted away once they pile up.
+
+    When encryption is disabled it is a ``search.db`` file. When encryption
+    is enabled it is an in-memory database saved as an encrypted snapshot,
+    ``search.db.enc``, so that decrypted content is never written to disk.
     """
 
     def _create_schema(self) -> None:
         self._conn.executescript(
             """
             CREATE TABLE IF NOT EXISTS sessions (
-                uuid            TEXT PRIMARY KEY,
+                id              INTEGER PRIMARY KEY AUTOINCREMENT,
+                uuid            TEXT NOT NULL UNIQUE,
                 created         REAL NOT NULL,
                 model           TEXT NOT NULL,
                 provider        TEXT NOT NULL,
                 source_filename TEXT NOT NULL,
-                page_count      INTEGER NOT NULL
+                page_count      INTEGER NOT NULL,
+                stamp           TEXT NOT NULL DEFAULT ''
             );
+            CREATE INDEX IF NOT EXISTS sessions_created ON sessions (created, uuid);
+            CREATE INDEX IF NOT EXISTS sessions_model ON sessions (model COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS sessions_provider ON sessions (provider COLLATE NOCASE);
             CREATE VIRTUAL TABLE IF NOT EXISTS sessions_fts USING fts5(
-                uuid UNINDEXED,
                 content,
+                content='',
+                prefix='2 3 4',
                 tokenize='unicode61'
             );
             CREATE TABLE IF NOT EXISTS snippets (
@@ -423,19 +1498,102 @@ class OcrFTS(_BaseFTS[OcrHit]):
     def _aux_table(self) -> str:
         return "snippets"
 
-    def _index_session(self, storage_dir: str, entry: dict[str, Any], encryption: Encryption | None) -> bool:
+    def _insert_fts_rows(self, sessions: list[_IndexedSession]) -> None:
+        for table in ["sessions_fts", "sessions_trigram"] if self._trigram else ["sessions_fts"]:
+            self._conn.executemany(
+                f"INSERT INTO {table}(rowid, content) SELECT id, ? FROM sessions WHERE uuid = ?",
+                [(s.content, s.session_row[0]) for s in sessions],
+            )
+
+    def _delete_fts_rows(self, uuids: str) -> None:
+        # The indexed text is not kept, and a contentless table needs it to remove a row, so the rows
+        # of deleted and rewritten sessions stay behind as orphans until the index is compacted.
+        return None
+
+    def _needs_compaction(self) -> bool:
+        live: int = self._conn.execute("SELECT count(*) FROM sessions").fetchone()[0]
+        orphans: int = self._conn.execute("SELECT count(*) FROM sessions_fts").fetchone()[0] - live
+        return orphans >= _MIN_ORPHANS_TO_COMPACT and orphans > live * _MAX_ORPHAN_RATIO
+
+    def _clear(self) -> None:
+        super()._clear()
+        self._conn.execute("INSERT INTO sessions_fts(sessions_fts) VALUES ('delete-all')")
+        if self._trigram:
+            self._conn.execute("INSERT INTO sessions_trigram(sessions_trigram) VALUES ('delete-all')")
+
+    def _trigram_table(self) -> str:
+        return "sessions_trigram"
+
+    def _create_trigram(self) -> None:
+        self._conn.execute(
+            """
+            CREATE VIRTUAL TABLE sessions_trigram USING fts5(
+                content,
+                content='',
+                tokenize='trigram'
+            )
+            """
+        )
+        # The documents are not stored, so they are all indexed again, into both tables.
+        self._clear()
+
+    def _migrate_fts(self) -> bool:
+        # Earlier indexes stored each document in sessions_fts, keyed by a uuid column.
+        if "uuid" not in [row[1] for row in self._conn.execute("PRAGMA table_info(sessions_fts)")]:
+            if self._has_prefix_index("sessions_fts"):
+                return False
+            # Without the text the table cannot be rebuilt in place, so every document is indexed again.
+            logger.info("Adding prefix indexes to the search index.")
+            self._conn.execute("DROP TABLE sessions_fts")
+            self._create_schema()
+            self._clear()
+            return True
+        logger.info("Migrating the search index to a contentless full-text table.")
+        self._conn.execute("ALTER TABLE sessions_fts RENAME TO legacy_sessions_fts")
+        self._create_schema()
+        self._conn.execute(
+            """
+            INSERT INTO sessions_fts(rowid, content)
+            SELECT s.id, f.content FROM legacy_sessions_fts f JOIN sessions s ON s.uuid = f.uuid
+            """
+        )
+        self._conn.execute("DROP TABLE legacy_sessions_fts")
+        return True
+
+    def _match(self, query: str, filters: _Filters, substrings: list[str] | None) -> list[OcrHit]:
+        # Documents have no roles, so a role facet does not narrow them down.
+        conditions, params = filters.session_conditions("s")
+        table: str = "sessions_fts" if substrings is None else "sessions_trigram"
+        rows = self._conn.execute(
+            f"""
+            SELECT {", ".join(f"s.{c.strip()}" for c in self._select_columns().split(","))}, f.rank
+            FROM {table} f
+            JOIN sessions s ON s.id = f.rowid
+            WHERE {table} MATCH ? {"".join(f" AND {c}" for c in conditions)}
+            ORDER BY rank
+            LIMIT ?
+            """,
+            (query, *params, _MAX_RESULTS),
+        ).fetchall()
+        hits: list[OcrHit] = self._build_hits([row[:-1] for row in rows])
+        for hit, row in zip(hits, rows):
+            hit.score = row[-1]
+        return hits
+
+    def _load_session(
+        self, store: SessionStore, entry: dict[str, Any], encryption: Encryption | None
+    ) -> _IndexedSession | None:
         session_uuid = entry.get("uuid", "")
         created = float(entry.get("created", 0.0))
         if not session_uuid:
-            return False
+            return None
 
-        session_dir = path.join(storage_dir, session_uuid)
-        if not os.path.isdir(session_dir):
-            return False
+        if not store.has_session(session_uuid):
+            return None
 
-        metadata = _load_metadata(session_dir, encryption)
+        metadata = _load_metadata(store, session_uuid, encryption)
         if metadata is None:
-            return False
+            return None
 
         model = metadata.get("ocr", {}).get("model", "")
         provider = metadata.get("ocr", {}).get("provider", "")
@@ -444,28 +1602,17 @@ class OcrFTS(_BaseFTS[OcrHit]):
         markdown_file = metadata.get("output", {}).get("markdown_file", "")
 
         if not markdown_file:
-            return False
+            return None
 
-        markdown_raw = read_text_file(path.join(session_dir, markdown_file), encryption)
+        markdown_raw = store.read_text(session_uuid, markdown_file, encryption)
         if markdown_raw is None:
-            return False
-
-        single_line = markdown_raw.replace("\n", " ").replace("\r", " ")
-        snippet = single_line[:_SNIPPET_MAX_LENGTH] + ("..." if len(single_line) > _SNIPPET_MAX_LENGTH else "")
+            return None
 
-        self._conn.execute(
-            "INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?)",
-            (session_uuid, created, model, provider, source_filename, page_count),
-        )
-        self._conn.execute(
-            "INSERT INTO sessions_fts(uuid, content) VALUES (?, ?)",
-            (session_uuid, markdown_raw),
-        )
-        self._conn.execute(
-            "INSERT INTO snippets VALUES (?, ?)",
-            (session_uuid, snippet),
+        return _IndexedSession(
+            session_row=(session_uuid, created, model, provider, source_filename, page_count),
+            content=markdown_raw,
+            aux_rows=[(session_uuid, _truncate(markdown_raw))],
         )
-        return True
 
     def _build_hits(self, rows: list[Any]) -> list[OcrHit]:
         uuids = [row[0] for row in rows]
@@ -492,3 +1639,180 @@ class OcrFTS(_BaseFTS[OcrHit]):
             session_uuids,
         ).fetchall()
         return {session_uuid: content for session_uuid, content in rows}
+
+
+class SearchIndex(Protocol[T]):
+    """What the search TUI needs of an index: ChatFTS, OcrFTS or UnifiedFTS."""
+
+    @property
+    def has_substring_index(self) -> bool: ...
+
+    def search(self, query: str) -> list[T]: ...
+
+    def browse(self, after: tuple[float, str] | None = None, query: str = "") -> list[T]: ...
+
+    def interrupt(self) -> None: ...
+
+
+@dataclass(frozen=True)
+class SearchSource:
+    """A storage directory searched by UnifiedFTS.
+
+    Attributes:
+        provider: The provider whose history it holds, e.g. 'mistral'.
+        target: What it holds, 'chat' or 'ocr'.
+        storage_dir: Path to the storage directory.
+    """
+
+    provider: str
+    target: str
+    storage_dir: str
+
+    @property
+    def label(self) -> str:
+        """Return the source as shown next to its hits, e.g. 'mistral chat'."""
+        return f"{self.provider} {self.target}"
+
+
+@dataclass
+class SourceHit:
+    """A search result of UnifiedFTS: a chat or OCR hit and the source it was found in.
+
+    Attributes:
+        source: The source the hit was found in.
+        hit: The hit, a SessionHit for a chat source or an OcrHit for an OCR source.
+    """
+
+    source: SearchSource
+    hit: SessionHit | OcrHit
+
+    @property
+    def uuid(self) -> str:
+        """The UUID of the session."""
+        return self.hit.uuid
+
+    @property
+    def created(self) -> float:
+        """The session creation timestamp (epoch seconds)."""
+        return self.hit.created
+
+
+class UnifiedFTS:
+    """Full-text search over the chat and OCR history of every provider at once.
+
+    Each source keeps its own ChatFTS or OcrFTS index, which is built once and
+    then queried for every search. The indexes are queried in parallel, one
+    thread each, and their hits merged: by BM25 rank for a query, ties broken
+    by recency, UUID and then source order so that the order is stable, and
+    by recency when browsing. BM25 ranks of different indexes are scored against different
+    collections, so they are only roughly comparable.
+
+    Like the indexes it holds, it may be searched from a thread other than
+    the one that built it, as long as one thread uses it at a time.
+    """
+
+    def __init__(self, sources: list[SearchSource], trigram: bool | None = None) -> None:
+        """Initialise a closed index over the sources.
+
+        Args:
+            sources (list[SearchSource]): The sources to search. Those without a storage directory are skipped.
+            trigram (bool | None, optional): Passed on to every index; see _BaseFTS. Defaults to None.
+        """
+        self._sources: list[SearchSource] = sources
+        self._trigram: bool | None = trigram
+        self._indexes: list[tuple[SearchSource, ChatFTS | OcrFTS]] = []
+        self._executor: ThreadPoolExecutor | None = None
+
+    @property
+    def has_substring_index(self) -> bool:
+        """Whether any of the indexes has the trigram index."""
+        return any(fts.has_substring_index for _, fts in self._indexes)
+
+    def build(
+        self,
+        encryption: Encryption | None,
+        jobs: int = DEFAULT_INDEX_JOBS,
+        progress: Callable[[SearchSource], IndexProgress | None] | None = None,
+    ) -> int:
+        """Build or incrementally update the index of every source; see _BaseFTS.build.
+
+        Args:
+            encryption (Encryption | None): Encryption instance or None.
+            jobs (int, optional): The number of sessions loaded concurrently. Defaults to the
+                number of CPUs, at most 8.
+            progress (Callable[[SearchSource], IndexProgress | None] | None, optional): Returns the
+                progress callback of each source's build. Defaults to None.
+
+        Returns:
+            int: Total number of sessions in the indexes after building.
+        """
+        self.close()
+        total: int = 0
+        for source in self._sources:
+            if not path.isdir(source.storage_dir):
+                continue
+            fts: ChatFTS | OcrFTS = (
+                OcrFTS(trigram=self._trigram) if source.target == "ocr" else ChatFTS(trigram=self._trigram)
+            )
+            total += fts.build(source.storage_dir, encryption, jobs, progress(source) if progress else None)
+            self._indexes.append((source, fts))
+        if self._indexes:
+            self._executor = ThreadPoolExecutor(max_workers=len(self._indexes), thread_name_prefix="gptcli-search")
+        return total
+
+    def search(self, query: str) -> list[SourceHit]:
+        """Search every index and merge the hits; see _BaseFTS.search.
+
+        Args:
+            query (str): The search query string. A query without text returns the first page of browse().
+
+        Returns:
+            list[SourceHit]: Up to 50 matching sessions ordered by relevance (or recency if no query).
+        """
+        if is_browse_query(query):
+            return self.browse(query=query)
+        hits: list[SourceHit] = self._gather(lambda fts: fts.search(query))
+        hits.sort(key=lambda h: (h.hit.score, -h.created, h.uuid))
+        return hits[:_MAX_RESULTS]
+
+    def browse(self, after: tuple[float, str] | None = None, query: str = "") -> list[SourceHit]:
+        """Return a page of the history of every source, most recent first; see _BaseFTS.browse.
+
+        Every index returns its own page after the same key and the merged page
+        keeps the most recent of them, so what is cut off follows the last
+        session kept and is returned with the next page.
+
+        Args:
+            after (tuple[float, str] | None, optional): The created timestamp and UUID of the last
+                session of the previous page. Defaults to None, for the first page.
+            query (str, optional): A query whose facets the sessions must match. Defaults to "".
+
+        Returns:
+            list[SourceHit]: Up to 50 sessions, none past the end of the history.
+        """
+        hits: list[SourceHit] = self._gather(lambda fts: fts.browse(after, query))
+        hits.sort(key=lambda h: (h.created, h.uuid), reverse=True)
+        return hits[:_BROWSE_PAGE_SIZE]
+
+    def interrupt(self) -> None:
+        """Abort the queries the indexes are running on other threads."""
+        for _, fts in self._indexes:
+            fts.interrupt()
+        return None
+
+    def close(self) -> None:
+        """Close every index. They can be opened again with build()."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        for _, fts in self._indexes:
+            fts.close()
+        self._indexes = []
+        return None
+
+    def _gather(self, query: Callable[[ChatFTS | OcrFTS], list[SessionHit] | list[OcrHit]]) -> list[SourceHit]:
+        """Run a query on every index in parallel and return the hits of all of them, labelled by source."""
+        if self._executor is None:
+            return []
+        futures = [(source, self._executor.submit(query, fts)) for source, fts in self._indexes]
+        return [SourceHit(source, hit) for source, future in futures for hit in future.result()]
@@ -0,0 +1,429 @@
+"""A local agent that holds the derived encryption key in memory and serves it over a Unix socket."""
+
+import ctypes
+import ctypes.util
+import json
+import logging
+import os
+import socket
+import stat
+import struct
+import sys
+import time
+from logging import Logger
+from typing import Any
+
+logger: Logger = logging.getLogger(__name__)
+
+GPTCLI_AGENT_SOCKET_ENV: str = "GPTCLI_AGENT_SOCK"
+DEFAULT_AGENT_TTL: float = 43200.0  # 12 hours in seconds, as for the key cache
+_CLIENT_TIMEOUT: float = 1.0
+_POLL_INTERVAL: float = 1.0
+_MAX_REQUEST_SIZE: int = 4096
+_PR_SET_DUMPABLE: int = 4
+
+
+def _libc() -> ctypes.CDLL | None:
+    name: str | None = ctypes.util.find_library("c")
+    try:
+        return ctypes.CDLL(name, use_errno=True) if name else None
+    except OSError:
+        return None
+
+
+def _buffer_address(buffer: bytearray) -> int:
+    return ctypes.addressof((ctypes.c_char * len(buffer)).from_buffer(buffer))
+
+
+def _lock_memory(buffer: bytearray) -> bool:
+    """Keep a buffer out of swap with mlock(2), where the platform allows it.
+
+    Args:
+        buffer (bytearray): The buffer to lock.
+
+    Returns:
+        bool: True if the buffer was locked.
+    """
+    libc = _libc()
+    if libc is None or not buffer:
+        return False
+    if libc.mlock(ctypes.c_void_p(_buffer_address(buffer)), ctypes.c_size_t(len(buffer))) != 0:
+        logger.warning(f"Could not lock the agent key in memory: {os.strerror(ctypes.get_errno())}")
+        return False
+    return True
+
+
+def _wipe(buffer: bytearray) -> None:
+    """Overwrite a buffer with zeros and unlock it.
+
+    Args:
+        buffer (bytearray): The buffer to wipe.
+    """
+    if not buffer:
+        return None
+    ctypes.memset(_buffer_address(buffer), 0, len(buffer))
+    libc = _libc()
+    if libc is not None:
+        libc.munlock(ctypes.c_void_p(_buffer_address(buffer)), ctypes.c_size_t(len(buffer)))
+    return None
+
+
+def _is_private(st: os.stat_result) -> bool:
+    """Return True if a file is owned by this user and no one else can read, write or enter it.
+
+    Args:
+        st (os.stat_result): The lstat() result of the file.
+
+    Returns:
+        bool: True if the file is private to this user.
+    """
+    return st.st_uid == os.getuid() and not st.st_mode & (stat.S_IRWXG | stat.S_IRWXO)
+
+
+def _peer_is_same_user(conn: socket.socket) -> bool:
+    """Return False if the other end of a connection is known to run as another user.
+
+    Args:
+        conn (socket.socket): The connected socket.
+
+    Returns:
+        bool: True if the peer runs as this user, or its user cannot be determined.
+    """
+    if not hasattr(socket, "SO_PEERCRED"):
+        return True
+    creds: bytes = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", creds)
+    return bool(uid == os.getuid())
+
+
+def ensure_socket_dir(socket_path: str) -> None:
+    """Create the directory of the agent socket, readable by the owner only, if it does not exist.
+
+    Args:
+        socket_path (str): Path of the agent's Unix socket.
+
+    Raises:
+        RuntimeError: If the directory exists but is a symlink, not a directory, or not private to this user.
+    """
+    directory: str = os.path.dirname(os.path.abspath(socket_path))
+    try:
+        os.mkdir(directory, stat.S_IRWXU)
+    except FileExistsError:
+        pass
+    st: os.stat_result = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or not _is_private(st):
+        raise RuntimeError(f"{directory} must be a directory owned by you that no one else can access.")
+    return None
+
+
+def _is_trusted_socket(socket_path: str) -> bool:
+    """Return True if a socket and its directory are owned by this user and private to it.
+
+    Anyone who can create the socket, or replace it in its directory, could
+    otherwise pose as the agent and be handed the key.
+
+    Args:
+        socket_path (str): Path of the agent's Unix socket.
+
+    Returns:
+        bool: True if the socket can be trusted to be this user's agent.
+    """
+    try:
+        directory: os.stat_result = os.lstat(os.path.dirname(os.path.abspath(socket_path)))
+        sock: os.stat_result = os.lstat(socket_path)
+    except OSError:
+        return False
+    if not stat.S_ISDIR(directory.st_mode) or not _is_private(directory):
+        logger.warning(f"Ignoring agent socket {socket_path}: its directory is not private to you.")
+        return False
+    if not stat.S_ISSOCK(sock.st_mode) or not _is_private(sock):
+        logger.warning(f"Ignoring agent socket {socket_path}: it is not a socket private to you.")
+        return False
+    return True
+
+
+def _harden_process() -> None:
+    """Disable core dumps, and on Linux ptrace by other processes, so the key cannot be read out of the agent."""
+    try:
+        import resource
+
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    except (ImportError, ValueError, OSError):
+        logger.warning("Could not disable core dumps for the agent.")
+    if sys.platform == "linux":
+        libc = _libc()
+        if libc is not None:
+            libc.prctl(_PR_SET_DUMPABLE, 0, 0, 0, 0)
+
+
+class KeyAgent:
+    """Serves the derived encryption key to gptcli processes of the same user, in the style of ssh-agent.
+
+    The key is held in a locked, zeroed-on-release buffer and forgotten when
+    its TTL runs out or the agent is locked. Requests are single JSON lines
+    over a Unix socket that only the owner can connect to, in a directory only
+    the owner can enter; on Linux the peer's uid is checked as well.
+
+    Attributes:
+        _socket_path: Path of the Unix socket the agent listens on.
+        _key: The key, or an empty buffer while the agent is locked.
+        _expires: When the key is forgotten, as a time.monotonic() value.
+        _running: False once the agent has been asked to stop.
+    """
+
+    def __init__(self, socket_path: str) -> None:
+        """Initialize a locked agent.
+
+        Args:
+            socket_path (str): Path of the Unix socket to listen on.
+        """
+        self._socket_path: str = socket_path
+        self._key: bytearray = bytearray()
+        self._expires: float = 0.0
+        self._running: bool = True
+
+    def unlock(self, key: bytes, ttl: float) -> None:
+        """Hold a key until the TTL runs out, replacing the current one.
+
+        Args:
+            key (bytes): The derived encryption key.
+            ttl (float): How long to hold the key, in seconds.
+        """
+        self.lock()
+        self._key = bytearray(key)
+        _lock_memory(self._key)
+        self._expires = time.monotonic() + ttl
+
+    def lock(self) -> None:
+        """Forget the key."""
+        _wipe(self._key)
+        self._key = bytearray()
+        self._expires = 0.0
+
+    def _expire(self) -> None:
+        if self._key and time.monotonic() >= self._expires:
+            logger.info("Agent key expired.")
+            self.lock()
+
+    def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        """Answer a request.
+
+        Args:
+            request (dict[str, Any]): The request: {"op": "get" | "unlock" | "lock" | "status" | "stop", ...}.
+                "unlock" also takes the hex-encoded "key" and the "ttl" in seconds.
+
+        Returns:
+            dict[str, Any]: The response, with "ok" set to whether the request succeeded.
+        """
+        self._expire()
+        op: Any = request.get("op")
+        if op == "get":
+            if not self._key:
+                return {"ok": False, "error": "locked"}
+            return {"ok": True, "key": bytes(self._key).hex()}
+        if op == "unlock":
+            try:
+                key: bytes = bytes.fromhex(str(request["key"]))
+                ttl: float = float(request.get("ttl", DEFAULT_AGENT_TTL))
+            except (KeyError, ValueError):
+                return {"ok": False, "error": "invalid key or ttl"}
+            if ttl <= 0:
+                return {"ok": False, "error": "invalid key or ttl"}
+            self.unlock(key, ttl)
+            return {"ok": True}
+        if op == "lock":
+            self.lock()
+            return {"ok": True}
+        if op == "status":
+            remaining: float = max(0.0, self._expires - time.monotonic()) if self._key else 0.0
+            return {"ok": True, "unlocked": bool(self._key), "expires_in": remaining, "pid": os.getpid()}
+        if op == "stop":
+            self._running = False
+            self.lock()
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown op {op!r}"}
+
+    @staticmethod
+    def _is_same_user(conn: socket.socket) -> bool:
+        """Return False if the peer is known to run as another user.
+
+        Args:
+            conn (socket.socket): The accepted connection.
+
+        Returns:
+            bool: True if the peer runs as this user, or its user cannot be determined.
+        """
+        return _peer_is_same_user(conn)
+
+    def _serve_connection(self, conn: socket.socket) -> None:
+        conn.settimeout(_CLIENT_TIMEOUT)
+        if not self._is_same_user(conn):
+            logger.warning("Rejected an agent connection from another user.")
+            return None
+        data: bytes = b""
+        while b"\n" not in data and len(data) < _MAX_REQUEST_SIZE:
+            chunk: bytes = conn.recv(_MAX_REQUEST_SIZE)
+            if not chunk:
+                break
+            data += chunk
+        try:
+            request: Any = json.loads(data.split(b"\n", 1)[0])
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            request = None
+        response = self.handle(request) if isinstance(request, dict) else {"ok": False, "error": "bad request"}
+        conn.sendall(json.dumps(response).encode("utf-8") + b"\n")
+        return None
+
+    def _bind(self) -> socket.socket:
+        """Create the listening socket, readable and writable by the owner only.
+
+        Returns:
+            socket.socket: The bound, listening socket.
+
+        Raises:
+            RuntimeError: If another agent is already listening on the socket path, or its
+                directory is not private; see ensure_socket_dir.
+        """
+        ensure_socket_dir(self._socket_path)
+        if os.path.lexists(self._socket_path):
+            if KeyAgentClient(self._socket_path).status() is not None:
+                raise RuntimeError(f"An agent is already running on {self._socket_path}.")
+            os.remove(self._socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask: int = os.umask(0o177)
+        try:
+            server.bind(self._socket_path)
+        finally:
+            os.umask(umask)
+        os.chmod(self._socket_path, stat.S_IRUSR | stat.S_IWUSR)
+        server.listen()
+        server.settimeout(_POLL_INTERVAL)
+        return server
+
+    def serve(self) -> None:
+        """Answer requests until asked to stop, forgetting the key when its TTL runs out."""
+        _harden_process()
+        server: socket.socket = self._bind()
+        logger.info(f"Agent listening on {self._socket_path}.")
+        try:
+            while self._running:
+                self._expire()
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    continue
+                with conn:
+                    try:
+                        self._serve_connection(conn)
+                    except OSError:
+                        logger.exception("Agent connection failed.")
+        finally:
+            self.lock()
+            server.close()
+            if os.path.exists(self._socket_path):
+                os.remove(self._socket_path)
+            logger.info("Agent stopped.")
+
+
+class KeyAgentClient:
+    """Talks to a KeyAgent. Every call returns None when no agent is reachable.
+
+    Only a socket private to this user, in a directory private to it, is
+    trusted, and on Linux the agent must run as this user too, so no other
+    user can pose as the agent.
+
+    Attributes:
+        _socket_path: Path of the agent's Unix socket.
+    """
+
+    def __init__(self, socket_path: str) -> None:
+        """Initialize the client.
+
+        Args:
+            socket_path (str): Path of the agent's Unix socket.
+        """
+        self._socket_path: str = socket_path
+
+    def _request(self, request: dict[str, Any]) -> dict[str, Any] | None:
+        """Send a request and wait for the response.
+
+        Args:
+            request (dict[str, Any]): The request.
+
+        Returns:
+            dict[str, Any] | None: The response, or None if the agent is not running, is not
+                trusted, or did not answer.
+        """
+        if not _is_trusted_socket(self._socket_path):
+            return None
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                conn.settimeout(_CLIENT_TIMEOUT)
+                conn.connect(self._socket_path)
+                if not _peer_is_same_user(conn):
+                    logger.warning(f"Ignoring agent on {self._socket_path}: it runs as another user.")
+                    return None
+                conn.sendall(json.dumps(request).encode("utf-8") + b"\n")
+                data: bytes = b""
+                while b"\n" not in data:
+                    chunk: bytes = conn.recv(_MAX_REQUEST_SIZE)
+                    if not chunk:
+                        break
+                    data += chunk
+            response: Any = json.loads(data)
+        except (OSError, ValueError):
+            logger.info(f"No agent answering on {self._socket_path}.")
+            return None
+        return response if isinstance(response, dict) else None
+
+    def get_key(self) -> bytes | None:
+        """Fetch the key from the agent.
+
+        Returns:
+            bytes | None: The key, or None if no agent is running or it is locked.
+        """
+        response = self._request({"op": "get"})
+        if not response or not response.get("ok"):
+            return None
+        try:
+            return bytes.fromhex(str(response["key"]))
+        except (KeyError, ValueError):
+            return None
+
+    def unlock(self, key: bytes, ttl: float = DEFAULT_AGENT_TTL) -> bool:
+        """Hand the agent a key to hold.
+
+        Args:
+            key (bytes): The derived encryption key.
+            ttl (float, optional): How long the agent holds the key, in seconds. Defaults to 12 hours.
+
+        Returns:
+            bool: True if the agent holds the key.
+        """
+        response = self._request({"op": "unlock", "key": key.hex(), "ttl": ttl})
+        return bool(response and response.get("ok"))
+
+    def lock(self) -> bool:
+        """Make the agent forget its key.
+
+        Returns:
+            bool: True if an agent answered.
+        """
+        return self._request({"op": "lock"}) is not None
+
+    def status(self) -> dict[str, Any] | None:
+        """Ask the agent whether it holds a key and for how long.
+
+        Returns:
+            dict[str, Any] | None: {"unlocked": bool, "expires_in": seconds, "pid": int, ...}, or None
+                if no agent is running.
+        """
+        return self._request({"op": "status"})
+
+    def stop(self) -> bool:
+        """Make the agent forget its key and exit.
+
+        Returns:
+            bool: True if an agent answered.
+        """
+        return self._request({"op": "stop"}) is not None
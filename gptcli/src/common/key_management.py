@@ -11,6 +11,7 @@ import sys
 import tempfile
 import time
 from collections.abc import Generator
+from dataclasses import dataclass
 from logging import Logger
 
 from gptcli.src.common.encryption import (
@@ -19,6 +20,7 @@ from gptcli.src.common.encryption import (
     _SCRYPT_R,
     Encryption,
 )
+from gptcli.src.common.key_agent import GPTCLI_AGENT_SOCKET_ENV, KeyAgentClient
 from gptcli.src.common.passphrase import PassphrasePrompt
 
 logger: Logger = logging.getLogger(__name__)
@@ -31,6 +33,90 @@ _MAX_PASSPHRASE_ATTEMPTS: int = 3
 _WRAPPING_KEY_FILENAME: str = (
     f"gptcli_wrapping_{os.getuid()}.key" if sys.platform == "linux" else "gptcli_wrapping.key"
 )
+_AGENT_SOCKET_DIRNAME: str = f"gptcli_agent_{os.getuid()}"
+_AGENT_SOCKET_FILENAME: str = "agent.sock"
+_RUNTIME_DIR_ENV: str = "XDG_RUNTIME_DIR"
+_CALIBRATION_MIN_N: int = 2**14
+_CALIBRATION_MAX_P: int = 16
+DEFAULT_KDF_TARGET_SECONDS: float = 1.0
+DEFAULT_KDF_MAX_MEMORY: int = 256 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ScryptParams:
+    """The cost parameters scrypt derives the encryption key with.
+
+    Attributes:
+        n: The CPU/memory cost, a power of two.
+        r: The block size.
+        p: The parallelization, i.e. how many times the memory-hard work is repeated.
+    """
+
+    n: int
+    r: int
+    p: int
+
+    @property
+    def memory(self) -> int:
+        """The memory scrypt needs with these parameters, in bytes."""
+        return 128 * self.n * self.r
+
+    def __str__(self) -> str:
+        return f"N=2^{self.n.bit_length() - 1}, r={self.r}, p={self.p} ({self.memory // (1024 * 1024)} MiB)"
+
+
+def default_scrypt_params() -> ScryptParams:
+    """Return the scrypt parameters used when none are calibrated or recorded.
+
+    Returns:
+        ScryptParams: The default parameters.
+    """
+    return ScryptParams(n=_SCRYPT_N, r=_SCRYPT_R, p=_SCRYPT_P)
+
+
+def _time_scrypt(params: ScryptParams) -> float:
+    """Derive a throwaway key and return how long it took.
+
+    Args:
+        params (ScryptParams): The parameters to derive with.
+
+    Returns:
+        float: The elapsed time in seconds.
+    """
+    start: float = time.perf_counter()
+    Encryption.derive_key("calibration", Encryption.generate_salt(), n=params.n, r=params.r, p=params.p)
+    return time.perf_counter() - start
+
+
+def calibrate_scrypt(
+    target_seconds: float = DEFAULT_KDF_TARGET_SECONDS, max_memory: int = DEFAULT_KDF_MAX_MEMORY
+) -> ScryptParams:
+    """Benchmark scrypt on this machine and pick the strongest parameters that fit a time and memory budget.
+
+    N is doubled, starting from 2**14, while the derivation stays within the
+    target time and N's memory within the budget. If memory runs out first,
+    the time left is spent on p instead. r stays at the default of 8. N never
+    goes below 2**14, even if that exceeds the budget.
+
+    Args:
+        target_seconds (float, optional): How long deriving the key may take. Defaults to 1 second.
+        max_memory (int, optional): How much memory deriving the key may use, in bytes. Defaults to 256 MiB.
+
+    Returns:
+        ScryptParams: The calibrated parameters.
+    """
+    r: int = _SCRYPT_R
+    params = ScryptParams(n=_CALIBRATION_MIN_N, r=r, p=1)
+    elapsed: float = _time_scrypt(params)
+    while elapsed * 2 <= target_seconds and ScryptParams(n=params.n * 2, r=r, p=1).memory <= max_memory:
+        params = ScryptParams(n=params.n * 2, r=r, p=1)
+        elapsed = _time_scrypt(params)
+    if elapsed > target_seconds and params.n > _CALIBRATION_MIN_N:
+        params, elapsed = ScryptParams(n=params.n // 2, r=r, p=1), elapsed / 2
+    if ScryptParams(n=params.n * 2, r=r, p=1).memory > max_memory:
+        params = ScryptParams(n=params.n, r=r, p=max(1, min(_CALIBRATION_MAX_P, int(target_seconds // elapsed))))
+    logger.info(f"Calibrated scrypt to {params}, about {elapsed * params.p:.2f}s per derivation.")
+    return params
 
 
 def make_key_manager(no_cache: bool = False) -> "KeyManager":
@@ -54,10 +140,28 @@ def make_key_manager(no_cache: bool = False) -> "KeyManager":
         key_path=GPTCLI_KEY_CACHE_FILE,
         verify_path=GPTCLI_VERIFY_FILE,
         params_path=GPTCLI_KDF_PARAMS_FILE,
+        agent_socket_path=agent_socket_path(),
         no_cache=no_cache,
     )
 
 
+def agent_socket_path() -> str:
+    """Return the path of the key agent socket: $GPTCLI_AGENT_SOCK, or a socket in a per-user directory.
+
+    The directory is in $XDG_RUNTIME_DIR if it is set, otherwise in volatile
+    storage. The agent creates it readable by its owner only, and clients
+    refuse a socket or directory that is not; see key_agent.ensure_socket_dir.
+
+    Returns:
+        str: The socket path.
+    """
+    runtime_dir: str = os.environ.get(_RUNTIME_DIR_ENV, "")
+    base_dir: str = runtime_dir if os.path.isabs(runtime_dir) else KeyManager._get_volatile_dir()
+    return os.environ.get(GPTCLI_AGENT_SOCKET_ENV) or os.path.join(
+        base_dir, _AGENT_SOCKET_DIRNAME, _AGENT_SOCKET_FILENAME
+    )
+
+
 class KeyManager:
     """Manages the lifecycle of encryption keys for data at rest.
 
@@ -72,6 +176,7 @@ class KeyManager:
         _verify_path: Path to the verification token file.
         _params_path: Path to the KDF parameters file.
         _wrapping_key_path: Path to the wrapping key file in volatile storage.
+        _agent_socket_path: Path of the key agent socket, or None to never ask an agent.
     """
 
     def __init__(
@@ -82,6 +187,7 @@ class KeyManager:
         params_path: str | None = None,
         wrapping_key_path: str | None = None,
         no_cache: bool = False,
+        agent_socket_path: str | None = None,
     ) -> None:
         """Initialize with paths to salt, key cache, verification, and KDF params files.
 
@@ -93,12 +199,15 @@ class KeyManager:
             wrapping_key_path (str | None): Path to wrapping key file in volatile storage.
                 If None, auto-detected via _get_volatile_dir(). Allows tests to use tmp_path.
             no_cache (bool): If True, never read or write the key cache or wrapping key files.
+            agent_socket_path (str | None): Path of the key agent socket to ask for the key first.
+                Defaults to None, which never asks an agent.
         """
         self._salt_path: str = salt_path
         self._key_path: str = key_path
         self._verify_path: str = verify_path
         self._params_path: str | None = params_path
         self._no_cache: bool = no_cache
+        self._agent_socket_path: str | None = agent_socket_path
         if wrapping_key_path is not None:
             self._wrapping_key_path: str = wrapping_key_path
         else:
@@ -194,7 +303,7 @@ class KeyManager:
         """
         return os.path.exists(self._salt_path) and os.path.exists(self._verify_path)
 
-    def initialize(self, passphrase: str) -> bytes:
+    def initialize(self, passphrase: str, params: ScryptParams | None = None) -> bytes:
         """Perform first-time encryption setup.
 
         Generates a salt, derives a key from the passphrase, creates a
@@ -203,6 +312,8 @@ class KeyManager:
 
         Args:
             passphrase (str): The user's chosen passphrase.
+            params (ScryptParams | None, optional): The scrypt parameters to derive the key with,
+                e.g. from calibrate_scrypt. Defaults to None, which uses the default parameters.
 
         Returns:
             bytes: The 32-byte derived encryption key.
@@ -218,16 +329,15 @@ class KeyManager:
             self._write_restricted(self._salt_path, salt)
             written.append(self._salt_path)
 
-            n: int = _SCRYPT_N
-            key: bytes = Encryption.derive_key(passphrase, salt, n=n)
+            params = params or default_scrypt_params()
+            key: bytes = Encryption.derive_key(passphrase, salt, n=params.n, r=params.r, p=params.p)
 
             token: bytes = Encryption.create_verification_token(key)
             self._write_restricted(self._verify_path, token)
             written.append(self._verify_path)
 
             if self._params_path is not None:
-                params_json: bytes = json.dumps({"n": n, "r": _SCRYPT_R, "p": _SCRYPT_P}).encode("utf-8")
-                self._write_restricted(self._params_path, params_json)
+                self._write_scrypt_params(params)
                 written.append(self._params_path)
 
             if not self._no_cache:
@@ -237,8 +347,10 @@ class KeyManager:
         return key
 
     def load_key(self) -> bytes | None:
-        """Load the encryption key from cache or prompt for passphrase.
+        """Load the encryption key from the agent, the cache, or prompt for passphrase.
 
+        A running, unlocked key agent is asked first, even when the key cache
+        is disabled, since it only holds the key once the user has started it.
         If the wrapping key is missing (e.g. after reboot), the encrypted key
         cache is unreadable and is deleted. If the key cache exists and is not
         expired, decrypts and returns the key. Otherwise prompts for passphrase.
@@ -246,11 +358,39 @@ class KeyManager:
         Returns:
             bytes | None: The 32-byte encryption key, or None if all attempts failed.
         """
+        from_agent: bytes | None = self._load_from_agent()
+        if from_agent is not None:
+            return from_agent
         cached: bytes | None = self._load_from_cache()
         if cached is not None:
             return cached
         return self._prompt_for_key()
 
+    def _load_from_agent(self) -> bytes | None:
+        """Ask the key agent for the encryption key.
+
+        The key is checked against the verification token, so an agent holding
+        the key of another installation, or one from before a rekey, is ignored.
+
+        Returns:
+            bytes | None: The key if an agent holds the right one, None otherwise.
+        """
+        if self._agent_socket_path is None:
+            return None
+        key: bytes | None = KeyAgentClient(self._agent_socket_path).get_key()
+        if key is None:
+            return None
+        try:
+            with open(self._verify_path, "rb") as fp:
+                token: bytes = fp.read()
+        except FileNotFoundError:
+            return None
+        if len(key) != _KEY_SIZE or not Encryption.verify_key(key, token):
+            logger.warning("Key agent holds a key that does not match this installation; ignoring it.")
+            return None
+        logger.info("Loading encryption key from agent.")
+        return key
+
     def _load_from_cache(self) -> bytes | None:
         """Attempt to load the encryption key from the on-disk cache.
 
@@ -370,7 +510,7 @@ class KeyManager:
         timestamp, _ = cached_data
         return (time.time() - timestamp) > _KEY_SESSION_DURATION
 
-    def replace_key_material(self, salt: bytes, key: bytes, n: int = _SCRYPT_N) -> None:
+    def replace_key_material(self, salt: bytes, key: bytes, params: ScryptParams | None = None) -> None:
         """Replace all key material files for rekey operations.
 
         Removes old key material and writes new salt, verification token,
@@ -379,7 +519,8 @@ class KeyManager:
         Args:
             salt (bytes): The new salt.
             key (bytes): The new derived encryption key.
-            n (int): The scrypt N cost parameter used to derive the key.
+            params (ScryptParams | None, optional): The scrypt parameters used to derive the key.
+                Defaults to None, which records the default parameters.
         """
         for filepath in [self._salt_path, self._verify_path, self._key_path]:
             if os.path.exists(filepath):
@@ -400,24 +541,37 @@ class KeyManager:
                 written.append(self._key_path)
 
             if self._params_path is not None:
-                params_json: bytes = json.dumps({"n": n, "r": _SCRYPT_R, "p": _SCRYPT_P}).encode("utf-8")
-                self._write_restricted(self._params_path, params_json)
+                self._write_scrypt_params(params or default_scrypt_params())
                 written.append(self._params_path)
 
-    def _load_scrypt_n(self) -> int:
-        """Load the scrypt N parameter from the KDF params file.
+    def _write_scrypt_params(self, params: ScryptParams) -> None:
+        """Record the scrypt parameters in the KDF params file.
+
+        Args:
+            params (ScryptParams): The parameters the key was derived with.
+        """
+        assert self._params_path is not None
+        params_json: bytes = json.dumps({"n": params.n, "r": params.r, "p": params.p}).encode("utf-8")
+        self._write_restricted(self._params_path, params_json)
+
+    def load_scrypt_params(self) -> ScryptParams:
+        """Load the scrypt parameters from the KDF params file.
 
-        Returns the value stored in the params file when available.
-        Defaults to _SCRYPT_N when no params file is configured or present.
+        Returns the values stored in the params file when available. Each
+        parameter missing from the file, or the whole file when no params file
+        is configured or present, defaults to the default parameters.
 
         Returns:
-            int: The scrypt N cost parameter.
+            ScryptParams: The scrypt parameters the key is derived with.
         """
+        defaults: ScryptParams = default_scrypt_params()
         if self._params_path is not None and os.path.exists(self._params_path):
             with open(self._params_path, "r", encoding="utf-8") as fp:
                 params: dict[str, int] = json.load(fp)
-            return params.get("n", _SCRYPT_N)
-        return _SCRYPT_N
+            return ScryptParams(
+                n=params.get("n", defaults.n), r=params.get("r", defaults.r), p=params.get("p", defaults.p)
+            )
+        return defaults
 
     def verify_passphrase(self, passphrase: str) -> bool:
         """Verify a passphrase against the stored salt and verification token.
@@ -444,8 +598,8 @@ class KeyManager:
         with open(self._verify_path, "rb") as fp:
             token: bytes = fp.read()
 
-        n: int = self._load_scrypt_n()
-        key: bytes = Encryption.derive_key(passphrase, salt, n=n)
+        params: ScryptParams = self.load_scrypt_params()
+        key: bytes = Encryption.derive_key(passphrase, salt, n=params.n, r=params.r, p=params.p)
         if not Encryption.verify_key(key, token):
             return None
         return key
@@ -0,0 +1,192 @@
+"""Append-only session manifest with a constant-time pointer to the latest session."""
+
+import json
+import logging
+import os
+from logging import Logger
+from os import path
+from typing import Any
+
+from gptcli.constants import (
+    GPTCLI_MANIFEST_FILENAME,
+    GPTCLI_MANIFEST_LATEST_FILENAME,
+    GPTCLI_MANIFEST_LOG_FILENAME,
+)
+from gptcli.src.common.encryption import Encryption
+from gptcli.src.common.file_io import read_text_file
+from gptcli.src.common.record_log import RecordLog
+
+logger: Logger = logging.getLogger(__name__)
+
+_COMPACTION_INTERVAL: int = 1000
+
+
+class Manifest:
+    """The list of sessions in a storage directory.
+
+    Entries are appended to a record log, one frame per entry, so adding a
+    session costs the same regardless of how many sessions exist. A later
+    record for the same UUID replaces the earlier one. A small pointer file
+    tracks the most recent entry, and the log is compacted once enough
+    records have been appended since the last rewrite.
+
+    A legacy ``.manifest.json`` is still read, and is folded into the log the
+    next time the manifest is written.
+
+    Attributes:
+        _storage_dir: The storage directory containing the manifest.
+        _encryption: Encryption instance, or None for plaintext.
+        _log: The record log holding the manifest entries.
+    """
+
+    def __init__(self, storage_dir: str, encryption: Encryption | None) -> None:
+        """Initialize the manifest for a storage directory.
+
+        Args:
+            storage_dir (str): The storage directory containing the manifest.
+            encryption (Encryption | None): Encryption instance, or None for plaintext.
+        """
+        self._storage_dir: str = storage_dir
+        self._encryption: Encryption | None = encryption
+        self._log: RecordLog = RecordLog(path.join(storage_dir, GPTCLI_MANIFEST_LOG_FILENAME), encryption)
+
+    @property
+    def _legacy_path(self) -> str:
+        return path.join(self._storage_dir, GPTCLI_MANIFEST_FILENAME)
+
+    @property
+    def _latest_path(self) -> str:
+        return path.join(self._storage_dir, GPTCLI_MANIFEST_LATEST_FILENAME)
+
+    def _has_legacy(self) -> bool:
+        return os.path.exists(self._legacy_path) or os.path.exists(self._legacy_path + ".enc")
+
+    def _read_legacy(self) -> list[dict[str, Any]] | None:
+        """Read the legacy JSON manifest.
+
+        Returns:
+            list[dict[str, Any]] | None: The legacy entries, an empty list if there is no
+                legacy manifest, or None if it is encrypted and no key is available.
+        """
+        if not self._has_legacy():
+            return []
+        raw: str | None = read_text_file(self._legacy_path, self._encryption)
+        if raw is None:
+            return None
+        try:
+            entries: list[dict[str, Any]] = json.loads(raw)
+            return entries
+        except json.JSONDecodeError:
+            logger.warning(f"Ignoring malformed legacy manifest: {self._legacy_path}")
+            return []
+
+    def read(self) -> list[dict[str, Any]] | None:
+        """Read all manifest entries.
+
+        Returns:
+            list[dict[str, Any]] | None: Entries with 'uuid' and 'created' keys in insertion
+                order, or None if the manifest is encrypted and no key is available.
+        """
+        legacy: list[dict[str, Any]] | None = self._read_legacy()
+        records: list[dict[str, Any]] | None = self._log.read()
+        if legacy is None or records is None:
+            return None
+        entries: dict[str, dict[str, Any]] = {}
+        for entry in legacy + records:
+            if "uuid" in entry:
+                entries[entry["uuid"]] = {"uuid": entry["uuid"], "created": entry.get("created", 0.0)}
+        return list(entries.values())
+
+    def append(self, session_uuid: str, created: float) -> None:
+        """Record a new session, or a new creation time for an existing one.
+
+        Args:
+            session_uuid (str): The UUID of the session.
+            created (float): The creation timestamp (epoch seconds).
+        """
+        entry: dict[str, Any] = {"uuid": session_uuid, "created": created}
+        pointer: dict[str, Any] | None = self._read_latest()
+        if self._has_legacy() or pointer is None or pointer["appended"] + 1 >= _COMPACTION_INTERVAL:
+            entries: list[dict[str, Any]] | None = self.read()
+            if entries is not None:
+                self.rewrite(entries + [entry])
+                return None
+        self._log.append(entry)
+        if pointer is not None:
+            latest: dict[str, Any] = entry if created >= pointer["created"] else pointer
+            self._write_latest(latest, appended=pointer["appended"] + 1)
+        return None
+
+    def rewrite(self, entries: list[dict[str, Any]]) -> None:
+        """Replace the manifest with the given entries and reset the latest pointer.
+
+        Also removes any legacy JSON manifest, completing its migration.
+
+        Args:
+            entries (list[dict[str, Any]]): The manifest entries to keep.
+        """
+        self._log.rewrite(entries)
+        for filepath in (self._legacy_path, self._legacy_path + ".enc"):
+            if os.path.exists(filepath):
+                os.remove(filepath)
+        if entries:
+            self._write_latest(max(entries, key=lambda e: e["created"]), appended=0)
+        else:
+            self._remove_latest()
+
+    def latest(self) -> dict[str, Any] | None:
+        """Return the entry the latest pointer refers to.
+
+        The pointer is not trusted while an unmigrated legacy manifest exists.
+
+        Returns:
+            dict[str, Any] | None: The latest entry, or None if the pointer is missing or unusable.
+        """
+        if self._has_legacy():
+            return None
+        pointer: dict[str, Any] | None = self._read_latest()
+        if pointer is None:
+            return None
+        return {"uuid": pointer["uuid"], "created": pointer["created"]}
+
+    def repair_latest(self, entry: dict[str, Any]) -> None:
+        """Point the latest pointer at an entry found by a full manifest scan.
+
+        Does nothing while a legacy manifest exists, since it would be ignored.
+
+        Args:
+            entry (dict[str, Any]): The manifest entry with the highest 'created' value.
+        """
+        if self._has_legacy():
+            return None
+        pointer: dict[str, Any] | None = self._read_latest()
+        self._write_latest(entry, appended=pointer["appended"] if pointer else 0)
+        return None
+
+    def _read_latest(self) -> dict[str, Any] | None:
+        raw: str | None = read_text_file(self._latest_path, self._encryption)
+        if raw is None:
+            return None
+        try:
+            pointer: dict[str, Any] = json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(pointer, dict) or not {"uuid", "created", "appended"} <= pointer.keys():
+            return None
+        return pointer
+
+    def _write_latest(self, entry: dict[str, Any], appended: int) -> None:
+        content: bytes = json.dumps({"uuid": entry["uuid"], "created": entry["created"], "appended": appended}).encode(
+            "utf-8"
+        )
+        if self._encryption:
+            with open(self._latest_path + ".enc", "wb") as fp:
+                fp.write(self._encryption.encrypt(content))
+        else:
+            with open(self._latest_path, "wb") as fp:
+                fp.write(content)
+
+    def _remove_latest(self) -> None:
+        for filepath in (self._latest_path, self._latest_path + ".enc"):
+            if os.path.exists(filepath):
+                os.remove(filepath)
@@ -51,6 +51,7 @@ class Message:
         created: Optional[float] = None,
         uuid: Optional[str] = None,
         tokens: Optional[int] = None,
+        attachment: bool = False,
     ) -> None:
         """A message can be created by a user or by an API.
         Message serves as a blueprint to express the message
@@ -65,6 +66,7 @@ class Message:
             created (Optional[float], optional): The epoch time of creation; includes milliseconds. Defaults to None.
             uuid (Optional[str], optional): The uuid of the message to ID specific Message objects. Defaults to None.
             tokens (Optional[int], optional): The estimated token amount this message will consume. Defaults to None.
+            attachment (bool, optional): True if the content was loaded from a file. Defaults to False.
         """
         self._created: float = created if created is not None else time()
         self._uuid: str = uuid if uuid is not None else str(uuid4())
@@ -75,6 +77,7 @@ class Message:
         self._is_reply: bool = is_reply
         self._tokens: int = tokens if tokens is not None else self._count_tokens(provider=self._provider)
         self._index: int = Message.index
+        self._attachment: bool = attachment
         Message.index += 1
 
     @property
@@ -97,6 +100,11 @@ class Message:
         """The 'is_reply' value (read)."""
         return self._is_reply
 
+    @property
+    def is_attachment(self) -> bool:
+        """True if the content of this message was loaded from a file."""
+        return self._attachment
+
     def to_dict_reduced_context(self) -> dict[str, str]:
         """Use this lightweight version when sending messages to API endpoints.
         If we send less, we save tokens.
@@ -126,6 +134,7 @@ class Message:
             "is_reply": self._is_reply,
             "tokens": self._tokens,
             "index": self._index,
+            "attachment": self._attachment,
         }
 
     def _count_tokens(self, provider: str) -> int:
@@ -276,6 +285,26 @@ class MessageFactory:
             is_reply=False,
         )
 
+    def attachment_message(self, role: str, content: str, model: str) -> Message:
+        """Creates a user message whose content was loaded from a file.
+
+        Args:
+            role (str): The role designated by the user at the start (user, mathematician, pilot etc).
+            content (str): The content loaded from the file.
+            model (str): The LLM used for this message.
+
+        Returns:
+            Message: A Message object whose content is stored once in the blob store.
+        """
+        return Message(
+            role=role,
+            content=content,
+            model=model,
+            provider=self._provider,
+            is_reply=False,
+            attachment=True,
+        )
+
     def reply_message(self, content: str, model: str) -> Message:
         """Creates a message, you may specify the role and the content.
 
@@ -317,6 +346,7 @@ class MessageFactory:
             created=message["created"],
             uuid=message["uuid"],
             tokens=message["tokens"],
+            attachment=message.get("attachment", False),
         )
 
 
@@ -460,5 +490,8 @@ class Messages:
     def __len__(self) -> int:
         return len(self._messages)
 
+    def __getitem__(self, index: int) -> Message:
+        return self._messages[index]
+
     def __iter__(self) -> MessagesIterator:
         return MessagesIterator(self._messages)
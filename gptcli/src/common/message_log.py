@@ -0,0 +1,487 @@
+"""Seekable per-message storage for chat sessions, with tail loading."""
+
+import json
+import logging
+import struct
+from dataclasses import dataclass
+from logging import Logger
+from typing import Any
+
+from gptcli.constants import (
+    GPTCLI_JOURNAL_FILENAME,
+    GPTCLI_MESSAGES_INDEX_FILENAME,
+    GPTCLI_MESSAGES_LOG_FILENAME,
+    GPTCLI_SESSION_FILENAME,
+)
+from gptcli.src.common.blob_store import (
+    BlobStore,
+    blob_owner,
+    load_attachments,
+    store_attachments,
+)
+from gptcli.src.common.chat_journal import is_system_message, read_journal
+from gptcli.src.common.encryption import (
+    CIPHERTEXT_OVERHEAD,
+    ENVELOPE_HEADER_SIZE,
+    Encryption,
+)
+from gptcli.src.common.record_log import (
+    decode_frames,
+    encode_record,
+    open_frames,
+)
+from gptcli.src.common.session_store import SessionStore
+
+logger: Logger = logging.getLogger(__name__)
+
+# offset and length of the message's frame in the log, its token count, and flags. Offsets
+# and lengths are those of the frames before sealing, compressed or not, which encrypting or
+# decrypting the log frame by frame leaves as they are, so the index stays valid; sealed
+# frames are CIPHERTEXT_OVERHEAD longer and follow the header of the log.
+_INDEX_ENTRY: struct.Struct = struct.Struct(">QIIB")
+_FLAG_SYSTEM: int = 1
+
+
+class SessionLocked(Exception):
+    """Raised when a chat session is encrypted and no encryption key is available."""
+
+
+@dataclass
+class ChatWindow:
+    """The part of a chat session loaded by a windowed read.
+
+    Attributes:
+        session_uuid: The UUID of the session the window was read from.
+        messages: The loaded messages, in session order.
+        prefix: The index of the first message of the tail. Every earlier
+            message that is not a system message was left unloaded.
+        total: The number of messages in the session.
+    """
+
+    session_uuid: str
+    messages: list[dict[str, Any]]
+    prefix: int
+    total: int
+
+    @property
+    def skipped(self) -> int:
+        """The number of messages that were not loaded."""
+        return self.total - len(self.messages)
+
+    @property
+    def anchor(self) -> str:
+        """The UUID of the first non-system message loaded, or an empty string if there is none."""
+        return next((str(m.get("uuid", "")) for m in self.messages if not is_system_message(m)), "")
+
+
+def select_window(
+    entries: list[tuple[int, bool]], last: int | None, token_budget: int | None
+) -> tuple[list[int], int]:
+    """Choose which messages of a session to load.
+
+    System messages are always loaded. Walking back from the newest message,
+    other messages are loaded until either limit would be exceeded; the newest
+    message is always loaded. A limit of None means no limit.
+
+    Args:
+        entries (list[tuple[int, bool]]): The token count and system flag of every message, in order.
+        last (int | None): The maximum number of non-system messages to load.
+        token_budget (int | None): The maximum number of tokens of non-system messages to load.
+
+    Returns:
+        tuple[list[int], int]: The indices to load in order, and the index where the tail starts.
+    """
+    count: int = 0
+    tokens: int = 0
+    prefix: int = len(entries)
+    for index in range(len(entries) - 1, -1, -1):
+        message_tokens, is_system = entries[index]
+        if not is_system:
+            over_last: bool = last is not None and count + 1 > last
+            over_budget: bool = token_budget is not None and tokens + message_tokens > token_budget
+            if count > 0 and (over_last or over_budget):
+                break
+            count += 1
+            tokens += message_tokens
+        prefix = index
+    indices: list[int] = [i for i in range(prefix) if entries[i][1]] + list(range(prefix, len(entries)))
+    return indices, prefix
+
+
+def write_message_log(
+    store: SessionStore,
+    session_uuid: str,
+    messages: list[dict[str, Any]],
+    encryption: Encryption | None,
+    blobs: BlobStore | None = None,
+) -> None:
+    """Store a session's messages as one record per message plus an index of the records.
+
+    With encryption, each record is compressed before it is sealed; see encode_record.
+
+    Args:
+        store (SessionStore): The session store to write to.
+        session_uuid (str): The UUID of the session.
+        messages (list[dict[str, Any]]): The messages, as stored by Message.to_dict_full_context.
+        encryption (Encryption | None): Encryption instance, or None for plaintext.
+        blobs (BlobStore | None, optional): The blob store for attachment content. Defaults to None,
+            which keeps attachment content in the records.
+    """
+    if blobs is not None:
+        messages = store_attachments(messages, blobs, blob_owner(store, session_uuid))
+    header: bytes = b""
+    frame_encryption: Encryption | None = None
+    if encryption is not None:
+        header, frame_encryption = encryption.new_envelope()
+    frames, index = _encode_messages(messages, frame_encryption, 0)
+    raw_index: bytes = b"".join(index)
+    encrypted: bool = encryption is not None
+    with store.transaction():
+        store.write_file(session_uuid, GPTCLI_MESSAGES_LOG_FILENAME, header + b"".join(frames), encrypted)
+        store.write_file(
+            session_uuid,
+            GPTCLI_MESSAGES_INDEX_FILENAME,
+            encryption.encrypt_envelope(raw_index) if encryption else raw_index,
+            encrypted,
+        )
+        store.delete_file(session_uuid, GPTCLI_SESSION_FILENAME)
+
+
+def append_message_log(
+    store: SessionStore,
+    session_uuid: str,
+    messages: list[dict[str, Any]],
+    encryption: Encryption | None,
+    blobs: BlobStore | None = None,
+) -> bool:
+    """Append messages to the end of a session's message log.
+
+    The records already in the log are left as they are; the new records are
+    sealed with the data key of the log, and only the index is rewritten.
+
+    Args:
+        store (SessionStore): The session store holding the log.
+        session_uuid (str): The UUID of the session.
+        messages (list[dict[str, Any]]): The messages to append, as stored by Message.to_dict_full_context.
+        encryption (Encryption | None): Encryption instance, or None for plaintext.
+        blobs (BlobStore | None, optional): The blob store for attachment content. Defaults to None,
+            which keeps attachment content in the records.
+
+    Returns:
+        bool: True if the messages were appended, False if the session has no message log
+            that is encrypted, or not, as requested, in which case nothing is written.
+    """
+    try:
+        log: MessageLog | None = MessageLog.open(store, session_uuid, encryption)
+    except SessionLocked:
+        return False
+    if log is None or log.encrypted != (encryption is not None):
+        return False
+    if blobs is not None:
+        messages = store_attachments(messages, blobs, blob_owner(store, session_uuid))
+    offset: int = log._entries[-1][0] + log._entries[-1][1] if log._entries else 0
+    frames, index = _encode_messages(messages, log._encryption, offset)
+    raw_index: bytes = b"".join([_INDEX_ENTRY.pack(*entry) for entry in log._entries] + index)
+    encrypted: bool = encryption is not None
+    with store.transaction():
+        store.append_file(session_uuid, GPTCLI_MESSAGES_LOG_FILENAME, b"".join(frames), encrypted)
+        store.write_file(
+            session_uuid,
+            GPTCLI_MESSAGES_INDEX_FILENAME,
+            encryption.encrypt_envelope(raw_index) if encryption else raw_index,
+            encrypted,
+        )
+    return True
+
+
+def copy_message_log(store: SessionStore, source_uuid: str, target_uuid: str) -> bool:
+    """Copy the message log of one session to another, byte for byte.
+
+    Nothing is decrypted or re-encoded: the copy keeps the header, and so the
+    data key, of the original.
+
+    Args:
+        store (SessionStore): The session store holding both sessions.
+        source_uuid (str): The UUID of the session to copy from.
+        target_uuid (str): The UUID of the session to copy to.
+
+    Returns:
+        bool: True if the log was copied, False if the source session has no message log.
+    """
+    stored_log = store.read_file(source_uuid, GPTCLI_MESSAGES_LOG_FILENAME)
+    stored_index = store.read_file(source_uuid, GPTCLI_MESSAGES_INDEX_FILENAME)
+    if stored_log is None or stored_index is None:
+        return False
+    with store.transaction():
+        store.write_file(target_uuid, GPTCLI_MESSAGES_LOG_FILENAME, *stored_log)
+        store.write_file(target_uuid, GPTCLI_MESSAGES_INDEX_FILENAME, *stored_index)
+        store.delete_file(target_uuid, GPTCLI_SESSION_FILENAME)
+    return True
+
+
+def _encode_messages(
+    messages: list[dict[str, Any]], frame_encryption: Encryption | None, offset: int
+) -> tuple[list[bytes], list[bytes]]:
+    """Encode messages as log records and index entries.
+
+    Args:
+        messages (list[dict[str, Any]]): The messages to encode.
+        frame_encryption (Encryption | None): The key to seal the records with, or None for plaintext.
+        offset (int): The offset of the first record, as recorded in the index.
+
+    Returns:
+        tuple[list[bytes], list[bytes]]: The records and the packed index entries, one per message.
+    """
+    frames: list[bytes] = []
+    index: list[bytes] = []
+    overhead: int = CIPHERTEXT_OVERHEAD if frame_encryption else 0
+    for message in messages:
+        frame: bytes = encode_record(message, frame_encryption)
+        length: int = len(frame) - overhead
+        flags: int = _FLAG_SYSTEM if is_system_message(message) else 0
+        index.append(_INDEX_ENTRY.pack(offset, length, int(message.get("tokens", 0)), flags))
+        frames.append(frame)
+        offset += length
+    return frames, index
+
+
+class MessageLog:
+    """Reads individual messages of a session stored with write_message_log.
+
+    Only the index is read up front; messages are read by seeking to their
+    records, so loading the tail of a long session does not read the rest.
+
+    Attributes:
+        _store: The session store holding the log.
+        _session_uuid: The UUID of the session.
+        _encryption: The key the records are sealed with, or None if they are plaintext.
+        _start: The offset of the first record, past the header of an encrypted log.
+        _entries: The decoded index, one (offset, length, tokens, flags) tuple per message.
+    """
+
+    def __init__(
+        self,
+        store: SessionStore,
+        session_uuid: str,
+        encryption: Encryption | None,
+        entries: list[tuple[int, int, int, int]],
+        start: int = 0,
+    ) -> None:
+        """Initialize the reader from a decoded index; see MessageLog.open.
+
+        Args:
+            store (SessionStore): The session store holding the log.
+            session_uuid (str): The UUID of the session.
+            encryption (Encryption | None): The key the records are sealed with, or None if they are plaintext.
+            entries (list[tuple[int, int, int, int]]): The decoded index entries.
+            start (int, optional): The offset of the first record. Defaults to 0.
+        """
+        self._store: SessionStore = store
+        self._session_uuid: str = session_uuid
+        self._encryption: Encryption | None = encryption
+        self._start: int = start
+        self._entries: list[tuple[int, int, int, int]] = entries
+
+    @classmethod
+    def open(cls, store: SessionStore, session_uuid: str, encryption: Encryption | None) -> "MessageLog | None":
+        """Open the message log of a session.
+
+        Args:
+            store (SessionStore): The session store holding the log.
+            session_uuid (str): The UUID of the session.
+            encryption (Encryption | None): Encryption instance for decryption, or None.
+
+        Returns:
+            MessageLog | None: The reader, or None if the session has no readable message log.
+
+        Raises:
+            SessionLocked: If the log is encrypted and no key is available.
+        """
+        stored = store.read_file(session_uuid, GPTCLI_MESSAGES_INDEX_FILENAME)
+        if stored is None:
+            return None
+        raw_index, encrypted = stored
+        if encrypted:
+            if encryption is None:
+                raise SessionLocked(session_uuid)
+            decrypted: bytes | None = encryption.decrypt(raw_index)
+            if decrypted is None:
+                logger.warning(f"Failed to decrypt the message index of session {session_uuid}.")
+                return None
+            raw_index = decrypted
+        if len(raw_index) % _INDEX_ENTRY.size:
+            logger.warning(f"Ignoring malformed message index of session {session_uuid}.")
+            return None
+        entries = [entry for entry in _INDEX_ENTRY.iter_unpack(raw_index)]
+        if not encrypted:
+            return cls(store, session_uuid, None, entries)
+        assert encryption is not None
+        head = store.read_range(session_uuid, GPTCLI_MESSAGES_LOG_FILENAME, 0, ENVELOPE_HEADER_SIZE)
+        frame_encryption, start = open_frames(head[0] if head is not None else b"", encryption)
+        return cls(store, session_uuid, frame_encryption, entries, start)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def encrypted(self) -> bool:
+        """Whether the records of the log are sealed."""
+        return self._encryption is not None
+
+    def window(self, prefix: int) -> list[int]:
+        """Return the indices a windowed read with its tail starting at prefix loaded.
+
+        Args:
+            prefix (int): The index of the first message of the tail.
+
+        Returns:
+            list[int]: The system messages before the tail and every message of the tail, in order.
+        """
+        return [i for i in range(prefix) if self._entries[i][3] & _FLAG_SYSTEM] + list(
+            range(prefix, len(self._entries))
+        )
+
+    def select(self, last: int | None, token_budget: int | None) -> tuple[list[int], int]:
+        """Choose the messages of a windowed read; see select_window.
+
+        Args:
+            last (int | None): The maximum number of non-system messages to load.
+            token_budget (int | None): The maximum number of tokens of non-system messages to load.
+
+        Returns:
+            tuple[list[int], int]: The indices to load in order, and the index where the tail starts.
+        """
+        return select_window(
+            [(tokens, bool(flags & _FLAG_SYSTEM)) for _, _, tokens, flags in self._entries], last, token_budget
+        )
+
+    def read(self, indices: list[int]) -> list[dict[str, Any]]:
+        """Read the messages at the given indices.
+
+        Records that sit next to each other in the log are read together.
+
+        Args:
+            indices (list[int]): The message indices to read, in ascending order.
+
+        Returns:
+            list[dict[str, Any]]: The messages that could be read, in order.
+        """
+        messages: list[dict[str, Any]] = []
+        overhead: int = CIPHERTEXT_OVERHEAD if self._encryption else 0
+        run: list[int] = []
+        for index in indices + [-1]:
+            if run and (index == -1 or index != run[-1] + 1):
+                start: int = self._start + self._entries[run[0]][0] + run[0] * overhead
+                end: int = (
+                    self._start + self._entries[run[-1]][0] + self._entries[run[-1]][1] + (run[-1] + 1) * overhead
+                )
+                stored = self._store.read_range(self._session_uuid, GPTCLI_MESSAGES_LOG_FILENAME, start, end - start)
+                if stored is not None:
+                    source: str = f"{self._session_uuid}/{GPTCLI_MESSAGES_LOG_FILENAME}"
+                    messages.extend(decode_frames(stored[0], self._encryption, source))
+                run = []
+            run.append(index)
+        return messages
+
+
+def read_chat_session(
+    store: SessionStore, session_uuid: str, encryption: Encryption | None, blobs: BlobStore | None = None
+) -> list[dict[str, Any]] | None:
+    """Read every message of a chat session, whatever layout it is stored in.
+
+    A session that still has a journal, because it is running or its process
+    died, is read from the journal. Otherwise its message log is read, or the
+    legacy session.json of sessions stored before message logs existed.
+
+    Args:
+        store (SessionStore): The session store holding the session.
+        session_uuid (str): The UUID of the session.
+        encryption (Encryption | None): Encryption instance for decryption, or None.
+        blobs (BlobStore | None, optional): The blob store to read attachment content from. Defaults to None,
+            which leaves the content of attachments stored as blobs empty.
+
+    Returns:
+        list[dict[str, Any]] | None: The messages, or None if the session has none or they are unreadable.
+
+    Raises:
+        SessionLocked: If the session is encrypted and no key is available.
+    """
+    messages: list[dict[str, Any]] | None = _read_stored_session(store, session_uuid, encryption, blobs)
+    if messages is None or blobs is None:
+        return messages
+    return load_attachments(messages, blobs)
+
+
+def _read_stored_session(
+    store: SessionStore, session_uuid: str, encryption: Encryption | None, blobs: BlobStore | None
+) -> list[dict[str, Any]] | None:
+    if GPTCLI_JOURNAL_FILENAME in store.file_names(session_uuid):
+        messages: list[dict[str, Any]] | None = read_journal(
+            store, session_uuid, encryption, lambda uuid: read_chat_session(store, uuid, encryption, blobs)
+        )
+        if messages is None:
+            raise SessionLocked(session_uuid)
+        return messages
+
+    log: MessageLog | None = MessageLog.open(store, session_uuid, encryption)
+    if log is not None:
+        return log.read(list(range(len(log))))
+
+    if encryption is None:
+        stored = store.read_file(session_uuid, GPTCLI_SESSION_FILENAME)
+        if stored is not None and stored[1]:
+            raise SessionLocked(session_uuid)
+    raw: str | None = store.read_text(session_uuid, GPTCLI_SESSION_FILENAME, encryption)
+    if raw is None:
+        return None
+    try:
+        legacy: list[dict[str, Any]] = json.loads(raw)["messages"]
+        return legacy
+    except (json.JSONDecodeError, KeyError, TypeError):
+        logger.warning(f"Ignoring malformed session {session_uuid}.")
+        return None
+
+
+def read_chat_window(
+    store: SessionStore,
+    session_uuid: str,
+    encryption: Encryption | None,
+    last: int | None,
+    token_budget: int | None,
+    blobs: BlobStore | None = None,
+) -> ChatWindow | None:
+    """Read the system messages and the tail of a chat session.
+
+    Sessions stored as a message log only read the records being loaded;
+    other layouts are read in full and then trimmed.
+
+    Args:
+        store (SessionStore): The session store holding the session.
+        session_uuid (str): The UUID of the session.
+        encryption (Encryption | None): Encryption instance for decryption, or None.
+        last (int | None): The maximum number of non-system messages to load, or None for no limit.
+        token_budget (int | None): The maximum number of tokens of non-system messages, or None for no limit.
+        blobs (BlobStore | None, optional): The blob store to read attachment content from. Defaults to None.
+
+    Returns:
+        ChatWindow | None: The loaded window, or None if the session has no readable messages.
+
+    Raises:
+        SessionLocked: If the session is encrypted and no key is available.
+    """
+    if GPTCLI_JOURNAL_FILENAME not in store.file_names(session_uuid):
+        log: MessageLog | None = MessageLog.open(store, session_uuid, encryption)
+        if log is not None:
+            indices, prefix = log.select(last, token_budget)
+            loaded: list[dict[str, Any]] = log.read(indices)
+            if blobs is not None:
+                loaded = load_attachments(loaded, blobs)
+            return ChatWindow(session_uuid, loaded, prefix, len(log))
+
+    messages: list[dict[str, Any]] | None = read_chat_session(store, session_uuid, encryption, blobs)
+    if messages is None:
+        return None
+    indices, prefix = select_window(
+        [(int(m.get("tokens", 0)), is_system_message(m)) for m in messages], last, token_budget
+    )
+    return ChatWindow(session_uuid, [messages[i] for i in indices], prefix, len(messages))
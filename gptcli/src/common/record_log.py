@@ -0,0 +1,312 @@
+"""Append-only files of length-prefixed JSON records, encrypted one record at a time.
+
+An encrypted record log starts with an envelope header that wraps a data key
+of its own, and every frame is sealed with that data key. Changing the master
+key therefore only rewrites the header. Logs encrypted before the header
+existed have their frames sealed with the master key and are still read.
+
+Records of an encrypted log are compressed with the codec of the encryption
+before they are sealed. Transcoding a log between plaintext and encrypted
+form leaves the payloads as they are, compressed or not, so every frame keeps
+its length apart from the sealing overhead; readers decompress either form.
+"""
+
+import json
+import logging
+import os
+import struct
+from logging import Logger
+from typing import Any
+
+from gptcli.src.common.compression import compress, decompress
+from gptcli.src.common.encryption import (
+    ENVELOPE_HEADER_SIZE,
+    Encryption,
+    is_envelope,
+)
+
+logger: Logger = logging.getLogger(__name__)
+
+_FRAME_HEADER: struct.Struct = struct.Struct(">I")
+_RECORD_LOG_SUFFIX: str = ".log"
+
+
+def is_record_log(filepath: str) -> bool:
+    """Return True if the path names a record log, with or without the .enc suffix.
+
+    Args:
+        filepath (str): The file path to check.
+
+    Returns:
+        bool: True if the file is a record log.
+    """
+    if filepath.endswith(".enc"):
+        filepath = filepath[: -len(".enc")]
+    return filepath.endswith(_RECORD_LOG_SUFFIX)
+
+
+def _encode_frame(payload: bytes) -> bytes:
+    return _FRAME_HEADER.pack(len(payload)) + payload
+
+
+def _split_frames(data: bytes) -> list[bytes]:
+    """Split raw log bytes into frame payloads.
+
+    A truncated trailing frame, as left behind by a crash mid-append, is dropped.
+
+    Args:
+        data (bytes): The raw contents of a record log.
+
+    Returns:
+        list[bytes]: The payload of every complete frame, in file order.
+    """
+    payloads: list[bytes] = []
+    offset: int = 0
+    while offset + _FRAME_HEADER.size <= len(data):
+        (length,) = _FRAME_HEADER.unpack_from(data, offset)
+        start: int = offset + _FRAME_HEADER.size
+        if start + length > len(data):
+            logger.warning("Ignoring truncated record at the end of a record log.")
+            break
+        payloads.append(data[start : start + length])
+        offset = start + length
+    return payloads
+
+
+def open_frames(head: bytes, encryption: Encryption) -> tuple[Encryption, int]:
+    """Find the key the frames of an encrypted record log are sealed with, and where they start.
+
+    Args:
+        head (bytes): The start of the encrypted log, ENVELOPE_HEADER_SIZE bytes or all of it if shorter.
+        encryption (Encryption): Encryption instance with the master key.
+
+    Returns:
+        tuple[Encryption, int]: The data key of the log and the size of its header, or the master key
+            and 0 for a log without a header. The master key is also returned for a header wrapped
+            with another key, so that frames fail to decrypt rather than being misread.
+    """
+    if not is_envelope(head):
+        return encryption, 0
+    return encryption.open_envelope(head) or encryption, ENVELOPE_HEADER_SIZE
+
+
+def encrypt_frames(data: bytes, encryption: Encryption) -> bytes:
+    """Encrypt every frame of a plaintext record log with a new data key.
+
+    Args:
+        data (bytes): The raw contents of a plaintext record log.
+        encryption (Encryption): Encryption instance to wrap the data key with.
+
+    Returns:
+        bytes: The contents of the equivalent encrypted record log, header first.
+    """
+    header, frame_encryption = encryption.new_envelope()
+    return header + b"".join(_encode_frame(frame_encryption.encrypt(payload)) for payload in _split_frames(data))
+
+
+def decrypt_frames(data: bytes, encryption: Encryption) -> bytes | None:
+    """Decrypt every frame of an encrypted record log.
+
+    Args:
+        data (bytes): The raw contents of an encrypted record log.
+        encryption (Encryption): Encryption instance with the master key.
+
+    Returns:
+        bytes | None: The contents of the equivalent plaintext record log, or None if any frame fails to decrypt.
+    """
+    frame_encryption, start = open_frames(data[:ENVELOPE_HEADER_SIZE], encryption)
+    frames: list[bytes] = []
+    for payload in _split_frames(data[start:]):
+        plaintext: bytes | None = frame_encryption.decrypt_payload(payload)
+        if plaintext is None:
+            return None
+        frames.append(_encode_frame(plaintext))
+    return b"".join(frames)
+
+
+def encode_record(record: dict[str, Any], encryption: Encryption | None) -> bytes:
+    """Serialize a record as a single frame, compressing and sealing it when encryption is enabled.
+
+    Args:
+        record (dict[str, Any]): The JSON-serializable record.
+        encryption (Encryption | None): Encryption instance for the frame, the data key of the log
+            it is appended to (see open_frames), or None for plaintext.
+
+    Returns:
+        bytes: The encoded frame, ready to be appended to a record log.
+    """
+    payload: bytes = json.dumps(record, ensure_ascii=False).encode("utf-8")
+    if encryption:
+        if encryption.codec is not None:
+            payload = compress(payload, encryption.codec)
+        payload = encryption.encrypt(payload)
+    return _encode_frame(payload)
+
+
+def encode_log(records: list[dict[str, Any]], encryption: Encryption | None) -> bytes:
+    """Serialize records as the contents of a record log, encrypted with a new data key if enabled.
+
+    Args:
+        records (list[dict[str, Any]]): The JSON-serializable records.
+        encryption (Encryption | None): Encryption instance to wrap the data key with, or None for plaintext.
+
+    Returns:
+        bytes: The contents of the record log.
+    """
+    if encryption is None:
+        return b"".join(encode_record(record, None) for record in records)
+    header, frame_encryption = encryption.new_envelope()
+    return header + b"".join(encode_record(record, frame_encryption) for record in records)
+
+
+def decode_records(data: bytes, encryption: Encryption | None, source: str) -> list[dict[str, Any]]:
+    """Decode every record in the raw contents of a record log.
+
+    Frames that fail to decrypt or parse are skipped with a warning.
+
+    Args:
+        data (bytes): The raw contents of a record log.
+        encryption (Encryption | None): Encryption instance with the master key if the log is encrypted,
+            or None for plaintext.
+        source (str): A description of where the data came from, for log messages.
+
+    Returns:
+        list[dict[str, Any]]: The records in append order.
+    """
+    if encryption is None:
+        return decode_frames(data, None, source)
+    frame_encryption, start = open_frames(data[:ENVELOPE_HEADER_SIZE], encryption)
+    return decode_frames(data[start:], frame_encryption, source)
+
+
+def decode_frames(data: bytes, encryption: Encryption | None, source: str) -> list[dict[str, Any]]:
+    """Decode records from consecutive frames of a record log, such as a range read past its header.
+
+    Frames that fail to decrypt or parse are skipped with a warning.
+
+    Args:
+        data (bytes): Whole frames of a record log.
+        encryption (Encryption | None): The key the frames are sealed with (see open_frames), or None for plaintext.
+        source (str): A description of where the data came from, for log messages.
+
+    Returns:
+        list[dict[str, Any]]: The records in append order.
+    """
+    records: list[dict[str, Any]] = []
+    for payload in _split_frames(data):
+        if encryption is not None:
+            decrypted: bytes | None = encryption.decrypt_payload(payload)
+            if decrypted is None:
+                logger.warning(f"Skipping record that failed to decrypt in {source}.")
+                continue
+            payload = decrypted
+        decompressed: bytes | None = decompress(payload)
+        if decompressed is None:
+            logger.warning(f"Skipping record that failed to decompress in {source}.")
+            continue
+        try:
+            records.append(json.loads(decompressed.decode("utf-8")))
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            logger.warning(f"Skipping malformed record in {source}.")
+    return records
+
+
+class RecordLog:
+    """An append-only log of JSON records stored as length-prefixed frames.
+
+    Each record is serialized on its own and, when encryption is enabled,
+    sealed as an independent AES-GCM message with the data key of the log.
+    Appending therefore writes a single frame to the end of the file without
+    touching earlier records, after reading and unwrapping the header.
+
+    Attributes:
+        _filepath: Path to the plaintext log (without .enc suffix).
+        _encryption: Encryption instance for the frames, or None for plaintext.
+    """
+
+    def __init__(self, filepath: str, encryption: Encryption | None) -> None:
+        """Initialize the log.
+
+        Args:
+            filepath (str): Path to the plaintext log (without .enc suffix).
+            encryption (Encryption | None): Encryption instance, or None to store plaintext frames.
+        """
+        self._filepath: str = filepath
+        self._encryption: Encryption | None = encryption
+
+    @property
+    def path(self) -> str:
+        """The path this log is written to."""
+        return self._filepath + ".enc" if self._encryption else self._filepath
+
+    def exists(self) -> bool:
+        """Return True if the log exists in plaintext or encrypted form.
+
+        Returns:
+            bool: True if either file exists.
+        """
+        return os.path.exists(self._filepath) or os.path.exists(self._filepath + ".enc")
+
+    def append(self, record: dict[str, Any]) -> None:
+        """Append a record to the end of the log.
+
+        Args:
+            record (dict[str, Any]): The JSON-serializable record to append.
+        """
+        with open(self.path, "a+b") as fp:
+            if self._encryption is None:
+                fp.write(encode_record(record, None))
+                return None
+            fp.seek(0)
+            head: bytes = fp.read(ENVELOPE_HEADER_SIZE)
+            header: bytes = b""
+            if head:
+                frame_encryption, _ = open_frames(head, self._encryption)
+            else:
+                header, frame_encryption = self._encryption.new_envelope()
+            fp.write(header + encode_record(record, frame_encryption))
+        return None
+
+    def read(self) -> list[dict[str, Any]] | None:
+        """Read every record in the log.
+
+        Prefers the encrypted log when it exists. Frames that fail to decrypt or
+        parse are skipped with a warning.
+
+        Returns:
+            list[dict[str, Any]] | None: The records in append order, an empty list if the
+                log does not exist, or None if the log is encrypted and no key is available.
+        """
+        enc_path: str = self._filepath + ".enc"
+        if os.path.exists(enc_path):
+            if self._encryption is None:
+                return None
+            filepath: str = enc_path
+        elif os.path.exists(self._filepath):
+            filepath = self._filepath
+        else:
+            return []
+        with open(filepath, "rb") as fp:
+            data: bytes = fp.read()
+        return decode_records(data, self._encryption if filepath == enc_path else None, filepath)
+
+    def rewrite(self, records: list[dict[str, Any]]) -> None:
+        """Atomically replace the log with the given records.
+
+        When encryption is enabled, a leftover plaintext copy of the log is removed.
+
+        Args:
+            records (list[dict[str, Any]]): The records the log should contain.
+        """
+        tmp_filepath: str = self.path + ".tmp"
+        with open(tmp_filepath, "wb") as fp:
+            fp.write(encode_log(records, self._encryption))
+        os.replace(tmp_filepath, self.path)
+        if self._encryption and os.path.exists(self._filepath):
+            os.remove(self._filepath)
+
+    def remove(self) -> None:
+        """Delete the log in both plaintext and encrypted form, if present."""
+        for filepath in (self._filepath, self._filepath + ".enc"):
+            if os.path.exists(filepath):
+                os.remove(filepath)
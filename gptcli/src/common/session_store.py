@@ -0,0 +1,598 @@
+"""Storage backends that hold the files of chat and OCR sessions."""
+
+import io
+import json
+import logging
+import os
+import shutil
+import sqlite3
+from abc import ABC, abstractmethod
+from collections.abc import Iterator
+from contextlib import contextmanager
+from logging import Logger
+from os import path
+from typing import BinaryIO
+
+from gptcli.constants import GPTCLI_SESSION_STORE_FILENAME
+from gptcli.src.common.encryption import ENVELOPE_HEADER_SIZE, Encryption
+from gptcli.src.common.file_io import read_text_file
+from gptcli.src.common.record_log import (
+    decrypt_frames,
+    encrypt_frames,
+    is_record_log,
+)
+
+logger: Logger = logging.getLogger(__name__)
+
+
+class SessionStore(ABC):
+    """Holds the files of every session in one storage directory.
+
+    Files are stored and returned exactly as given; callers encrypt and
+    decrypt the contents and tell the store whether a file is encrypted.
+
+    Attributes:
+        _storage_dir: The storage directory the sessions belong to.
+    """
+
+    def __init__(self, storage_dir: str) -> None:
+        """Initialize the store for a storage directory.
+
+        Args:
+            storage_dir (str): The storage directory (chat_dir or ocr_dir).
+        """
+        self._storage_dir: str = storage_dir
+
+    @property
+    def storage_dir(self) -> str:
+        """The storage directory the sessions belong to."""
+        return self._storage_dir
+
+    @property
+    def concurrent_reads(self) -> bool:
+        """True if sessions can be read from several threads at once."""
+        return False
+
+    @abstractmethod
+    def location(self, session_uuid: str) -> str:
+        """Return the filesystem path that holds a session's files."""
+
+    @abstractmethod
+    def has_session(self, session_uuid: str) -> bool:
+        """Return True if the session exists in the store."""
+
+    @abstractmethod
+    def create_session(self, session_uuid: str) -> None:
+        """Create an empty session."""
+
+    @abstractmethod
+    def session_uuids(self) -> list[str]:
+        """Return the UUIDs of every stored session."""
+
+    @abstractmethod
+    def file_names(self, session_uuid: str) -> list[str]:
+        """Return the sorted names of a session's files, without any .enc suffix."""
+
+    @abstractmethod
+    def read_file(self, session_uuid: str, name: str) -> tuple[bytes, bool] | None:
+        """Read a session file.
+
+        Returns:
+            tuple[bytes, bool] | None: The stored bytes and whether they are encrypted,
+                or None if the file does not exist. The encrypted copy wins if both exist.
+        """
+
+    @abstractmethod
+    def read_range(self, session_uuid: str, name: str, offset: int, length: int) -> tuple[bytes, bool] | None:
+        """Read part of a session file without reading the rest of it.
+
+        Returns:
+            tuple[bytes, bool] | None: Up to length bytes starting at offset and whether the
+                file is encrypted, or None if the file does not exist.
+        """
+
+    def open_file(self, session_uuid: str, name: str) -> tuple[BinaryIO, bool] | None:
+        """Open a session file for reading in pieces; the caller closes it.
+
+        Returns:
+            tuple[BinaryIO, bool] | None: A readable binary stream and whether the file is
+                encrypted, or None if the file does not exist.
+        """
+        stored = self.read_file(session_uuid, name)
+        if stored is None:
+            return None
+        return io.BytesIO(stored[0]), stored[1]
+
+    @abstractmethod
+    def write_file(self, session_uuid: str, name: str, data: bytes, encrypted: bool) -> None:
+        """Write a session file, replacing any copy stored in the same form."""
+
+    @abstractmethod
+    def append_file(self, session_uuid: str, name: str, data: bytes, encrypted: bool) -> None:
+        """Append to a session file without rewriting what is already stored."""
+
+    @abstractmethod
+    def delete_file(self, session_uuid: str, name: str) -> None:
+        """Delete a session file in both plaintext and encrypted form, if present."""
+
+    @abstractmethod
+    def delete_session(self, session_uuid: str) -> None:
+        """Delete a session and all of its files."""
+
+    @abstractmethod
+    def stamp(self) -> list[int] | None:
+        """Return a cheap fingerprint that changes whenever a session is created or deleted."""
+
+    @abstractmethod
+    def session_stamp(self, session_uuid: str) -> list[int] | None:
+        """Return a cheap fingerprint that changes whenever a file of the session is written or deleted."""
+
+    def session_stamps(self, session_uuids: list[str]) -> dict[str, list[int]]:
+        """Return the fingerprints of several sessions.
+
+        Args:
+            session_uuids (list[str]): The UUIDs of the sessions.
+
+        Returns:
+            dict[str, list[int]]: The fingerprint of every session that exists, keyed by UUID.
+        """
+        stamps: dict[str, list[int]] = {}
+        for session_uuid in session_uuids:
+            stamp = self.session_stamp(session_uuid)
+            if stamp is not None:
+                stamps[session_uuid] = stamp
+        return stamps
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Group writes so that backends supporting it can commit them at once."""
+        yield
+
+    def read_text(self, session_uuid: str, name: str, encryption: Encryption | None) -> str | None:
+        """Read and decrypt a session text file, returning None on any failure.
+
+        Args:
+            session_uuid (str): The UUID of the session.
+            name (str): The file name, without .enc suffix.
+            encryption (Encryption | None): Encryption instance for decryption, or None.
+
+        Returns:
+            str | None: The file contents, or None if missing, undecryptable, or encrypted without a key.
+        """
+        stored = self.read_file(session_uuid, name)
+        if stored is None:
+            return None
+        data, encrypted = stored
+        if encrypted:
+            if encryption is None:
+                return None
+            decrypted = encryption.decrypt(data)
+            return decrypted.decode("utf-8") if decrypted is not None else None
+        return data.decode("utf-8")
+
+
+class DirectoryStore(SessionStore):
+    """Stores each session as a directory with one file per session file.
+
+    Encrypted files carry an ``.enc`` suffix next to their plaintext name.
+    """
+
+    @property
+    def concurrent_reads(self) -> bool:
+        return True
+
+    def location(self, session_uuid: str) -> str:
+        return path.join(self._storage_dir, session_uuid)
+
+    def _file_path(self, session_uuid: str, name: str) -> str:
+        return path.join(self._storage_dir, session_uuid, path.basename(name))
+
+    def has_session(self, session_uuid: str) -> bool:
+        return os.path.isdir(self.location(session_uuid))
+
+    def create_session(self, session_uuid: str) -> None:
+        os.makedirs(self.location(session_uuid), exist_ok=True)
+
+    def session_uuids(self) -> list[str]:
+        try:
+            entries = os.listdir(self._storage_dir)
+        except OSError:
+            return []
+        return sorted(e for e in entries if os.path.isdir(path.join(self._storage_dir, e)))
+
+    def file_names(self, session_uuid: str) -> list[str]:
+        try:
+            entries = os.listdir(self.location(session_uuid))
+        except OSError:
+            return []
+        return sorted({e[: -len(".enc")] if e.endswith(".enc") else e for e in entries})
+
+    def read_file(self, session_uuid: str, name: str) -> tuple[bytes, bool] | None:
+        filepath = self._file_path(session_uuid, name)
+        for candidate, encrypted in ((filepath + ".enc", True), (filepath, False)):
+            if os.path.exists(candidate):
+                with open(candidate, "rb") as fp:
+                    return fp.read(), encrypted
+        return None
+
+    def read_range(self, session_uuid: str, name: str, offset: int, length: int) -> tuple[bytes, bool] | None:
+        filepath = self._file_path(session_uuid, name)
+        for candidate, encrypted in ((filepath + ".enc", True), (filepath, False)):
+            if os.path.exists(candidate):
+                with open(candidate, "rb") as fp:
+                    fp.seek(offset)
+                    return fp.read(length), encrypted
+        return None
+
+    def open_file(self, session_uuid: str, name: str) -> tuple[BinaryIO, bool] | None:
+        filepath = self._file_path(session_uuid, name)
+        for candidate, encrypted in ((filepath + ".enc", True), (filepath, False)):
+            try:
+                return open(candidate, "rb"), encrypted
+            except FileNotFoundError:
+                continue
+        return None
+
+    def read_text(self, session_uuid: str, name: str, encryption: Encryption | None) -> str | None:
+        return read_text_file(self._file_path(session_uuid, name), encryption)
+
+    def write_file(self, session_uuid: str, name: str, data: bytes, encrypted: bool) -> None:
+        filepath = self._file_path(session_uuid, name)
+        with open(filepath + ".enc" if encrypted else filepath, "wb") as fp:
+            fp.write(data)
+
+    def append_file(self, session_uuid: str, name: str, data: bytes, encrypted: bool) -> None:
+        filepath = self._file_path(session_uuid, name)
+        with open(filepath + ".enc" if encrypted else filepath, "ab") as fp:
+            fp.write(data)
+
+    def delete_file(self, session_uuid: str, name: str) -> None:
+        filepath = self._file_path(session_uuid, name)
+        for candidate in (filepath, filepath + ".enc"):
+            try:
+                os.remove(candidate)
+            except FileNotFoundError:
+                pass
+
+    def delete_session(self, session_uuid: str) -> None:
+        shutil.rmtree(self.location(session_uuid), ignore_errors=True)
+
+    def stamp(self) -> list[int] | None:
+        # The directory mtime and link count change whenever a session
+        # directory is created or removed.
+        try:
+            st = os.stat(self._storage_dir)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_nlink]
+
+    def session_stamp(self, session_uuid: str) -> list[int] | None:
+        # Rewriting or appending to a file changes its mtime, and usually its size.
+        count, size, mtime = 0, 0, 0
+        try:
+            with os.scandir(self.location(session_uuid)) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        st = entry.stat()
+                        count, size, mtime = count + 1, size + st.st_size, max(mtime, st.st_mtime_ns)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return [count, size, mtime]
+
+
+class PackedStore(SessionStore):
+    """Stores every session of a storage directory in a single SQLite database.
+
+    Each session file is one row, so reading or writing a session touches one
+    file on disk regardless of how many files the session has. Appending to a
+    file adds a row with the next sequence number instead of rewriting the
+    stored data. Encrypted rows are sealed individually with the same AES-GCM
+    format as ``.enc`` files.
+
+    Every write to a session bumps its version, which session_stamp() reports.
+
+    Attributes:
+        _db_path: Path to the SQLite database.
+        _conn: The open database connection.
+        _batch_depth: Nesting depth of open transactions; commits are deferred while positive.
+    """
+
+    def __init__(self, storage_dir: str, db_path: str | None = None) -> None:
+        """Open or create the packed database.
+
+        Args:
+            storage_dir (str): The storage directory (chat_dir or ocr_dir).
+            db_path (str | None): Path to the database. Defaults to the store file inside storage_dir.
+        """
+        super().__init__(storage_dir)
+        self._db_path: str = db_path or path.join(storage_dir, GPTCLI_SESSION_STORE_FILENAME)
+        self._conn: sqlite3.Connection = sqlite3.connect(self._db_path)
+        self._batch_depth: int = 0
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS sessions (
+                uuid    TEXT PRIMARY KEY,
+                version INTEGER NOT NULL DEFAULT 0
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS files (
+                session_uuid TEXT    NOT NULL,
+                name         TEXT    NOT NULL,
+                seq          INTEGER NOT NULL,
+                encrypted    INTEGER NOT NULL,
+                data         BLOB    NOT NULL,
+                PRIMARY KEY (session_uuid, name, seq)
+            ) WITHOUT ROWID;
+        """
+        )
+        columns: list[str] = [row[1] for row in self._conn.execute("PRAGMA table_info(sessions)")]
+        if "version" not in columns:
+            self._conn.execute("ALTER TABLE sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+            self._conn.commit()
+
+    @property
+    def db_path(self) -> str:
+        """The path to the SQLite database."""
+        return self._db_path
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self._conn.close()
+
+    def _commit(self) -> None:
+        if self._batch_depth == 0:
+            self._conn.commit()
+
+    def _bump_stamp(self) -> None:
+        version: int = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        self._conn.execute(f"PRAGMA user_version = {version + 1}")
+
+    def _bump_session(self, session_uuid: str) -> None:
+        self._conn.execute("UPDATE sessions SET version = version + 1 WHERE uuid = ?", (session_uuid,))
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        self._batch_depth += 1
+        try:
+            yield
+        except BaseException:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self._conn.rollback()
+            raise
+        self._batch_depth -= 1
+        self._commit()
+
+    def location(self, session_uuid: str) -> str:
+        return self._db_path
+
+    def has_session(self, session_uuid: str) -> bool:
+        row = self._conn.execute("SELECT 1 FROM sessions WHERE uuid = ?", (session_uuid,)).fetchone()
+        return row is not None
+
+    def create_session(self, session_uuid: str) -> None:
+        self._conn.execute("INSERT OR IGNORE INTO sessions (uuid) VALUES (?)", (session_uuid,))
+        self._bump_stamp()
+        self._commit()
+
+    def session_uuids(self) -> list[str]:
+        return [row[0] for row in self._conn.execute("SELECT uuid FROM sessions ORDER BY uuid")]
+
+    def file_names(self, session_uuid: str) -> list[str]:
+        rows = self._conn.execute(
+            "SELECT DISTINCT name FROM files WHERE session_uuid = ? ORDER BY name", (session_uuid,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def read_file(self, session_uuid: str, name: str) -> tuple[bytes, bool] | None:
+        rows = self._conn.execute(
+            "SELECT data, encrypted FROM files WHERE session_uuid = ? AND name = ? ORDER BY seq",
+            (session_uuid, path.basename(name)),
+        ).fetchall()
+        if not rows:
+            return None
+        return b"".join(bytes(row[0]) for row in rows), bool(rows[0][1])
+
+    def read_range(self, session_uuid: str, name: str, offset: int, length: int) -> tuple[bytes, bool] | None:
+        rows = self._conn.execute(
+            "SELECT seq, length(data), encrypted FROM files WHERE session_uuid = ? AND name = ? ORDER BY seq",
+            (session_uuid, path.basename(name)),
+        ).fetchall()
+        if not rows:
+            return None
+        parts: list[bytes] = []
+        start: int = 0
+        for seq, size, _ in rows:
+            begin, end = max(offset, start), min(offset + length, start + size)
+            if begin < end:
+                row = self._conn.execute(
+                    "SELECT substr(data, ?, ?) FROM files WHERE session_uuid = ? AND name = ? AND seq = ?",
+                    (begin - start + 1, end - begin, session_uuid, path.basename(name), seq),
+                ).fetchone()
+                parts.append(bytes(row[0]))
+            start += size
+        return b"".join(parts), bool(rows[0][2])
+
+    def write_file(self, session_uuid: str, name: str, data: bytes, encrypted: bool) -> None:
+        with self.transaction():
+            self._conn.execute(
+                "DELETE FROM files WHERE session_uuid = ? AND name = ?", (session_uuid, path.basename(name))
+            )
+            self._conn.execute(
+                "INSERT INTO files (session_uuid, name, seq, encrypted, data) VALUES (?, ?, 0, ?, ?)",
+                (session_uuid, path.basename(name), int(encrypted), data),
+            )
+            self._bump_session(session_uuid)
+
+    def append_file(self, session_uuid: str, name: str, data: bytes, encrypted: bool) -> None:
+        self._conn.execute(
+            """
+            INSERT INTO files (session_uuid, name, seq, encrypted, data)
+            SELECT ?, ?, COALESCE(MAX(seq) + 1, 0), ?, ? FROM files WHERE session_uuid = ? AND name = ?
+            """,
+            (session_uuid, path.basename(name), int(encrypted), data, session_uuid, path.basename(name)),
+        )
+        self._bump_session(session_uuid)
+        self._commit()
+
+    def delete_file(self, session_uuid: str, name: str) -> None:
+        self._conn.execute(
+            "DELETE FROM files WHERE session_uuid = ? AND name = ?", (session_uuid, path.basename(name))
+        )
+        self._bump_session(session_uuid)
+        self._commit()
+
+    def delete_session(self, session_uuid: str) -> None:
+        self._conn.execute("DELETE FROM files WHERE session_uuid = ?", (session_uuid,))
+        self._conn.execute("DELETE FROM sessions WHERE uuid = ?", (session_uuid,))
+        self._bump_stamp()
+        self._commit()
+
+    def stamp(self) -> list[int] | None:
+        version: int = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        return [version]
+
+    def session_stamp(self, session_uuid: str) -> list[int] | None:
+        return self.session_stamps([session_uuid]).get(session_uuid)
+
+    def session_stamps(self, session_uuids: list[str]) -> dict[str, list[int]]:
+        # One query for the wanted sessions only, looked up by primary key and passed as one JSON
+        # array parameter instead of one placeholder per UUID; length() of a blob does not read its content.
+        rows = self._conn.execute(
+            """
+            SELECT s.uuid, s.version, COUNT(f.name), COALESCE(SUM(length(f.data)), 0)
+            FROM sessions s LEFT JOIN files f ON f.session_uuid = s.uuid
+            WHERE s.uuid IN (SELECT value FROM json_each(?))
+            GROUP BY s.uuid
+            """,
+            (json.dumps(session_uuids),),
+        ).fetchall()
+        return {row[0]: [row[1], row[2], row[3]] for row in rows}
+
+    def recrypt(self, old_encryption: Encryption | None, new_encryption: Encryption | None) -> int:
+        """Re-encrypt every file in a single transaction, one file at a time.
+
+        Encrypted files are decrypted with old_encryption, or left untouched if it
+        is None. Files are then sealed with new_encryption, or stored as plaintext
+        if it is None, and written back as a single row. Record logs are
+        transcoded one frame at a time; other files are compressed before they
+        are sealed. Files moved from one key to another that start with an
+        envelope header, including record logs, only have the header read and
+        rewrapped in place; their contents are never loaded.
+
+        Args:
+            old_encryption (Encryption | None): Encryption instance for existing encrypted files.
+            new_encryption (Encryption | None): Encryption instance for the rewritten files.
+
+        Returns:
+            int: The number of files rewritten.
+
+        Raises:
+            RuntimeError: If an encrypted file fails to decrypt; no files are changed.
+        """
+        # Only the file keys are listed up front, so memory stays bounded by the largest file.
+        files: list[tuple[str, str, int, int]] = self._conn.execute(
+            "SELECT session_uuid, name, MIN(seq), MAX(encrypted) FROM files GROUP BY session_uuid, name"
+        ).fetchall()
+        count = 0
+        with self.transaction():
+            for session_uuid, name, first_seq, encrypted in files:
+                if encrypted and old_encryption is not None and new_encryption is not None:
+                    head: bytes = self._conn.execute(
+                        "SELECT substr(data, 1, ?) FROM files WHERE session_uuid = ? AND name = ? AND seq = ?",
+                        (ENVELOPE_HEADER_SIZE, session_uuid, name, first_seq),
+                    ).fetchone()[0]
+                    header: bytes | None = old_encryption.rewrap(bytes(head), new_encryption)
+                    if header is not None:
+                        # Appended rows hold frames sealed with the data key, which stays the same.
+                        self._conn.execute(
+                            """
+                            UPDATE files SET data = CAST(? || substr(data, ?) AS BLOB)
+                            WHERE session_uuid = ? AND name = ? AND seq = ?
+                            """,
+                            (header, ENVELOPE_HEADER_SIZE + 1, session_uuid, name, first_seq),
+                        )
+                        count += 1
+                        continue
+                if encrypted and old_encryption is None:
+                    continue
+                if not encrypted and new_encryption is None:
+                    continue
+                rows: list[tuple[bytes]] = self._conn.execute(
+                    "SELECT data FROM files WHERE session_uuid = ? AND name = ? ORDER BY seq", (session_uuid, name)
+                ).fetchall()
+                contents: bytes = b"".join(bytes(data) for (data,) in rows)
+                plaintext: bytes | None = contents
+                if encrypted:
+                    assert old_encryption is not None
+                    if is_record_log(name):
+                        plaintext = decrypt_frames(contents, old_encryption)
+                    else:
+                        plaintext = old_encryption.decrypt(contents)
+                    if plaintext is None:
+                        raise RuntimeError(f"Failed to decrypt {session_uuid}/{name} in {self._db_path}")
+                assert plaintext is not None
+                sealed: bytes = plaintext
+                if new_encryption is not None:
+                    if is_record_log(name):
+                        sealed = encrypt_frames(plaintext, new_encryption)
+                    else:
+                        sealed = new_encryption.encrypt_envelope(plaintext)
+                self._conn.execute("DELETE FROM files WHERE session_uuid = ? AND name = ?", (session_uuid, name))
+                self._conn.execute(
+                    "INSERT INTO files (session_uuid, name, seq, encrypted, data) VALUES (?, ?, 0, ?, ?)",
+                    (session_uuid, name, int(new_encryption is not None), sealed),
+                )
+                count += 1
+        return count
+
+
+def is_packed(storage_dir: str) -> bool:
+    """Return True if the storage directory has been packed into a single database.
+
+    Args:
+        storage_dir (str): The storage directory to check.
+
+    Returns:
+        bool: True if the packed database exists.
+    """
+    return os.path.exists(path.join(storage_dir, GPTCLI_SESSION_STORE_FILENAME))
+
+
+def open_session_store(storage_dir: str) -> SessionStore:
+    """Open the session store used by a storage directory.
+
+    A storage directory uses the packed backend once it holds a packed
+    database, and the directory-per-session backend otherwise.
+
+    Args:
+        storage_dir (str): The storage directory (chat_dir or ocr_dir).
+
+    Returns:
+        SessionStore: The backend for the storage directory.
+    """
+    if is_packed(storage_dir):
+        return PackedStore(storage_dir)
+    return DirectoryStore(storage_dir)
+
+
+def copy_sessions(source: SessionStore, target: SessionStore) -> int:
+    """Copy every session from one store to another, as stored.
+
+    Encrypted files are copied without being decrypted, so no key is needed.
+
+    Args:
+        source (SessionStore): The store to copy from.
+        target (SessionStore): The store to copy into.
+
+    Returns:
+        int: The number of sessions copied.
+    """
+    session_uuids = source.session_uuids()
+    with target.transaction():
+        for session_uuid in session_uuids:
+            target.create_session(session_uuid)
+            for name in source.file_names(session_uuid):
+                stored = source.read_file(session_uuid, name)
+                if stored is not None:
+                    target.write_file(session_uuid, name, stored[0], stored[1])
+    return len(session_uuids)
@@ -1,8 +1,10 @@
 """Handles access and storage of messages and OCR results."""
 
+import codecs
 import json
 import logging
 import os
+import sqlite3
 import uuid
 from logging import Logger
 from os import path
@@ -14,14 +16,16 @@ from prompt_toolkit import print_formatted_text
 from prompt_toolkit.formatted_text import ANSI
 
 from gptcli.constants import (
-    GPTCLI_MANIFEST_FILENAME,
+    GPTCLI_GENERATION_FILENAME,
+    GPTCLI_HASH_INDEX_FILENAME,
     GPTCLI_METADATA_FILENAME,
     GPTCLI_PROVIDER_MISTRAL_STORAGE_CHAT_DIR,
     GPTCLI_PROVIDER_MISTRAL_STORAGE_OCR_DIR,
     GPTCLI_PROVIDER_OPENAI_STORAGE_CHAT_DIR,
     GPTCLI_PROVIDER_OPENAI_STORAGE_OCR_DIR,
-    GPTCLI_SESSION_FILENAME,
 )
+from gptcli.src.common.blob_store import BlobStore, blob_owner
+from gptcli.src.common.chat_journal import ChatJournal, expand_base
 from gptcli.src.common.constants import (
     GRN,
     GRY,
@@ -32,9 +36,22 @@ from gptcli.src.common.constants import (
     RST,
     OpenaiUserRoles,
 )
-from gptcli.src.common.encryption import Encryption
+from gptcli.src.common.encryption import DecryptionError, Encryption
 from gptcli.src.common.file_io import read_text_file
-from gptcli.src.common.message import MessageFactory, Messages
+from gptcli.src.common.fts import ChatFTS, OcrFTS
+from gptcli.src.common.manifest import Manifest
+from gptcli.src.common.message import Message, MessageFactory, Messages
+from gptcli.src.common.message_log import (
+    ChatWindow,
+    MessageLog,
+    SessionLocked,
+    append_message_log,
+    copy_message_log,
+    read_chat_session,
+    read_chat_window,
+    write_message_log,
+)
+from gptcli.src.common.session_store import SessionStore, open_session_store
 from gptcli.src.common.validators import InputType, is_url
 
 logger: Logger = logging.getLogger(__name__)
@@ -55,17 +72,24 @@ class Storage:
         _provider: The LLM provider name (e.g., 'mistral', 'openai').
         _chat_dir: Directory path for storing chat sessions.
         _ocr_dir: Directory path for storing OCR results.
+        _hash_index: In-memory copy of the OCR content-hash index, or None if not yet loaded.
+        _hash_index_generation: The OCR generation the in-memory hash index was validated against.
+        _stores: Session store backends opened so far, keyed by storage directory.
+        _search_index: Whether stored sessions are added to an existing search index straight away.
     """
 
     _FALLBACK_MARKDOWN_FILENAME = "document.md"
     _ENCRYPTED_DATA_WITHOUT_KEY = "Encrypted data found but no encryption key provided."
+    _PRINT_CHUNK_SIZE = 64 * 1024
 
-    def __init__(self, provider: str, encryption: Encryption | None = None) -> None:
+    def __init__(self, provider: str, encryption: Encryption | None = None, search_index: bool = True) -> None:
         """Initialize storage with provider-specific directories.
 
         Args:
             provider (str): The LLM provider name ('mistral' or 'openai').
             encryption (Encryption | None): Optional encryption instance for encrypting/decrypting stored data.
+            search_index (bool, optional): Whether to update an existing search index whenever a session
+                is stored. Defaults to True.
 
         Raises:
             NotImplementedError: If the provider is not supported.
@@ -84,6 +108,11 @@ class Storage:
         else:
             raise NotImplementedError(f"Provider '{self._provider}' not yet supported.")
 
+        self._hash_index: dict[str, list[str]] | None = None
+        self._hash_index_generation: int | None = None
+        self._stores: dict[str, SessionStore] = {}
+        self._search_index: bool = search_index
+
     @property
     def chat_dir(self) -> str:
         """The directory where chat sessions are stored."""
@@ -94,43 +123,87 @@ class Storage:
         """The directory where OCR sessions are stored."""
         return self._ocr_dir
 
-    def _write_image(self, filepath: str, data: bytes) -> None:
-        """Write image data to a file, encrypting if encryption is enabled.
+    def _store(self, storage_dir: str) -> SessionStore:
+        """Return the session store backend for a storage directory.
 
-        When encryption is enabled, writes to filepath + '.enc' in binary.
-        Otherwise, writes raw bytes to the given filepath.
+        Args:
+            storage_dir (str): The storage directory (chat_dir or ocr_dir).
+
+        Returns:
+            SessionStore: The packed store if the directory has been packed, otherwise the directory store.
+        """
+        if storage_dir not in self._stores:
+            self._stores[storage_dir] = open_session_store(storage_dir)
+        return self._stores[storage_dir]
+
+    def _blobs(self, storage_dir: str) -> BlobStore:
+        """Return the blob store shared by the chat and OCR sessions of the provider.
 
         Args:
-            filepath (str): The base filepath (without .enc suffix).
-            data (bytes): The image data to write.
+            storage_dir (str): The storage directory (chat_dir or ocr_dir) of the sessions using the blobs.
+
+        Returns:
+            BlobStore: The blob store, next to the storage directory.
+        """
+        return BlobStore.for_store(self._store(storage_dir), self._encryption)
+
+    def _write_session_file(self, storage_dir: str, session_uuid: str, name: str, data: bytes) -> None:
+        """Write a session file, encrypting if encryption is enabled.
+
+        Args:
+            storage_dir (str): The storage directory the session belongs to.
+            session_uuid (str): The UUID of the session.
+            name (str): The file name (without .enc suffix).
+            data (bytes): The file contents.
         """
         if self._encryption:
-            encrypted: bytes = self._encryption.encrypt(data)
-            with open(filepath + ".enc", "wb") as fp:
-                fp.write(encrypted)
+            self._store(storage_dir).write_file(
+                session_uuid, name, self._encryption.encrypt_envelope(data), encrypted=True
+            )
         else:
-            with open(filepath, "wb") as fp:
-                fp.write(data)
+            self._store(storage_dir).write_file(session_uuid, name, data, encrypted=False)
+
+    def _read_session_file(self, storage_dir: str, session_uuid: str, name: str) -> bytes | None:
+        """Read a session file, decrypting it if it is stored encrypted.
 
-    def _read_image(self, filepath: str) -> bytes | None:
-        """Read image data from a plaintext or encrypted file.
+        Returns None with a user-visible message when encrypted data is found
+        without a key or fails to decrypt.
 
         Args:
-            filepath (str): The base filepath (without .enc suffix).
+            storage_dir (str): The storage directory the session belongs to.
+            session_uuid (str): The UUID of the session.
+            name (str): The file name (without .enc suffix).
 
         Returns:
-            bytes | None: The image data, or None if unreadable or key missing.
+            bytes | None: The file contents, or None if missing or unreadable.
         """
-        enc_path = filepath + ".enc"
-        if os.path.exists(enc_path):
-            if self._encryption is None:
-                self._warn(self._ENCRYPTED_DATA_WITHOUT_KEY)
-                return None
-            return self._encryption.decrypt_file(enc_path)
-        if os.path.exists(filepath):
-            with open(filepath, "rb") as fp:
-                return fp.read()
-        return None
+        stored = self._store(storage_dir).read_file(session_uuid, name)
+        if stored is None:
+            return None
+        data, encrypted = stored
+        if not encrypted:
+            return data
+        if self._encryption is None:
+            self._warn(self._ENCRYPTED_DATA_WITHOUT_KEY)
+            return None
+        decrypted: bytes | None = self._encryption.decrypt(data)
+        if decrypted is None:
+            self._warn("Failed to decrypt data.")
+        return decrypted
+
+    def _read_session_text(self, storage_dir: str, session_uuid: str, name: str) -> str | None:
+        """Read a session text file; see _read_session_file.
+
+        Args:
+            storage_dir (str): The storage directory the session belongs to.
+            session_uuid (str): The UUID of the session.
+            name (str): The file name (without .enc suffix).
+
+        Returns:
+            str | None: The file contents, or None if missing or unreadable.
+        """
+        data = self._read_session_file(storage_dir, session_uuid, name)
+        return data.decode("utf-8") if data is not None else None
 
     def _write_text(self, filepath: str, content: str) -> None:
         """Write text content to a file, encrypting if encryption is enabled.
@@ -143,7 +216,7 @@ class Storage:
             content (str): The text content to write.
         """
         if self._encryption:
-            encrypted: bytes = self._encryption.encrypt(content.encode("utf-8"))
+            encrypted: bytes = self._encryption.encrypt_envelope(content.encode("utf-8"))
             with open(filepath + ".enc", "wb") as fp:
                 fp.write(encrypted)
         else:
@@ -193,18 +266,19 @@ class Storage:
             list[dict[str, Any]]: List of manifest entries, each with 'uuid' and 'created' keys.
                 Returns an empty list if the manifest does not exist.
         """
-        content = self._read_text(path.join(storage_dir, GPTCLI_MANIFEST_FILENAME))
-        if content is None:
+        entries: list[dict[str, Any]] | None = Manifest(storage_dir, self._encryption).read()
+        if entries is None:
+            self._warn(self._ENCRYPTED_DATA_WITHOUT_KEY)
             return []
-        entries: list[dict[str, Any]] = json.loads(content)
         return entries
 
     def find_ocr_sessions_by_hash(self, content_hash: str) -> list[str]:
         """Find OCR session UUIDs that match a given content hash.
 
-        Scans all OCR session directories for metadata containing a matching
-        ``source.hash`` value. Sessions without a hash field (legacy) or with
-        unreadable metadata are silently skipped.
+        Looks the hash up in the persistent hash index, so the cost does not
+        depend on how many OCR sessions are stored. The index is rebuilt from
+        session metadata when it is missing or stale. Sessions deleted since
+        the index was written are left out.
 
         Args:
             content_hash (str): The content hash fingerprint to search for.
@@ -212,58 +286,193 @@ class Storage:
         Returns:
             list[str]: List of session UUIDs whose metadata hash matches.
         """
-        sessions: list[str] = []
+        if not content_hash:
+            return []
+        matches: list[str] = self._load_hash_index().get(content_hash, [])
+        return [u for u in matches if self._store(self._ocr_dir).has_session(u)]
+
+    def _ocr_generation(self) -> int | None:
+        """Return the OCR generation counter.
 
-        if not os.path.exists(self._ocr_dir):
-            return sessions
+        The counter is bumped before an OCR session is stored or overwritten,
+        and the hash index records the generation it is current for. Unlike
+        the directory's mtime, it is left alone by writes of other files in
+        the directory, such as the manifest or the search index, and does not
+        depend on the file system. A store interrupted before it updated the
+        index leaves the counter ahead of it, so the index is rebuilt.
 
+        Returns:
+            int | None: The generation, 0 if it was never bumped, or None if the directory does not exist.
+        """
+        if not os.path.isdir(self._ocr_dir):
+            return None
         try:
-            session_dirs = [d for d in os.listdir(self._ocr_dir) if os.path.isdir(os.path.join(self._ocr_dir, d))]
-        except (OSError, PermissionError):
-            return sessions
+            with open(path.join(self._ocr_dir, GPTCLI_GENERATION_FILENAME), "r", encoding="utf8") as fp:
+                return int(fp.read().strip() or 0)
+        except (OSError, ValueError):
+            return 0
+
+    def _bump_ocr_generation(self) -> None:
+        """Atomically increment the OCR generation counter, creating the OCR directory if needed."""
+        generation: int = (self._ocr_generation() or 0) + 1
+        os.makedirs(self._ocr_dir, exist_ok=True)
+        generation_path = path.join(self._ocr_dir, GPTCLI_GENERATION_FILENAME)
+        with open(generation_path + ".tmp", "w", encoding="utf8") as fp:
+            fp.write(str(generation))
+        os.replace(generation_path + ".tmp", generation_path)
+
+    def _scan_ocr_hashes(self) -> dict[str, list[str]]:
+        """Build a hash to session UUIDs mapping by reading every OCR session's metadata.
+
+        Sessions without a hash field (legacy) or with unreadable metadata are
+        silently skipped.
 
-        for session_uuid in session_dirs:
-            session_dir = os.path.join(self._ocr_dir, session_uuid)
-            metadata_file = os.path.join(session_dir, GPTCLI_METADATA_FILENAME)
+        Returns:
+            dict[str, list[str]]: Mapping of content hash to the UUIDs of matching sessions.
+        """
+        hashes: dict[str, list[str]] = {}
 
+        for session_uuid in self._store(self._ocr_dir).session_uuids():
             try:
-                metadata_content = self._read_text(metadata_file)
+                metadata_content = self._read_session_text(self._ocr_dir, session_uuid, GPTCLI_METADATA_FILENAME)
                 if metadata_content:
                     metadata = json.loads(metadata_content)
                     stored_hash = metadata.get("source", {}).get("hash")
-                    if stored_hash and stored_hash == content_hash:
-                        sessions.append(session_uuid)
-            except (json.JSONDecodeError, OSError, KeyError):
+                    if stored_hash:
+                        hashes.setdefault(stored_hash, []).append(session_uuid)
+            except (json.JSONDecodeError, OSError, KeyError, AttributeError):
                 continue
 
-        return sessions
+        return hashes
+
+    def _read_hash_index(self) -> tuple[int, dict[str, list[str]]] | None:
+        """Read the persisted hash index from the OCR directory.
+
+        Returns:
+            tuple[int, dict[str, list[str]]] | None: The generation the index is current for
+                and its hash mapping, or None if the index is missing, unreadable or was
+                written before the index recorded a generation.
+        """
+        content = self._read_text(path.join(self._ocr_dir, GPTCLI_HASH_INDEX_FILENAME))
+        if not content:
+            return None
+        try:
+            data: dict[str, Any] = json.loads(content)
+            generation: int = data["generation"]
+            hashes: dict[str, list[str]] = data["hashes"]
+        except (json.JSONDecodeError, KeyError, TypeError):
+            return None
+        return generation, hashes
+
+    def _write_hash_index(self, hashes: dict[str, list[str]]) -> None:
+        """Persist the hash index for the current OCR generation and remember it in memory.
+
+        Args:
+            hashes (dict[str, list[str]]): Mapping of content hash to session UUIDs.
+        """
+        generation = self._ocr_generation()
+        if generation is None:
+            return None
+        index_path = path.join(self._ocr_dir, GPTCLI_HASH_INDEX_FILENAME)
+        self._write_text(index_path, json.dumps({"generation": generation, "hashes": hashes}, ensure_ascii=False))
+        self._hash_index = hashes
+        self._hash_index_generation = generation
+        return None
+
+    def _load_hash_index(self) -> dict[str, list[str]]:
+        """Return the hash index, rebuilding it from session metadata when missing or stale.
+
+        Returns:
+            dict[str, list[str]]: Mapping of content hash to session UUIDs.
+        """
+        generation = self._ocr_generation()
+        if generation is None:
+            return {}
+        if self._hash_index is not None and self._hash_index_generation == generation:
+            return self._hash_index
+
+        persisted = self._read_hash_index()
+        if persisted is not None and persisted[0] == generation:
+            self._hash_index, self._hash_index_generation = persisted[1], generation
+            return self._hash_index
+
+        logger.info("OCR hash index missing or stale; rebuilding from metadata.")
+        hashes = self._scan_ocr_hashes()
+        self._write_hash_index(hashes)
+        return hashes
+
+    def _index_ocr_hash(self, hashes: dict[str, list[str]], session_uuid: str, content_hash: str) -> None:
+        """Record a session's content hash in the index and persist it.
+
+        Any previous hash recorded for the session is dropped first, so that
+        overwriting a session with a different document keeps the index exact.
+
+        Args:
+            hashes (dict[str, list[str]]): The index loaded before the session was written.
+            session_uuid (str): The UUID of the stored session.
+            content_hash (str): Hash fingerprint of the source document content.
+        """
+        updated: dict[str, list[str]] = {}
+        for stored_hash, uuids in hashes.items():
+            remaining = [u for u in uuids if u != session_uuid]
+            if remaining:
+                updated[stored_hash] = remaining
+        if content_hash:
+            updated.setdefault(content_hash, []).append(session_uuid)
+        self._write_hash_index(updated)
 
     def _write_manifest(self, storage_dir: str, entries: list[dict[str, Any]]) -> None:
-        """Write the manifest to a storage directory.
+        """Rewrite the manifest of a storage directory with the given entries.
 
         Args:
             storage_dir (str): The storage directory to write the manifest to.
             entries (list[dict[str, Any]]): List of manifest entries to write.
         """
-        self._write_text(path.join(storage_dir, GPTCLI_MANIFEST_FILENAME), json.dumps(entries, ensure_ascii=False))
+        Manifest(storage_dir, self._encryption).rewrite(entries)
 
     def _append_to_manifest(self, storage_dir: str, session_uuid: str, created: float) -> None:
-        """Append a new entry to the manifest in a storage directory.
+        """Append an entry to the manifest in a storage directory.
 
-        Non-atomic read-modify-write: acceptable for a single-user CLI.
+        Writes a single record to the end of the manifest log. Appending an
+        existing UUID replaces its 'created' timestamp.
 
         Args:
             storage_dir (str): The storage directory containing the manifest.
-            session_uuid (str): The UUID of the new session.
+            session_uuid (str): The UUID of the session.
             created (float): The creation timestamp (epoch seconds).
         """
-        entries = self._read_manifest(storage_dir)
-        entries.append({"uuid": session_uuid, "created": created})
-        self._write_manifest(storage_dir, entries)
+        Manifest(storage_dir, self._encryption).append(session_uuid, created)
+
+    def _update_search_index(self, storage_dir: str, session_uuid: str, created: float) -> None:
+        """Add a stored session to the search index of its storage directory, if there is one.
+
+        Failures are logged and otherwise ignored: the session is already stored
+        and in the manifest, so the next search indexes it instead. An encrypted
+        index gets the session through its delta log, see ChatFTS.update_sessions.
+
+        Args:
+            storage_dir (str): The storage directory of the session (chat_dir or ocr_dir).
+            session_uuid (str): The UUID of the session.
+            created (float): The creation timestamp (epoch seconds).
+        """
+        if not self._search_index:
+            return None
+        fts: ChatFTS | OcrFTS = ChatFTS() if storage_dir == self._chat_dir else OcrFTS()
+        try:
+            fts.update_sessions(
+                self._store(storage_dir), [{"uuid": session_uuid, "created": created}], self._encryption
+            )
+        except (sqlite3.Error, OSError, DecryptionError) as e:
+            logger.warning(f"Could not update the search index for session {session_uuid}: {e}")
+        finally:
+            fts.close()
+        return None
 
     def _prune_deleted_sessions(self, storage_dir: str, entries: list[dict[str, Any]]) -> list[dict[str, Any]]:
         """Remove manifest entries whose session directory no longer exists on disk.
 
+        Blobs referenced only by the removed sessions are deleted.
+
         Args:
             storage_dir (str): The storage directory containing the session subdirectories.
             entries (list[dict[str, Any]]): The current manifest entries.
@@ -271,41 +480,58 @@ class Storage:
         Returns:
             list[dict[str, Any]]: Entries filtered to only those with an existing session directory.
         """
-        valid_entries = [e for e in entries if os.path.isdir(path.join(storage_dir, e["uuid"]))]
+        store = self._store(storage_dir)
+        valid_entries = [e for e in entries if store.has_session(e["uuid"])]
         if len(valid_entries) < len(entries):
             self._write_manifest(storage_dir, valid_entries)
+            valid_uuids = {e["uuid"] for e in valid_entries}
+            blobs = self._blobs(storage_dir)
+            for entry in entries:
+                if entry["uuid"] not in valid_uuids:
+                    blobs.release(blob_owner(store, entry["uuid"]))
         return valid_entries
 
     def _find_latest_uuid(self, storage_dir: str) -> str | None:
         """Find the UUID of the most recently created session.
 
+        Follows the manifest's latest pointer. Falls back to scanning the full
+        manifest when the pointer is missing or refers to a deleted session,
+        then repairs the pointer.
+
         Args:
             storage_dir (str): The storage directory to search.
 
         Returns:
             str | None: The UUID with the highest 'created' timestamp, or None if no valid entries exist.
         """
+        manifest = Manifest(storage_dir, self._encryption)
+        pointer: dict[str, Any] | None = manifest.latest()
+        if pointer is not None and self._store(storage_dir).has_session(pointer["uuid"]):
+            pointed_uuid: str = pointer["uuid"]
+            return pointed_uuid
         entries = self._prune_deleted_sessions(storage_dir, self._read_manifest(storage_dir))
         if not entries:
             return None
         latest = max(entries, key=lambda e: e["created"])
+        manifest.repair_latest(latest)
         session_uuid: str = latest["uuid"]
         return session_uuid
 
     def _create_session_dir(self, base_dir: str) -> tuple[str, str, float]:
-        """Create a new UUID-based session directory.
+        """Create a new UUID-based session in a storage directory's session store.
 
         Args:
             base_dir (str): The parent storage directory (chat_dir or ocr_dir).
 
         Returns:
-            tuple[str, str, float]: A tuple of (session_dir_path, uuid_string, created_timestamp).
+            tuple[str, str, float]: A tuple of (session_location, uuid_string, created_timestamp). The
+                location is the session directory, or the packed database for packed storage.
         """
         session_uuid = str(uuid.uuid4())
         created = time()
-        session_dir = path.join(base_dir, session_uuid)
-        os.makedirs(session_dir, exist_ok=True)
-        return session_dir, session_uuid, created
+        store = self._store(base_dir)
+        store.create_session(session_uuid)
+        return store.location(session_uuid), session_uuid, created
 
     @staticmethod
     def build_chat_metadata(session_uuid: str, created: float, model: str, provider: str) -> dict[str, Any]:
@@ -332,7 +558,7 @@ class Storage:
     def store_messages(self, messages: Messages, model: str = "") -> None:
         """Store a Messages collection to the local filesystem.
 
-        Creates a UUID-based directory containing session.json and metadata.json,
+        Creates a UUID-based session containing the message log and metadata.json,
         and updates the chat manifest.
 
         Args:
@@ -341,15 +567,130 @@ class Storage:
         """
         logger.info("Storing Messages to local filesystem.")
         if len(messages) > 0:
-            session_dir, session_uuid, created = self._create_session_dir(self._chat_dir)
-            session_filepath = path.join(session_dir, GPTCLI_SESSION_FILENAME)
-            self._write_text(session_filepath, messages.to_json())
+            with self._store(self._chat_dir).transaction():
+                _, session_uuid, created = self._create_session_dir(self._chat_dir)
+                write_message_log(
+                    self._store(self._chat_dir),
+                    session_uuid,
+                    [m.to_dict_full_context() for m in messages],
+                    self._encryption,
+                    self._blobs(self._chat_dir),
+                )
+
+                metadata = self.build_chat_metadata(session_uuid, created, model, self._provider)
+                self._write_session_file(
+                    self._chat_dir,
+                    session_uuid,
+                    GPTCLI_METADATA_FILENAME,
+                    json.dumps(metadata, ensure_ascii=False).encode("utf-8"),
+                )
+
+            self._append_to_manifest(self._chat_dir, session_uuid, created)
+            self._update_search_index(self._chat_dir, session_uuid, created)
+
+    def start_chat_journal(self, model: str = "", base: ChatWindow | None = None) -> ChatJournal:
+        """Create a new chat session whose messages are journaled as they are produced.
+
+        The session is written with its metadata and added to the chat manifest
+        straight away, so it can be recovered even if the process never exits cleanly.
+
+        Args:
+            model (str): The model used for the chat session.
+            base (ChatWindow | None): The window the session was loaded with, if only part of an
+                earlier session was loaded. The messages left out are merged back in when stored.
 
+        Returns:
+            ChatJournal: The journal to sync the session's messages into.
+        """
+        logger.info("Starting chat journal.")
+        store = self._store(self._chat_dir)
+        with store.transaction():
+            _, session_uuid, created = self._create_session_dir(self._chat_dir)
             metadata = self.build_chat_metadata(session_uuid, created, model, self._provider)
-            metadata_filepath = path.join(session_dir, GPTCLI_METADATA_FILENAME)
-            self._write_text(metadata_filepath, json.dumps(metadata, ensure_ascii=False))
+            self._write_session_file(
+                self._chat_dir,
+                session_uuid,
+                GPTCLI_METADATA_FILENAME,
+                json.dumps(metadata, ensure_ascii=False).encode("utf-8"),
+            )
+        self._append_to_manifest(self._chat_dir, session_uuid, created)
+        journal = ChatJournal(store, session_uuid, self._encryption, self._blobs(self._chat_dir))
+        if base is not None and base.skipped > 0:
+            journal.set_base(base.session_uuid, base.prefix, base.anchor)
+        return journal
+
+    def finish_chat_journal(self, journal: ChatJournal, messages: Messages) -> None:
+        """Store the final messages of a journaled session in its message log and drop the journal.
+
+        A session continued from the tail of another, with none of its messages
+        removed, only appends its new messages to a copy of the other session's
+        log. Otherwise, the session is written in full.
 
-            self._append_to_manifest(self._chat_dir, session_uuid, created)
+        Args:
+            journal (ChatJournal): The journal of the session.
+            messages (Messages): The final messages of the session.
+        """
+        logger.info("Finishing chat journal.")
+        store = self._store(self._chat_dir)
+        blobs: BlobStore = self._blobs(self._chat_dir)
+        stored: list[dict[str, Any]] = [m.to_dict_full_context() for m in messages]
+        with store.transaction():
+            if not self._continue_base_log(store, journal, stored, blobs):
+                if journal.base is not None:
+                    stored = expand_base(journal.base, stored, self._load_chat_session)
+                write_message_log(store, journal.session_uuid, stored, self._encryption, blobs)
+            journal.remove()
+        created: float | None = self._read_session_created(journal.session_uuid)
+        if created is not None:
+            self._update_search_index(self._chat_dir, journal.session_uuid, created)
+
+    def _continue_base_log(
+        self, store: SessionStore, journal: ChatJournal, stored: list[dict[str, Any]], blobs: BlobStore
+    ) -> bool:
+        """Store a session continued from a tail as its base session's log plus its new messages.
+
+        The base log is copied without being decrypted or decoded, and its blobs
+        are shared with the session; only the new messages are encoded.
+
+        Args:
+            store (SessionStore): The session store holding both sessions.
+            journal (ChatJournal): The journal of the session.
+            stored (list[dict[str, Any]]): The final messages of the session, as stored.
+            blobs (BlobStore): The blob store for attachment content.
+
+        Returns:
+            bool: True if the session was stored, False if it has to be written in full.
+        """
+        base: dict[str, Any] | None = journal.base
+        if base is None or journal.reset:
+            return False
+        try:
+            log: MessageLog | None = MessageLog.open(store, base["session"], self._encryption)
+        except SessionLocked:
+            return False
+        if log is None or log.encrypted != (self._encryption is not None):
+            return False
+        loaded: list[str] = [str(m.get("uuid", "")) for m in log.read(log.window(base["count"]))]
+        if "" in loaded or loaded != [str(m.get("uuid", "")) for m in stored[: len(loaded)]]:
+            return False
+        if not copy_message_log(store, base["session"], journal.session_uuid):
+            return False
+        append_message_log(store, journal.session_uuid, stored[len(loaded) :], self._encryption, blobs)
+        blobs.share(blob_owner(store, journal.session_uuid), blob_owner(store, base["session"]))
+        return True
+
+    def discard_chat_journal(self, journal: ChatJournal) -> None:
+        """Delete a journaled session that ended up with nothing to store.
+
+        The manifest entry is pruned the next time the manifest is read.
+
+        Args:
+            journal (ChatJournal): The journal of the session.
+        """
+        logger.info("Discarding chat journal.")
+        store = self._store(self._chat_dir)
+        store.delete_session(journal.session_uuid)
+        self._blobs(self._chat_dir).release(blob_owner(store, journal.session_uuid))
 
     @staticmethod
     def extract_filename_from_source(source: str) -> str:
@@ -438,21 +779,22 @@ class Storage:
                 return candidate
             counter += 1
 
-    def _write_images_safely(self, target_dir: str, image_data: list[tuple[str, bytes]]) -> list[str]:
-        """Write image files to a directory with path traversal checks.
+    def _write_images_safely(self, session_uuid: str, image_data: list[tuple[str, bytes]]) -> dict[str, str]:
+        """Store the images of an OCR session in the blob store, with path traversal checks.
 
         Validates each filename to prevent directory traversal attacks.
-        Skips images with empty or escaping filenames.
+        Skips images with empty or escaping filenames. Images already in the
+        blob store, e.g. from an earlier run on the same document, are not
+        written again.
 
         Args:
-            target_dir (str): The directory to write images into.
+            session_uuid (str): The UUID of the OCR session the images belong to.
             image_data (list[tuple[str, bytes]]): List of (filename, bytes) tuples.
 
         Returns:
-            list[str]: List of safely written image filenames.
+            dict[str, str]: The digest of each safely stored image, keyed by its filename.
         """
-        resolved_dir = os.path.realpath(target_dir)
-        image_filenames: list[str] = []
+        image_files: dict[str, bytes] = {}
 
         for filename, data in image_data:
             safe_filename = path.basename(filename)
@@ -460,14 +802,33 @@ class Storage:
                 logger.warning("Possible malicious filename detected; path traversal.")
                 logger.warning(f"Filename of: '{filename}'")
                 continue
-            image_filepath = path.join(target_dir, safe_filename)
-            if not os.path.realpath(image_filepath).startswith(resolved_dir):
+            if safe_filename in (os.curdir, os.pardir):
                 logger.warning(f"Image path escapes session folder; skipping '{filename}'.")
                 continue
-            self._write_image(image_filepath, data)
-            image_filenames.append(safe_filename)
+            image_files[safe_filename] = data
+
+        owner = blob_owner(self._store(self._ocr_dir), session_uuid)
+        digests = self._blobs(self._ocr_dir).add(owner, list(image_files.values()))
+        return dict(zip(image_files, digests))
+
+    def _read_ocr_image(self, session_uuid: str, filename: str, metadata: dict[str, Any]) -> bytes | None:
+        """Read an image of an OCR session.
+
+        Images are read from the blob store, or from the session itself for
+        sessions stored before images were kept as blobs.
 
-        return image_filenames
+        Args:
+            session_uuid (str): The UUID of the OCR session.
+            filename (str): The filename of the image.
+            metadata (dict[str, Any]): The metadata of the session.
+
+        Returns:
+            bytes | None: The image, or None if it is missing or unreadable.
+        """
+        digest: str | None = metadata.get("output", {}).get("blobs", {}).get(filename)
+        if digest is not None:
+            return self._blobs(self._ocr_dir).get(digest)
+        return self._read_session_file(self._ocr_dir, session_uuid, filename)
 
     def _build_ocr_metadata(
         self,
@@ -480,6 +841,7 @@ class Storage:
         session_uuid: str,
         created: float,
         content_hash: str = "",
+        blobs: dict[str, str] | None = None,
     ) -> dict[str, Any]:
         """Build a metadata dictionary for an OCR result.
 
@@ -493,6 +855,7 @@ class Storage:
             session_uuid (str): The UUID of the OCR session.
             created (float): The creation timestamp (epoch seconds).
             content_hash (str): Hash fingerprint of the source document content.
+            blobs (dict[str, str] | None): The blob digest of each image, keyed by its filename.
 
         Returns:
             dict[str, Any]: A dictionary containing source info, OCR processing details,
@@ -519,6 +882,7 @@ class Storage:
                 "markdown_file": markdown_file,
                 "original_filename": original_filename,
                 "images": images,
+                "blobs": blobs or {},
             },
         }
 
@@ -533,12 +897,12 @@ class Storage:
     ) -> str:
         """Store an OCR processing result to local storage.
 
-        Creates a UUID-based session directory containing:
+        Creates a UUID-based session containing:
         - A Markdown file with the extracted text
         - Any extracted images
         - A metadata.json file with processing details
 
-        Updates the OCR manifest with the new session entry.
+        Updates the OCR manifest and the content-hash index with the new session entry.
 
         Args:
             source: The original input source (URL or filepath) that was processed.
@@ -549,34 +913,43 @@ class Storage:
             content_hash: Hash fingerprint of the source document content.
 
         Returns:
-            The full path to the created session directory.
+            The full path to the created session directory, or to the packed database for packed storage.
         """
         logger.info("Storing OCR result to local filesystem.")
 
-        session_dir, session_uuid, created = self._create_session_dir(self._ocr_dir)
-
-        original_filename = self.derive_markdown_filename_from_source(source)
-        markdown_filename = self._FALLBACK_MARKDOWN_FILENAME
-        markdown_filepath = path.join(session_dir, markdown_filename)
-        self._write_text(markdown_filepath, markdown_content)
-
-        image_filenames = self._write_images_safely(session_dir, image_data)
-
-        metadata = self._build_ocr_metadata(
-            source=source,
-            model=model,
-            page_count=page_count,
-            markdown_file=markdown_filename,
-            original_filename=original_filename,
-            images=image_filenames,
-            session_uuid=session_uuid,
-            created=created,
-            content_hash=content_hash,
-        )
-        metadata_filepath = path.join(session_dir, GPTCLI_METADATA_FILENAME)
-        self._write_text(metadata_filepath, json.dumps(metadata, ensure_ascii=False))
+        hashes = self._load_hash_index()
+        self._bump_ocr_generation()
+        with self._store(self._ocr_dir).transaction():
+            session_dir, session_uuid, created = self._create_session_dir(self._ocr_dir)
+
+            original_filename = self.derive_markdown_filename_from_source(source)
+            markdown_filename = self._FALLBACK_MARKDOWN_FILENAME
+            self._write_session_file(self._ocr_dir, session_uuid, markdown_filename, markdown_content.encode("utf-8"))
+
+            images = self._write_images_safely(session_uuid, image_data)
+
+            metadata = self._build_ocr_metadata(
+                source=source,
+                model=model,
+                page_count=page_count,
+                markdown_file=markdown_filename,
+                original_filename=original_filename,
+                images=list(images),
+                session_uuid=session_uuid,
+                created=created,
+                content_hash=content_hash,
+                blobs=images,
+            )
+            self._write_session_file(
+                self._ocr_dir,
+                session_uuid,
+                GPTCLI_METADATA_FILENAME,
+                json.dumps(metadata, ensure_ascii=False).encode("utf-8"),
+            )
 
         self._append_to_manifest(self._ocr_dir, session_uuid, created)
+        self._index_ocr_hash(hashes, session_uuid, content_hash)
+        self._update_search_index(self._ocr_dir, session_uuid, created)
 
         return session_dir
 
@@ -590,12 +963,10 @@ class Storage:
             tuple[str, list[tuple[str, bytes]], int] | None: A tuple of (markdown_content,
                 image_data, page_count), or None if the session cannot be loaded.
         """
-        session_dir = path.join(self._ocr_dir, session_uuid)
-        if not os.path.isdir(session_dir):
+        if not self._store(self._ocr_dir).has_session(session_uuid):
             return None
 
-        metadata_file = path.join(session_dir, GPTCLI_METADATA_FILENAME)
-        raw_metadata = self._read_text(metadata_file)
+        raw_metadata = self._read_session_text(self._ocr_dir, session_uuid, GPTCLI_METADATA_FILENAME)
         if raw_metadata is None:
             return None
 
@@ -604,8 +975,7 @@ class Storage:
         except json.JSONDecodeError:
             return None
 
-        markdown_path = path.join(session_dir, self._FALLBACK_MARKDOWN_FILENAME)
-        markdown_content = self._read_text(markdown_path)
+        markdown_content = self._read_session_text(self._ocr_dir, session_uuid, self._FALLBACK_MARKDOWN_FILENAME)
         if markdown_content is None:
             return None
 
@@ -614,7 +984,7 @@ class Storage:
 
         image_data: list[tuple[str, bytes]] = []
         for img_filename in image_filenames:
-            img_bytes = self._read_image(path.join(session_dir, img_filename))
+            img_bytes = self._read_ocr_image(session_uuid, img_filename, metadata)
             if img_bytes is not None:
                 image_data.append((img_filename, img_bytes))
 
@@ -632,8 +1002,9 @@ class Storage:
     ) -> str:
         """Overwrite an existing OCR session with new content.
 
-        Replaces the markdown file, images, and metadata in the existing session
-        directory. Updates the manifest ``created`` timestamp.
+        Replaces the markdown file, images, and metadata in the existing session.
+        Images no longer referenced by any session are deleted from the blob store.
+        Updates the manifest ``created`` timestamp and the content-hash index.
 
         Args:
             session_uuid (str): The UUID of the existing session to overwrite.
@@ -645,91 +1016,136 @@ class Storage:
             content_hash (str): Hash fingerprint of the source document content.
 
         Returns:
-            str: The full path to the session directory.
+            str: The full path to the session directory, or to the packed database for packed storage.
 
         Raises:
-            StorageEmpty: If no session directory exists for the given UUID.
+            StorageEmpty: If no session exists for the given UUID.
         """
-        session_dir = path.join(self._ocr_dir, session_uuid)
-        if not os.path.isdir(session_dir):
+        store = self._store(self._ocr_dir)
+        if not store.has_session(session_uuid):
             raise StorageEmpty(f"No OCR session found for UUID {session_uuid}")
 
-        # Remove old images
-        metadata_file = path.join(session_dir, GPTCLI_METADATA_FILENAME)
-        raw_metadata = self._read_text(metadata_file)
-        if raw_metadata:
-            try:
-                old_metadata: dict[str, Any] = json.loads(raw_metadata)
-                old_images: list[str] = old_metadata.get("output", {}).get("images", [])
-                for old_img in old_images:
-                    for suffix in ("", ".enc"):
-                        try:
-                            os.remove(path.join(session_dir, old_img + suffix))
-                        except FileNotFoundError:
-                            pass
-            except json.JSONDecodeError:
-                pass
-
-        # Write new markdown
-        original_filename = self.derive_markdown_filename_from_source(source)
-        markdown_filename = self._FALLBACK_MARKDOWN_FILENAME
-        markdown_filepath = path.join(session_dir, markdown_filename)
-        self._write_text(markdown_filepath, markdown_content)
-
-        # Write new images
-        image_filenames = self._write_images_safely(session_dir, image_data)
-
-        # Build and write new metadata
-        created = time()
-        metadata = self._build_ocr_metadata(
-            source=source,
-            model=model,
-            page_count=page_count,
-            markdown_file=markdown_filename,
-            original_filename=original_filename,
-            images=image_filenames,
-            session_uuid=session_uuid,
-            created=created,
-            content_hash=content_hash,
-        )
-        self._write_text(metadata_file, json.dumps(metadata, ensure_ascii=False))
+        hashes = self._load_hash_index()
+        self._bump_ocr_generation()
+
+        with store.transaction():
+            # Remove old images stored in the session before images were kept as blobs
+            raw_metadata = self._read_session_text(self._ocr_dir, session_uuid, GPTCLI_METADATA_FILENAME)
+            if raw_metadata:
+                try:
+                    old_output: dict[str, Any] = json.loads(raw_metadata).get("output", {})
+                    old_blobs: dict[str, str] = old_output.get("blobs", {})
+                    for old_img in old_output.get("images", []):
+                        if old_img not in old_blobs:
+                            store.delete_file(session_uuid, old_img)
+                except (json.JSONDecodeError, AttributeError):
+                    pass
+
+            # Write new markdown
+            original_filename = self.derive_markdown_filename_from_source(source)
+            markdown_filename = self._FALLBACK_MARKDOWN_FILENAME
+            self._write_session_file(self._ocr_dir, session_uuid, markdown_filename, markdown_content.encode("utf-8"))
+
+            # Write new images, then drop the old ones
+            images = self._write_images_safely(session_uuid, image_data)
+            self._blobs(self._ocr_dir).release(blob_owner(store, session_uuid), keep=images.values())
+
+            # Build and write new metadata
+            created = time()
+            metadata = self._build_ocr_metadata(
+                source=source,
+                model=model,
+                page_count=page_count,
+                markdown_file=markdown_filename,
+                original_filename=original_filename,
+                images=list(images),
+                session_uuid=session_uuid,
+                created=created,
+                content_hash=content_hash,
+                blobs=images,
+            )
+            self._write_session_file(
+                self._ocr_dir,
+                session_uuid,
+                GPTCLI_METADATA_FILENAME,
+                json.dumps(metadata, ensure_ascii=False).encode("utf-8"),
+            )
 
         # Update manifest created timestamp
-        entries = self._read_manifest(self._ocr_dir)
-        for entry in entries:
-            if entry["uuid"] == session_uuid:
-                entry["created"] = created
-                break
-        self._write_manifest(self._ocr_dir, entries)
+        self._append_to_manifest(self._ocr_dir, session_uuid, created)
 
-        return session_dir
+        self._index_ocr_hash(hashes, session_uuid, content_hash)
+        self._update_search_index(self._ocr_dir, session_uuid, created)
 
-    def _read_ocr_markdown(self, session_dir: str) -> str | None:
-        """Read the Markdown content from an OCR session directory.
+        return store.location(session_uuid)
+
+    def _ocr_markdown_name(self, session_uuid: str) -> str:
+        """Find the Markdown file of an OCR session.
 
         Args:
-            session_dir (str): Path to the OCR session directory.
+            session_uuid (str): The UUID of the OCR session.
 
         Returns:
-            str | None: The Markdown content, or None if unreadable.
+            str: The file name, without .enc suffix.
 
         Raises:
-            StorageEmpty: If no markdown file is found in the session directory.
+            StorageEmpty: If no markdown file is found in the session.
         """
-        all_files = os.listdir(session_dir)
-        markdown_enc_files: list[str] = sorted(f for f in all_files if f.endswith(".md.enc"))
-        markdown_files: list[str] = sorted(f for f in all_files if f.endswith(".md") and not f.endswith(".md.enc"))
+        markdown_files: list[str] = [
+            f for f in self._store(self._ocr_dir).file_names(session_uuid) if f.endswith(".md")
+        ]
+        if not markdown_files:
+            raise StorageEmpty(f"No markdown file found in OCR session {session_uuid}")
+        return markdown_files[0]
 
-        if not markdown_files and not markdown_enc_files:
-            raise StorageEmpty(f"No markdown file found in {session_dir}")
+    def _read_ocr_markdown(self, session_uuid: str) -> str | None:
+        """Read the Markdown content from an OCR session.
 
-        plaintext_path: str = path.join(session_dir, markdown_files[0]) if markdown_files else ""
-        encrypted_path: str | None = path.join(session_dir, markdown_enc_files[0]) if markdown_enc_files else None
+        Args:
+            session_uuid (str): The UUID of the OCR session.
 
-        if not plaintext_path and encrypted_path:
-            plaintext_path = encrypted_path[: -len(".enc")]
+        Returns:
+            str | None: The Markdown content, or None if unreadable.
 
-        return self._read_text(plaintext_path, encrypted_path)
+        Raises:
+            StorageEmpty: If no markdown file is found in the session.
+        """
+        return self._read_session_text(self._ocr_dir, session_uuid, self._ocr_markdown_name(session_uuid))
+
+    def _print_session_text(self, storage_dir: str, session_uuid: str, name: str) -> None:
+        """Print a session text file as it is read and decrypted, without holding all of it in memory.
+
+        Prints a warning instead when encrypted data is found without a key or fails to decrypt;
+        text printed before a decryption failure is authentic.
+
+        Args:
+            storage_dir (str): The storage directory the session belongs to.
+            session_uuid (str): The UUID of the session.
+            name (str): The file name (without .enc suffix).
+        """
+        opened = self._store(storage_dir).open_file(session_uuid, name)
+        if opened is None:
+            return None
+        source, encrypted = opened
+        with source:
+            if encrypted and self._encryption is None:
+                self._warn(self._ENCRYPTED_DATA_WITHOUT_KEY)
+                return None
+            pieces = (
+                self._encryption.decrypt_stream(source)
+                if self._encryption is not None and encrypted
+                else iter(lambda: source.read(self._PRINT_CHUNK_SIZE), b"")
+            )
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            try:
+                for piece in pieces:
+                    print(decoder.decode(piece), end="", flush=True)
+            except DecryptionError:
+                print()
+                self._warn("Failed to decrypt data.")
+                return None
+            print(decoder.decode(b"", final=True))
+        return None
 
     def extract_last_ocr_result(self) -> str | None:
         """Extract the Markdown content from the most recent OCR session.
@@ -748,25 +1164,24 @@ class Storage:
         if latest_uuid is None:
             raise StorageEmpty(f"No OCR sessions found in {self._ocr_dir}")
 
-        session_dir = path.join(self._ocr_dir, latest_uuid)
-        return self._read_ocr_markdown(session_dir)
+        return self._read_ocr_markdown(latest_uuid)
 
     def display_last_ocr_result(self) -> None:
         """Extract and display the Markdown content from the most recent OCR session.
 
         Retrieves the last OCR result from storage and prints it to the
-        terminal. Prints a warning if no OCR sessions exist.
+        terminal as it is decrypted. Prints a warning if no OCR sessions exist.
         """
         try:
-            content: str | None = self.extract_last_ocr_result()
+            latest_uuid = self._find_latest_uuid(self._ocr_dir)
+            if latest_uuid is None:
+                raise StorageEmpty(f"No OCR sessions found in {self._ocr_dir}")
+            markdown_name: str = self._ocr_markdown_name(latest_uuid)
         except StorageEmpty:
             self._warn("No OCR results found in storage; storage is likely empty.")
             return None
 
-        if content is None:
-            return None
-
-        print(content)
+        self._print_session_text(self._ocr_dir, latest_uuid, markdown_name)
         return None
 
     def extract_ocr_by_uuid(self, session_uuid: str) -> str | None:
@@ -779,45 +1194,46 @@ class Storage:
             str | None: The Markdown content, or None if unreadable.
 
         Raises:
-            StorageEmpty: If no session directory exists for the given UUID.
+            StorageEmpty: If no session exists for the given UUID.
         """
-        session_dir = path.join(self._ocr_dir, session_uuid)
-        if not os.path.isdir(session_dir):
+        if not self._store(self._ocr_dir).has_session(session_uuid):
             raise StorageEmpty(f"No OCR session found for UUID {session_uuid}")
 
-        return self._read_ocr_markdown(session_dir)
+        return self._read_ocr_markdown(session_uuid)
 
     def display_ocr_by_uuid(self, session_uuid: str) -> None:
         """Extract and display the Markdown content from a specific OCR session.
 
+        The content is printed as it is decrypted.
+
         Args:
             session_uuid (str): The UUID of the OCR session to display.
         """
         try:
-            content: str | None = self.extract_ocr_by_uuid(session_uuid)
+            if not self._store(self._ocr_dir).has_session(session_uuid):
+                raise StorageEmpty(f"No OCR session found for UUID {session_uuid}")
+            markdown_name: str = self._ocr_markdown_name(session_uuid)
         except StorageEmpty:
             self._warn(f"No OCR session found for UUID {session_uuid}.")
             return None
 
-        if content is None:
-            return None
-
-        print(content)
+        self._print_session_text(self._ocr_dir, session_uuid, markdown_name)
         return None
 
     def _write_ocr_images(
         self,
-        session_dir: str,
-        image_filenames: list[str],
+        session_uuid: str,
+        metadata: dict[str, Any],
         output_folder: str,
     ) -> None:
         """Copy OCR images from storage to the output folder.
 
         Args:
-            session_dir (str): The OCR session directory in storage.
-            image_filenames (list[str]): Filenames of images to copy.
+            session_uuid (str): The UUID of the OCR session in storage.
+            metadata (dict[str, Any]): The metadata of the session, listing its images.
             output_folder (str): Destination directory for the images.
         """
+        image_filenames: list[str] = metadata.get("output", {}).get("images", [])
         resolved_output = os.path.realpath(output_folder)
         for img_filename in image_filenames:
             safe_filename = path.basename(img_filename)
@@ -826,7 +1242,7 @@ class Storage:
                 logger.warning(f"Filename of: '{img_filename}'")
                 continue
 
-            img_data = self._read_image(path.join(session_dir, safe_filename))
+            img_data = self._read_ocr_image(session_uuid, safe_filename, metadata)
             if img_data is None:
                 continue
 
@@ -848,13 +1264,11 @@ class Storage:
             session_uuid (str): The UUID of the OCR session to write.
             output_dir (str): Destination directory.
         """
-        session_dir = path.join(self._ocr_dir, session_uuid)
-        if not os.path.isdir(session_dir):
+        if not self._store(self._ocr_dir).has_session(session_uuid):
             self._warn(f"No OCR session found for UUID {session_uuid}.")
             return None
 
-        metadata_file = path.join(session_dir, GPTCLI_METADATA_FILENAME)
-        raw_metadata = self._read_text(metadata_file)
+        raw_metadata = self._read_session_text(self._ocr_dir, session_uuid, GPTCLI_METADATA_FILENAME)
         if raw_metadata is None:
             return None
 
@@ -864,7 +1278,6 @@ class Storage:
             return None
 
         source: str = metadata.get("source", {}).get("input", "document")
-        image_filenames: list[str] = metadata.get("output", {}).get("images", [])
 
         try:
             content: str | None = self.extract_ocr_by_uuid(session_uuid)
@@ -884,32 +1297,68 @@ class Storage:
         with open(markdown_filepath, "w", encoding="utf8") as fp:
             fp.write(content)
 
-        self._write_ocr_images(session_dir, image_filenames, folder_path)
+        self._write_ocr_images(session_uuid, metadata, folder_path)
 
         abs_path = str(os.path.abspath(folder_path))
         print(f"OCR result saved to '{abs_path}'.")
         return None
 
+    def _load_chat_session(self, session_uuid: str) -> list[dict[str, Any]] | None:
+        """Read every stored message of a chat session, warning if it is locked.
+
+        Args:
+            session_uuid (str): The UUID of the chat session.
+
+        Returns:
+            list[dict[str, Any]] | None: The stored messages, or None if they are unreadable.
+        """
+        try:
+            return read_chat_session(
+                self._store(self._chat_dir), session_uuid, self._encryption, self._blobs(self._chat_dir)
+            )
+        except SessionLocked:
+            self._warn(self._ENCRYPTED_DATA_WITHOUT_KEY)
+            return None
+
     @staticmethod
-    def _parse_messages(raw_content: str) -> Messages:
-        """Parse a JSON session file into a Messages collection.
+    def _to_messages(stored: list[dict[str, Any]]) -> Messages:
+        """Build a Messages collection from stored messages.
 
         Args:
-            raw_content (str): The raw JSON string from session.json.
+            stored (list[dict[str, Any]]): The messages, as stored by Message.to_dict_full_context.
 
         Returns:
-            Messages: A Messages collection built from the JSON data.
+            Messages: A Messages collection built from the stored messages.
         """
         messages: Messages = Messages()
-        for message in json.loads(raw_content)["messages"]:
+        for message in stored:
             messages.add(MessageFactory.message_from_dict(message=message))
         return messages
 
+    def _read_chat_messages(self, session_uuid: str) -> Messages | None:
+        """Read the messages of a chat session.
+
+        A session left with a journal, because it is still running or its
+        process died before exiting, is read from the journal; otherwise the
+        messages come from its message log, or the session.json of sessions
+        stored before message logs existed.
+
+        Args:
+            session_uuid (str): The UUID of the chat session.
+
+        Returns:
+            Messages | None: The session's messages, or None if they are unreadable.
+        """
+        stored: list[dict[str, Any]] | None = self._load_chat_session(session_uuid)
+        if stored is None:
+            return None
+        return self._to_messages(stored)
+
     def extract_messages(self) -> Messages | None:
         """Extract messages from the most recent chat session.
 
         Uses the manifest to find the latest session UUID, then reads
-        session.json from that directory.
+        its messages from its message log, or from its journal if it has one.
 
         Returns:
             A Messages collection containing all messages from the last session.
@@ -921,12 +1370,7 @@ class Storage:
         latest_uuid = self._find_latest_uuid(self._chat_dir)
         if latest_uuid is None:
             raise StorageEmpty(f"No chat sessions found in {self._chat_dir}")
-
-        session_file = path.join(self._chat_dir, latest_uuid, GPTCLI_SESSION_FILENAME)
-        raw_content: str | None = self._read_text(session_file)
-        if raw_content is None:
-            return None
-        return self._parse_messages(raw_content)
+        return self._read_chat_messages(latest_uuid)
 
     def extract_messages_by_uuid(self, session_uuid: str) -> Messages | None:
         """Extract messages from a specific chat session by UUID.
@@ -938,17 +1382,54 @@ class Storage:
             Messages | None: A Messages collection, or None if the file is unreadable.
 
         Raises:
-            StorageEmpty: If no session directory exists for the given UUID.
+            StorageEmpty: If no session exists for the given UUID.
         """
-        session_dir = path.join(self._chat_dir, session_uuid)
-        if not os.path.isdir(session_dir):
+        if not self._store(self._chat_dir).has_session(session_uuid):
             raise StorageEmpty(f"No chat session found for UUID {session_uuid}")
+        return self._read_chat_messages(session_uuid)
 
-        session_file = path.join(session_dir, GPTCLI_SESSION_FILENAME)
-        raw_content: str | None = self._read_text(session_file)
-        if raw_content is None:
+    def load_chat_window(
+        self, session_uuid: str | None, last: int | None, token_budget: int | None
+    ) -> tuple[ChatWindow, Messages] | None:
+        """Load the system messages and the tail of a chat session.
+
+        Only the loaded messages are read from sessions stored as a message log,
+        so continuing a very long session does not read all of it.
+
+        Args:
+            session_uuid (str | None): The UUID of the chat session, or None for the most recent one.
+            last (int | None): The maximum number of non-system messages to load, or None for no limit.
+            token_budget (int | None): The maximum number of tokens of non-system messages to load,
+                or None for no limit. The most recent message is loaded regardless.
+
+        Returns:
+            tuple[ChatWindow, Messages] | None: The window that was loaded and its messages, or None
+                if the session is unreadable.
+
+        Raises:
+            StorageEmpty: If the session does not exist, or there are no sessions when session_uuid is None.
+        """
+        if session_uuid is None:
+            session_uuid = self._find_latest_uuid(self._chat_dir)
+            if session_uuid is None:
+                raise StorageEmpty(f"No chat sessions found in {self._chat_dir}")
+        elif not self._store(self._chat_dir).has_session(session_uuid):
+            raise StorageEmpty(f"No chat session found for UUID {session_uuid}")
+        try:
+            window: ChatWindow | None = read_chat_window(
+                self._store(self._chat_dir),
+                session_uuid,
+                self._encryption,
+                last,
+                token_budget,
+                self._blobs(self._chat_dir),
+            )
+        except SessionLocked:
+            self._warn(self._ENCRYPTED_DATA_WITHOUT_KEY)
             return None
-        return self._parse_messages(raw_content)
+        if window is None:
+            return None
+        return window, self._to_messages(window.messages)
 
     def read_session_model(self, session_uuid: str) -> str | None:
         """Read the model name from a session's metadata file.
@@ -959,9 +1440,7 @@ class Storage:
         Returns:
             str | None: The model name, or None if the metadata is unreadable.
         """
-        session_dir = path.join(self._chat_dir, session_uuid)
-        metadata_file = path.join(session_dir, GPTCLI_METADATA_FILENAME)
-        raw_content: str | None = self._read_text(metadata_file)
+        raw_content: str | None = self._read_session_text(self._chat_dir, session_uuid, GPTCLI_METADATA_FILENAME)
         if raw_content is None:
             return None
         try:
@@ -971,13 +1450,34 @@ class Storage:
         except (json.JSONDecodeError, AttributeError):
             return None
 
+    def _read_session_created(self, session_uuid: str) -> float | None:
+        """Read the creation timestamp from a chat session's metadata file.
+
+        Args:
+            session_uuid (str): The UUID of the chat session.
+
+        Returns:
+            float | None: The creation timestamp (epoch seconds), or None if the metadata is unreadable.
+        """
+        raw_content: str | None = self._read_session_text(self._chat_dir, session_uuid, GPTCLI_METADATA_FILENAME)
+        if raw_content is None:
+            return None
+        try:
+            metadata: dict[str, Any] = json.loads(raw_content)
+            return float(metadata["chat"]["created"])
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+            return None
+
     @staticmethod
-    def _display_messages(messages: Messages) -> None:
+    def display_messages(messages: Messages, hidden: int = 0) -> None:
         """Format and display a collection of chat messages with ANSI color codes.
 
         Args:
             messages (Messages): The messages to display.
+            hidden (int, optional): The number of earlier messages that are not shown. Defaults to 0.
         """
+        if hidden > 0:
+            print_formatted_text(ANSI(f"{GRY}[{hidden} earlier messages not shown]{RST}"))
         for message in messages:
             if message.is_reply:
                 print_formatted_text(ANSI(f"{MGA}>>>{RST} " + message.content.strip()))
@@ -987,11 +1487,13 @@ class Storage:
             else:
                 print_formatted_text(ANSI(f"{GRN}>>>{RST} " + message.content.strip()))
 
-    def display_chat_by_uuid(self, session_uuid: str) -> None:
+    def display_chat_by_uuid(self, session_uuid: str, start: int = 0) -> None:
         """Extract, format, and display messages from a specific chat session.
 
         Args:
             session_uuid (str): The UUID of the chat session to display.
+            start (int, optional): The index of the first message to display, e.g. a search match.
+                The messages before it are counted, not shown. Defaults to 0.
         """
         try:
             messages: Messages | None = self.extract_messages_by_uuid(session_uuid)
@@ -1002,7 +1504,11 @@ class Storage:
         if messages is None:
             return None
 
-        self._display_messages(messages)
+        if start > 0:
+            shown: list[Message] = list(messages)[start:]
+            self.display_messages(Messages(shown), hidden=len(messages) - len(shown))
+            return None
+        self.display_messages(messages)
         return None
 
     def display_last_chat(self) -> None:
@@ -1023,5 +1529,5 @@ class Storage:
         if messages is None:
             return None
 
-        self._display_messages(messages)
+        self.display_messages(messages)
         return None
@@ -18,6 +18,7 @@ from prompt_toolkit.history import InMemoryHistory
 from prompt_toolkit.key_binding import KeyBindings
 
 from gptcli.src.common.api import Chat as ChatAPIHelper
+from gptcli.src.common.chat_journal import ChatJournal
 from gptcli.src.common.constants import (
     GRN,
     GRY,
@@ -34,6 +35,7 @@ from gptcli.src.common.decorators import user_triggered_abort
 from gptcli.src.common.encryption import Encryption
 from gptcli.src.common.ingest import PDF, Text
 from gptcli.src.common.message import MessageFactory, Messages
+from gptcli.src.common.message_log import ChatWindow
 from gptcli.src.common.storage import Storage
 
 logger: Logger = logging.getLogger(__name__)
@@ -234,6 +236,9 @@ class ChatUser(Chat):
         store: bool = True,
         load_last: bool = False,
         load_session_uuid: str = "",
+        show_from: int = 0,
+        tail: int | None = None,
+        tail_tokens: int | None = None,
         encryption: Encryption | None = None,
         api_key: str = "",
     ) -> None:
@@ -250,6 +255,12 @@ class ChatUser(Chat):
             store (bool, optional): Store the chat messages to disk. Defaults to True.
             load_last (bool, optional): Load the most recent chat as context. Defaults to False.
             load_session_uuid (str, optional): Load a specific chat session by UUID. Defaults to "".
+            show_from (int, optional): The index of the first message of the loaded session to display,
+                e.g. a search match. All of its messages are still loaded as context. Defaults to 0.
+            tail (int | None, optional): Only load this many of the loaded session's most recent
+                non-system messages. Defaults to None, which loads them all.
+            tail_tokens (int | None, optional): Only load the loaded session's most recent non-system
+                messages that fit in this many tokens. Defaults to None, which loads them all.
             encryption (Encryption | None, optional): Encryption instance for encrypting stored data. Defaults to None.
             api_key (str, optional): The API key for authentication. Defaults to "".
         """
@@ -268,11 +279,20 @@ class ChatUser(Chat):
         self._store: bool = store
         self._load_last: bool = load_last
         self._load_session_uuid: str = load_session_uuid
+        self._show_from: int = show_from
         self._encryption_enabled: bool = encryption is not None
         self._storage: Storage = Storage(provider=provider, encryption=encryption)
+        self._journal: ChatJournal | None = None
+        self._count_when_loaded: int = 0
+        self._window: ChatWindow | None = None
 
         loaded: Messages | None
-        if load_session_uuid:
+        if (load_session_uuid or self._load_last) and (tail is not None or tail_tokens is not None):
+            windowed = self._storage.load_chat_window(load_session_uuid or None, tail, tail_tokens)
+            loaded = None
+            if windowed is not None:
+                self._window, loaded = windowed
+        elif load_session_uuid:
             loaded = self._storage.extract_messages_by_uuid(load_session_uuid)
         elif self._load_last:
             loaded = self._storage.extract_messages()
@@ -382,15 +402,17 @@ class ChatUser(Chat):
             return None
 
         # check if we should add file content to message
-        count_when_loaded: int = 0
         if self._filepath is not None and len(self._filepath) > 0:
             self._ingest_file_as_context()
-        if self._load_session_uuid:
-            self._storage.display_chat_by_uuid(self._load_session_uuid)
-            count_when_loaded = len(self._messages)
+        if self._window is not None:
+            self._storage.display_messages(self._messages, hidden=self._window.skipped)
+            self._count_when_loaded = len(self._messages)
+        elif self._load_session_uuid:
+            self._storage.display_chat_by_uuid(self._load_session_uuid, start=self._show_from)
+            self._count_when_loaded = len(self._messages)
         elif self._load_last:
             self._storage.display_last_chat()
-            count_when_loaded = len(self._messages)
+            self._count_when_loaded = len(self._messages)
 
         commands_multiline = ChatCommands.multiline()
         commands_clear = ChatCommands.clear()
@@ -401,38 +423,40 @@ class ChatUser(Chat):
         commands_help_doc = ChatCommands.help_doc(provider=self._provider)
         commands_exec = "cls" if os.name.lower() == "nt" else "clear"
 
-        while True:
-            user_input = self.prompt(">>> ")
-            if user_input in commands_multiline:
-                user_input = self.prompt_multiline("... ")
-            elif user_input in self._commands_system:
-                system_input = self._prompt_system("... ")
-                self._process_system_message(system_input)
-                continue
-            elif any(user_input == cmd or user_input.startswith(cmd + " ") for cmd in self._commands_system_clear):
-                self._process_system_clear(user_input)
-                continue
-            elif user_input in self._commands_system_show:
-                self._display_system_messages()
-                continue
-            elif user_input.isspace():
-                continue
-            elif user_input in commands_clear:
-                subprocess.run(commands_exec, shell=True, check=True)
-                continue
-            elif user_input in commands_config:
-                print(commands_config_doc)
-                continue
-            elif user_input in commands_help:
-                print(commands_help_doc)
-                continue
-            elif user_input in commands_exit:
-                break
-
-            self._process_user_and_reply_messages(user_input)
-
-        if self._should_store_messages(number_of_messages_from_storage=count_when_loaded):
-            self._storage.store_messages(messages=self._messages, model=self._model)
+        try:
+            while True:
+                self._persist_turn()
+                user_input = self.prompt(">>> ")
+                if user_input in commands_multiline:
+                    user_input = self.prompt_multiline("... ")
+                elif user_input in self._commands_system:
+                    system_input = self._prompt_system("... ")
+                    self._process_system_message(system_input)
+                    continue
+                elif any(user_input == cmd or user_input.startswith(cmd + " ") for cmd in self._commands_system_clear):
+                    self._process_system_clear(user_input)
+                    continue
+                elif user_input in self._commands_system_show:
+                    self._display_system_messages()
+                    continue
+                elif user_input.isspace():
+                    continue
+                elif user_input in commands_clear:
+                    subprocess.run(commands_exec, shell=True, check=True)
+                    continue
+                elif user_input in commands_config:
+                    print(commands_config_doc)
+                    continue
+                elif user_input in commands_help:
+                    print(commands_help_doc)
+                    continue
+                elif user_input in commands_exit:
+                    break
+
+                self._process_user_and_reply_messages(user_input)
+        finally:
+            self._persist_turn()
+            self._finish_session()
 
         return None
 
@@ -483,7 +507,9 @@ class ChatUser(Chat):
             print(f"Make sure the filepath you provided is correct: '{self._filepath}'")
 
         if len(content) > 0 and not content.isspace():
-            message_user = self._message_factory.user_message(role=self._role_user, content=content, model=self._model)
+            message_user = self._message_factory.attachment_message(
+                role=self._role_user, content=content, model=self._model
+            )
             self._messages.add(message_user)
 
     def _process_system_message(self, content: str) -> None:
@@ -554,6 +580,7 @@ class ChatUser(Chat):
         message_user = self._message_factory.user_message(role=self._role_user, content=user_input, model=self._model)
         self._messages.add(message_user)
         self._chat.messages = self._messages
+        self._persist_turn()
 
         # send messages and capture reply
         message_reply = self._chat.send()
@@ -582,6 +609,29 @@ class ChatUser(Chat):
             """
         )
 
+    def _persist_turn(self) -> None:
+        """Journal the messages produced since the last call.
+
+        The session is only created once there is something new to store.
+        """
+        if self._journal is None:
+            if not self._should_store_messages(number_of_messages_from_storage=self._count_when_loaded):
+                return None
+            self._journal = self._storage.start_chat_journal(model=self._model, base=self._window)
+        self._journal.sync(self._messages)
+        return None
+
+    def _finish_session(self) -> None:
+        """Store the journaled session in full, or discard it if nothing new is left to store."""
+        if self._journal is None:
+            return None
+        if self._should_store_messages(number_of_messages_from_storage=self._count_when_loaded):
+            self._storage.finish_chat_journal(self._journal, self._messages)
+        else:
+            self._storage.discard_chat_journal(self._journal)
+        self._journal = None
+        return None
+
     def _should_store_messages(self, number_of_messages_from_storage: int) -> bool:
         """Accepts the number of messages loaded from storage and returns true if we added new messages."""
         return self._store and len(self._messages) - number_of_messages_from_storage > 0
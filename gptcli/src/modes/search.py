@@ -1,7 +1,9 @@
 """Interactive full-text search TUI over local chat and OCR history."""
 
+import asyncio
 import re
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Generic, TypeVar
 
 from prompt_toolkit import Application
@@ -14,25 +16,42 @@ from prompt_toolkit.layout.controls import BufferControl, FormattedTextControl
 from prompt_toolkit.styles import Style
 
 from gptcli.src.common.constants import GRN, RST, SearchActions
+from gptcli.src.common.embeddings import (
+    EmbeddingClient,
+    EmbeddingIndex,
+    SemanticFTS,
+)
 from gptcli.src.common.encryption import Encryption
 from gptcli.src.common.fts import (
     ChatFTS,
+    IndexProgress,
     MessageSnippet,
     OcrFTS,
     OcrHit,
+    SearchIndex,
+    SearchSource,
     SessionHit,
-    _BaseFTS,
-    tokenize,
+    SourceHit,
+    UnifiedFTS,
+    is_browse_query,
+    is_substring_query,
+    query_terms,
 )
 
 _HEIGHT_RESULTS = 14
 _TEXT_FOOTER_CHAT = " [↑↓/PgUp/PgDn] Navigate   [Enter] Load   [^P] Print   [^U] Clear   [ESC] Quit "
 _TEXT_FOOTER_OCR = " [↑↓/PgUp/PgDn] Navigate   [Enter] Print   [^W] Write   [^U] Clear   [ESC] Quit "
+_TEXT_FOOTER_ALL = " [↑↓/PgUp/PgDn] Navigate   [Enter] Load/Print   [^P] Print   [^W] Write   [^U] Clear   [ESC] Quit "
 _TEXT_NO_RESULTS = "  No results.\n"
+_TEXT_SEARCHING = "  Searching…\n"
 _TEXT_MORE = "  ↓ more…\n"
 _STYLE = Style.from_dict({"search-prefix": "bold"})
 _LABEL_WIDTH = len("Assistant")
 _LABEL_OCR_DOC = "Doc:"
+# Typing pause after which a query runs, so a burst of keystrokes runs only the last query.
+_DEBOUNCE_SECONDS = 0.05
+# Longer pause after which a semantic query is embedded, so partial queries are never sent to the provider.
+_SETTLE_SECONDS = 0.8
 
 
 class _Styles:
@@ -53,12 +72,40 @@ class _Styles:
 _T = TypeVar("_T")
 
 
+def _print_progress(kind: str, what: str = "history") -> IndexProgress:
+    """Return an index progress callback that rewrites the 'Indexing' line in place.
+
+    Args:
+        kind (str): What is being indexed, e.g. 'chat' or 'OCR'.
+        what (str, optional): What of it is being indexed. Defaults to 'history'.
+
+    Returns:
+        IndexProgress: The callback.
+    """
+
+    def _report(done: int, total: int) -> None:
+        print(f"{GRN}>>>{RST} Indexing {kind} {what}… {done:,}/{total:,}", end="\r", flush=True)
+
+    return _report
+
+
 class _BaseSearch(ABC, Generic[_T]):
     """Abstract base for full-text search TUI applications.
 
     Manages navigation state and shared TUI layout. Subclasses provide the FTS
     query, per-hit line count, hit rendering, footer text, and action key bindings.
 
+    Queries run on a worker thread once typing pauses, so the TUI keeps
+    rendering while they do. Typing on interrupts the query in flight, and
+    only the results of the latest query are shown. With semantic search, a
+    query that stays unchanged for longer is embedded on a worker of its own,
+    so a slow request never holds up full-text queries, and its blended
+    results replace the full-text ones when they arrive.
+
+    Without a query the full history is browsed a page at a time; the next
+    page is fetched, on the same worker, once the selection nears the end
+    of the sessions loaded so far.
+
     Attributes:
         _results: The current list of matching hits.
         _selected_idx: Index into _results of the highlighted row.
@@ -67,17 +114,26 @@ class _BaseSearch(ABC, Generic[_T]):
         _selected_uuid: The UUID of the session the user acted on.
         _cache_key: Identifies the last rendered state for fragment caching.
         _cached_fragments: Cached StyleAndTextTuples from the last render.
-        _query_tokens: Lowercase alphanumeric tokens from the current query, for highlight logic.
+        _query_tokens: The tokens the current query includes, for highlight logic.
         _highlight_pattern: Compiled regex built from _query_tokens, or None when no query.
         _total: Total number of sessions in the index.
         _total_width: Digit width of _total, for fixed-width counter formatting.
+        _searching: Whether a query is pending or running, so _results may be stale.
+        _generation: Incremented for every query, so that results of superseded queries are dropped.
+        _pending: The task running the latest query, or None before the first keystroke.
+        _executor: The single worker thread queries run on while the TUI runs.
+        _embed_executor: The single worker thread settled queries are embedded on, with semantic search.
+        _query_text: The query _results are for.
+        _browsing: Whether _results are pages of the history, shown for a query without text.
+        _paging: Whether the next page of the history is being fetched.
+        _exhausted: Whether the last page of the history has been fetched.
     """
 
-    def __init__(self, fts: _BaseFTS[_T], total: int) -> None:
+    def __init__(self, fts: SearchIndex[_T], total: int) -> None:
         """Initialise shared search state from a pre-built FTS index.
 
         Args:
-            fts (_BaseFTS[_T]): The pre-built full-text search index.
+            fts (SearchIndex[_T]): The pre-built full-text search index.
             total (int): Total number of sessions in the index.
         """
         self._fts = fts
@@ -86,17 +142,142 @@ class _BaseSearch(ABC, Generic[_T]):
         self._scroll_offset: int = 0
         self._action: str | None = None
         self._selected_uuid: str | None = None
-        self._cache_key: tuple[int, int, int, tuple[str, ...]] | None = None
+        self._cache_key: tuple[int, int, int, tuple[str, ...], bool] | None = None
         self._cached_fragments: StyleAndTextTuples = []
         self._query_tokens: list[str] = []
         self._highlight_pattern: re.Pattern[str] | None = None
         self._total: int = total
         self._total_width: int = len(str(total))
+        self._searching: bool = False
+        self._generation: int = 0
+        self._pending: asyncio.Task[None] | None = None
+        self._executor: ThreadPoolExecutor | None = None
+        self._embed_executor: ThreadPoolExecutor | None = None
+        self._query_text: str = ""
+        self._browsing: bool = True
+        self._paging: bool = False
+        self._exhausted: bool = False
 
     def _query(self, text: str) -> list[_T]:
         """Search the FTS index and return matching hits."""
         return self._fts.search(text)
 
+    def _schedule_query(self, app: Application[Any], text: str, delay: float) -> None:
+        """Run a query on the worker thread after a delay, superseding the previous one.
+
+        Args:
+            app (Application[Any]): The running application.
+            text (str): The query.
+            delay (float): Seconds to wait for further typing before running the query.
+        """
+        self._generation += 1
+        if self._pending is not None:
+            self._pending.cancel()
+        # Cancelling the task does not stop a query already on the worker; interrupting it frees the worker.
+        self._fts.interrupt()
+        self._searching = True
+        self._pending = app.create_background_task(self._run_query(app, text, self._generation, delay))
+        app.invalidate()
+
+    async def _run_query(self, app: Application[Any], text: str, generation: int, delay: float) -> None:
+        """Wait out the delay, run the query on the worker thread and show its results if still current.
+
+        Args:
+            app (Application[Any]): The running application.
+            text (str): The query.
+            generation (int): The value of _generation the query was scheduled at.
+            delay (float): Seconds to wait before running the query.
+        """
+        await asyncio.sleep(delay)
+        loop = asyncio.get_running_loop()
+        results: list[_T] = await loop.run_in_executor(self._executor, self._query, text)
+        if generation != self._generation:
+            return None
+        self._show_results(text, results)
+        app.invalidate()
+        if self._embed_executor is None or is_browse_query(text):
+            return None
+        await asyncio.sleep(_SETTLE_SECONDS)
+        if not await loop.run_in_executor(self._embed_executor, self._embed_query, text, generation):
+            return None
+        results = await loop.run_in_executor(self._executor, self._query, text)
+        if generation == self._generation:
+            self._show_results(text, results)
+            app.invalidate()
+        return None
+
+    def _embed_query(self, text: str, generation: int) -> bool:
+        """Embed a settled query on the embedding worker, unless a later query superseded it while it waited.
+
+        Args:
+            text (str): The query.
+            generation (int): The value of _generation the query was scheduled at.
+
+        Returns:
+            bool: True if the query was embedded, so its results change.
+        """
+        if generation != self._generation or not isinstance(self._fts, SemanticFTS):
+            return False
+        return self._fts.embed_query(text)
+
+    def _show_results(self, text: str, results: list[_T]) -> None:
+        """Replace the results with those of a query and reset the selection.
+
+        Args:
+            text (str): The query.
+            results (list[_T]): Its results.
+        """
+        self._results = results
+        self._query_tokens = query_terms(text, self._fts.has_substring_index and is_substring_query(text))
+        self._highlight_pattern = (
+            re.compile("|".join(re.escape(t) for t in self._query_tokens), re.IGNORECASE)
+            if self._query_tokens
+            else None
+        )
+        self._selected_idx = 0
+        self._scroll_offset = 0
+        self._searching = False
+        self._query_text = text
+        self._browsing = is_browse_query(text)
+        self._paging = False
+        self._exhausted = False
+
+    def _schedule_page(self, app: Application[Any]) -> None:
+        """Fetch the next page of the history on the worker thread if the selection nears the end of it.
+
+        Args:
+            app (Application[Any]): The running application.
+        """
+        if not self._browsing or self._searching or self._paging or self._exhausted or not self._results:
+            return None
+        if len(self._results) - self._selected_idx > _HEIGHT_RESULTS:
+            return None
+        self._paging = True
+        after: tuple[float, str] = self._browse_key(self._results[-1])
+        app.create_background_task(self._run_page(app, after, self._generation))
+        return None
+
+    async def _run_page(self, app: Application[Any], after: tuple[float, str], generation: int) -> None:
+        """Fetch a page of the history on the worker thread and append it if still current.
+
+        Args:
+            app (Application[Any]): The running application.
+            after (tuple[float, str]): The browse key of the last session loaded so far.
+            generation (int): The value of _generation the page was scheduled at.
+        """
+        page: list[_T] = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._fts.browse, after, self._query_text
+        )
+        if generation == self._generation:
+            self._results = self._results + page
+            self._paging = False
+            self._exhausted = not page
+            app.invalidate()
+
+    @abstractmethod
+    def _browse_key(self, hit: _T) -> tuple[float, str]:
+        """Return the created timestamp and UUID of a hit, which the next page of the history follows."""
+
     @abstractmethod
     def _lines_for(self, hit: _T) -> int:
         """Return the number of terminal lines this hit occupies in the viewport."""
@@ -158,22 +339,25 @@ class _BaseSearch(ABC, Generic[_T]):
         )
 
         def _on_query_changed(_: Buffer) -> None:
-            self._results = self._query(search_buffer.text)
-            self._query_tokens = tokenize(search_buffer.text)
-            self._highlight_pattern = (
-                re.compile("|".join(re.escape(t) for t in self._query_tokens), re.IGNORECASE)
-                if self._query_tokens
-                else None
-            )
-            self._selected_idx = 0
-            self._scroll_offset = 0
-            app.invalidate()
+            self._schedule_query(app, search_buffer.text, _DEBOUNCE_SECONDS)
 
         search_buffer.on_text_changed += _on_query_changed
 
         self._results = self._query("")
 
-        app.run()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search")
+        if isinstance(self._fts, SemanticFTS):
+            self._embed_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-embed")
+        try:
+            app.run()
+        finally:
+            self._fts.interrupt()
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+            if self._embed_executor is not None:
+                # A request in flight cannot be cancelled; its result is dropped.
+                self._embed_executor.shutdown(wait=False, cancel_futures=True)
+                self._embed_executor = None
 
         return self._action, self._selected_uuid
 
@@ -206,17 +390,13 @@ class _BaseSearch(ABC, Generic[_T]):
             if self._selected_idx < len(self._results) - 1:
                 self._selected_idx += 1
                 self._clamp_scroll()
+                self._schedule_page(event.app)
                 event.app.invalidate()
 
         @kb.add("c-u")  # type: ignore[misc]
         def _clear(event: Any) -> None:
             search_buffer.reset()
-            self._results = self._query("")
-            self._query_tokens = []
-            self._highlight_pattern = None
-            self._selected_idx = 0
-            self._scroll_offset = 0
-            event.app.invalidate()
+            self._schedule_query(event.app, "", 0)
 
         @kb.add("pageup")  # type: ignore[misc]
         def _page_up(event: Any) -> None:
@@ -230,6 +410,7 @@ class _BaseSearch(ABC, Generic[_T]):
             if self._selected_idx < len(self._results) - 1:
                 self._selected_idx = min(len(self._results) - 1, self._selected_idx + self._page_size())
                 self._clamp_scroll()
+                self._schedule_page(event.app)
                 event.app.invalidate()
 
         self._add_action_bindings(kb, search_buffer)
@@ -284,8 +465,8 @@ class _BaseSearch(ABC, Generic[_T]):
         Returns:
             AnyFormattedText: The formatted prefix text.
         """
-        count = len(self._results)
-        pad = " " * (self._total_width - len(str(count)))
+        count = "…" if self._searching else str(len(self._results) if self._query_text.strip() else self._total)
+        pad = " " * (self._total_width - len(count))
         return [
             (_Styles.SEARCH_PREFIX, f" Search {pad}[{count}/{self._total}]: "),
         ]
@@ -294,18 +475,24 @@ class _BaseSearch(ABC, Generic[_T]):
         """Render the visible slice of results as formatted text.
 
         Caches rendered fragments by (results identity, selected index, scroll
-        offset, query tokens) to avoid redundant work when prompt_toolkit calls
-        this function multiple times per render cycle.
+        offset, query tokens, searching) to avoid redundant work when prompt_toolkit
+        calls this function multiple times per render cycle.
 
         Returns:
             StyleAndTextTuples: A list of (style, text) pairs for rendering.
         """
-        cache_key = (id(self._results), self._selected_idx, self._scroll_offset, tuple(self._query_tokens))
+        cache_key = (
+            id(self._results),
+            self._selected_idx,
+            self._scroll_offset,
+            tuple(self._query_tokens),
+            self._searching,
+        )
         if cache_key == self._cache_key:
             return self._cached_fragments
 
         if not self._results:
-            fragments: StyleAndTextTuples = [(_Styles.MUTED, _TEXT_NO_RESULTS)]
+            fragments: StyleAndTextTuples = [(_Styles.MUTED, _TEXT_SEARCHING if self._searching else _TEXT_NO_RESULTS)]
         else:
             fragments = []
             lines_used = 0
@@ -331,20 +518,48 @@ class ChatSearch(_BaseSearch[SessionHit]):
 
     Builds a ChatFTS index on initialisation, then runs a prompt_toolkit
     Application that updates results on every keystroke.
+
+    Attributes:
+        _selected_position: The index of the best-matching message of the session the user acted on,
+            or None if the session was picked without a query.
     """
 
-    def __init__(self, chat_dir: str, encryption: Encryption | None) -> None:
+    def __init__(
+        self,
+        chat_dir: str,
+        encryption: Encryption | None,
+        trigram: bool | None = None,
+        embeddings: EmbeddingClient | None = None,
+    ) -> None:
         """Build the chat FTS index and initialise search state.
 
         Args:
             chat_dir (str): Path to the provider's chat storage directory.
             encryption (Encryption | None): Encryption instance, or None.
+            trigram (bool | None, optional): True to add the substring index, False to drop it.
+                Defaults to None, which keeps the index as it is.
+            embeddings (EmbeddingClient | None, optional): The client to embed sessions with, to blend
+                query results with the sessions nearest in meaning. Defaults to None, for full-text search alone.
         """
         print(f"{GRN}>>>{RST} Indexing chat history…", end="\r", flush=True)
-        fts = ChatFTS()
-        total = fts.build(storage_dir=chat_dir, encryption=encryption)
-        print(" " * 40, end="\r", flush=True)
-        super().__init__(fts, total)
+        fts = ChatFTS(trigram=trigram)
+        total = fts.build(storage_dir=chat_dir, encryption=encryption, progress=_print_progress("chat"))
+        index: SearchIndex[SessionHit] = fts
+        if embeddings is not None:
+            embedding_index = EmbeddingIndex(embeddings)
+            embedding_index.build(chat_dir, encryption, fts.session_text, _print_progress("chat", "embeddings"))
+            index = SemanticFTS(fts, embedding_index)
+        print(" " * 60, end="\r", flush=True)
+        super().__init__(index, total)
+        self._selected_position: int | None = None
+
+    @property
+    def selected_position(self) -> int | None:
+        """The index of the matching message to open the selected session at, or None for its start."""
+        return self._selected_position
+
+    def _browse_key(self, hit: SessionHit) -> tuple[float, str]:
+        return hit.created, hit.uuid
 
     def _lines_for(self, hit: SessionHit) -> int:
         return 2 + len(hit.snippets)
@@ -363,6 +578,7 @@ class ChatSearch(_BaseSearch[SessionHit]):
             if self._results:
                 self._action = SearchActions.LOAD.value
                 self._selected_uuid = self._results[self._selected_idx].uuid
+                self._selected_position = self._results[self._selected_idx].position
                 event.app.exit()
 
         @kb.add("c-p")  # type: ignore[misc]
@@ -370,6 +586,7 @@ class ChatSearch(_BaseSearch[SessionHit]):
             if self._results:
                 self._action = SearchActions.PRINT.value
                 self._selected_uuid = self._results[self._selected_idx].uuid
+                self._selected_position = self._results[self._selected_idx].position
                 event.app.exit()
 
 
@@ -380,18 +597,36 @@ class OcrSearch(_BaseSearch[OcrHit]):
     Application that updates results on every keystroke.
     """
 
-    def __init__(self, ocr_dir: str, encryption: Encryption | None) -> None:
+    def __init__(
+        self,
+        ocr_dir: str,
+        encryption: Encryption | None,
+        trigram: bool | None = None,
+        embeddings: EmbeddingClient | None = None,
+    ) -> None:
         """Build the OCR FTS index and initialise search state.
 
         Args:
             ocr_dir (str): Path to the provider's OCR storage directory.
             encryption (Encryption | None): Encryption instance, or None.
+            trigram (bool | None, optional): True to add the substring index, False to drop it.
+                Defaults to None, which keeps the index as it is.
+            embeddings (EmbeddingClient | None, optional): The client to embed documents with, to blend
+                query results with the documents nearest in meaning. Defaults to None, for full-text search alone.
         """
         print(f"{GRN}>>>{RST} Indexing OCR history…", end="\r", flush=True)
-        fts = OcrFTS()
-        total = fts.build(storage_dir=ocr_dir, encryption=encryption)
-        print(" " * 40, end="\r", flush=True)
-        super().__init__(fts, total)
+        fts = OcrFTS(trigram=trigram)
+        total = fts.build(storage_dir=ocr_dir, encryption=encryption, progress=_print_progress("OCR"))
+        index: SearchIndex[OcrHit] = fts
+        if embeddings is not None:
+            embedding_index = EmbeddingIndex(embeddings)
+            embedding_index.build(ocr_dir, encryption, fts.session_text, _print_progress("OCR", "embeddings"))
+            index = SemanticFTS(fts, embedding_index)
+        print(" " * 60, end="\r", flush=True)
+        super().__init__(index, total)
+
+    def _browse_key(self, hit: OcrHit) -> tuple[float, str]:
+        return hit.created, hit.uuid
 
     def _lines_for(self, hit: OcrHit) -> int:
         return 2
@@ -420,8 +655,97 @@ class OcrSearch(_BaseSearch[OcrHit]):
                 event.app.exit()
 
 
+class UnifiedSearch(_BaseSearch[SourceHit]):
+    """Interactive TUI for full-text search over the chat and OCR history of every provider.
+
+    Builds a UnifiedFTS index on initialisation, then runs a prompt_toolkit
+    Application that updates results on every keystroke. Each result is
+    labelled with its provider and target, and offers the actions of its
+    target: a chat session is loaded or printed, an OCR result printed or
+    written to a file.
+
+    Attributes:
+        _selected_source: The source of the session the user acted on, or None.
+        _selected_position: The index of the best-matching message of the chat session the user acted on,
+            or None if the session was picked without a query or is an OCR result.
+    """
+
+    def __init__(
+        self, sources: list[SearchSource], encryption: Encryption | None, trigram: bool | None = None
+    ) -> None:
+        """Build the index of every source and initialise search state.
+
+        Args:
+            sources (list[SearchSource]): The storage directories to search.
+            encryption (Encryption | None): Encryption instance, or None.
+            trigram (bool | None, optional): True to add the substring index, False to drop it.
+                Defaults to None, which keeps the index as it is.
+        """
+        print(f"{GRN}>>>{RST} Indexing history…", end="\r", flush=True)
+        fts = UnifiedFTS(sources, trigram=trigram)
+        total = fts.build(encryption=encryption, progress=lambda source: _print_progress(source.label))
+        print(" " * 60, end="\r", flush=True)
+        super().__init__(fts, total)
+        self._selected_source: SearchSource | None = None
+        self._selected_position: int | None = None
+
+    @property
+    def selected_source(self) -> SearchSource | None:
+        """The source of the selected session, or None if none was selected."""
+        return self._selected_source
+
+    @property
+    def selected_position(self) -> int | None:
+        """The index of the matching message to open the selected chat session at, or None for its start."""
+        return self._selected_position
+
+    def _browse_key(self, hit: SourceHit) -> tuple[float, str]:
+        return hit.created, hit.uuid
+
+    def _lines_for(self, hit: SourceHit) -> int:
+        return 2 + len(hit.hit.snippets) if isinstance(hit.hit, SessionHit) else 2
+
+    def _render_hit_fragments(
+        self, idx: int, hit: SourceHit, is_selected: bool, pattern: re.Pattern[str] | None
+    ) -> StyleAndTextTuples:
+        if isinstance(hit.hit, SessionHit):
+            return _render_hit(idx, hit.hit, is_selected, pattern, self._total_width, hit.source.label)
+        return _render_ocr_hit(idx, hit.hit, is_selected, pattern, self._total_width, hit.source.label)
+
+    def _footer_text(self) -> str:
+        return _TEXT_FOOTER_ALL
+
+    def _select(self, action: str) -> None:
+        """Record the action and the selected session it applies to."""
+        selected: SourceHit = self._results[self._selected_idx]
+        self._action = action
+        self._selected_uuid = selected.uuid
+        self._selected_source = selected.source
+        self._selected_position = selected.hit.position if isinstance(selected.hit, SessionHit) else None
+
+    def _add_action_bindings(self, kb: KeyBindings, search_buffer: Buffer) -> None:
+        @kb.add("enter")  # type: ignore[misc]
+        def _open(event: Any) -> None:
+            if self._results:
+                chat: bool = isinstance(self._results[self._selected_idx].hit, SessionHit)
+                self._select(SearchActions.LOAD.value if chat else SearchActions.PRINT.value)
+                event.app.exit()
+
+        @kb.add("c-p")  # type: ignore[misc]
+        def _print(event: Any) -> None:
+            if self._results:
+                self._select(SearchActions.PRINT.value)
+                event.app.exit()
+
+        @kb.add("c-w")  # type: ignore[misc]
+        def _write(event: Any) -> None:
+            if self._results and isinstance(self._results[self._selected_idx].hit, OcrHit):
+                self._select(SearchActions.WRITE.value)
+                event.app.exit()
+
+
 def _render_ocr_hit(
-    idx: int, hit: OcrHit, is_selected: bool, pattern: re.Pattern[str] | None, num_width: int
+    idx: int, hit: OcrHit, is_selected: bool, pattern: re.Pattern[str] | None, num_width: int, label: str = ""
 ) -> StyleAndTextTuples:
     """Render a single OCR search result as formatted text fragments.
 
@@ -431,25 +755,28 @@ def _render_ocr_hit(
         is_selected (bool): Whether this row is currently selected.
         pattern (re.Pattern[str] | None): Compiled highlight pattern for snippets.
         num_width (int): Fixed digit width for the index number.
+        label (str, optional): The source of the result, shown after its date. Defaults to "".
 
     Returns:
         StyleAndTextTuples: Formatted text fragments for this result.
     """
     fragments: StyleAndTextTuples = []
     page_str: str = f"{hit.page_count} page{'s' if hit.page_count != 1 else ''}"
+    source: str = f"  {label}" if label else ""
     indent: str = " " * (num_width + 6)
     pad: str = " " * (num_width - len(str(idx + 1)) + 1)
 
     if is_selected:
         fragments.append((_Styles.SELECTED_GUTTER, f"{pad}[{idx + 1}] ▶ "))
         fragments.append((_Styles.BOLD, hit.created_display))
+        fragments.append((_Styles.DEFAULT, source))
         fragments.append((_Styles.OCR_ACCENT, f"  {hit.model or '?'}"))
         fragments.append((_Styles.MUTED, f"  {page_str}"))
         fragments.append((_Styles.BOLD, f"  {hit.source_filename or '?'}\n"))
     else:
         fragments.append((_Styles.MUTED, f"{pad}[{idx + 1}]   "))
         fragments.append((_Styles.BOLD, hit.created_display))
-        fragments.append((_Styles.MUTED, f"  {hit.model or '?'}  {page_str}  {hit.source_filename or '?'}\n"))
+        fragments.append((_Styles.MUTED, f"{source}  {hit.model or '?'}  {page_str}  {hit.source_filename or '?'}\n"))
 
     if hit.snippet:
         fragments.append((_Styles.DEFAULT, indent))
@@ -487,8 +814,30 @@ def _highlight_content(content: str, pattern: re.Pattern[str] | None) -> StyleAn
     return fragments
 
 
+def _highlight_spans(content: str, spans: list[tuple[int, int]]) -> StyleAndTextTuples:
+    """Return formatted text fragments with the given spans highlighted in yellow.
+
+    Args:
+        content (str): The text to highlight.
+        spans (list[tuple[int, int]]): Sorted, non-overlapping (start, end) offsets to highlight.
+
+    Returns:
+        StyleAndTextTuples: Fragments with the spans styled in bold yellow.
+    """
+    fragments: StyleAndTextTuples = []
+    pos = 0
+    for start, end in spans:
+        if pos < start:
+            fragments.append((_Styles.DEFAULT, content[pos:start]))
+        fragments.append((_Styles.HIGHLIGHT, content[start:end]))
+        pos = end
+    if pos < len(content):
+        fragments.append((_Styles.DEFAULT, content[pos:]))
+    return fragments
+
+
 def _render_hit(
-    idx: int, hit: SessionHit, is_selected: bool, pattern: re.Pattern[str] | None, num_width: int
+    idx: int, hit: SessionHit, is_selected: bool, pattern: re.Pattern[str] | None, num_width: int, label: str = ""
 ) -> StyleAndTextTuples:
     """Render a single search result as formatted text fragments.
 
@@ -498,12 +847,14 @@ def _render_hit(
         is_selected (bool): Whether this row is currently selected.
         pattern (re.Pattern[str] | None): Compiled highlight pattern for snippets.
         num_width (int): Fixed digit width for the index number.
+        label (str, optional): The source of the result, shown after its date. Defaults to "".
 
     Returns:
         StyleAndTextTuples: Formatted text fragments for this result.
     """
     fragments: StyleAndTextTuples = []
-    meta: str = f"  {hit.model or '?'}  {hit.message_count} msg\n"
+    source: str = f"  {label}" if label else ""
+    meta: str = f"{source}  {hit.model or '?'}  {hit.message_count} msg\n"
     pad: str = " " * (num_width - len(str(idx + 1)) + 1)
 
     if is_selected:
@@ -560,6 +911,9 @@ def _snippet_label(snippet: MessageSnippet) -> tuple[str, str, str]:
 def _render_snippet(snippet: MessageSnippet, pattern: re.Pattern[str] | None, num_width: int) -> StyleAndTextTuples:
     """Render a message snippet with colour-coded role label and highlighted query terms.
 
+    The terms the index matched are highlighted when the snippet has them,
+    otherwise whatever the pattern matches.
+
     Args:
         snippet (MessageSnippet): The snippet to render.
         pattern (re.Pattern[str] | None): Compiled highlight pattern, or None for no highlighting.
@@ -574,6 +928,10 @@ def _render_snippet(snippet: MessageSnippet, pattern: re.Pattern[str] | None, nu
         (_Styles.DEFAULT, indent),
         (role_style, label_colon),
         (_Styles.DEFAULT, padding),
-        *_highlight_content(snippet.content, pattern),
+        *(
+            _highlight_spans(snippet.content, snippet.highlights)
+            if snippet.highlights
+            else _highlight_content(snippet.content, pattern)
+        ),
         (_Styles.DEFAULT, "\n"),
     ]
@@ -0,0 +1,151 @@
+"""Holds all the tests for agent_commands.py."""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections.abc import Generator
+from unittest.mock import patch
+
+import pytest
+
+from gptcli.src.cli import CommandParser
+from gptcli.src.commands.agent_commands import AgentCommands
+from gptcli.src.common.constants import ModeNames
+from gptcli.src.common.key_agent import (
+    DEFAULT_AGENT_TTL,
+    KeyAgent,
+    KeyAgentClient,
+)
+from gptcli.src.common.key_management import KeyManager
+
+
+@pytest.fixture
+def socket_path() -> Generator[str, None, None]:
+    """A socket path short enough for AF_UNIX, which tmp_path often is not."""
+    directory = tempfile.mkdtemp(dir="/tmp")
+    yield os.path.join(directory, "agent.sock")
+    KeyAgentClient(os.path.join(directory, "agent.sock")).stop()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def km(tmp_path: str) -> KeyManager:
+    return KeyManager(
+        salt_path=os.path.join(str(tmp_path), ".salt"),
+        key_path=os.path.join(str(tmp_path), ".key"),
+        verify_path=os.path.join(str(tmp_path), ".verify.enc"),
+        wrapping_key_path=os.path.join(str(tmp_path), "wrapping.key"),
+    )
+
+
+def _spawn_in_thread(socket_path: str, key: bytes, ttl: float) -> None:
+    agent = KeyAgent(socket_path)
+    agent.unlock(key, ttl)
+    threading.Thread(target=agent.serve, daemon=True).start()
+
+
+@pytest.fixture(autouse=True)
+def _agent_in_thread() -> Generator[None, None, None]:
+    """Run agents in a thread of the test process instead of a detached daemon."""
+    with (
+        patch.object(AgentCommands, "_spawn", side_effect=_spawn_in_thread),
+        patch("gptcli.src.common.key_agent._harden_process"),
+        patch("gptcli.src.common.key_agent._POLL_INTERVAL", 0.05),
+    ):
+        yield
+
+
+def _wait_for_exit(socket_path: str) -> None:
+    deadline = time.monotonic() + 5.0
+    while os.path.exists(socket_path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class TestAgentCommands:
+
+    class TestStart:
+
+        def test_agent_holds_the_key(self, km: KeyManager, socket_path: str) -> None:
+            key = km.initialize("test-passphrase")
+            assert AgentCommands.start(km, socket_path, ttl=60) is True
+            assert KeyAgentClient(socket_path).get_key() == key
+
+        def test_fails_when_encryption_is_not_initialized(self, km: KeyManager, socket_path: str) -> None:
+            assert AgentCommands.start(km, socket_path, ttl=60) is False
+            assert not os.path.exists(socket_path)
+
+        def test_fails_when_an_agent_is_already_running(self, km: KeyManager, socket_path: str) -> None:
+            km.initialize("test-passphrase")
+            AgentCommands.start(km, socket_path, ttl=60)
+            assert AgentCommands.start(km, socket_path, ttl=60) is False
+
+        def test_fails_when_the_socket_directory_is_not_private(
+            self, km: KeyManager, socket_path: str, capsys: pytest.CaptureFixture[str]
+        ) -> None:
+            km.initialize("test-passphrase")
+            os.chmod(os.path.dirname(socket_path), 0o777)
+            with patch.object(KeyManager, "load_key") as load_key:
+                assert AgentCommands.start(km, socket_path, ttl=60) is False
+            load_key.assert_not_called()
+            assert "Cannot start an agent" in capsys.readouterr().out
+
+        def test_fails_when_the_key_cannot_be_loaded(self, km: KeyManager, socket_path: str) -> None:
+            km.initialize("test-passphrase")
+            with patch.object(KeyManager, "load_key", return_value=None):
+                assert AgentCommands.start(km, socket_path, ttl=60) is False
+
+    class TestUnlock:
+
+        def test_hands_the_key_to_a_locked_agent(self, km: KeyManager, socket_path: str) -> None:
+            key = km.initialize("test-passphrase")
+            AgentCommands.start(km, socket_path, ttl=60)
+            AgentCommands.lock(socket_path)
+            assert KeyAgentClient(socket_path).get_key() is None
+            assert AgentCommands.unlock(km, socket_path, ttl=60) is True
+            assert KeyAgentClient(socket_path).get_key() == key
+
+        def test_fails_without_agent(self, km: KeyManager, socket_path: str) -> None:
+            km.initialize("test-passphrase")
+            assert AgentCommands.unlock(km, socket_path, ttl=60) is False
+
+    class TestLockStopStatus:
+
+        def test_status_reports_locked_and_unlocked(
+            self, km: KeyManager, socket_path: str, capsys: pytest.CaptureFixture[str]
+        ) -> None:
+            km.initialize("test-passphrase")
+            AgentCommands.start(km, socket_path, ttl=3600)
+            assert AgentCommands.status(socket_path) is True
+            assert "unlocked for 0h 59m" in capsys.readouterr().out
+            AgentCommands.lock(socket_path)
+            AgentCommands.status(socket_path)
+            assert "locked." in capsys.readouterr().out
+
+        def test_stop_shuts_the_agent_down(self, km: KeyManager, socket_path: str) -> None:
+            km.initialize("test-passphrase")
+            AgentCommands.start(km, socket_path, ttl=60)
+            assert AgentCommands.stop(socket_path) is True
+            _wait_for_exit(socket_path)
+            assert AgentCommands.status(socket_path) is False
+
+        def test_actions_fail_without_agent(self, socket_path: str) -> None:
+            assert AgentCommands.lock(socket_path) is False
+            assert AgentCommands.stop(socket_path) is False
+            assert AgentCommands.status(socket_path) is False
+
+
+class TestCliRouting:
+
+    def test_agent_action_parsed_for_all(self) -> None:
+        with patch("sys.argv", ["gptcli", "all", "agent", "start", "--ttl", "600"]):
+            parser = CommandParser()
+            assert parser.args.mode_name == ModeNames.AGENT.value
+            assert parser.args.agent_action == "start"
+            assert parser.args.ttl == 600
+
+    def test_ttl_defaults_to_the_agent_default(self) -> None:
+        with patch("sys.argv", ["gptcli", "all", "agent", "status"]):
+            parser = CommandParser()
+            assert parser.args.ttl == DEFAULT_AGENT_TTL
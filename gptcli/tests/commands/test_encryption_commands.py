@@ -8,12 +8,23 @@ from unittest.mock import patch
 
 import pytest
 
+from gptcli.constants import (
+    GPTCLI_GENERATION_FILENAME,
+    GPTCLI_MANIFEST_LOG_FILENAME,
+)
 from gptcli.src.cli import CommandParser
 from gptcli.src.commands.encryption_commands import EncryptionCommands
 from gptcli.src.common.constants import ModeNames
-from gptcli.src.common.encryption import Encryption
-from gptcli.src.common.key_management import KeyManager
+from gptcli.src.common.encryption import (
+    ENVELOPE_HEADER_SIZE,
+    Encryption,
+    is_envelope,
+)
+from gptcli.src.common.key_management import KeyManager, ScryptParams
+from gptcli.src.common.manifest import Manifest
 from gptcli.src.common.passphrase import PassphrasePrompt
+from gptcli.src.common.record_log import encode_record
+from gptcli.src.common.session_store import PackedStore
 
 
 class TestEncryptionCommands:
@@ -95,6 +106,52 @@ class TestEncryptionCommands:
             cmd = EncryptionCommands(provider_dir=str(tmp_path), encryption=encryption)
             cmd.encrypt_provider()  # Should not raise
 
+        def test_encrypts_record_log_frame_by_frame(self, encryption: Encryption, tmp_path: str) -> None:
+            manifest = Manifest(str(tmp_path), None)
+            manifest.append("uuid-1", 100.0)
+            manifest.append("uuid-2", 200.0)
+
+            cmd = EncryptionCommands(provider_dir=str(tmp_path), encryption=encryption)
+            cmd.encrypt_provider()
+
+            encrypted_manifest = Manifest(str(tmp_path), encryption)
+            encrypted_manifest.append("uuid-3", 300.0)
+            entries = encrypted_manifest.read()
+            assert entries is not None
+            assert [e["uuid"] for e in entries] == ["uuid-1", "uuid-2", "uuid-3"]
+
+        def test_encrypts_packed_store_rows(self, encryption: Encryption, tmp_path: str) -> None:
+            store = PackedStore(str(tmp_path))
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "session.json", b'{"messages": []}', encrypted=False)
+            store.close()
+
+            cmd = EncryptionCommands(provider_dir=str(tmp_path), encryption=encryption)
+            cmd.encrypt_provider()
+
+            store = PackedStore(str(tmp_path))
+            assert store.read_text("uuid-1", "session.json", encryption) == '{"messages": []}'
+            stored = store.read_file("uuid-1", "session.json")
+            store.close()
+            assert stored is not None
+            assert stored[1] is True
+            assert not os.path.exists(store.db_path + ".enc")
+
+        def test_encrypts_files_on_several_jobs(self, encryption: Encryption, tmp_path: str) -> None:
+            contents = {f"{i}.json": f'{{"index": {i}}}'.encode() * (i + 1) for i in range(20)}
+            for name, content in contents.items():
+                with open(os.path.join(str(tmp_path), name), "wb") as f:
+                    f.write(content)
+            Manifest(str(tmp_path), None).append("uuid-1", 100.0)
+
+            cmd = EncryptionCommands(provider_dir=str(tmp_path), encryption=encryption, jobs=4)
+            cmd.encrypt_provider()
+
+            for name, content in contents.items():
+                assert not os.path.exists(os.path.join(str(tmp_path), name))
+                assert encryption.decrypt_file(os.path.join(str(tmp_path), name + ".enc")) == content
+            assert Manifest(str(tmp_path), encryption).read() == [{"uuid": "uuid-1", "created": 100.0}]
+
     class TestDecryptProvider:
 
         @pytest.fixture
@@ -203,6 +260,82 @@ class TestEncryptionCommands:
             with open(filepath, "rb") as f:
                 assert f.read() == original_content
 
+        def test_decrypts_record_log_frame_by_frame(self, encryption: Encryption, tmp_path: str) -> None:
+            manifest = Manifest(str(tmp_path), encryption)
+            manifest.append("uuid-1", 100.0)
+            manifest.append("uuid-2", 200.0)
+
+            cmd = EncryptionCommands(provider_dir=str(tmp_path), encryption=encryption)
+            cmd.decrypt_provider()
+
+            assert os.path.exists(os.path.join(str(tmp_path), GPTCLI_MANIFEST_LOG_FILENAME))
+            assert Manifest(str(tmp_path), None).read() == [
+                {"uuid": "uuid-1", "created": 100.0},
+                {"uuid": "uuid-2", "created": 200.0},
+            ]
+
+        def test_decrypts_packed_store_rows(self, encryption: Encryption, tmp_path: str) -> None:
+            store = PackedStore(str(tmp_path))
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "session.json", encryption.encrypt(b"{}"), encrypted=True)
+            store.close()
+
+            cmd = EncryptionCommands(provider_dir=str(tmp_path), encryption=encryption)
+            cmd.decrypt_provider()
+
+            store = PackedStore(str(tmp_path))
+            assert store.read_file("uuid-1", "session.json") == (b"{}", False)
+            store.close()
+
+        def test_reports_packed_store_with_wrong_key(
+            self, encryption: Encryption, tmp_path: str, capsys: pytest.CaptureFixture[str]
+        ) -> None:
+            store = PackedStore(str(tmp_path))
+            store.create_session("uuid-1")
+            sealed = Encryption(key=os.urandom(32)).encrypt(b"{}")
+            store.write_file("uuid-1", "session.json", sealed, encrypted=True)
+            store.close()
+
+            cmd = EncryptionCommands(provider_dir=str(tmp_path), encryption=encryption)
+            cmd.decrypt_provider()
+
+            assert "1 file(s) failed to decrypt" in capsys.readouterr().out
+            store = PackedStore(str(tmp_path))
+            assert store.read_file("uuid-1", "session.json") == (sealed, True)
+            store.close()
+
+        def test_decrypts_files_on_several_jobs(self, encryption: Encryption, tmp_path: str) -> None:
+            contents = {f"{i}.json": f'{{"index": {i}}}'.encode() * (i + 1) for i in range(20)}
+            for name, content in contents.items():
+                filepath = os.path.join(str(tmp_path), name)
+                with open(filepath, "wb") as f:
+                    f.write(content)
+                encryption.encrypt_file(filepath)
+
+            cmd = EncryptionCommands(provider_dir=str(tmp_path), encryption=encryption, jobs=4)
+            cmd.decrypt_provider()
+
+            for name, content in contents.items():
+                assert not os.path.exists(os.path.join(str(tmp_path), name + ".enc"))
+                with open(os.path.join(str(tmp_path), name), "rb") as f:
+                    assert f.read() == content
+
+        def test_failures_on_several_jobs_do_not_abort_the_batch(
+            self, encryption: Encryption, tmp_path: str, capsys: pytest.CaptureFixture[str]
+        ) -> None:
+            for i in range(10):
+                filepath = os.path.join(str(tmp_path), f"{i}.json")
+                with open(filepath, "wb") as f:
+                    f.write(b"{}")
+                (encryption if i % 2 else Encryption(key=os.urandom(32))).encrypt_file(filepath)
+
+            cmd = EncryptionCommands(provider_dir=str(tmp_path), encryption=encryption, jobs=4)
+            cmd.decrypt_provider()
+
+            assert "5 file(s) failed to decrypt" in capsys.readouterr().out
+            for i in range(10):
+                assert os.path.exists(os.path.join(str(tmp_path), f"{i}.json" if i % 2 else f"{i}.json.enc"))
+
     class TestRekey:
 
         @pytest.fixture
@@ -281,6 +414,74 @@ class TestEncryptionCommands:
             decrypted = new_enc.decrypt_file(os.path.join(keys_dir, "main.enc"))
             assert decrypted == b"my-api-key"
 
+        def test_rewraps_record_log_header_only(self, rekey_env: dict[str, str]) -> None:
+            old_enc = Encryption(key=os.urandom(32))
+            Manifest(rekey_env["provider_dir"], old_enc).append("uuid-1", 100.0)
+            Manifest(rekey_env["provider_dir"], old_enc).append("uuid-2", 200.0)
+            log_path = os.path.join(rekey_env["provider_dir"], GPTCLI_MANIFEST_LOG_FILENAME + ".enc")
+            with open(log_path, "rb") as f:
+                before = f.read()
+
+            with self._apply_rekey_patches(rekey_env):
+                EncryptionCommands.rekey(old_encryption=old_enc, providers=[rekey_env["provider_dir"]])
+
+            with open(log_path, "rb") as f:
+                after = f.read()
+            assert after[:ENVELOPE_HEADER_SIZE] != before[:ENVELOPE_HEADER_SIZE]
+            assert after[ENVELOPE_HEADER_SIZE:] == before[ENVELOPE_HEADER_SIZE:]
+            assert not os.path.exists(log_path + ".new")
+            km = KeyManager(
+                salt_path=rekey_env["salt_path"], key_path=rekey_env["key_path"], verify_path=rekey_env["verify_path"]
+            )
+            new_key = km.load_key()
+            assert new_key is not None
+            entries = Manifest(rekey_env["provider_dir"], Encryption(key=new_key)).read()
+            assert entries is not None
+            assert [e["uuid"] for e in entries] == ["uuid-1", "uuid-2"]
+
+        def test_gives_legacy_record_log_a_header(self, rekey_env: dict[str, str]) -> None:
+            old_enc = Encryption(key=os.urandom(32))
+            log_path = os.path.join(rekey_env["provider_dir"], GPTCLI_MANIFEST_LOG_FILENAME + ".enc")
+            with open(log_path, "wb") as f:
+                f.write(encode_record({"uuid": "uuid-1", "created": 100.0}, old_enc))
+
+            with self._apply_rekey_patches(rekey_env):
+                EncryptionCommands.rekey(old_encryption=old_enc, providers=[rekey_env["provider_dir"]])
+
+            with open(log_path, "rb") as f:
+                assert is_envelope(f.read())
+            km = KeyManager(
+                salt_path=rekey_env["salt_path"], key_path=rekey_env["key_path"], verify_path=rekey_env["verify_path"]
+            )
+            new_key = km.load_key()
+            assert new_key is not None
+            entries = Manifest(rekey_env["provider_dir"], Encryption(key=new_key)).read()
+            assert entries is not None
+            assert [e["uuid"] for e in entries] == ["uuid-1"]
+
+        def test_reencrypts_packed_store_rows(self, rekey_env: dict[str, str]) -> None:
+            old_enc = Encryption(key=os.urandom(32))
+            storage_dir = os.path.join(rekey_env["provider_dir"], "storage", "chat")
+            os.makedirs(storage_dir)
+            store = PackedStore(storage_dir)
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "session.json", old_enc.encrypt(b"{}"), encrypted=True)
+            store.close()
+
+            with self._apply_rekey_patches(rekey_env):
+                EncryptionCommands.rekey(old_encryption=old_enc, providers=[rekey_env["provider_dir"]])
+
+            km = KeyManager(
+                salt_path=rekey_env["salt_path"], key_path=rekey_env["key_path"], verify_path=rekey_env["verify_path"]
+            )
+            new_key = km.load_key()
+            assert new_key is not None
+            store = PackedStore(storage_dir)
+            assert store.read_text("uuid-1", "session.json", Encryption(key=new_key)) == "{}"
+            assert store.read_text("uuid-1", "session.json", old_enc) is None
+            store.close()
+            assert not os.path.exists(store.db_path + ".new")
+
         def test_updates_salt_file(self, rekey_env: dict[str, str]) -> None:
             old_enc = Encryption(key=os.urandom(32))
 
@@ -354,10 +555,9 @@ class TestEncryptionCommands:
             os.makedirs(keys_dir)
 
             for name in ["main", "backup"]:
-                filepath = os.path.join(keys_dir, name)
-                with open(filepath, "wb") as f:
-                    f.write(b"api-key-data")
-                old_enc.encrypt_file(filepath)
+                # written before envelope encryption, so rekey decrypts and re-encrypts them
+                with open(os.path.join(keys_dir, name + ".enc"), "wb") as f:
+                    f.write(old_enc.encrypt(b"api-key-data"))
 
             original_decrypt_file = old_enc.decrypt_file
             call_count = 0
@@ -381,6 +581,152 @@ class TestEncryptionCommands:
             assert os.path.exists(os.path.join(keys_dir, "main.enc"))
             assert os.path.exists(os.path.join(keys_dir, "backup.enc"))
 
+        def test_rewraps_envelope_headers_without_rewriting_files(self, rekey_env: dict[str, str]) -> None:
+            old_enc = Encryption(key=os.urandom(32))
+            filepath = os.path.join(rekey_env["provider_dir"], "doc.md")
+            with open(filepath, "wb") as f:
+                f.write(b"# Title\n" * 20_000)
+            old_enc.encrypt_file(filepath)
+            with open(filepath + ".enc", "rb") as f:
+                before = f.read()
+            inode = os.stat(filepath + ".enc").st_ino
+
+            with self._apply_rekey_patches(rekey_env):
+                EncryptionCommands.rekey(old_encryption=old_enc, providers=[rekey_env["provider_dir"]])
+
+            with open(filepath + ".enc", "rb") as f:
+                after = f.read()
+            assert os.stat(filepath + ".enc").st_ino == inode
+            assert after[:ENVELOPE_HEADER_SIZE] != before[:ENVELOPE_HEADER_SIZE]
+            assert after[ENVELOPE_HEADER_SIZE:] == before[ENVELOPE_HEADER_SIZE:]
+            km = KeyManager(
+                salt_path=rekey_env["salt_path"], key_path=rekey_env["key_path"], verify_path=rekey_env["verify_path"]
+            )
+            new_key = km.load_key()
+            assert new_key is not None
+            assert Encryption(key=new_key).decrypt(after) == b"# Title\n" * 20_000
+
+        def test_moves_legacy_files_to_envelope_encryption(self, rekey_env: dict[str, str]) -> None:
+            old_enc = Encryption(key=os.urandom(32))
+            filepath = os.path.join(rekey_env["provider_dir"], "doc.md.enc")
+            with open(filepath, "wb") as f:
+                f.write(old_enc.encrypt(b"# Title"))
+
+            with self._apply_rekey_patches(rekey_env):
+                EncryptionCommands.rekey(old_encryption=old_enc, providers=[rekey_env["provider_dir"]])
+
+            with open(filepath, "rb") as f:
+                assert is_envelope(f.read())
+
+        def test_failure_restores_rewrapped_headers_and_databases(self, rekey_env: dict[str, str]) -> None:
+            old_enc = Encryption(key=os.urandom(32))
+            for name in ["a.md", "b.md"]:
+                filepath = os.path.join(rekey_env["provider_dir"], name)
+                with open(filepath, "wb") as f:
+                    f.write(b"# Title")
+                old_enc.encrypt_file(filepath)
+            store = PackedStore(rekey_env["provider_dir"])
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "session.json", old_enc.encrypt_envelope(b"{}"), encrypted=True)
+            store.close()
+
+            original_replace_header = EncryptionCommands._replace_header
+            calls = 0
+
+            def failing_replace_header(filepath: str, header: bytes) -> bytes:
+                nonlocal calls
+                calls += 1
+                if calls == 2:
+                    raise OSError("Simulated failure")
+                return original_replace_header(filepath, header)
+
+            with self._apply_rekey_patches(rekey_env):
+                with patch.object(EncryptionCommands, "_replace_header", side_effect=failing_replace_header):
+                    with pytest.raises(OSError, match="Simulated failure"):
+                        EncryptionCommands.rekey(old_encryption=old_enc, providers=[rekey_env["provider_dir"]])
+
+            for name in ["a.md", "b.md"]:
+                assert old_enc.decrypt_file(os.path.join(rekey_env["provider_dir"], name + ".enc")) == b"# Title"
+            store = PackedStore(rekey_env["provider_dir"])
+            assert store.read_text("uuid-1", "session.json", old_enc) == "{}"
+            store.close()
+            assert not os.path.exists(rekey_env["key_path"])
+
+        def test_keeps_the_current_kdf_params_by_default(self, rekey_env: dict[str, str]) -> None:
+            params = ScryptParams(n=2**11, r=4, p=2)
+            with open(rekey_env["kdf_params_path"], "w") as f:
+                json.dump({"n": params.n, "r": params.r, "p": params.p}, f)
+
+            with self._apply_rekey_patches(rekey_env):
+                EncryptionCommands.rekey(old_encryption=Encryption(key=os.urandom(32)), providers=[])
+
+            km = KeyManager(
+                salt_path=rekey_env["salt_path"],
+                key_path=rekey_env["key_path"],
+                verify_path=rekey_env["verify_path"],
+                params_path=rekey_env["kdf_params_path"],
+            )
+            assert km.load_scrypt_params() == params
+
+        def test_derives_the_new_key_with_calibrated_params(self, rekey_env: dict[str, str]) -> None:
+            params = ScryptParams(n=2**11, r=8, p=3)
+
+            with self._apply_rekey_patches(rekey_env):
+                EncryptionCommands.rekey(
+                    old_encryption=Encryption(key=os.urandom(32)), providers=[], kdf_params=params
+                )
+
+            km = KeyManager(
+                salt_path=rekey_env["salt_path"],
+                key_path=rekey_env["key_path"],
+                verify_path=rekey_env["verify_path"],
+                params_path=rekey_env["kdf_params_path"],
+            )
+            assert km.load_scrypt_params() == params
+            with open(rekey_env["salt_path"], "rb") as f:
+                salt = f.read()
+            assert km.load_key() == Encryption.derive_key("new-pass", salt, n=params.n, r=params.r, p=params.p)
+
+        def test_reencrypts_files_on_several_jobs(self, rekey_env: dict[str, str]) -> None:
+            old_enc = Encryption(key=os.urandom(32))
+            contents = {f"{i}.json": f'{{"index": {i}}}'.encode() * (i + 1) for i in range(20)}
+            for name, content in contents.items():
+                filepath = os.path.join(rekey_env["provider_dir"], name)
+                with open(filepath, "wb") as f:
+                    f.write(content)
+                old_enc.encrypt_file(filepath)
+
+            with self._apply_rekey_patches(rekey_env):
+                EncryptionCommands.rekey(old_encryption=old_enc, providers=[rekey_env["provider_dir"]], jobs=4)
+
+            km = KeyManager(
+                salt_path=rekey_env["salt_path"], key_path=rekey_env["key_path"], verify_path=rekey_env["verify_path"]
+            )
+            new_key = km.load_key()
+            assert new_key is not None
+            new_enc = Encryption(key=new_key)
+            for name, content in contents.items():
+                assert new_enc.decrypt_file(os.path.join(rekey_env["provider_dir"], name + ".enc")) == content
+
+        def test_failure_on_several_jobs_keeps_old_files_and_key(self, rekey_env: dict[str, str]) -> None:
+            old_enc = Encryption(key=os.urandom(32))
+            for i in range(20):
+                filepath = os.path.join(rekey_env["provider_dir"], f"{i}.json")
+                with open(filepath, "wb") as f:
+                    f.write(b"{}")
+                (old_enc if i != 7 else Encryption(key=os.urandom(32))).encrypt_file(filepath)
+
+            with self._apply_rekey_patches(rekey_env):
+                with pytest.raises(RuntimeError, match="Failed to decrypt file during rekey"):
+                    EncryptionCommands.rekey(old_encryption=old_enc, providers=[rekey_env["provider_dir"]], jobs=4)
+
+            filenames = sorted(os.listdir(rekey_env["provider_dir"]))
+            assert filenames == sorted(f"{i}.json.enc" for i in range(20))
+            for i in range(20):
+                if i != 7:
+                    assert old_enc.decrypt_file(os.path.join(rekey_env["provider_dir"], f"{i}.json.enc")) == b"{}"
+            assert not os.path.exists(rekey_env["key_path"])
+
     class TestCollectFiles:
 
         @pytest.fixture
@@ -411,6 +757,14 @@ class TestEncryptionCommands:
             result = cmd._collect_files(include=lambda f: True, skip_log="Skipping")
             assert marker not in result
 
+        def test_skips_ocr_generation_counter(self, encryption: Encryption, tmp_path: str) -> None:
+            counter = os.path.join(str(tmp_path), GPTCLI_GENERATION_FILENAME)
+            with open(counter, "w") as f:
+                f.write("3")
+            cmd = EncryptionCommands(provider_dir=str(tmp_path), encryption=encryption)
+            result = cmd._collect_files(include=lambda f: True, skip_log="Skipping")
+            assert counter not in result
+
         def test_logs_skipped_files(
             self, encryption: Encryption, tmp_path: str, caplog: pytest.LogCaptureFixture
         ) -> None:
@@ -445,3 +799,23 @@ class TestEncryptionCommands:
                 parser = CommandParser()
                 assert parser.args.provider == "all"
                 assert parser.args.mode_name == ModeNames.REKEY.value
+
+        def test_jobs_defaults_to_one(self) -> None:
+            with patch("sys.argv", ["gptcli", "all", "decrypt"]):
+                parser = CommandParser()
+                assert parser.args.jobs == 1
+
+        def test_jobs_parsed_for_encrypt_decrypt_and_rekey(self) -> None:
+            for mode in (ModeNames.ENCRYPT.value, ModeNames.DECRYPT.value, ModeNames.REKEY.value):
+                with patch("sys.argv", ["gptcli", "all", mode, "--jobs", "8"]):
+                    parser = CommandParser()
+                    assert parser.args.jobs == 8
+
+        def test_calibration_flags_parsed_for_encrypt_and_rekey(self) -> None:
+            for mode in (ModeNames.ENCRYPT.value, ModeNames.REKEY.value):
+                argv = ["gptcli", "all", mode, "--calibrate-kdf", "--kdf-time", "0.5", "--kdf-memory", "64"]
+                with patch("sys.argv", argv):
+                    parser = CommandParser()
+                    assert parser.args.calibrate_kdf is True
+                    assert parser.args.kdf_time == 0.5
+                    assert parser.args.kdf_memory == 64
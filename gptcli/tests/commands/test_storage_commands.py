@@ -0,0 +1,93 @@
+"""Holds all the tests for storage_commands.py."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from gptcli.constants import GPTCLI_SESSION_STORE_FILENAME
+from gptcli.src.cli import CommandParser
+from gptcli.src.commands.storage_commands import StorageCommands
+from gptcli.src.common.constants import ModeNames, ProviderNames
+from gptcli.src.common.message import MessageFactory, Messages
+from gptcli.src.common.session_store import DirectoryStore, PackedStore
+from gptcli.src.common.storage import Storage
+
+
+class TestStorageCommands:
+
+    @pytest.fixture
+    def storage_dir(self, tmp_path: str) -> str:
+        storage_dir = os.path.join(str(tmp_path), "chat")
+        store = DirectoryStore(storage_dir)
+        for session_uuid in ("uuid-1", "uuid-2"):
+            store.create_session(session_uuid)
+            store.write_file(session_uuid, "session.json", b"{}", encrypted=False)
+        return storage_dir
+
+    class TestPack:
+
+        def test_moves_sessions_into_database(self, storage_dir: str) -> None:
+            assert StorageCommands.pack([storage_dir]) == 2
+            assert os.listdir(storage_dir) == [GPTCLI_SESSION_STORE_FILENAME]
+            store = PackedStore(storage_dir)
+            assert store.session_uuids() == ["uuid-1", "uuid-2"]
+            assert store.read_file("uuid-1", "session.json") == (b"{}", False)
+            store.close()
+
+        def test_finishes_interrupted_pack(self, storage_dir: str) -> None:
+            store = PackedStore(storage_dir)
+            store.create_session("uuid-0")
+            store.close()
+            assert StorageCommands.pack([storage_dir]) == 2
+            store = PackedStore(storage_dir)
+            assert store.session_uuids() == ["uuid-0", "uuid-1", "uuid-2"]
+            store.close()
+
+        def test_skips_missing_directory(self, tmp_path: str) -> None:
+            assert StorageCommands.pack([os.path.join(str(tmp_path), "missing")]) == 0
+
+        def test_storage_reads_packed_sessions(self, tmp_path: str) -> None:
+            storage_dir = os.path.join(str(tmp_path), "chat")
+            os.makedirs(storage_dir)
+            factory = MessageFactory(provider=ProviderNames.MISTRAL.value)
+            messages = Messages()
+            messages.add(factory.user_message(role="user", content="Hello!", model="mistral-large-latest"))
+            storage = Storage(provider=ProviderNames.MISTRAL.value)
+            storage._chat_dir = storage_dir
+            storage.store_messages(messages)
+
+            StorageCommands.pack([storage_dir])
+
+            storage = Storage(provider=ProviderNames.MISTRAL.value)
+            storage._chat_dir = storage_dir
+            loaded = storage.extract_messages()
+            assert loaded is not None
+            assert [m.content for m in loaded] == ["Hello!"]
+
+    class TestUnpack:
+
+        def test_round_trip(self, storage_dir: str) -> None:
+            StorageCommands.pack([storage_dir])
+            assert StorageCommands.unpack([storage_dir]) == 2
+            assert not os.path.exists(os.path.join(storage_dir, GPTCLI_SESSION_STORE_FILENAME))
+            store = DirectoryStore(storage_dir)
+            assert store.session_uuids() == ["uuid-1", "uuid-2"]
+            assert store.read_file("uuid-2", "session.json") == (b"{}", False)
+
+        def test_skips_unpacked_directory(self, storage_dir: str) -> None:
+            assert StorageCommands.unpack([storage_dir]) == 0
+
+    class TestCliRouting:
+
+        def test_pack_command_parsed_for_all(self) -> None:
+            with patch("sys.argv", ["gptcli", "all", "pack"]):
+                parser = CommandParser()
+            assert parser.args.provider == "all"
+            assert parser.args.mode_name == ModeNames.PACK.value
+
+        def test_unpack_command_parsed_for_all(self) -> None:
+            with patch("sys.argv", ["gptcli", "all", "unpack"]):
+                parser = CommandParser()
+            assert parser.args.provider == "all"
+            assert parser.args.mode_name == ModeNames.UNPACK.value
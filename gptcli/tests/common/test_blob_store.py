@@ -0,0 +1,167 @@
+"""Holds all the tests for blob_store.py."""
+
+import os
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+from gptcli.src.common.blob_store import (
+    BlobStore,
+    blob_digest,
+    load_attachments,
+    store_attachments,
+)
+from gptcli.src.common.encryption import Encryption
+
+
+def _blob_files(blob_dir: str) -> list[str]:
+    return sorted(name for _, _, names in os.walk(blob_dir) for name in names if not name.startswith("refs.log"))
+
+
+class TestBlobStore:
+
+    @pytest.fixture
+    def encryption(self) -> Encryption:
+        return Encryption(key=os.urandom(32))
+
+    @pytest.fixture
+    def blobs(self, tmp_path: str) -> BlobStore:
+        return BlobStore(str(tmp_path), None)
+
+    class TestAdd:
+
+        def test_returns_the_digest_of_each_blob(self, blobs: BlobStore) -> None:
+            assert blobs.add("ocr/a", [b"one", b"two"]) == [blob_digest(b"one"), blob_digest(b"two")]
+
+        def test_blobs_can_be_read_back(self, blobs: BlobStore) -> None:
+            (digest,) = blobs.add("ocr/a", [b"image"])
+            assert blobs.get(digest) == b"image"
+
+        def test_identical_blobs_are_stored_once(self, blobs: BlobStore, tmp_path: str) -> None:
+            blobs.add("ocr/a", [b"image"])
+            blobs.add("ocr/b", [b"image", b"image"])
+            assert _blob_files(str(tmp_path)) == [blob_digest(b"image")]
+
+        def test_appends_references_without_reading_them(self, blobs: BlobStore) -> None:
+            blobs.add("ocr/a", [b"image"])
+            with patch.object(BlobStore, "_read_refs") as read_refs:
+                blobs.add("ocr/b", [b"image", b"other"])
+            read_refs.assert_not_called()
+            assert blobs.references(blob_digest(b"image")) == 2
+
+        def test_reference_is_recorded_before_the_blob(self, blobs: BlobStore, tmp_path: str) -> None:
+            with patch.object(BlobStore, "_write_blob", side_effect=OSError("disk full")), pytest.raises(OSError):
+                blobs.add("ocr/a", [b"image"])
+            assert blobs.references(blob_digest(b"image")) == 1
+            blobs.release("ocr/a")
+            assert blobs.references(blob_digest(b"image")) == 0
+
+        def test_counts_each_owner_once(self, blobs: BlobStore) -> None:
+            (digest,) = blobs.add("ocr/a", [b"image"])
+            blobs.add("ocr/a", [b"image"])
+            blobs.add("chat/b", [b"image"])
+            assert blobs.references(digest) == 2
+
+        def test_share_references_blobs_of_another_owner(self, blobs: BlobStore) -> None:
+            (digest,) = blobs.add("chat/a", [b"image"])
+            assert blobs.share("chat/b", "chat/a") == 1
+            blobs.release("chat/a")
+            assert blobs.get(digest) == b"image"
+            assert blobs.references(digest) == 1
+
+    class TestGet:
+
+        def test_returns_none_for_missing_blob(self, blobs: BlobStore) -> None:
+            assert blobs.get(blob_digest(b"missing")) is None
+
+        def test_returns_none_for_corrupt_blob(self, blobs: BlobStore, tmp_path: str) -> None:
+            (digest,) = blobs.add("ocr/a", [b"image"])
+            with open(os.path.join(str(tmp_path), digest[:2], digest), "wb") as fp:
+                fp.write(b"tampered")
+            assert blobs.get(digest) is None
+
+    class TestEncryption:
+
+        def test_blobs_are_encrypted_on_their_own(self, tmp_path: str, encryption: Encryption) -> None:
+            blobs = BlobStore(str(tmp_path), encryption)
+            (digest,) = blobs.add("ocr/a", [b"secret image"])
+            with open(os.path.join(str(tmp_path), digest[len("hmac-") :][:2], digest + ".enc"), "rb") as fp:
+                assert b"secret image" not in fp.read()
+            assert blobs.get(digest) == b"secret image"
+
+        def test_blobs_are_named_by_a_keyed_digest(self, tmp_path: str, encryption: Encryption) -> None:
+            (digest,) = BlobStore(str(tmp_path), encryption).add("ocr/a", [b"secret image"])
+            assert digest == blob_digest(b"secret image", encryption) != blob_digest(b"secret image")
+            assert blob_digest(b"secret image") not in str(_blob_files(str(tmp_path)))
+            other = Encryption(key=os.urandom(32))
+            assert blob_digest(b"secret image", other) != digest
+
+        def test_keyed_blob_is_read_once_decrypted(self, tmp_path: str, encryption: Encryption) -> None:
+            (digest,) = BlobStore(str(tmp_path), encryption).add("ocr/a", [b"secret image"])
+            for dirpath, _, names in os.walk(str(tmp_path)):
+                for name in names:
+                    if name == digest + ".enc":
+                        decrypted = encryption.decrypt_file(os.path.join(dirpath, name))
+                        assert decrypted is not None
+                        with open(os.path.join(dirpath, digest), "wb") as fp:
+                            fp.write(decrypted)
+                        os.remove(os.path.join(dirpath, name))
+            assert BlobStore(str(tmp_path), None).get(digest) == b"secret image"
+
+        def test_encrypted_blob_is_unreadable_without_key(self, tmp_path: str, encryption: Encryption) -> None:
+            (digest,) = BlobStore(str(tmp_path), encryption).add("ocr/a", [b"secret image"])
+            assert BlobStore(str(tmp_path), None).get(digest) is None
+
+    class TestRelease:
+
+        def test_deletes_blobs_no_longer_referenced(self, blobs: BlobStore) -> None:
+            (digest,) = blobs.add("ocr/a", [b"image"])
+            assert blobs.release("ocr/a") == 1
+            assert blobs.get(digest) is None
+
+        def test_keeps_blobs_referenced_by_other_owners(self, blobs: BlobStore) -> None:
+            (digest,) = blobs.add("ocr/a", [b"image"])
+            blobs.add("chat/b", [b"image"])
+            assert blobs.release("ocr/a") == 0
+            assert blobs.get(digest) == b"image"
+            assert blobs.references(digest) == 1
+
+        def test_keeps_the_digests_the_owner_still_references(self, blobs: BlobStore) -> None:
+            old, new = blobs.add("ocr/a", [b"old", b"new"])
+            assert blobs.release("ocr/a", keep=[new]) == 1
+            assert blobs.get(old) is None
+            assert blobs.get(new) == b"new"
+
+        def test_unknown_owner_deletes_nothing(self, blobs: BlobStore) -> None:
+            blobs.add("ocr/a", [b"image"])
+            assert blobs.release("ocr/unknown") == 0
+
+        def test_references_survive_compaction(self, blobs: BlobStore, monkeypatch: pytest.MonkeyPatch) -> None:
+            monkeypatch.setattr("gptcli.src.common.blob_store._COMPACTION_SLACK", 2)
+            (digest,) = blobs.add("ocr/a", [b"image"])
+            for owner in ("ocr/b", "ocr/c", "ocr/d"):
+                blobs.add(owner, [b"other"])
+                blobs.release(owner)
+            assert blobs.references(digest) == 1
+            assert blobs.get(digest) == b"image"
+
+    class TestAttachments:
+
+        def test_attachment_content_is_moved_to_the_blob_store(self, blobs: BlobStore) -> None:
+            messages: list[dict[str, Any]] = [
+                {"role": "user", "content": "hello"},
+                {"role": "user", "content": "file contents", "attachment": True},
+            ]
+            stored = store_attachments(messages, blobs, "chat/a")
+            assert stored[0] == messages[0]
+            assert stored[1]["content"] == ""
+            assert stored[1]["blob"] == blob_digest(b"file contents")
+
+        def test_attachments_round_trip(self, blobs: BlobStore) -> None:
+            messages: list[dict[str, Any]] = [{"role": "user", "content": "file contents", "attachment": True}]
+            assert load_attachments(store_attachments(messages, blobs, "chat/a"), blobs) == messages
+
+        def test_missing_blob_leaves_content_empty(self, blobs: BlobStore) -> None:
+            loaded = load_attachments([{"role": "user", "content": "", "blob": blob_digest(b"gone")}], blobs)
+            assert loaded == [{"role": "user", "content": ""}]
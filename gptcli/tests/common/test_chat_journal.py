@@ -0,0 +1,156 @@
+"""Holds all the tests for chat_journal.py."""
+
+import os
+
+import pytest
+
+from gptcli.constants import GPTCLI_JOURNAL_FILENAME
+from gptcli.src.common.chat_journal import (
+    ChatJournal,
+    expand_base,
+    read_journal,
+    replay_journal,
+)
+from gptcli.src.common.constants import ProviderNames
+from gptcli.src.common.encryption import (
+    ENVELOPE_HEADER_SIZE,
+    Encryption,
+    is_envelope,
+)
+from gptcli.src.common.message import MessageFactory, Messages
+from gptcli.src.common.session_store import (
+    DirectoryStore,
+    PackedStore,
+    SessionStore,
+)
+
+
+class TestChatJournal:
+
+    @pytest.fixture(params=["directory", "packed"])
+    def store(self, request: pytest.FixtureRequest, tmp_path: str) -> SessionStore:
+        store: SessionStore = (
+            DirectoryStore(str(tmp_path)) if request.param == "directory" else PackedStore(str(tmp_path))
+        )
+        store.create_session("uuid-1")
+        return store
+
+    @staticmethod
+    def _create_messages(*contents: str) -> Messages:
+        factory = MessageFactory(provider=ProviderNames.MISTRAL.value)
+        messages = Messages()
+        for content in contents:
+            messages.add(factory.user_message(role="user", content=content, model="mistral-large-latest"))
+        return messages
+
+    @staticmethod
+    def _contents(messages: list[dict[str, object]] | None) -> list[object]:
+        assert messages is not None
+        return [m["content"] for m in messages]
+
+    class TestSync:
+
+        def test_appends_only_new_messages(self, store: SessionStore) -> None:
+            journal = ChatJournal(store, "uuid-1", None)
+            messages = TestChatJournal._create_messages("one")
+            journal.sync(messages)
+            stored = store.read_file("uuid-1", GPTCLI_JOURNAL_FILENAME)
+            assert stored is not None
+            first = stored[0]
+
+            messages.add(MessageFactory(provider=ProviderNames.MISTRAL.value).user_message("user", "two", "m"))
+            journal.sync(messages)
+            journal.sync(messages)
+            stored = store.read_file("uuid-1", GPTCLI_JOURNAL_FILENAME)
+            assert stored is not None
+            assert stored[0].startswith(first)
+            assert TestChatJournal._contents(read_journal(store, "uuid-1", None)) == ["one", "two"]
+
+        def test_journals_removed_messages_as_reset(self, store: SessionStore) -> None:
+            journal = ChatJournal(store, "uuid-1", None)
+            messages = TestChatJournal._create_messages("one", "two", "three")
+            journal.sync(messages)
+            assert journal.reset is False
+            messages.flush_except({"nobody"})
+            journal.sync(messages)
+            assert journal.reset is True
+            assert TestChatJournal._contents(read_journal(store, "uuid-1", None)) == []
+
+        def test_encrypts_each_record(self, store: SessionStore) -> None:
+            encryption = Encryption(key=os.urandom(32))
+            journal = ChatJournal(store, "uuid-1", encryption)
+            journal.sync(TestChatJournal._create_messages("secret"))
+            stored = store.read_file("uuid-1", GPTCLI_JOURNAL_FILENAME)
+            assert stored is not None
+            assert stored[1] is True
+            assert b"secret" not in stored[0]
+            assert TestChatJournal._contents(read_journal(store, "uuid-1", encryption)) == ["secret"]
+            assert read_journal(store, "uuid-1", None) is None
+
+        def test_seals_records_with_a_data_key_wrapped_once(self, store: SessionStore) -> None:
+            encryption = Encryption(key=os.urandom(32))
+            journal = ChatJournal(store, "uuid-1", encryption)
+            messages = TestChatJournal._create_messages("one")
+            journal.sync(messages)
+            messages.add(MessageFactory(provider=ProviderNames.MISTRAL.value).user_message("user", "two", "m"))
+            journal.sync(messages)
+            stored = store.read_file("uuid-1", GPTCLI_JOURNAL_FILENAME)
+            assert stored is not None
+            assert is_envelope(stored[0])
+            assert not is_envelope(stored[0][ENVELOPE_HEADER_SIZE:])
+
+            new_encryption = Encryption(key=os.urandom(32))
+            header = encryption.rewrap(stored[0], new_encryption)
+            assert header is not None
+            store.write_file("uuid-1", GPTCLI_JOURNAL_FILENAME, header + stored[0][ENVELOPE_HEADER_SIZE:], True)
+            assert TestChatJournal._contents(read_journal(store, "uuid-1", new_encryption)) == ["one", "two"]
+
+        def test_remove_deletes_journal(self, store: SessionStore) -> None:
+            journal = ChatJournal(store, "uuid-1", None)
+            journal.sync(TestChatJournal._create_messages("one"))
+            journal.remove()
+            assert read_journal(store, "uuid-1", None) is None
+
+    class TestReplayJournal:
+
+        def test_reset_replaces_earlier_messages(self) -> None:
+            records: list[dict[str, object]] = [
+                {"op": "add", "message": {"content": "one"}},
+                {"op": "reset", "messages": [{"content": "kept"}]},
+                {"op": "add", "message": {"content": "two"}},
+            ]
+            assert TestChatJournal._contents(replay_journal(records)) == ["kept", "two"]
+
+        def test_skips_unknown_records(self) -> None:
+            assert replay_journal([{"op": "unknown"}]) == []
+
+        def test_base_merges_unloaded_messages(self) -> None:
+            source: list[dict[str, object]] = [
+                {"uuid": "s", "role": "system", "content": "sys"},
+                {"uuid": "1", "role": "user", "content": "one"},
+                {"uuid": "2", "role": "user", "content": "two"},
+            ]
+            records: list[dict[str, object]] = [
+                {"op": "base", "session": "uuid-0", "count": 2, "anchor": "2"},
+                {"op": "reset", "messages": [source[0], source[2]]},
+                {"op": "add", "message": {"uuid": "3", "role": "user", "content": "three"}},
+            ]
+            merged = replay_journal(records, lambda uuid: source if uuid == "uuid-0" else None)
+            assert TestChatJournal._contents(merged) == ["sys", "one", "two", "three"]
+            assert TestChatJournal._contents(replay_journal(records)) == ["sys", "two", "three"]
+
+    class TestExpandBase:
+
+        def test_drops_removed_system_messages(self) -> None:
+            source: list[dict[str, object]] = [
+                {"uuid": "s", "role": "system", "content": "sys"},
+                {"uuid": "1", "role": "user", "content": "one"},
+                {"uuid": "2", "role": "user", "content": "two"},
+            ]
+            base: dict[str, object] = {"op": "base", "session": "uuid-0", "count": 2, "anchor": "2"}
+            merged = expand_base(base, [source[2]], lambda _: source)
+            assert TestChatJournal._contents(merged) == ["one", "two"]
+
+        def test_unreadable_base_keeps_loaded_messages(self) -> None:
+            base: dict[str, object] = {"op": "base", "session": "uuid-0", "count": 2, "anchor": "2"}
+            assert TestChatJournal._contents(expand_base(base, [{"content": "two"}], lambda _: None)) == ["two"]
@@ -0,0 +1,61 @@
+"""Holds all the tests for compression.py."""
+
+import pytest
+
+from gptcli.src.common.compression import (
+    _MAGIC,
+    CODEC_LZMA,
+    CODEC_ZLIB,
+    CODEC_ZSTD,
+    available_codecs,
+    compress,
+    decompress,
+    is_compressed,
+)
+
+
+class TestCompression:
+
+    _TEXT: bytes = b"# Heading\n\nSome Markdown text that repeats. " * 50
+
+    class TestCompress:
+
+        @pytest.mark.parametrize("codec", [CODEC_ZLIB, CODEC_LZMA])
+        def test_roundtrip(self, codec: str) -> None:
+            compressed = compress(TestCompression._TEXT, codec)
+            assert is_compressed(compressed)
+            assert len(compressed) < len(TestCompression._TEXT)
+            assert decompress(compressed) == TestCompression._TEXT
+
+        def test_data_that_does_not_shrink_is_stored_as_is(self) -> None:
+            assert compress(b"short", CODEC_ZLIB) == b"short"
+
+        def test_data_starting_with_the_magic_is_wrapped(self) -> None:
+            data = _MAGIC + b"x"
+            compressed = compress(data, CODEC_ZLIB)
+            assert compressed != data
+            assert decompress(compressed) == data
+
+        def test_raises_on_unknown_codec(self) -> None:
+            with pytest.raises(ValueError):
+                compress(TestCompression._TEXT, "brotli")
+
+        def test_zstd_is_only_available_when_installed(self) -> None:
+            if CODEC_ZSTD in available_codecs():
+                assert decompress(compress(TestCompression._TEXT, CODEC_ZSTD)) == TestCompression._TEXT
+            else:
+                with pytest.raises(ValueError):
+                    compress(TestCompression._TEXT, CODEC_ZSTD)
+
+    class TestDecompress:
+
+        def test_data_without_header_is_returned_unchanged(self) -> None:
+            assert decompress(b'{"messages": []}') == b'{"messages": []}'
+
+        def test_returns_none_for_unknown_version(self) -> None:
+            compressed = compress(TestCompression._TEXT, CODEC_ZLIB)
+            assert decompress(compressed[:4] + b"\xff" + compressed[5:]) is None
+
+        def test_returns_none_for_corrupt_data(self) -> None:
+            compressed = compress(TestCompression._TEXT, CODEC_ZLIB)
+            assert decompress(compressed[:-10]) is None
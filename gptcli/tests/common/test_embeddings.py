@@ -0,0 +1,283 @@
+"""Tests for gptcli/src/common/embeddings.py."""
+
+import json
+import os
+import threading
+import uuid
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+from gptcli.constants import (
+    GPTCLI_MANIFEST_FILENAME,
+    GPTCLI_METADATA_FILENAME,
+    GPTCLI_SESSION_FILENAME,
+)
+from gptcli.src.common.embeddings import (
+    _EMBEDDINGS_FILENAME,
+    _ENCRYPTED_EMBEDDINGS_FILENAME,
+    EmbeddingClient,
+    EmbeddingError,
+    EmbeddingIndex,
+    SemanticFTS,
+    _load_numpy,
+)
+from gptcli.src.common.encryption import Encryption
+from gptcli.src.common.fts import ChatFTS, OcrFTS
+
+_needs_numpy = pytest.mark.skipif(_load_numpy() is None, reason="requires numpy")
+
+# Words of the same topic share a dimension, so the stand-in embeds synonyms alike.
+_TOPICS: list[set[str]] = [
+    {"car", "automobile", "vehicle", "engine", "tyres"},
+    {"bread", "bake", "oven", "dough", "flour"},
+    {"python", "code", "function", "bug", "compiler"},
+]
+
+
+def _embed(text: str) -> list[float]:
+    words = text.lower().split()
+    return [float(sum(w.strip(".,?") in topic for w in words)) for topic in _TOPICS] + [0.1]
+
+
+class _StandIn:
+    """A local server that stands in for a provider's embeddings endpoint."""
+
+    def __init__(self) -> None:
+        self.inputs: list[list[str]] = []
+        self.status: int = 200
+        stand_in = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:
+                body: dict[str, Any] = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                stand_in.inputs.append(body["input"])
+                # Entries are sent in reverse to check that they are put back in order by index.
+                data = [{"index": i, "embedding": _embed(t)} for i, t in enumerate(body["input"])][::-1]
+                payload = json.dumps({"model": body["model"], "data": data}).encode("utf-8")
+                self.send_response(stand_in.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return None
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/embeddings"
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+
+    @property
+    def embedded(self) -> list[str]:
+        """Every text embedded so far, in order."""
+        return [text for inputs in self.inputs for text in inputs]
+
+    def client(self, model: str = "") -> EmbeddingClient:
+        return EmbeddingClient("mistral", "key", url=self.url, model=model)
+
+
+@pytest.fixture
+def stand_in() -> Iterator[_StandIn]:
+    server = _StandIn()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+def _create_session(chat_dir: str, content: str, created: float = 1000.0) -> str:
+    """Create a single-message chat session and its manifest entry."""
+    session_uuid = str(uuid.uuid4())
+    os.makedirs(os.path.join(chat_dir, session_uuid))
+    with open(os.path.join(chat_dir, session_uuid, GPTCLI_SESSION_FILENAME), "w", encoding="utf-8") as fp:
+        json.dump({"messages": [{"role": "user", "content": content}]}, fp)
+    with open(os.path.join(chat_dir, session_uuid, GPTCLI_METADATA_FILENAME), "w", encoding="utf-8") as fp:
+        json.dump({"chat": {"uuid": session_uuid, "created": created, "model": "m", "provider": "mistral"}}, fp)
+    manifest_path = os.path.join(chat_dir, GPTCLI_MANIFEST_FILENAME)
+    entries: list[dict[str, Any]] = []
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as fp:
+            entries = json.load(fp)
+    entries.append({"uuid": session_uuid, "created": created})
+    with open(manifest_path, "w", encoding="utf-8") as fp:
+        json.dump(entries, fp)
+    return session_uuid
+
+
+def _build(chat_dir: str, client: EmbeddingClient, encryption: Encryption | None = None) -> EmbeddingIndex:
+    index = EmbeddingIndex(client)
+    fts = ChatFTS()
+    fts.build(chat_dir, encryption)
+    index.build(chat_dir, encryption, fts.session_text)
+    fts.close()
+    return index
+
+
+class TestEmbeddingClient:
+
+    def test_returns_one_embedding_per_text_in_order(self, stand_in: _StandIn) -> None:
+        assert stand_in.client().embed(["car", "oven"]) == [_embed("car"), _embed("oven")]
+
+    def test_sends_nothing_for_no_texts(self, stand_in: _StandIn) -> None:
+        assert stand_in.client().embed([]) == []
+        assert stand_in.inputs == []
+
+    def test_raises_on_http_error(self, stand_in: _StandIn) -> None:
+        stand_in.status = 401
+        with pytest.raises(EmbeddingError):
+            stand_in.client().embed(["car"])
+
+    def test_raises_when_unreachable(self) -> None:
+        with pytest.raises(EmbeddingError):
+            EmbeddingClient("openai", "key", url="http://127.0.0.1:9/v1/embeddings").embed(["car"])
+
+    def test_unsupported_provider_raises(self) -> None:
+        with pytest.raises(NotImplementedError):
+            EmbeddingClient("unknown", "key")
+
+
+@_needs_numpy
+class TestEmbeddingIndex:
+
+    def test_requires_numpy(self, stand_in: _StandIn) -> None:
+        with patch("gptcli.src.common.embeddings._load_numpy", return_value=None):
+            with pytest.raises(ValueError, match="numpy"):
+                EmbeddingIndex(stand_in.client())
+
+    def test_nearest_ranks_by_meaning(self, tmp_path: str, stand_in: _StandIn) -> None:
+        chat_dir = str(tmp_path)
+        car = _create_session(chat_dir, "my automobile makes a noise")
+        bread = _create_session(chat_dir, "how long to bake dough")
+        index = _build(chat_dir, stand_in.client())
+
+        nearest = index.nearest(["vehicle engine", "flour oven"], k=1)
+        assert [[u for u, _ in hits] for hits in nearest] == [[car], [bread]]
+        assert nearest[0][0][1] == pytest.approx(0.99, abs=0.01)
+        assert [u for u, _ in index.nearest(["car"])[0]] == [car, bread]
+
+    def test_next_build_only_embeds_new_sessions(self, tmp_path: str, stand_in: _StandIn) -> None:
+        chat_dir = str(tmp_path)
+        _create_session(chat_dir, "my automobile makes a noise")
+        _build(chat_dir, stand_in.client())
+        _create_session(chat_dir, "how long to bake dough", created=2000.0)
+
+        index = _build(chat_dir, stand_in.client())
+        assert len(index) == 2
+        assert stand_in.embedded == ["my automobile makes a noise", "how long to bake dough"]
+
+    def test_deleted_sessions_are_dropped(self, tmp_path: str, stand_in: _StandIn) -> None:
+        chat_dir = str(tmp_path)
+        _create_session(chat_dir, "my automobile makes a noise")
+        kept = _create_session(chat_dir, "how long to bake dough")
+        _build(chat_dir, stand_in.client())
+        manifest_path = os.path.join(chat_dir, GPTCLI_MANIFEST_FILENAME)
+        with open(manifest_path, "r", encoding="utf-8") as fp:
+            entries = [e for e in json.load(fp) if e["uuid"] == kept]
+        with open(manifest_path, "w", encoding="utf-8") as fp:
+            json.dump(entries, fp)
+
+        index = _build(chat_dir, stand_in.client())
+        assert len(stand_in.embedded) == 2
+        assert [u for u, _ in index.nearest(["car"])[0]] == [kept]
+
+    def test_other_model_embeds_every_session_again(self, tmp_path: str, stand_in: _StandIn) -> None:
+        chat_dir = str(tmp_path)
+        _create_session(chat_dir, "my automobile makes a noise")
+        _build(chat_dir, stand_in.client())
+        _build(chat_dir, stand_in.client(model="other-embed"))
+        assert len(stand_in.embedded) == 2
+
+    def test_encrypted_index_is_sealed(self, tmp_path: str, stand_in: _StandIn) -> None:
+        chat_dir = str(tmp_path)
+        session_uuid = _create_session(chat_dir, "my automobile makes a noise")
+        encryption = Encryption(key=os.urandom(32))
+        _build(chat_dir, stand_in.client(), encryption)
+
+        assert not os.path.exists(os.path.join(chat_dir, _EMBEDDINGS_FILENAME))
+        with open(os.path.join(chat_dir, _ENCRYPTED_EMBEDDINGS_FILENAME), "rb") as fp:
+            assert session_uuid.encode("utf-8") not in fp.read()
+        index = _build(chat_dir, stand_in.client(), encryption)
+        assert len(index) == 1
+        assert len(stand_in.embedded) == 1
+
+    def test_failed_request_keeps_what_was_embedded(self, tmp_path: str, stand_in: _StandIn) -> None:
+        chat_dir = str(tmp_path)
+        _create_session(chat_dir, "my automobile makes a noise")
+        stand_in.status = 503
+        assert len(_build(chat_dir, stand_in.client())) == 0
+        stand_in.status = 200
+        assert len(_build(chat_dir, stand_in.client())) == 1
+
+
+@_needs_numpy
+class TestSemanticFTS:
+
+    @pytest.fixture
+    def chat_dir(self, tmp_path: str) -> str:
+        chat_dir = str(tmp_path)
+        _create_session(chat_dir, "my automobile makes a noise", created=1000.0)
+        _create_session(chat_dir, "how long to bake dough", created=2000.0)
+        _create_session(chat_dir, "a car and its tyres", created=3000.0)
+        return chat_dir
+
+    @staticmethod
+    def _semantic(chat_dir: str, client: EmbeddingClient) -> SemanticFTS[Any]:
+        fts = ChatFTS()
+        fts.build(chat_dir, encryption=None)
+        embeddings = EmbeddingIndex(client)
+        embeddings.build(chat_dir, None, fts.session_text)
+        return SemanticFTS(fts, embeddings)
+
+    def test_finds_sessions_in_other_words(self, chat_dir: str, stand_in: _StandIn) -> None:
+        semantic = self._semantic(chat_dir, stand_in.client())
+        assert semantic.embed_query("car")
+        hits = semantic.search("car")
+        contents = [h.snippets[0].content for h in hits]
+        assert contents[:2] == ["a car and its tyres", "my automobile makes a noise"]
+        assert hits[0].score < hits[1].score < hits[2].score <= 0
+
+    def test_respects_facets(self, chat_dir: str, stand_in: _StandIn) -> None:
+        semantic = self._semantic(chat_dir, stand_in.client())
+        semantic.embed_query("car before:1970-01-01")
+        assert semantic.search("car before:1970-01-01") == []
+
+    def test_search_sends_nothing_to_the_endpoint(self, chat_dir: str, stand_in: _StandIn) -> None:
+        semantic = self._semantic(chat_dir, stand_in.client())
+        requests = len(stand_in.inputs)
+        assert [h.snippets[0].content for h in semantic.search("car")] == ["a car and its tyres"]
+        assert len(stand_in.inputs) == requests
+        assert semantic.embed_query("car")
+        assert not semantic.embed_query("car")
+        assert stand_in.inputs[requests:] == [["car"]]
+
+    def test_falls_back_to_full_text_without_embeddings(self, chat_dir: str, stand_in: _StandIn) -> None:
+        semantic = self._semantic(chat_dir, stand_in.client())
+        stand_in.status = 500
+        assert not semantic.embed_query("car")
+        assert [h.snippets[0].content for h in semantic.search("car")] == ["a car and its tyres"]
+
+    def test_browse_is_full_text(self, chat_dir: str, stand_in: _StandIn) -> None:
+        semantic = self._semantic(chat_dir, stand_in.client())
+        assert len(semantic.search("")) == 3
+        assert stand_in.inputs == [["my automobile makes a noise", "how long to bake dough", "a car and its tyres"]]
+
+    def test_embeds_ocr_documents(self, tmp_path: str, stand_in: _StandIn) -> None:
+        ocr_dir = str(tmp_path)
+        os.makedirs(os.path.join(ocr_dir, "doc"))
+        with open(os.path.join(ocr_dir, "doc", "document.md"), "w", encoding="utf-8") as fp:
+            fp.write("Recipe: knead the dough")
+        with open(os.path.join(ocr_dir, "doc", GPTCLI_METADATA_FILENAME), "w", encoding="utf-8") as fp:
+            json.dump({"ocr": {"page_count": 1}, "output": {"markdown_file": "document.md"}}, fp)
+        with open(os.path.join(ocr_dir, GPTCLI_MANIFEST_FILENAME), "w", encoding="utf-8") as fp:
+            json.dump([{"uuid": "doc", "created": 5000.0}], fp)
+        fts = OcrFTS()
+        fts.build(ocr_dir, encryption=None)
+        embeddings = EmbeddingIndex(stand_in.client())
+        embeddings.build(ocr_dir, None, fts.session_text)
+
+        semantic = SemanticFTS(fts, embeddings)
+        semantic.embed_query("bread oven")
+        assert [h.uuid for h in semantic.search("bread oven")] == ["doc"]
@@ -1,5 +1,6 @@
 """Holds all the tests for encryption.py."""
 
+import io
 import os
 
 import pytest
@@ -7,8 +8,12 @@ import pytest
 from gptcli.src.common.encryption import (
     _NONCE_SIZE,
     _SALT_SIZE,
+    _STREAM_HEADER,
     _TAG_SIZE,
+    ENVELOPE_HEADER_SIZE,
+    DecryptionError,
     Encryption,
+    is_envelope,
 )
 
 
@@ -56,6 +61,18 @@ class TestEncryption:
             assert isinstance(result, bytes)
             assert len(result) == _NONCE_SIZE + _TAG_SIZE
 
+        def test_compressed_output_is_smaller_for_repetitive_input(self, encryption: Encryption) -> None:
+            plaintext = b'{"role": "user", "content": "hello"}' * 100
+            ciphertext = encryption.encrypt_envelope(plaintext)
+            assert len(ciphertext) < len(plaintext)
+            assert encryption.decrypt(ciphertext) == plaintext
+
+        def test_compression_can_be_disabled(self) -> None:
+            encryption = Encryption(key=os.urandom(32), codec=None)
+            plaintext = b"a" * 1000
+            ciphertext = encryption.encrypt_envelope(plaintext)
+            assert len(ciphertext) == ENVELOPE_HEADER_SIZE + len(plaintext) + _NONCE_SIZE + _TAG_SIZE
+
     class TestHasEncryptedContent:
 
         def test_returns_true_for_minimum_valid_length(self) -> None:
@@ -146,6 +163,123 @@ class TestEncryption:
             with pytest.raises(FileNotFoundError):
                 encryption.encrypt_file("/nonexistent/path/file.txt")
 
+    class TestStream:
+
+        @pytest.fixture
+        def encryption(self, monkeypatch: pytest.MonkeyPatch) -> Encryption:
+            monkeypatch.setattr("gptcli.src.common.encryption._STREAM_CHUNK_SIZE", 16)
+            return Encryption(key=os.urandom(32), codec=None)
+
+        @staticmethod
+        def _seal(encryption: Encryption, plaintext: bytes, compressed: bool = False) -> bytes:
+            sealed = io.BytesIO()
+            encryption.encrypt_stream(io.BytesIO(plaintext), sealed, compressed=compressed)
+            return sealed.getvalue()
+
+        @pytest.mark.parametrize("size", [0, 1, 16, 32, 100])
+        def test_roundtrip(self, encryption: Encryption, size: int) -> None:
+            plaintext = os.urandom(size)
+            sealed = self._seal(encryption, plaintext)
+            assert b"".join(encryption.decrypt_stream(io.BytesIO(sealed))) == plaintext
+            assert encryption.decrypt(sealed) == plaintext
+
+        def test_yields_one_piece_per_chunk(self, encryption: Encryption) -> None:
+            pieces = list(encryption.decrypt_stream(io.BytesIO(self._seal(encryption, b"x" * 40))))
+            assert [len(p) for p in pieces] == [16, 16, 8]
+
+        def test_compressed_roundtrip(self, monkeypatch: pytest.MonkeyPatch) -> None:
+            monkeypatch.setattr("gptcli.src.common.encryption._STREAM_CHUNK_SIZE", 16)
+            encryption = Encryption(key=os.urandom(32))
+            plaintext = b"repeated text " * 100
+            sealed = self._seal(encryption, plaintext, compressed=True)
+            assert len(sealed) < len(plaintext)
+            assert encryption.decrypt(sealed) == plaintext
+
+        def test_detects_truncation_at_a_chunk_boundary(self, encryption: Encryption) -> None:
+            sealed = self._seal(encryption, b"x" * 40)
+            truncated = sealed[: len(sealed) - (8 + _TAG_SIZE)]
+            with pytest.raises(DecryptionError):
+                list(encryption.decrypt_stream(io.BytesIO(truncated)))
+            assert encryption.decrypt(truncated) is None
+
+        def test_detects_reordered_chunks(self, encryption: Encryption) -> None:
+            sealed = self._seal(encryption, b"a" * 16 + b"b" * 16 + b"c")
+            header, chunk = _STREAM_HEADER.size, 16 + _TAG_SIZE
+            first, second = sealed[header : header + chunk], sealed[header + chunk : header + 2 * chunk]
+            swapped = sealed[:header] + second + first + sealed[header + 2 * chunk :]
+            assert encryption.decrypt(swapped) is None
+
+        def test_detects_tampering(self, encryption: Encryption) -> None:
+            sealed = bytearray(self._seal(encryption, b"x" * 40))
+            sealed[-1] ^= 0xFF
+            assert encryption.decrypt(bytes(sealed)) is None
+
+        def test_reads_single_shot_ciphertexts(self, encryption: Encryption) -> None:
+            sealed = encryption.encrypt(b"legacy data")
+            assert list(encryption.decrypt_stream(io.BytesIO(sealed))) == [b"legacy data"]
+
+        def test_large_compressed_payloads_are_sealed_as_streams(self, encryption: Encryption) -> None:
+            plaintext = os.urandom(100)
+            sealed = encryption.encrypt_envelope(plaintext)
+            assert sealed[ENVELOPE_HEADER_SIZE:].startswith(b"\x00GPS")
+            assert encryption.decrypt(sealed) == plaintext
+
+    class TestEnvelope:
+
+        @pytest.fixture
+        def encryption(self) -> Encryption:
+            return Encryption(key=os.urandom(32))
+
+        def test_whole_files_are_sealed_behind_an_envelope_header(self, encryption: Encryption) -> None:
+            assert is_envelope(encryption.encrypt_envelope(b"file"))
+            assert not is_envelope(encryption.encrypt(b"frame"))
+
+        def test_each_file_has_its_own_data_key(self, encryption: Encryption) -> None:
+            first = encryption.encrypt_envelope(b"file")
+            second = encryption.encrypt_envelope(b"file")
+            assert first[:ENVELOPE_HEADER_SIZE] != second[:ENVELOPE_HEADER_SIZE]
+
+        @pytest.mark.parametrize("size", [10, 200_000])
+        def test_rewrapped_file_decrypts_with_the_new_key_only(self, encryption: Encryption, size: int) -> None:
+            plaintext = os.urandom(size)
+            sealed = encryption.encrypt_envelope(plaintext)
+            new_encryption = Encryption(key=os.urandom(32))
+            header = encryption.rewrap(sealed, new_encryption)
+            assert header is not None and len(header) == ENVELOPE_HEADER_SIZE
+            rewrapped = header + sealed[ENVELOPE_HEADER_SIZE:]
+            assert new_encryption.decrypt(rewrapped) == plaintext
+            assert b"".join(new_encryption.decrypt_stream(io.BytesIO(rewrapped))) == plaintext
+            assert encryption.decrypt(rewrapped) is None
+
+        def test_rewrap_rejects_the_wrong_key(self, encryption: Encryption) -> None:
+            sealed = Encryption(key=os.urandom(32)).encrypt_envelope(b"file")
+            assert encryption.rewrap(sealed, Encryption(key=os.urandom(32))) is None
+
+        def test_rewrap_rejects_data_without_an_envelope(self, encryption: Encryption) -> None:
+            assert encryption.rewrap(encryption.encrypt(b"frame"), Encryption(key=os.urandom(32))) is None
+
+        def test_tampered_header_fails_to_decrypt(self, encryption: Encryption) -> None:
+            sealed = bytearray(encryption.encrypt_envelope(b"file"))
+            sealed[ENVELOPE_HEADER_SIZE - 1] ^= 0xFF
+            assert encryption.decrypt(bytes(sealed)) is None
+            with pytest.raises(DecryptionError):
+                list(encryption.decrypt_stream(io.BytesIO(bytes(sealed))))
+
+        def test_encrypted_files_have_an_envelope(self, encryption: Encryption, tmp_path: str) -> None:
+            filepath = os.path.join(str(tmp_path), "test.txt")
+            with open(filepath, "wb") as f:
+                f.write(b"hello")
+            encryption.encrypt_file(filepath)
+            with open(filepath + ".enc", "rb") as f:
+                assert is_envelope(f.read())
+            assert encryption.decrypt_file(filepath + ".enc") == b"hello"
+
+        def test_reads_files_sealed_before_envelopes(self, encryption: Encryption) -> None:
+            sealed = io.BytesIO()
+            encryption.encrypt_stream(io.BytesIO(b"legacy " * 20_000), sealed)
+            assert encryption.decrypt(sealed.getvalue()) == b"legacy " * 20_000
+            assert encryption.decrypt(encryption.encrypt(b"legacy")) == b"legacy"
+
     class TestDecryptFile:
 
         @pytest.fixture
@@ -169,6 +303,20 @@ class TestEncryption:
             encryption.decrypt_file(filepath + ".enc")
             assert not os.path.exists(filepath)
 
+        def test_reads_files_written_without_compression(self, encryption: Encryption, tmp_path: str) -> None:
+            filepath = os.path.join(str(tmp_path), "test.txt.enc")
+            with open(filepath, "wb") as f:
+                f.write(encryption.encrypt(b"hello " * 100))
+            assert encryption.decrypt_file(filepath) == b"hello " * 100
+
+        def test_compresses_the_file(self, encryption: Encryption, tmp_path: str) -> None:
+            filepath = os.path.join(str(tmp_path), "test.txt")
+            with open(filepath, "wb") as f:
+                f.write(b"hello " * 100)
+            encryption.encrypt_file(filepath)
+            assert os.path.getsize(filepath + ".enc") < 600
+            assert encryption.decrypt_file(filepath + ".enc") == b"hello " * 100
+
         def test_returns_none_on_nonexistent_file(self, encryption: Encryption) -> None:
             assert encryption.decrypt_file("/nonexistent/path/file.txt.enc") is None
 
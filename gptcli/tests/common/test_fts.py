@@ -3,9 +3,13 @@
 import json
 import os
 import shutil
+import sqlite3
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime
 from typing import Any
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -14,15 +18,27 @@ from gptcli.constants import (
     GPTCLI_METADATA_FILENAME,
     GPTCLI_SESSION_FILENAME,
 )
+from gptcli.src.commands.storage_commands import StorageCommands
+from gptcli.src.common.encryption import Encryption
 from gptcli.src.common.fts import (
     _DB_FILENAME,
+    _DELTA_FILENAME,
+    _ENCRYPTED_DB_FILENAME,
     ChatFTS,
     MessageSnippet,
     OcrFTS,
     OcrHit,
+    SearchSource,
     SessionHit,
+    UnifiedFTS,
+    _split_filters,
+    is_browse_query,
+    is_substring_query,
+    match_expression,
+    query_terms,
     tokenize,
 )
+from gptcli.src.common.session_store import open_session_store
 
 
 def _write_json(filepath: str, data: Any) -> None:
@@ -59,6 +75,52 @@ def _create_session(
     return session_uuid
 
 
+def _write_legacy_chat_index(
+    conn: sqlite3.Connection, session_uuid: str, content: str, stamp: str, contentless: bool = False
+) -> None:
+    """Write a one-session chat index in an earlier schema, with one full-text row per session.
+
+    The full-text table stored the session text until it was made contentless, keyed by a sessions id.
+    """
+    if contentless:
+        conn.executescript(
+            """
+            CREATE TABLE sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, uuid TEXT NOT NULL UNIQUE, created REAL NOT NULL,
+                model TEXT NOT NULL, provider TEXT NOT NULL, message_count INTEGER NOT NULL,
+                stamp TEXT NOT NULL DEFAULT ''
+            );
+            CREATE VIRTUAL TABLE sessions_fts USING fts5(content, content='', tokenize='unicode61');
+            """
+        )
+        conn.execute(
+            "INSERT INTO sessions VALUES (1, ?, 1000.0, 'test-model', 'mistral', 1, ?)", (session_uuid, stamp)
+        )
+        conn.execute("INSERT INTO sessions_fts(rowid, content) VALUES (1, ?)", (content,))
+    else:
+        conn.executescript(
+            """
+            CREATE TABLE sessions (
+                uuid TEXT PRIMARY KEY, created REAL NOT NULL, model TEXT NOT NULL,
+                provider TEXT NOT NULL, message_count INTEGER NOT NULL, stamp TEXT NOT NULL DEFAULT ''
+            );
+            CREATE VIRTUAL TABLE sessions_fts USING fts5(uuid UNINDEXED, content, tokenize='unicode61');
+            """
+        )
+        conn.execute("INSERT INTO sessions VALUES (?, 1000.0, 'test-model', 'mistral', 1, ?)", (session_uuid, stamp))
+        conn.execute("INSERT INTO sessions_fts VALUES (?, ?)", (session_uuid, content))
+    conn.execute(
+        """
+        CREATE TABLE messages (
+            session_uuid TEXT NOT NULL, position INTEGER NOT NULL, role TEXT NOT NULL,
+            content TEXT NOT NULL, PRIMARY KEY (session_uuid, position)
+        )
+        """
+    )
+    conn.execute("INSERT INTO messages VALUES (?, 0, 'user', ?)", (session_uuid, content))
+    conn.commit()
+
+
 class TestChatFTS:
 
     class TestBuild:
@@ -92,6 +154,7 @@ class TestChatFTS:
 
             mock_enc = MagicMock()
             mock_enc.decrypt_file.return_value = None  # can't read encrypted files
+            mock_enc.encrypt_envelope.side_effect = lambda data: data
             fts = ChatFTS()
             fts.build(chat_dir, encryption=mock_enc)
             assert not os.path.exists(os.path.join(chat_dir, _DB_FILENAME))
@@ -163,6 +226,7 @@ class TestChatFTS:
             _write_json(os.path.join(chat_dir, GPTCLI_MANIFEST_FILENAME), [{"uuid": session_uuid, "created": 1000.0}])
 
             mock_enc = MagicMock()
+            mock_enc.encrypt_envelope.side_effect = lambda data: data
             mock_enc.decrypt_file.side_effect = lambda p: (
                 session_data if GPTCLI_SESSION_FILENAME in p else metadata_data
             )
@@ -232,13 +296,13 @@ class TestChatFTS:
             fts.build(chat_dir, encryption=None)
             assert len(fts.search("common")) == 50
 
-        def test_empty_query_returns_all_indexed_sessions(self, tmp_path: str) -> None:
+        def test_empty_query_returns_first_page_of_sessions(self, tmp_path: str) -> None:
             chat_dir = str(tmp_path)
             for i in range(60):
                 _create_session(chat_dir, [{"role": "user", "content": "hello"}], created=float(i))
             fts = ChatFTS()
             fts.build(chat_dir, encryption=None)
-            assert len(fts.search("")) == 60
+            assert [h.created for h in fts.search("")] == [float(i) for i in range(59, 9, -1)]
 
         def test_result_has_correct_metadata(self, tmp_path: str) -> None:
             chat_dir = str(tmp_path)
@@ -278,6 +342,62 @@ class TestChatFTS:
             assert all(isinstance(s, MessageSnippet) for s in snippets)
             assert any("quantum" in s.content.lower() for s in snippets)
 
+        def test_hit_points_at_best_matching_message(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            messages = [{"role": "user", "content": f"filler message {i}"} for i in range(5)]
+            messages[3] = {"role": "assistant", "content": "quantum entanglement explained"}
+            _create_session(chat_dir, messages)
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            hit = fts.search("entanglement")[0]
+            assert hit.position == 3
+            assert [(s.role, s.position) for s in hit.snippets] == [("assistant", 3)]
+
+        def test_requires_all_tokens_in_one_message(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(
+                chat_dir,
+                [{"role": "user", "content": "explain quantum"}, {"role": "assistant", "content": "entanglement is"}],
+            )
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            assert fts.search("quantum entanglement") == []
+
+        def test_ranks_sessions_by_their_best_message(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            diluted = _create_session(
+                chat_dir, [{"role": "user", "content": "quantum " + "filler " * 50}], created=2000.0
+            )
+            focused = _create_session(chat_dir, [{"role": "user", "content": "quantum quantum"}], created=1000.0)
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            assert [h.uuid for h in fts.search("quantum")] == [focused, diluted]
+
+        def test_shows_at_most_two_matching_messages_per_hit(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": f"quantum {i}"} for i in range(5)])
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            hits = fts.search("quantum")
+            assert len(hits) == 1
+            assert len(hits[0].snippets) == 2
+
+        def test_snippet_is_excerpt_around_the_match(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(
+                chat_dir, [{"role": "user", "content": "filler " * 100 + "Quantum physics " + "tail " * 100}]
+            )
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            snippet = fts.search("quantum")[0].snippets[0]
+            assert len(snippet.content) <= 123
+            assert [snippet.content[a:b] for a, b in snippet.highlights] == ["Quantum"]
+
+        def test_browsing_has_no_position_or_highlights(self, populated_fts: ChatFTS) -> None:
+            hits = populated_fts.search("")
+            assert all(h.position is None for h in hits)
+            assert all(not s.highlights for h in hits for s in h.snippets)
+
         def test_snippets_are_single_line(self, tmp_path: str) -> None:
             chat_dir = str(tmp_path)
             _create_session(
@@ -291,6 +411,287 @@ class TestChatFTS:
             for snippet in results[0].snippets:
                 assert "\n" not in snippet.content
 
+    class TestBrowse:
+
+        def test_pages_cover_history_once_in_recency_order(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            for i in range(7):
+                # Pairs of sessions share a timestamp, so pages must also be keyed on the UUID.
+                _create_session(chat_dir, [{"role": "user", "content": "hello"}], created=float(i // 2))
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            with patch("gptcli.src.common.fts._BROWSE_PAGE_SIZE", 3):
+                pages: list[list[SessionHit]] = [fts.browse()]
+                while pages[-1]:
+                    pages.append(fts.browse((pages[-1][-1].created, pages[-1][-1].uuid)))
+            assert [len(page) for page in pages] == [3, 3, 1, 0]
+            hits = [h for page in pages for h in page]
+            assert [(h.created, h.uuid) for h in hits] == sorted(((h.created, h.uuid) for h in hits), reverse=True)
+            assert len({h.uuid for h in hits}) == 7
+
+        def test_page_is_read_through_created_index(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "hello"}])
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            plan = fts._conn.execute(
+                "EXPLAIN QUERY PLAN SELECT uuid FROM sessions WHERE (created, uuid) < (?, ?) "
+                "ORDER BY created DESC, uuid DESC LIMIT 50",
+                (1000.0, ""),
+            ).fetchall()
+            assert any("sessions_created" in row[-1] for row in plan)
+            assert not any("TEMP B-TREE" in row[-1] for row in plan)
+
+        def test_snippets_are_first_user_and_assistant_messages(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(
+                chat_dir,
+                [
+                    {"role": "system", "content": ""},
+                    {"role": "user", "content": "first question"},
+                    {"role": "assistant", "content": "first answer"},
+                    {"role": "user", "content": "second question"},
+                    {"role": "assistant", "content": "second answer"},
+                ],
+            )
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            snippets = fts.browse()[0].snippets
+            assert [(s.role, s.content, s.position) for s in snippets] == [
+                ("user", "first question", 1),
+                ("assistant", "first answer", 2),
+            ]
+
+        def test_lookup_keeps_order_and_facets(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            old = _create_session(chat_dir, [{"role": "user", "content": "hello"}], created=1000.0)
+            new = _create_session(chat_dir, [{"role": "user", "content": "world"}], created=2000.0)
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            assert [h.uuid for h in fts.lookup([old, "missing", new])] == [old, new]
+            assert [h.uuid for h in fts.lookup([old, new], "after:1970-01-01 role:assistant")] == []
+            assert fts.session_text(open_session_store(chat_dir), {"uuid": new}, None) == "world"
+
+    class TestFilters:
+
+        @pytest.fixture
+        def fts(self, tmp_path: str) -> ChatFTS:
+            chat_dir = str(tmp_path)
+            _create_session(
+                chat_dir,
+                [{"role": "user", "content": "quantum question"}, {"role": "assistant", "content": "an answer"}],
+                model="mistral-large-latest",
+                created=datetime(2025, 12, 20).timestamp(),
+            )
+            _create_session(
+                chat_dir,
+                [{"role": "user", "content": "a question"}, {"role": "assistant", "content": "quantum answer"}],
+                model="mistral-small-latest",
+                created=datetime(2026, 1, 15).timestamp(),
+            )
+            _create_session(
+                chat_dir,
+                [{"role": "user", "content": "quantum question"}],
+                model="gpt-5-mini",
+                provider="openai",
+                created=datetime(2026, 2, 10).timestamp(),
+            )
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            return fts
+
+        def test_model_matches_prefix_case_insensitively(self, fts: ChatFTS) -> None:
+            assert [h.model for h in fts.search("quantum model:Mistral-L")] == ["mistral-large-latest"]
+            assert len(fts.search("quantum model:mistral")) == 2
+
+        def test_provider(self, fts: ChatFTS) -> None:
+            assert [h.provider for h in fts.search("quantum provider:openai")] == ["openai"]
+
+        def test_date_range(self, fts: ChatFTS) -> None:
+            assert [h.model for h in fts.search("quantum after:2026-01 before:2026-02")] == ["mistral-small-latest"]
+            assert len(fts.search("quantum after:2026")) == 2
+            assert [h.model for h in fts.search("quantum before:2025-12-21")] == ["mistral-large-latest"]
+
+        def test_role_filters_matching_message(self, fts: ChatFTS) -> None:
+            hits = fts.search("quantum role:assistant")
+            assert [h.model for h in hits] == ["mistral-small-latest"]
+            assert hits[0].snippets[0].role == "assistant"
+
+        def test_filters_without_text_browse_matching_sessions(self, fts: ChatFTS) -> None:
+            assert [h.model for h in fts.search("model:mistral")] == ["mistral-small-latest", "mistral-large-latest"]
+            assert [h.model for h in fts.search("role:assistant after:2026-01-01 ")] == ["mistral-small-latest"]
+
+        def test_filtered_browse_pages(self, fts: ChatFTS) -> None:
+            with patch("gptcli.src.common.fts._BROWSE_PAGE_SIZE", 1):
+                first = fts.browse(query="model:mistral")
+                second = fts.browse((first[0].created, first[0].uuid), "model:mistral")
+                third = fts.browse((second[0].created, second[0].uuid), "model:mistral")
+            assert [h.model for h in first + second] == ["mistral-small-latest", "mistral-large-latest"]
+            assert third == []
+
+        def test_like_wildcards_are_literal(self, fts: ChatFTS) -> None:
+            assert fts.search("model:%") == []
+            assert fts.search("model:mistral_large") == []
+
+        def test_unparseable_date_is_text(self, fts: ChatFTS) -> None:
+            assert fts.search("quantum after:lunch") == []
+
+        def test_filtered_browse_uses_model_index(self, fts: ChatFTS) -> None:
+            plan = fts._conn.execute(
+                "EXPLAIN QUERY PLAN SELECT uuid FROM sessions WHERE sessions.model LIKE ? ESCAPE '\\'", ("gpt%",)
+            ).fetchall()
+            assert any("sessions_model" in row[-1] for row in plan)
+
+    class TestQuerySyntax:
+
+        @pytest.fixture
+        def fts(self, tmp_path: str) -> ChatFTS:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "quantum entanglement explained"}], created=1000.0)
+            _create_session(chat_dir, [{"role": "user", "content": "entanglement of quantum states"}], created=2000.0)
+            _create_session(chat_dir, [{"role": "user", "content": "machine learning basics"}], created=3000.0)
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            return fts
+
+        def test_last_word_matches_as_prefix(self, fts: ChatFTS) -> None:
+            assert len(fts.search("quant")) == 2
+            assert len(fts.search("machine lear")) == 1
+
+        def test_trailing_space_ends_prefix(self, fts: ChatFTS) -> None:
+            assert fts.search("quant ") == []
+
+        def test_only_last_word_is_prefix(self, fts: ChatFTS) -> None:
+            assert fts.search("quant entanglement") == []
+
+        def test_single_character_is_not_a_prefix(self, fts: ChatFTS) -> None:
+            assert fts.search("q") == []
+
+        def test_prefix_match_is_highlighted(self, fts: ChatFTS) -> None:
+            snippet = fts.search("machine lear")[0].snippets[0]
+            assert [snippet.content[a:b] for a, b in snippet.highlights] == ["machine", "learning"]
+
+        def test_quoted_words_match_as_phrase(self, fts: ChatFTS) -> None:
+            assert len(fts.search('"quantum entanglement"')) == 1
+            assert len(fts.search('"quantum ent')) == 1
+
+        def test_or_matches_either_word(self, fts: ChatFTS) -> None:
+            assert len(fts.search("explained OR machine")) == 2
+
+        def test_lowercase_or_is_a_word(self, fts: ChatFTS) -> None:
+            assert fts.search("explained or machine") == []
+
+        @pytest.mark.parametrize("query", ["quantum NOT states", "quantum -states", 'quantum -"quantum states"'])
+        def test_excludes_negated_terms(self, fts: ChatFTS, query: str) -> None:
+            hits = fts.search(query)
+            assert len(hits) == 1
+            assert "explained" in hits[0].snippets[0].content
+
+        @pytest.mark.parametrize("query", ["-quantum", "NOT quantum", "OR", '""'])
+        def test_query_without_included_terms_matches_nothing(self, fts: ChatFTS, query: str) -> None:
+            assert fts.search(query) == []
+
+    class TestQueryCache:
+
+        def test_repeated_query_is_answered_from_cache(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            with patch.object(ChatFTS, "_match", autospec=True, side_effect=ChatFTS._match) as match:
+                first = fts.search("quantum")
+                assert fts.search("quantum") == first
+            assert match.call_count == 1
+
+        def test_least_recently_used_query_is_evicted(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            with patch("gptcli.src.common.fts._QUERY_CACHE_SIZE", 2):
+                with patch.object(ChatFTS, "_match", autospec=True, side_effect=ChatFTS._match) as match:
+                    for query in ("quantum", "physics", "quantum", "quant", "physics"):
+                        fts.search(query)
+            assert match.call_count == 4
+
+        def test_cache_is_cleared_when_index_is_rebuilt(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}], created=1000.0)
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            assert len(fts.search("quantum")) == 1
+            _create_session(chat_dir, [{"role": "user", "content": "quantum chemistry"}], created=2000.0)
+            fts.build(chat_dir, encryption=None)
+            assert len(fts.search("quantum")) == 2
+
+    class TestSubstringIndex:
+
+        @pytest.fixture
+        def chat_dir(self, tmp_path: str) -> str:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "why does _read_manifest fail?"}], created=1000.0)
+            _create_session(chat_dir, [{"role": "user", "content": "see gptcli/src/common/fts.py"}], created=2000.0)
+            _create_session(chat_dir, [{"role": "user", "content": "how do I read a manifest"}], created=3000.0)
+            return chat_dir
+
+        def test_backquoted_terms_match_substrings(self, chat_dir: str) -> None:
+            fts = ChatFTS(trigram=True)
+            fts.build(chat_dir, encryption=None)
+            assert fts.has_substring_index
+            hits = fts.search("`_read_manifest`")
+            assert len(hits) == 1
+            snippet = hits[0].snippets[0]
+            assert [snippet.content[a:b] for a, b in snippet.highlights] == ["_read_manifest"]
+            assert len(fts.search("`common/ft`")) == 1
+            assert len(fts.search("`anifes`")) == 2
+            assert len(fts.search("`anifes` -`_read`")) == 1
+
+        def test_backquoted_terms_match_as_phrases_without_the_index(self, chat_dir: str) -> None:
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            assert not fts.has_substring_index
+            assert len(fts.search("`_read_manifest`")) == 1
+            assert fts.search("`anifes`") == []
+
+        def test_index_is_kept_until_dropped(self, chat_dir: str) -> None:
+            ChatFTS(trigram=True).build(chat_dir, encryption=None)
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            assert len(fts.search("`anifes`")) == 2
+            fts = ChatFTS(trigram=False)
+            fts.build(chat_dir, encryption=None)
+            assert not fts.has_substring_index
+            assert fts.search("`anifes`") == []
+
+        def test_index_follows_updated_sessions(self, chat_dir: str) -> None:
+            ChatFTS(trigram=True).build(chat_dir, encryption=None)
+            session_uuid = _create_session(
+                chat_dir, [{"role": "user", "content": "call parse_manifest_v2 here"}], created=4000.0
+            )
+            fts = ChatFTS()
+            fts.update_sessions(open_session_store(chat_dir), [{"uuid": session_uuid, "created": 4000.0}], None)
+            assert [h.uuid for h in fts.search("`manifest_v`")] == [session_uuid]
+
+    class TestConcurrentSearch:
+
+        def test_interrupted_query_returns_nothing_and_is_not_cached(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            fts._conn.set_progress_handler(fts.interrupt, 1)
+            assert fts.search("quantum") == []
+            fts._conn.set_progress_handler(None, 1)
+            assert len(fts.search("quantum")) == 1
+
+        def test_can_be_searched_from_another_thread(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                assert len(executor.submit(fts.search, "quantum").result()) == 1
+
     class TestIncrementalBuild:
 
         def test_removes_deleted_sessions_from_index(self, tmp_path: str) -> None:
@@ -315,6 +716,354 @@ class TestChatFTS:
             assert count == 1
             assert len(fts2.search("goodbye")) == 0
 
+    class TestMessageIndex:
+
+        def test_message_text_is_stored_once(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+            fts = ChatFTS()
+            fts.build(chat_dir, encryption=None)
+            with closing(sqlite3.connect(os.path.join(chat_dir, _DB_FILENAME))) as conn:
+                tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master")}
+            assert "messages_fts" in tables
+            assert "messages_fts_content" not in tables
+            assert "sessions_fts" not in tables
+            assert len(fts.search("quantum")) == 1
+
+        def test_changed_session_leaves_no_stale_tokens(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            session_uuid = _create_session(chat_dir, [{"role": "user", "content": "first draft"}])
+            ChatFTS().build(chat_dir, encryption=None)
+            _write_json(
+                os.path.join(chat_dir, session_uuid, GPTCLI_SESSION_FILENAME),
+                {"messages": [{"role": "user", "content": "final revision"}]},
+            )
+
+            fts = ChatFTS()
+            assert fts.build(chat_dir, encryption=None) == 1
+            assert fts.search("draft") == []
+            assert len(fts.search("revision")) == 1
+            with closing(sqlite3.connect(os.path.join(chat_dir, _DB_FILENAME))) as conn:
+                conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('integrity-check')")
+
+        @pytest.mark.parametrize("contentless", [False, True])
+        def test_migrates_index_with_one_row_per_session(self, tmp_path: str, contentless: bool) -> None:
+            chat_dir = str(tmp_path)
+            session_uuid = _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+            stamp = json.dumps(open_session_store(chat_dir).session_stamp(session_uuid))
+            with closing(sqlite3.connect(os.path.join(chat_dir, _DB_FILENAME))) as conn:
+                _write_legacy_chat_index(conn, session_uuid, "quantum physics", stamp, contentless)
+
+            fts = ChatFTS()
+            with patch.object(ChatFTS, "_load_session") as load:
+                assert fts.build(chat_dir, encryption=None) == 1
+            load.assert_not_called()
+            hits = fts.search("quantum")
+            assert [h.uuid for h in hits] == [session_uuid]
+            assert hits[0].position == 0
+            with closing(sqlite3.connect(os.path.join(chat_dir, _DB_FILENAME))) as conn:
+                tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master")}
+                assert not any(name.startswith(("legacy_", "sessions_fts")) for name in tables)
+                assert "sessions_created" in tables
+                conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('integrity-check')")
+
+        def test_adds_prefix_indexes_to_existing_index(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+            ChatFTS().build(chat_dir, encryption=None)
+            with closing(sqlite3.connect(os.path.join(chat_dir, _DB_FILENAME))) as conn:
+                conn.executescript(
+                    """
+                    DROP TABLE messages_fts;
+                    CREATE VIRTUAL TABLE messages_fts USING fts5(
+                        content, content='messages', content_rowid='id', tokenize='unicode61'
+                    );
+                    INSERT INTO messages_fts(messages_fts) VALUES ('rebuild');
+                    """
+                )
+
+            fts = ChatFTS()
+            with patch.object(ChatFTS, "_load_session") as load:
+                assert fts.build(chat_dir, encryption=None) == 1
+            load.assert_not_called()
+            assert len(fts.search("quan")) == 1
+            with closing(sqlite3.connect(os.path.join(chat_dir, _DB_FILENAME))) as conn:
+                (sql,) = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'messages_fts'").fetchone()
+                assert "prefix='2 3 4'" in sql
+                conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('integrity-check')")
+
+    class TestParallelBuild:
+
+        def test_parallel_build_matches_serial_build(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            for i in range(40):
+                _create_session(chat_dir, [{"role": "user", "content": f"topic{i} shared"}], created=float(i))
+            serial_dir = os.path.join(str(tmp_path), "serial")
+            shutil.copytree(chat_dir, serial_dir)
+
+            parallel = ChatFTS()
+            serial = ChatFTS()
+            assert parallel.build(chat_dir, encryption=None, jobs=4) == 40
+            assert serial.build(serial_dir, encryption=None, jobs=1) == 40
+            assert [h.uuid for h in parallel.search("")] == [h.uuid for h in serial.search("")]
+            assert len(parallel.search("topic7")) == 1
+            assert len(parallel.search("shared")) == 40
+
+        def test_inserts_in_batches(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            for i in range(5):
+                _create_session(chat_dir, [{"role": "user", "content": "hello"}], created=float(i))
+
+            fts = ChatFTS()
+            with (
+                patch("gptcli.src.common.fts._INDEX_BATCH_SIZE", 2),
+                patch.object(
+                    ChatFTS, "_insert_sessions", autospec=True, side_effect=ChatFTS._insert_sessions
+                ) as insert,
+            ):
+                assert fts.build(chat_dir, encryption=None, jobs=2) == 5
+            assert [len(call.args[1]) for call in insert.call_args_list] == [2, 2, 1]
+
+        def test_reports_progress(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            for i in range(5):
+                _create_session(chat_dir, [{"role": "user", "content": "hello"}], created=float(i))
+
+            reported: list[tuple[int, int]] = []
+            with patch("gptcli.src.common.fts._INDEX_BATCH_SIZE", 2):
+                ChatFTS().build(chat_dir, encryption=None, progress=lambda done, total: reported.append((done, total)))
+            assert reported == [(2, 5), (4, 5), (5, 5)]
+
+        def test_skipped_sessions_are_counted_as_progress(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "hello"}])
+            missing = _create_session(chat_dir, [{"role": "user", "content": "gone"}])
+            shutil.rmtree(os.path.join(chat_dir, missing))
+
+            reported: list[tuple[int, int]] = []
+            count = ChatFTS().build(chat_dir, encryption=None, jobs=2, progress=lambda d, t: reported.append((d, t)))
+            assert count == 1
+            assert reported == [(2, 2)]
+
+        def test_packed_store_is_read_serially(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            for i in range(3):
+                _create_session(chat_dir, [{"role": "user", "content": "hello"}], created=float(i))
+            StorageCommands.pack([chat_dir])
+
+            with patch("gptcli.src.common.fts.ThreadPoolExecutor") as executor:
+                assert ChatFTS().build(chat_dir, encryption=None, jobs=4) == 3
+            executor.assert_not_called()
+
+        def test_worker_errors_propagate(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            for i in range(3):
+                _create_session(chat_dir, [{"role": "user", "content": "hello"}], created=float(i))
+
+            with patch.object(ChatFTS, "_load_session", side_effect=ValueError("boom")):
+                with pytest.raises(ValueError):
+                    ChatFTS().build(chat_dir, encryption=None, jobs=2)
+
+    class TestEncryptedSnapshot:
+
+        def test_saves_encrypted_snapshot_without_plaintext_db(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+
+            ChatFTS().build(chat_dir, encryption=Encryption(key=os.urandom(32)))
+            assert os.path.exists(os.path.join(chat_dir, _ENCRYPTED_DB_FILENAME))
+            assert not os.path.exists(os.path.join(chat_dir, _DB_FILENAME))
+            with open(os.path.join(chat_dir, _ENCRYPTED_DB_FILENAME), "rb") as fp:
+                assert b"quantum" not in fp.read()
+
+        def test_next_build_only_indexes_new_sessions(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            encryption = Encryption(key=os.urandom(32))
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}], created=1000.0)
+            ChatFTS().build(chat_dir, encryption=encryption)
+            _create_session(chat_dir, [{"role": "user", "content": "organic chemistry"}], created=2000.0)
+
+            fts = ChatFTS()
+            with patch.object(ChatFTS, "_load_session", autospec=True, side_effect=ChatFTS._load_session) as index:
+                count = fts.build(chat_dir, encryption=encryption)
+            assert count == 2
+            assert index.call_count == 1
+            assert len(fts.search("quantum")) == 1
+            assert len(fts.search("chemistry")) == 1
+
+        def test_unchanged_index_is_not_rewritten(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            encryption = Encryption(key=os.urandom(32))
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+            ChatFTS().build(chat_dir, encryption=encryption)
+            snapshot_path = os.path.join(chat_dir, _ENCRYPTED_DB_FILENAME)
+            mtime = os.stat(snapshot_path).st_mtime_ns
+
+            ChatFTS().build(chat_dir, encryption=encryption)
+            assert os.stat(snapshot_path).st_mtime_ns == mtime
+
+        def test_unreadable_snapshot_is_rebuilt(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+            ChatFTS().build(chat_dir, encryption=Encryption(key=os.urandom(32)))
+
+            fts = ChatFTS()
+            count = fts.build(chat_dir, encryption=Encryption(key=os.urandom(32)))
+            assert count == 1
+            assert len(fts.search("quantum")) == 1
+
+        def test_migrated_snapshot_is_saved(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            encryption = Encryption(key=os.urandom(32))
+            session_uuid = _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+            stamp = json.dumps(open_session_store(chat_dir).session_stamp(session_uuid))
+            with closing(sqlite3.connect(":memory:")) as conn:
+                _write_legacy_chat_index(conn, session_uuid, "quantum physics", stamp)
+                image = conn.serialize()
+            with open(os.path.join(chat_dir, _ENCRYPTED_DB_FILENAME), "wb") as fp:
+                fp.write(encryption.encrypt_envelope(image))
+
+            with patch.object(ChatFTS, "_load_session") as load:
+                assert ChatFTS().build(chat_dir, encryption=encryption) == 1
+            load.assert_not_called()
+            snapshot = encryption.decrypt_file(os.path.join(chat_dir, _ENCRYPTED_DB_FILENAME))
+            assert snapshot is not None
+            with closing(sqlite3.connect(":memory:")) as conn:
+                conn.deserialize(snapshot)
+                assert "id" in [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]
+
+        def test_loads_plaintext_db_encrypted_by_encrypt_command(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            encryption = Encryption(key=os.urandom(32))
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+            ChatFTS().build(chat_dir, encryption=None)
+            with closing(sqlite3.connect(os.path.join(chat_dir, _DB_FILENAME))) as conn:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            encryption.encrypt_file(os.path.join(chat_dir, _DB_FILENAME))
+
+            fts = ChatFTS()
+            with patch.object(ChatFTS, "_load_session") as index:
+                count = fts.build(chat_dir, encryption=encryption)
+            assert count == 1
+            index.assert_not_called()
+            assert len(fts.search("quantum")) == 1
+
+    class TestUpdateSessions:
+
+        def test_does_nothing_without_an_index(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            session_uuid = _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}])
+
+            store = open_session_store(chat_dir)
+            assert not ChatFTS().update_sessions(store, [{"uuid": session_uuid, "created": 1000.0}], None)
+            assert not os.path.exists(os.path.join(chat_dir, _DB_FILENAME))
+
+        def test_indexes_new_session_so_next_build_does_not(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}], created=1000.0)
+            ChatFTS().build(chat_dir, encryption=None)
+            session_uuid = _create_session(
+                chat_dir, [{"role": "user", "content": "organic chemistry"}], created=2000.0
+            )
+
+            fts = ChatFTS()
+            assert fts.update_sessions(open_session_store(chat_dir), [{"uuid": session_uuid, "created": 2000.0}], None)
+            fts.close()
+
+            fts = ChatFTS()
+            with patch.object(ChatFTS, "_load_session") as load:
+                assert fts.build(chat_dir, encryption=None) == 2
+            load.assert_not_called()
+            assert [h.uuid for h in fts.search("chemistry")] == [session_uuid]
+
+        def test_replaces_session_that_was_already_indexed(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            session_uuid = _create_session(chat_dir, [{"role": "user", "content": "first draft"}])
+            ChatFTS().build(chat_dir, encryption=None)
+            _write_json(
+                os.path.join(chat_dir, session_uuid, GPTCLI_SESSION_FILENAME),
+                {"messages": [{"role": "user", "content": "final revision"}]},
+            )
+
+            fts = ChatFTS()
+            fts.update_sessions(open_session_store(chat_dir), [{"uuid": session_uuid, "created": 1000.0}], None)
+            with patch.object(ChatFTS, "_load_session") as load:
+                assert fts.build(chat_dir, encryption=None) == 1
+            load.assert_not_called()
+            assert fts.search("draft") == []
+            assert len(fts.search("revision")) == 1
+
+        def test_skips_index_with_outdated_schema(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}], created=1000.0)
+            ChatFTS().build(chat_dir, encryption=None)
+            with closing(sqlite3.connect(os.path.join(chat_dir, _DB_FILENAME))) as conn:
+                conn.execute("PRAGMA user_version = 0")
+            session_uuid = _create_session(
+                chat_dir, [{"role": "user", "content": "organic chemistry"}], created=2000.0
+            )
+
+            fts = ChatFTS()
+            with patch.object(ChatFTS, "_migrate_schema") as migrate:
+                assert not fts.update_sessions(
+                    open_session_store(chat_dir), [{"uuid": session_uuid, "created": 2000.0}], None
+                )
+            migrate.assert_not_called()
+            assert fts.build(chat_dir, encryption=None) == 2
+
+        def test_appends_encrypted_sessions_to_delta_for_next_build(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            encryption = Encryption(key=os.urandom(32))
+            _create_session(chat_dir, [{"role": "user", "content": "quantum physics"}], created=1000.0)
+            ChatFTS().build(chat_dir, encryption=encryption)
+            session_uuid = _create_session(
+                chat_dir, [{"role": "user", "content": "organic chemistry"}], created=2000.0
+            )
+            snapshot_path = os.path.join(chat_dir, _ENCRYPTED_DB_FILENAME)
+            with open(snapshot_path, "rb") as fp:
+                snapshot = fp.read()
+
+            store = open_session_store(chat_dir)
+            with patch.object(Encryption, "decrypt_file") as decrypt:
+                assert ChatFTS().update_sessions(store, [{"uuid": session_uuid, "created": 2000.0}], encryption)
+            decrypt.assert_not_called()
+            with open(snapshot_path, "rb") as fp:
+                assert fp.read() == snapshot
+            delta_path = os.path.join(chat_dir, _DELTA_FILENAME + ".enc")
+            with open(delta_path, "rb") as fp:
+                assert b"chemistry" not in fp.read()
+            assert not os.path.exists(os.path.join(chat_dir, _DB_FILENAME))
+
+            fts = ChatFTS()
+            with patch.object(ChatFTS, "_load_session") as load:
+                assert fts.build(chat_dir, encryption=encryption) == 2
+            load.assert_not_called()
+            assert len(fts.search("chemistry")) == 1
+            assert not os.path.exists(delta_path)
+            fts.close()
+
+            fts = ChatFTS()
+            assert fts.build(chat_dir, encryption=encryption) == 2
+            assert len(fts.search("chemistry")) == 1
+
+        def test_delta_of_session_changed_since_is_not_merged(self, tmp_path: str) -> None:
+            chat_dir = str(tmp_path)
+            encryption = Encryption(key=os.urandom(32))
+            ChatFTS().build(chat_dir, encryption=encryption)
+            session_uuid = _create_session(chat_dir, [{"role": "user", "content": "first draft"}])
+            ChatFTS().update_sessions(
+                open_session_store(chat_dir), [{"uuid": session_uuid, "created": 1000.0}], encryption
+            )
+            _write_json(
+                os.path.join(chat_dir, session_uuid, GPTCLI_SESSION_FILENAME),
+                {"messages": [{"role": "user", "content": "final revision"}]},
+            )
+
+            fts = ChatFTS()
+            assert fts.build(chat_dir, encryption=encryption) == 1
+            assert fts.search("draft") == []
+            assert len(fts.search("revision")) == 1
+
     class TestTokenize:
 
         def test_lowercases_input(self) -> None:
@@ -335,6 +1084,66 @@ class TestChatFTS:
         def test_numbers_are_included(self) -> None:
             assert tokenize("gpt4 model2024") == ["gpt4", "model2024"]
 
+    class TestMatchExpression:
+
+        def test_last_word_is_prefix(self) -> None:
+            assert match_expression("Hello wor") == '("hello" AND "wor"*)'
+
+        def test_trailing_space_ends_prefix(self) -> None:
+            assert match_expression("hello wor ") == '("hello" AND "wor")'
+
+        def test_closed_phrase_is_not_prefix(self) -> None:
+            assert match_expression('"hello world"') == '("hello world")'
+
+        def test_open_phrase_is_prefix(self) -> None:
+            assert match_expression('"hello wor') == '("hello wor"*)'
+
+        def test_punctuated_word_is_phrase(self) -> None:
+            assert match_expression("gpt-4 ") == '("gpt 4")'
+
+        def test_or_separates_alternatives(self) -> None:
+            assert match_expression("foo OR bar baz ") == '("foo") OR ("bar" AND "baz")'
+
+        def test_negated_terms_are_excluded(self) -> None:
+            assert match_expression("foo -bar NOT baz ") == '("foo") NOT ("bar" OR "baz")'
+
+        def test_operator_characters_are_not_passed_through(self) -> None:
+            assert match_expression("foo* (bar) ^baz: ") == '("foo" AND "bar" AND "baz")'
+
+        def test_alternative_without_included_terms_is_dropped(self) -> None:
+            assert match_expression("-foo OR bar ") == '("bar")'
+            assert match_expression("-foo") is None
+
+        def test_facets_are_left_out(self) -> None:
+            assert match_expression("model:gpt-5 quantum role:user") == '("quantum")'
+            assert match_expression("model:gpt-5") is None
+            assert query_terms("quantum provider:openai") == ["quantum"]
+
+        def test_facets_are_split_from_text(self) -> None:
+            text, filters = _split_filters("quantum model:mistral after:2026-01 before:soon")
+            assert text.split() == ["quantum", "before:soon"]
+            assert filters.model == "mistral"
+            assert filters.after == datetime(2026, 1, 1).timestamp()
+            assert filters.before is None
+
+        def test_browse_query_has_no_text(self) -> None:
+            assert is_browse_query("  model:mistral role:user ")
+            assert not is_browse_query("model:mistral quantum")
+
+        def test_query_terms_leave_out_excluded_terms(self) -> None:
+            assert query_terms('"hello wor" -bar OR baz') == ["hello", "wor", "baz"]
+
+        def test_backquoted_term_is_closed_phrase(self) -> None:
+            assert match_expression("`_read_manifest`") == '("read manifest")'
+            assert match_expression("`_read_mani") == '("read mani")'
+            assert is_substring_query("`_read")
+            assert not is_substring_query("_read")
+
+        def test_substring_terms_are_matched_as_typed(self) -> None:
+            query = 'ab `src/"x"` -foo OR `zz`'
+            assert match_expression(query, substring=True) == '("src/""x""") NOT ("foo")'
+            assert query_terms(query, substring=True) == ['src/"x"']
+
 
 def _create_ocr_session(
     ocr_dir: str,
@@ -412,6 +1221,7 @@ class TestOcrFTS:
 
             mock_enc = MagicMock()
             mock_enc.decrypt_file.return_value = None
+            mock_enc.encrypt_envelope.side_effect = lambda data: data
             fts = OcrFTS()
             fts.build(ocr_dir, encryption=mock_enc)
             assert not os.path.exists(os.path.join(ocr_dir, _DB_FILENAME))
@@ -465,6 +1275,7 @@ class TestOcrFTS:
             _write_json(os.path.join(ocr_dir, GPTCLI_MANIFEST_FILENAME), [{"uuid": session_uuid, "created": 1000.0}])
 
             mock_enc = MagicMock()
+            mock_enc.encrypt_envelope.side_effect = lambda data: data
             mock_enc.decrypt_file.side_effect = lambda p: (
                 markdown_content.encode("utf-8") if p.endswith(".md.enc") else json.dumps(metadata).encode("utf-8")
             )
@@ -496,6 +1307,27 @@ class TestOcrFTS:
             fts.build(ocr_dir, encryption=None)
             return fts
 
+        def test_filters_narrow_documents(self, tmp_path: str) -> None:
+            ocr_dir = str(tmp_path)
+            _create_ocr_session(ocr_dir, "quantum invoice", model="mistral-ocr-2505", created=1000.0)
+            _create_ocr_session(ocr_dir, "quantum receipt", model="mistral-ocr-latest", created=2000.0)
+            fts = OcrFTS()
+            fts.build(ocr_dir, encryption=None)
+            assert [h.model for h in fts.search("quantum model:mistral-ocr-2")] == ["mistral-ocr-2505"]
+            assert [h.model for h in fts.search("model:mistral-ocr-l")] == ["mistral-ocr-latest"]
+            assert len(fts.search("quantum role:user")) == 2
+
+        def test_substring_index_reindexes_documents(self, tmp_path: str) -> None:
+            ocr_dir = str(tmp_path)
+            _create_ocr_session(ocr_dir, "Invoice INV-20260117 total", created=1000.0)
+            fts = OcrFTS()
+            fts.build(ocr_dir, encryption=None)
+            assert fts.search("`0117`") == []
+            fts = OcrFTS(trigram=True)
+            assert fts.build(ocr_dir, encryption=None) == 1
+            assert len(fts.search("`0117`")) == 1
+            assert len(fts.search("invoice")) == 1
+
         def test_returns_matching_session(self, populated_fts: OcrFTS) -> None:
             results = populated_fts.search("quantum")
             assert len(results) == 1
@@ -584,3 +1416,196 @@ class TestOcrFTS:
             count = fts2.build(ocr_dir, encryption=None)
             assert count == 1
             assert len(fts2.search("second")) == 0
+
+        def test_reindexes_overwritten_session(self, tmp_path: str) -> None:
+            ocr_dir = str(tmp_path)
+            session_uuid = _create_ocr_session(ocr_dir, "first draft", created=1000.0)
+            _create_ocr_session(ocr_dir, "untouched document", created=2000.0)
+            OcrFTS().build(ocr_dir, encryption=None)
+
+            with open(os.path.join(ocr_dir, session_uuid, "document.md"), "w", encoding="utf-8") as fp:
+                fp.write("final revision of the document")
+
+            fts = OcrFTS()
+            with patch.object(OcrFTS, "_load_session", autospec=True, side_effect=OcrFTS._load_session) as load:
+                assert fts.build(ocr_dir, encryption=None) == 2
+            assert load.call_count == 1
+            assert [h.uuid for h in fts.search("revision")] == [session_uuid]
+            assert fts.search("draft") == []
+            assert fts.search("revision")[0].snippet == "final revision of the document"
+
+        def test_does_not_reload_unchanged_sessions(self, tmp_path: str) -> None:
+            ocr_dir = str(tmp_path)
+            _create_ocr_session(ocr_dir, "first document content")
+            OcrFTS().build(ocr_dir, encryption=None)
+
+            with patch.object(OcrFTS, "_load_session") as load:
+                assert OcrFTS().build(ocr_dir, encryption=None) == 1
+            load.assert_not_called()
+
+        def test_document_text_is_not_stored_in_index(self, tmp_path: str) -> None:
+            ocr_dir = str(tmp_path)
+            _create_ocr_session(ocr_dir, "quantum physics")
+            fts = OcrFTS()
+            fts.build(ocr_dir, encryption=None)
+            with closing(sqlite3.connect(os.path.join(ocr_dir, _DB_FILENAME))) as conn:
+                assert conn.execute("SELECT content FROM sessions_fts").fetchall() == [(None,)]
+            assert len(fts.search("quantum")) == 1
+
+        def test_migrates_index_that_stored_document_text(self, tmp_path: str) -> None:
+            ocr_dir = str(tmp_path)
+            session_uuid = _create_ocr_session(ocr_dir, "quantum physics")
+            stamp = json.dumps(open_session_store(ocr_dir).session_stamp(session_uuid))
+            with closing(sqlite3.connect(os.path.join(ocr_dir, _DB_FILENAME))) as conn:
+                conn.executescript(
+                    """
+                    CREATE TABLE sessions (
+                        uuid TEXT PRIMARY KEY, created REAL NOT NULL, model TEXT NOT NULL, provider TEXT NOT NULL,
+                        source_filename TEXT NOT NULL, page_count INTEGER NOT NULL, stamp TEXT NOT NULL DEFAULT ''
+                    );
+                    CREATE VIRTUAL TABLE sessions_fts USING fts5(uuid UNINDEXED, content, tokenize='unicode61');
+                    CREATE TABLE snippets (session_uuid TEXT PRIMARY KEY, content TEXT NOT NULL);
+                    """
+                )
+                conn.execute(
+                    "INSERT INTO sessions VALUES (?, 1000.0, 'm', 'mistral', 'document.pdf', 3, ?)",
+                    (session_uuid, stamp),
+                )
+                conn.execute("INSERT INTO sessions_fts VALUES (?, 'quantum physics')", (session_uuid,))
+                conn.execute("INSERT INTO snippets VALUES (?, 'quantum physics')", (session_uuid,))
+                conn.commit()
+
+            fts = OcrFTS()
+            with patch.object(OcrFTS, "_load_session") as load:
+                assert fts.build(ocr_dir, encryption=None) == 1
+            load.assert_not_called()
+            assert [h.uuid for h in fts.search("quantum")] == [session_uuid]
+            with closing(sqlite3.connect(os.path.join(ocr_dir, _DB_FILENAME))) as conn:
+                assert conn.execute("SELECT content FROM sessions_fts").fetchall() == [(None,)]
+                assert not conn.execute("SELECT name FROM sqlite_master WHERE name LIKE 'legacy_%'").fetchall()
+
+        def test_reindexes_documents_of_index_without_prefix_indexes(self, tmp_path: str) -> None:
+            ocr_dir = str(tmp_path)
+            _create_ocr_session(ocr_dir, "quantum physics")
+            OcrFTS().build(ocr_dir, encryption=None)
+            with closing(sqlite3.connect(os.path.join(ocr_dir, _DB_FILENAME))) as conn:
+                conn.executescript(
+                    """
+                    DROP TABLE sessions_fts;
+                    CREATE VIRTUAL TABLE sessions_fts USING fts5(content, content='', tokenize='unicode61');
+                    """
+                )
+
+            fts = OcrFTS()
+            with patch.object(OcrFTS, "_load_session", autospec=True, side_effect=OcrFTS._load_session) as load:
+                assert fts.build(ocr_dir, encryption=None) == 1
+            assert load.call_count == 1
+            assert len(fts.search("quan")) == 1
+            with closing(sqlite3.connect(os.path.join(ocr_dir, _DB_FILENAME))) as conn:
+                assert conn.execute("SELECT count(*) FROM sessions_fts").fetchone() == (1,)
+
+        def test_compacts_orphaned_rows_of_overwritten_sessions(self, tmp_path: str) -> None:
+            ocr_dir = str(tmp_path)
+            session_uuid = _create_ocr_session(ocr_dir, "first draft", created=1000.0)
+            _create_ocr_session(ocr_dir, "untouched document", created=2000.0)
+            OcrFTS().build(ocr_dir, encryption=None)
+            with open(os.path.join(ocr_dir, session_uuid, "document.md"), "w", encoding="utf-8") as fp:
+                fp.write("final revision of the document")
+
+            with patch("gptcli.src.common.fts._MIN_ORPHANS_TO_COMPACT", 1):
+                OcrFTS().build(ocr_dir, encryption=None)
+                with closing(sqlite3.connect(os.path.join(ocr_dir, _DB_FILENAME))) as conn:
+                    assert conn.execute("SELECT count(*) FROM sessions_fts").fetchone() == (3,)
+
+                fts = OcrFTS()
+                assert fts.build(ocr_dir, encryption=None) == 2
+            with closing(sqlite3.connect(os.path.join(ocr_dir, _DB_FILENAME))) as conn:
+                assert conn.execute("SELECT count(*) FROM sessions_fts").fetchone() == (2,)
+            assert fts.search("draft") == []
+            assert len(fts.search("document")) == 2
+
+        def test_reindexes_sessions_of_index_without_stamps(self, tmp_path: str) -> None:
+            ocr_dir = str(tmp_path)
+            _create_ocr_session(ocr_dir, "first document content")
+            OcrFTS().build(ocr_dir, encryption=None)
+            with closing(sqlite3.connect(os.path.join(ocr_dir, _DB_FILENAME))) as conn:
+                conn.execute("ALTER TABLE sessions DROP COLUMN stamp")
+                conn.commit()
+
+            fts = OcrFTS()
+            with patch.object(OcrFTS, "_load_session", autospec=True, side_effect=OcrFTS._load_session) as load:
+                assert fts.build(ocr_dir, encryption=None) == 1
+            assert load.call_count == 1
+            assert len(fts.search("document")) == 1
+            with patch.object(OcrFTS, "_load_session") as load:
+                OcrFTS().build(ocr_dir, encryption=None)
+            load.assert_not_called()
+
+
+class TestUnifiedFTS:
+
+    @pytest.fixture
+    def sources(self, tmp_path: str) -> list[SearchSource]:
+        sources = [
+            SearchSource("mistral", "chat", os.path.join(tmp_path, "mistral_chat")),
+            SearchSource("mistral", "ocr", os.path.join(tmp_path, "mistral_ocr")),
+            SearchSource("openai", "chat", os.path.join(tmp_path, "openai_chat")),
+            SearchSource("openai", "ocr", os.path.join(tmp_path, "openai_ocr")),
+        ]
+        for source in sources[:3]:
+            os.makedirs(source.storage_dir)
+        _create_session(sources[0].storage_dir, [{"role": "user", "content": "invoice total"}], created=1000.0)
+        _create_ocr_session(sources[1].storage_dir, "Invoice invoice invoice for March", created=2000.0)
+        _create_session(sources[2].storage_dir, [{"role": "user", "content": "quantum physics"}], created=3000.0)
+        _create_session(sources[2].storage_dir, [{"role": "user", "content": "an invoice"}], created=4000.0)
+        return sources
+
+    def test_searches_every_source(self, sources: list[SearchSource]) -> None:
+        fts = UnifiedFTS(sources)
+        assert fts.build(encryption=None) == 4
+        hits = fts.search("invoice")
+        assert sorted(h.source.label for h in hits) == ["mistral chat", "mistral ocr", "openai chat"]
+        assert isinstance(next(h for h in hits if h.source.target == "ocr").hit, OcrHit)
+        fts.close()
+
+    def test_merges_hits_by_rank(self, sources: list[SearchSource]) -> None:
+        fts = UnifiedFTS(sources)
+        fts.build(encryption=None)
+        hits = fts.search("invoice")
+        assert [h.hit.score for h in hits] == sorted(h.hit.score for h in hits)
+        assert all(h.hit.score < 0 for h in hits)
+        assert [h.uuid for h in fts.search("invoice ")] == [h.uuid for h in hits]
+        fts.close()
+
+    def test_equal_ranks_keep_a_stable_order(self, sources: list[SearchSource]) -> None:
+        fts = UnifiedFTS(sources)
+        fts.build(encryption=None)
+        tied = [SessionHit(uuid=u, created=1.0, model="", provider="", message_count=1, snippets=[]) for u in "ba"]
+        with patch.object(ChatFTS, "_match", return_value=tied):
+            hits = fts.search("invoice")
+        assert [(h.source.provider, h.uuid) for h in hits if h.source.target == "chat"] == [
+            ("mistral", "a"),
+            ("openai", "a"),
+            ("mistral", "b"),
+            ("openai", "b"),
+        ]
+        fts.close()
+
+    def test_browses_every_source_a_page_at_a_time(self, sources: list[SearchSource]) -> None:
+        fts = UnifiedFTS(sources)
+        fts.build(encryption=None)
+        with patch("gptcli.src.common.fts._BROWSE_PAGE_SIZE", 3):
+            first = fts.search("")
+            rest = fts.browse(after=(first[-1].created, first[-1].uuid))
+        assert [h.created for h in first + rest] == [4000.0, 3000.0, 2000.0, 1000.0]
+        assert fts.browse(after=(rest[-1].created, rest[-1].uuid)) == []
+        fts.close()
+
+    def test_builds_each_index_once(self, sources: list[SearchSource]) -> None:
+        fts = UnifiedFTS(sources)
+        with patch.object(ChatFTS, "build", autospec=True, side_effect=ChatFTS.build) as build:
+            fts.build(encryption=None)
+            fts.search("invoice")
+            fts.search("quantum")
+        assert build.call_count == 2
+        fts.close()
@@ -0,0 +1,185 @@
+"""Holds all the tests for key_agent.py."""
+
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+import time
+from collections.abc import Generator
+from unittest.mock import patch
+
+import pytest
+
+from gptcli.src.common.key_agent import (
+    KeyAgent,
+    KeyAgentClient,
+    ensure_socket_dir,
+)
+
+
+@pytest.fixture
+def socket_path() -> Generator[str, None, None]:
+    """A socket path short enough for AF_UNIX, which tmp_path often is not."""
+    directory = tempfile.mkdtemp(dir="/tmp")
+    yield os.path.join(directory, "agent.sock")
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture
+def running_agent(socket_path: str) -> Generator[KeyAgent, None, None]:
+    """A KeyAgent serving from a background thread."""
+    agent = KeyAgent(socket_path)
+    with (
+        patch("gptcli.src.common.key_agent._harden_process"),
+        patch("gptcli.src.common.key_agent._POLL_INTERVAL", 0.05),
+    ):
+        thread = threading.Thread(target=agent.serve, daemon=True)
+        thread.start()
+        client = KeyAgentClient(socket_path)
+        deadline = time.monotonic() + 5.0
+        while client.status() is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        yield agent
+        client.stop()
+        thread.join(timeout=5.0)
+
+
+class TestKeyAgent:
+
+    class TestHandle:
+
+        def test_get_fails_while_locked(self, socket_path: str) -> None:
+            agent = KeyAgent(socket_path)
+            assert agent.handle({"op": "get"}) == {"ok": False, "error": "locked"}
+
+        def test_unlock_then_get_returns_key(self, socket_path: str) -> None:
+            agent = KeyAgent(socket_path)
+            key = os.urandom(32)
+            assert agent.handle({"op": "unlock", "key": key.hex(), "ttl": 60})["ok"] is True
+            assert agent.handle({"op": "get"}) == {"ok": True, "key": key.hex()}
+
+        def test_lock_forgets_key(self, socket_path: str) -> None:
+            agent = KeyAgent(socket_path)
+            agent.unlock(os.urandom(32), ttl=60)
+            agent.handle({"op": "lock"})
+            assert agent.handle({"op": "get"})["ok"] is False
+            assert agent.handle({"op": "status"})["unlocked"] is False
+
+        def test_key_expires_after_ttl(self, socket_path: str) -> None:
+            agent = KeyAgent(socket_path)
+            agent.unlock(os.urandom(32), ttl=0.01)
+            time.sleep(0.05)
+            assert agent.handle({"op": "get"})["ok"] is False
+
+        def test_status_reports_remaining_time(self, socket_path: str) -> None:
+            agent = KeyAgent(socket_path)
+            agent.unlock(os.urandom(32), ttl=60)
+            status = agent.handle({"op": "status"})
+            assert status["unlocked"] is True
+            assert 0 < status["expires_in"] <= 60
+            assert status["pid"] == os.getpid()
+
+        def test_unlock_rejects_invalid_key_or_ttl(self, socket_path: str) -> None:
+            agent = KeyAgent(socket_path)
+            assert agent.handle({"op": "unlock", "key": "not hex"})["ok"] is False
+            assert agent.handle({"op": "unlock"})["ok"] is False
+            assert agent.handle({"op": "unlock", "key": "00" * 32, "ttl": 0})["ok"] is False
+
+        def test_unknown_op_fails(self, socket_path: str) -> None:
+            agent = KeyAgent(socket_path)
+            assert agent.handle({"op": "dump"})["ok"] is False
+
+    class TestServe:
+
+        def test_client_round_trip(self, socket_path: str, running_agent: KeyAgent) -> None:
+            client = KeyAgentClient(socket_path)
+            key = os.urandom(32)
+            assert client.get_key() is None
+            assert client.unlock(key, ttl=60) is True
+            assert client.get_key() == key
+            assert client.lock() is True
+            assert client.get_key() is None
+
+        def test_socket_is_owner_only(self, socket_path: str, running_agent: KeyAgent) -> None:
+            mode = stat.S_IMODE(os.stat(socket_path).st_mode)
+            assert mode == stat.S_IRUSR | stat.S_IWUSR
+
+        def test_stop_removes_socket(self, socket_path: str, running_agent: KeyAgent) -> None:
+            assert KeyAgentClient(socket_path).stop() is True
+            deadline = time.monotonic() + 5.0
+            while os.path.exists(socket_path) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert not os.path.exists(socket_path)
+
+        def test_malformed_request_is_answered_with_error(self, socket_path: str, running_agent: KeyAgent) -> None:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+                conn.settimeout(2.0)
+                conn.connect(socket_path)
+                conn.sendall(b"{not json\n")
+                assert b'"ok": false' in conn.recv(4096)
+
+        def test_refuses_to_replace_running_agent(self, socket_path: str, running_agent: KeyAgent) -> None:
+            with pytest.raises(RuntimeError):
+                KeyAgent(socket_path)._bind()
+
+        def test_refuses_directory_others_can_access(self, socket_path: str) -> None:
+            os.chmod(os.path.dirname(socket_path), 0o755)
+            with pytest.raises(RuntimeError):
+                KeyAgent(socket_path)._bind()
+            assert not os.path.exists(socket_path)
+
+        def test_replaces_stale_socket(self, socket_path: str) -> None:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+                stale.bind(socket_path)
+            server = KeyAgent(socket_path)._bind()
+            server.close()
+            os.remove(socket_path)
+
+
+class TestKeyAgentClient:
+
+    def test_returns_none_when_no_agent_is_running(self, socket_path: str) -> None:
+        client = KeyAgentClient(socket_path)
+        assert client.status() is None
+        assert client.get_key() is None
+        assert client.lock() is False
+        assert client.unlock(os.urandom(32)) is False
+
+    def test_ignores_socket_in_directory_others_can_access(self, socket_path: str, running_agent: KeyAgent) -> None:
+        os.chmod(os.path.dirname(socket_path), 0o777)
+        client = KeyAgentClient(socket_path)
+        assert client.status() is None
+        assert client.unlock(os.urandom(32)) is False
+        assert running_agent.handle({"op": "status"})["unlocked"] is False
+        os.chmod(os.path.dirname(socket_path), 0o700)
+
+    def test_ignores_socket_others_can_connect_to(self, socket_path: str, running_agent: KeyAgent) -> None:
+        os.chmod(socket_path, 0o666)
+        assert KeyAgentClient(socket_path).status() is None
+        os.chmod(socket_path, 0o600)
+
+    def test_ignores_symlink_to_socket(self, socket_path: str, running_agent: KeyAgent) -> None:
+        link = os.path.join(os.path.dirname(socket_path), "link.sock")
+        os.symlink(socket_path, link)
+        assert KeyAgentClient(link).status() is None
+
+    def test_sends_nothing_to_agent_of_another_user(self, socket_path: str, running_agent: KeyAgent) -> None:
+        with patch("gptcli.src.common.key_agent._peer_is_same_user", return_value=False):
+            assert KeyAgentClient(socket_path).unlock(os.urandom(32)) is False
+        assert running_agent.handle({"op": "status"})["unlocked"] is False
+
+
+class TestEnsureSocketDir:
+
+    def test_creates_owner_only_directory(self, socket_path: str) -> None:
+        directory = os.path.join(os.path.dirname(socket_path), "agent")
+        ensure_socket_dir(os.path.join(directory, "agent.sock"))
+        assert stat.S_IMODE(os.lstat(directory).st_mode) == stat.S_IRWXU
+
+    def test_refuses_symlinked_directory(self, socket_path: str) -> None:
+        link = os.path.join(os.path.dirname(socket_path), "link")
+        os.symlink(os.path.dirname(socket_path), link)
+        with pytest.raises(RuntimeError):
+            ensure_socket_dir(os.path.join(link, "agent.sock"))
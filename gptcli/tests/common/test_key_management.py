@@ -8,11 +8,15 @@ from unittest.mock import patch
 
 import pytest
 
+from gptcli.src.common.key_agent import GPTCLI_AGENT_SOCKET_ENV, KeyAgentClient
 from gptcli.src.common.key_management import (
     _KEY_SESSION_DURATION,
     _KEY_SIZE,
     _TIMESTAMP_SIZE,
     KeyManager,
+    ScryptParams,
+    agent_socket_path,
+    calibrate_scrypt,
     make_key_manager,
 )
 from gptcli.src.common.passphrase import PassphrasePrompt
@@ -218,6 +222,79 @@ class TestKeyManager:
             assert os.path.exists(os.path.join(str(tmp_path), ".verify.enc"))
             assert os.path.exists(os.path.join(str(tmp_path), ".key"))
 
+    class TestScryptParams:
+
+        def test_initialize_records_the_given_params(self, tmp_path: str) -> None:
+            km = _make_km(tmp_path, params_path=os.path.join(str(tmp_path), ".kdf_params"))
+            params = ScryptParams(n=2**11, r=4, p=2)
+            km.initialize("test-passphrase", params=params)
+            assert km.load_scrypt_params() == params
+
+        def test_passphrase_is_verified_with_the_recorded_params(self, tmp_path: str) -> None:
+            km = _make_km(tmp_path, params_path=os.path.join(str(tmp_path), ".kdf_params"))
+            key = km.initialize("test-passphrase", params=ScryptParams(n=2**11, r=4, p=2))
+            assert km._derive_and_verify("test-passphrase") == key
+
+        def test_replace_key_material_records_the_given_params(self, tmp_path: str) -> None:
+            km = _make_km(tmp_path, params_path=os.path.join(str(tmp_path), ".kdf_params"))
+            from gptcli.src.common.encryption import Encryption
+
+            params = ScryptParams(n=2**11, r=8, p=3)
+            salt = Encryption.generate_salt()
+            key = Encryption.derive_key("test-passphrase-long", salt, n=params.n, r=params.r, p=params.p)
+            km.replace_key_material(salt=salt, key=key, params=params)
+            assert km.load_scrypt_params() == params
+            assert km.verify_passphrase("test-passphrase-long") is True
+
+        def test_missing_params_default_to_the_old_fixed_values(self, tmp_path: str) -> None:
+            params_path = os.path.join(str(tmp_path), ".kdf_params")
+            with open(params_path, "w") as f:
+                f.write('{"n": 2048}')
+            km = _make_km(tmp_path, params_path=params_path)
+            assert km.load_scrypt_params() == ScryptParams(n=2048, r=8, p=1)
+
+    class TestCalibrateScrypt:
+
+        @staticmethod
+        def _host(monkeypatch: pytest.MonkeyPatch, seconds_per_block: float) -> None:
+            """Replace scrypt timing with a host where cost grows linearly with n * r * p.
+
+            Args:
+                monkeypatch (pytest.MonkeyPatch): The monkeypatch fixture.
+                seconds_per_block (float): How long one unit of n * r * p takes.
+            """
+            monkeypatch.setattr(
+                "gptcli.src.common.key_management._time_scrypt",
+                lambda params: params.n * params.r * params.p * seconds_per_block,
+            )
+
+        def test_picks_the_largest_n_within_the_time_budget(self, monkeypatch: pytest.MonkeyPatch) -> None:
+            self._host(monkeypatch, 1.0 / (2**18 * 8))
+            params = calibrate_scrypt(target_seconds=1.0, max_memory=2**40)
+            assert params == ScryptParams(n=2**18, r=8, p=1)
+
+        def test_slower_hosts_get_a_smaller_n(self, monkeypatch: pytest.MonkeyPatch) -> None:
+            self._host(monkeypatch, 1.0 / (2**15 * 8))
+            assert calibrate_scrypt(target_seconds=1.0, max_memory=2**40).n == 2**15
+
+        def test_respects_the_memory_budget(self, monkeypatch: pytest.MonkeyPatch) -> None:
+            self._host(monkeypatch, 1.0 / (2**20 * 8))
+            params = calibrate_scrypt(target_seconds=1.0, max_memory=32 * 1024 * 1024)
+            assert params.memory <= 32 * 1024 * 1024
+            assert params.n == 2**15
+
+        def test_spends_time_left_over_by_the_memory_budget_on_p(self, monkeypatch: pytest.MonkeyPatch) -> None:
+            self._host(monkeypatch, 1.0 / (2**20 * 8))
+            assert calibrate_scrypt(target_seconds=1.0, max_memory=32 * 1024 * 1024).p == 16
+
+        def test_never_goes_below_the_minimum_n(self, monkeypatch: pytest.MonkeyPatch) -> None:
+            self._host(monkeypatch, 1.0)
+            assert calibrate_scrypt(target_seconds=0.1, max_memory=1024).n == 2**14
+
+        def test_measures_the_real_host(self) -> None:
+            params = calibrate_scrypt(target_seconds=0.01, max_memory=16 * 1024 * 1024)
+            assert params.n == 2**14 and params.r == 8 and 1 <= params.p <= 16
+
     class TestVerifyPassphrase:
 
         def test_returns_true_on_correct_passphrase(self, tmp_path: str) -> None:
@@ -442,6 +519,40 @@ class TestKeyManager:
                 assert km._load_from_cache() is None
             assert not os.path.exists(key_path)
 
+    class TestLoadFromAgent:
+
+        def test_returns_none_without_agent_socket(self, tmp_path: str) -> None:
+            km = _make_km(tmp_path)
+            km.initialize("test-passphrase")
+            assert km._load_from_agent() is None
+
+        def test_returns_agent_key_when_it_matches(self, tmp_path: str) -> None:
+            km = _make_km(tmp_path, no_cache=True)
+            key = km.initialize("test-passphrase")
+            km._agent_socket_path = os.path.join(str(tmp_path), "agent.sock")
+            with patch.object(KeyAgentClient, "get_key", return_value=key):
+                assert km.load_key() == key
+
+        def test_ignores_agent_key_that_does_not_match(self, tmp_path: str) -> None:
+            km = _make_km(tmp_path)
+            key = km.initialize("test-passphrase")
+            km._agent_socket_path = os.path.join(str(tmp_path), "agent.sock")
+            with patch.object(KeyAgentClient, "get_key", return_value=os.urandom(32)):
+                assert km._load_from_agent() is None
+                assert km.load_key() == key
+
+        def test_make_key_manager_uses_socket_from_environment(self, monkeypatch: pytest.MonkeyPatch) -> None:
+            monkeypatch.setenv(GPTCLI_AGENT_SOCKET_ENV, "/tmp/custom-agent.sock")
+            assert agent_socket_path() == "/tmp/custom-agent.sock"
+            assert make_key_manager()._agent_socket_path == "/tmp/custom-agent.sock"
+
+        def test_socket_is_in_a_per_user_directory(self, monkeypatch: pytest.MonkeyPatch) -> None:
+            monkeypatch.delenv(GPTCLI_AGENT_SOCKET_ENV, raising=False)
+            monkeypatch.setenv("XDG_RUNTIME_DIR", "/run/user/1000")
+            assert agent_socket_path() == f"/run/user/1000/gptcli_agent_{os.getuid()}/agent.sock"
+            monkeypatch.delenv("XDG_RUNTIME_DIR")
+            assert os.path.dirname(os.path.dirname(agent_socket_path())) == KeyManager._get_volatile_dir()
+
     class TestPromptForKey:
 
         def test_returns_key_on_correct_passphrase(self, tmp_path: str) -> None:
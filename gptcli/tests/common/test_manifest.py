@@ -0,0 +1,108 @@
+"""Holds all the tests for manifest.py."""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from gptcli.constants import (
+    GPTCLI_MANIFEST_FILENAME,
+    GPTCLI_MANIFEST_LATEST_FILENAME,
+    GPTCLI_MANIFEST_LOG_FILENAME,
+)
+from gptcli.src.common.encryption import Encryption
+from gptcli.src.common.manifest import Manifest
+from gptcli.src.common.record_log import RecordLog
+
+
+class TestManifest:
+
+    @staticmethod
+    def _write_legacy(storage_dir: str, entries: list[dict[str, object]]) -> None:
+        with open(os.path.join(storage_dir, GPTCLI_MANIFEST_FILENAME), "w", encoding="utf8") as f:
+            json.dump(entries, f)
+
+    class TestAppend:
+
+        def test_appends_single_frame_without_rewriting(self, tmp_path: str) -> None:
+            manifest = Manifest(str(tmp_path), None)
+            manifest.append("uuid-1", 100.0)
+            with patch.object(RecordLog, "rewrite") as mock_rewrite:
+                manifest.append("uuid-2", 200.0)
+            mock_rewrite.assert_not_called()
+            assert manifest.read() == [{"uuid": "uuid-1", "created": 100.0}, {"uuid": "uuid-2", "created": 200.0}]
+
+        def test_later_record_for_same_uuid_wins(self, tmp_path: str) -> None:
+            manifest = Manifest(str(tmp_path), None)
+            manifest.append("uuid-1", 100.0)
+            manifest.append("uuid-2", 200.0)
+            manifest.append("uuid-1", 300.0)
+            assert manifest.read() == [{"uuid": "uuid-1", "created": 300.0}, {"uuid": "uuid-2", "created": 200.0}]
+            assert manifest.latest() == {"uuid": "uuid-1", "created": 300.0}
+
+        def test_compacts_after_interval(self, tmp_path: str) -> None:
+            manifest = Manifest(str(tmp_path), None)
+            with patch("gptcli.src.common.manifest._COMPACTION_INTERVAL", 3):
+                for created in range(4):
+                    manifest.append("uuid-1", float(created))
+            records = RecordLog(os.path.join(str(tmp_path), GPTCLI_MANIFEST_LOG_FILENAME), None).read()
+            assert records is not None
+            assert len(records) < 4
+            assert manifest.read() == [{"uuid": "uuid-1", "created": 3.0}]
+
+        def test_encrypted_append(self, tmp_path: str) -> None:
+            encryption = Encryption(key=os.urandom(32))
+            manifest = Manifest(str(tmp_path), encryption)
+            manifest.append("uuid-1", 100.0)
+            manifest.append("uuid-2", 200.0)
+            assert os.path.exists(os.path.join(str(tmp_path), GPTCLI_MANIFEST_LOG_FILENAME + ".enc"))
+            assert os.path.exists(os.path.join(str(tmp_path), GPTCLI_MANIFEST_LATEST_FILENAME + ".enc"))
+            assert not os.path.exists(os.path.join(str(tmp_path), GPTCLI_MANIFEST_LOG_FILENAME))
+            assert manifest.latest() == {"uuid": "uuid-2", "created": 200.0}
+            assert Manifest(str(tmp_path), None).read() is None
+
+    class TestLegacyManifest:
+
+        def test_reads_legacy_entries(self, tmp_path: str) -> None:
+            TestManifest._write_legacy(str(tmp_path), [{"uuid": "uuid-1", "created": 100.0}])
+            assert Manifest(str(tmp_path), None).read() == [{"uuid": "uuid-1", "created": 100.0}]
+
+        def test_latest_pointer_ignored_while_legacy_exists(self, tmp_path: str) -> None:
+            TestManifest._write_legacy(str(tmp_path), [{"uuid": "uuid-1", "created": 100.0}])
+            assert Manifest(str(tmp_path), None).latest() is None
+
+        def test_append_migrates_legacy(self, tmp_path: str) -> None:
+            TestManifest._write_legacy(str(tmp_path), [{"uuid": "uuid-1", "created": 100.0}])
+            manifest = Manifest(str(tmp_path), None)
+            manifest.append("uuid-2", 200.0)
+            assert not os.path.exists(os.path.join(str(tmp_path), GPTCLI_MANIFEST_FILENAME))
+            assert manifest.read() == [{"uuid": "uuid-1", "created": 100.0}, {"uuid": "uuid-2", "created": 200.0}]
+            assert manifest.latest() == {"uuid": "uuid-2", "created": 200.0}
+
+    class TestLatest:
+
+        @pytest.fixture
+        def manifest(self, tmp_path: str) -> Manifest:
+            return Manifest(str(tmp_path), None)
+
+        def test_returns_none_when_empty(self, manifest: Manifest) -> None:
+            assert manifest.latest() is None
+
+        def test_does_not_read_log(self, manifest: Manifest) -> None:
+            manifest.append("uuid-1", 100.0)
+            with patch.object(RecordLog, "read") as mock_read:
+                assert manifest.latest() == {"uuid": "uuid-1", "created": 100.0}
+            mock_read.assert_not_called()
+
+        def test_returns_none_when_pointer_corrupt(self, manifest: Manifest, tmp_path: str) -> None:
+            manifest.append("uuid-1", 100.0)
+            with open(os.path.join(str(tmp_path), GPTCLI_MANIFEST_LATEST_FILENAME), "w") as f:
+                f.write("{not json")
+            assert manifest.latest() is None
+
+        def test_rewrite_with_no_entries_removes_pointer(self, manifest: Manifest, tmp_path: str) -> None:
+            manifest.append("uuid-1", 100.0)
+            manifest.rewrite([])
+            assert manifest.latest() is None
+            assert not os.path.exists(os.path.join(str(tmp_path), GPTCLI_MANIFEST_LATEST_FILENAME))
@@ -0,0 +1,236 @@
+"""Holds all the tests for message_log.py."""
+
+import os
+from typing import Any
+
+import pytest
+
+from gptcli.constants import (
+    GPTCLI_MESSAGES_INDEX_FILENAME,
+    GPTCLI_MESSAGES_LOG_FILENAME,
+    GPTCLI_SESSION_FILENAME,
+)
+from gptcli.src.common.chat_journal import ChatJournal
+from gptcli.src.common.encryption import (
+    CIPHERTEXT_OVERHEAD,
+    ENVELOPE_HEADER_SIZE,
+    Encryption,
+)
+from gptcli.src.common.message_log import (
+    MessageLog,
+    SessionLocked,
+    append_message_log,
+    copy_message_log,
+    read_chat_session,
+    read_chat_window,
+    select_window,
+    write_message_log,
+)
+from gptcli.src.common.record_log import decrypt_frames, encrypt_frames
+from gptcli.src.common.session_store import (
+    DirectoryStore,
+    PackedStore,
+    SessionStore,
+)
+
+
+class TestMessageLog:
+
+    @pytest.fixture(params=["directory", "packed"])
+    def store(self, request: pytest.FixtureRequest, tmp_path: str) -> SessionStore:
+        store: SessionStore = (
+            DirectoryStore(str(tmp_path)) if request.param == "directory" else PackedStore(str(tmp_path))
+        )
+        store.create_session("uuid-1")
+        return store
+
+    @staticmethod
+    def _messages(*contents: str) -> list[dict[str, Any]]:
+        return [
+            {"uuid": f"m{i}", "role": "system" if c.startswith("sys") else "user", "content": c, "tokens": 10}
+            for i, c in enumerate(contents)
+        ]
+
+    @staticmethod
+    def _contents(messages: list[dict[str, Any]] | None) -> list[Any]:
+        assert messages is not None
+        return [m["content"] for m in messages]
+
+    class TestSelectWindow:
+
+        def test_no_limits_loads_everything(self) -> None:
+            assert select_window([(5, False), (5, False)], None, None) == ([0, 1], 0)
+
+        def test_last_counts_only_non_system_messages(self) -> None:
+            entries = [(5, True), (5, False), (5, False), (5, True), (5, False)]
+            assert select_window(entries, 2, None) == ([0, 2, 3, 4], 2)
+
+        def test_token_budget_stops_at_first_message_that_does_not_fit(self) -> None:
+            entries = [(1, False), (50, False), (10, False), (10, False)]
+            assert select_window(entries, None, 25) == ([2, 3], 2)
+
+        def test_newest_message_is_always_loaded(self) -> None:
+            assert select_window([(5, False), (100, False)], None, 10) == ([1], 1)
+
+    class TestReadWrite:
+
+        def test_reads_selected_messages(self, store: SessionStore) -> None:
+            write_message_log(store, "uuid-1", TestMessageLog._messages("sys", "a", "b", "c", "d"), None)
+            log = MessageLog.open(store, "uuid-1", None)
+            assert log is not None
+            assert len(log) == 5
+            indices, prefix = log.select(2, None)
+            assert prefix == 3
+            assert TestMessageLog._contents(log.read(indices)) == ["sys", "c", "d"]
+
+        def test_encrypted_log_reads_selected_messages(self, store: SessionStore) -> None:
+            encryption = Encryption(key=os.urandom(32))
+            write_message_log(store, "uuid-1", TestMessageLog._messages("a", "secret", "c"), encryption)
+            stored = store.read_file("uuid-1", GPTCLI_MESSAGES_LOG_FILENAME)
+            assert stored is not None and stored[1] is True
+            assert b"secret" not in stored[0]
+            log = MessageLog.open(store, "uuid-1", encryption)
+            assert log is not None
+            assert TestMessageLog._contents(log.read([1, 2])) == ["secret", "c"]
+            with pytest.raises(SessionLocked):
+                MessageLog.open(store, "uuid-1", None)
+
+        def test_index_survives_encrypting_the_log(self, tmp_path: str) -> None:
+            encryption = Encryption(key=os.urandom(32))
+            store = DirectoryStore(str(tmp_path))
+            store.create_session("uuid-1")
+            write_message_log(store, "uuid-1", TestMessageLog._messages("a", "b", "c"), None)
+            for name, transcode in (
+                (GPTCLI_MESSAGES_LOG_FILENAME, lambda data: encrypt_frames(data, encryption)),
+                (GPTCLI_MESSAGES_INDEX_FILENAME, encryption.encrypt),
+            ):
+                stored = store.read_file("uuid-1", name)
+                assert stored is not None
+                store.write_file("uuid-1", name, transcode(stored[0]), encrypted=True)
+                os.remove(os.path.join(str(tmp_path), "uuid-1", name))
+            log = MessageLog.open(store, "uuid-1", encryption)
+            assert log is not None
+            assert TestMessageLog._contents(log.read([1, 2])) == ["b", "c"]
+            stored = store.read_file("uuid-1", GPTCLI_MESSAGES_LOG_FILENAME)
+            assert stored is not None and decrypt_frames(stored[0], encryption) is not None
+
+        def test_index_survives_decrypting_the_log(self, tmp_path: str) -> None:
+            encryption = Encryption(key=os.urandom(32))
+            store = DirectoryStore(str(tmp_path))
+            store.create_session("uuid-1")
+            write_message_log(store, "uuid-1", TestMessageLog._messages("a" * 500, "b" * 500, "c" * 500), encryption)
+            for name, transcode in (
+                (GPTCLI_MESSAGES_LOG_FILENAME, lambda data: decrypt_frames(data, encryption)),
+                (GPTCLI_MESSAGES_INDEX_FILENAME, encryption.decrypt),
+            ):
+                stored = store.read_file("uuid-1", name)
+                assert stored is not None
+                plaintext = transcode(stored[0])
+                assert plaintext is not None
+                store.write_file("uuid-1", name, plaintext, encrypted=False)
+                os.remove(os.path.join(str(tmp_path), "uuid-1", name + ".enc"))
+            log = MessageLog.open(store, "uuid-1", None)
+            assert log is not None
+            assert TestMessageLog._contents(log.read([1, 2])) == ["b" * 500, "c" * 500]
+
+        def test_encrypted_log_is_compressed(self, tmp_path: str) -> None:
+            messages = TestMessageLog._messages(
+                *(f"{i} the quick brown fox jumps over the lazy dog " * 40 for i in range(20))
+            )
+            sizes: dict[str, int] = {}
+            for name, encryption in (
+                ("plain", None),
+                ("uncompressed", Encryption(key=os.urandom(32), codec=None)),
+                ("compressed", Encryption(key=os.urandom(32))),
+            ):
+                store = DirectoryStore(os.path.join(str(tmp_path), name))
+                store.create_session("uuid-1")
+                write_message_log(store, "uuid-1", messages, encryption)
+                stored = store.read_file("uuid-1", GPTCLI_MESSAGES_LOG_FILENAME)
+                assert stored is not None
+                sizes[name] = len(stored[0])
+                assert read_chat_session(store, "uuid-1", encryption) == messages
+            assert sizes["uncompressed"] == sizes["plain"] + ENVELOPE_HEADER_SIZE + len(messages) * CIPHERTEXT_OVERHEAD
+            assert sizes["compressed"] < sizes["plain"] // 4
+
+        def test_replaces_legacy_session_json(self, store: SessionStore) -> None:
+            store.write_file("uuid-1", GPTCLI_SESSION_FILENAME, b'{"messages": []}', encrypted=False)
+            write_message_log(store, "uuid-1", TestMessageLog._messages("a"), None)
+            assert store.read_file("uuid-1", GPTCLI_SESSION_FILENAME) is None
+
+        def test_window_matches_selected_messages(self, store: SessionStore) -> None:
+            write_message_log(store, "uuid-1", TestMessageLog._messages("sys", "a", "sys2", "b", "c"), None)
+            log = MessageLog.open(store, "uuid-1", None)
+            assert log is not None
+            indices, prefix = log.select(1, None)
+            assert log.window(prefix) == indices == [0, 2, 4]
+
+    class TestAppend:
+
+        @pytest.mark.parametrize("encrypted", [False, True])
+        def test_appends_to_the_end_of_the_log(self, store: SessionStore, encrypted: bool) -> None:
+            encryption = Encryption(key=os.urandom(32)) if encrypted else None
+            write_message_log(store, "uuid-1", TestMessageLog._messages("sys", "a"), encryption)
+            before = store.read_file("uuid-1", GPTCLI_MESSAGES_LOG_FILENAME)
+            assert before is not None
+            appended = [{"uuid": "m2", "role": "user", "content": "b", "tokens": 10}]
+            assert append_message_log(store, "uuid-1", appended, encryption) is True
+            after = store.read_file("uuid-1", GPTCLI_MESSAGES_LOG_FILENAME)
+            assert after is not None and after[0].startswith(before[0])
+            log = MessageLog.open(store, "uuid-1", encryption)
+            assert log is not None
+            assert TestMessageLog._contents(log.read([1, 2])) == ["a", "b"]
+
+        def test_refuses_log_with_other_encryption(self, store: SessionStore) -> None:
+            write_message_log(store, "uuid-1", TestMessageLog._messages("a"), None)
+            encryption = Encryption(key=os.urandom(32))
+            assert append_message_log(store, "uuid-1", TestMessageLog._messages("b"), encryption) is False
+            assert TestMessageLog._contents(read_chat_session(store, "uuid-1", None)) == ["a"]
+
+        def test_refuses_session_without_log(self, store: SessionStore) -> None:
+            assert append_message_log(store, "uuid-1", TestMessageLog._messages("a"), None) is False
+
+        def test_copy_keeps_the_data_key(self, store: SessionStore) -> None:
+            encryption = Encryption(key=os.urandom(32))
+            write_message_log(store, "uuid-1", TestMessageLog._messages("a", "b"), encryption)
+            store.create_session("uuid-2")
+            assert copy_message_log(store, "uuid-1", "uuid-2") is True
+            assert store.read_file("uuid-2", GPTCLI_MESSAGES_LOG_FILENAME) == store.read_file(
+                "uuid-1", GPTCLI_MESSAGES_LOG_FILENAME
+            )
+            appended = [{"uuid": "m2", "role": "user", "content": "c", "tokens": 10}]
+            assert append_message_log(store, "uuid-2", appended, encryption) is True
+            assert TestMessageLog._contents(read_chat_session(store, "uuid-2", encryption)) == ["a", "b", "c"]
+            assert TestMessageLog._contents(read_chat_session(store, "uuid-1", encryption)) == ["a", "b"]
+
+    class TestReadChatSession:
+
+        def test_reads_legacy_session_json(self, store: SessionStore) -> None:
+            store.write_file("uuid-1", GPTCLI_SESSION_FILENAME, b'{"messages": [{"content": "old"}]}', False)
+            assert TestMessageLog._contents(read_chat_session(store, "uuid-1", None)) == ["old"]
+
+        def test_prefers_journal(self, store: SessionStore) -> None:
+            write_message_log(store, "uuid-1", TestMessageLog._messages("stored"), None)
+            ChatJournal(store, "uuid-1", None)._append({"op": "add", "message": {"content": "journaled"}})
+            assert TestMessageLog._contents(read_chat_session(store, "uuid-1", None)) == ["journaled"]
+
+        def test_missing_session_returns_none(self, store: SessionStore) -> None:
+            assert read_chat_session(store, "uuid-1", None) is None
+
+    class TestReadChatWindow:
+
+        def test_windows_legacy_session_json(self, store: SessionStore) -> None:
+            raw = b'{"messages": [{"role": "user", "content": "a"}, {"role": "user", "content": "b"}]}'
+            store.write_file("uuid-1", GPTCLI_SESSION_FILENAME, raw, encrypted=False)
+            window = read_chat_window(store, "uuid-1", None, 1, None)
+            assert window is not None
+            assert TestMessageLog._contents(window.messages) == ["b"]
+            assert (window.prefix, window.total, window.skipped) == (1, 2, 1)
+            assert window.anchor == ""
+
+        def test_anchor_is_first_non_system_message(self, store: SessionStore) -> None:
+            write_message_log(store, "uuid-1", TestMessageLog._messages("sys", "a", "b"), None)
+            window = read_chat_window(store, "uuid-1", None, None, 10)
+            assert window is not None
+            assert TestMessageLog._contents(window.messages) == ["sys", "b"]
+            assert window.anchor == "m2"
@@ -0,0 +1,166 @@
+"""Holds all the tests for record_log.py."""
+
+import os
+
+import pytest
+
+from gptcli.src.common.encryption import (
+    CIPHERTEXT_OVERHEAD,
+    ENVELOPE_HEADER_SIZE,
+    Encryption,
+    is_envelope,
+)
+from gptcli.src.common.record_log import (
+    RecordLog,
+    decode_frames,
+    decode_records,
+    decrypt_frames,
+    encode_log,
+    encode_record,
+    encrypt_frames,
+    is_record_log,
+    open_frames,
+)
+
+
+class TestRecordLog:
+
+    @pytest.fixture
+    def encryption(self) -> Encryption:
+        return Encryption(key=os.urandom(32))
+
+    class TestIsRecordLog:
+
+        def test_matches_plaintext_and_encrypted_logs(self) -> None:
+            assert is_record_log("/tmp/.manifest.log")
+            assert is_record_log("/tmp/.manifest.log.enc")
+
+        def test_rejects_other_files(self) -> None:
+            assert not is_record_log("/tmp/session.json.enc")
+            assert not is_record_log("/tmp/.manifest.json")
+
+    class TestAppendAndRead:
+
+        def test_read_returns_empty_list_when_missing(self, tmp_path: str) -> None:
+            assert RecordLog(os.path.join(str(tmp_path), "a.log"), None).read() == []
+
+        def test_appended_records_are_read_in_order(self, tmp_path: str) -> None:
+            log = RecordLog(os.path.join(str(tmp_path), "a.log"), None)
+            log.append({"n": 1})
+            log.append({"n": 2})
+            assert log.read() == [{"n": 1}, {"n": 2}]
+
+        def test_ignores_truncated_trailing_frame(self, tmp_path: str) -> None:
+            filepath = os.path.join(str(tmp_path), "a.log")
+            log = RecordLog(filepath, None)
+            log.append({"n": 1})
+            log.append({"n": 2})
+            with open(filepath, "r+b") as fp:
+                fp.truncate(os.path.getsize(filepath) - 3)
+            assert log.read() == [{"n": 1}]
+
+        def test_encrypted_log_has_no_plaintext(self, encryption: Encryption, tmp_path: str) -> None:
+            filepath = os.path.join(str(tmp_path), "a.log")
+            log = RecordLog(filepath, encryption)
+            log.append({"secret": "hunter2"})
+            assert not os.path.exists(filepath)
+            with open(filepath + ".enc", "rb") as fp:
+                assert b"hunter2" not in fp.read()
+            assert log.read() == [{"secret": "hunter2"}]
+
+        def test_encrypted_log_without_key_returns_none(self, encryption: Encryption, tmp_path: str) -> None:
+            filepath = os.path.join(str(tmp_path), "a.log")
+            RecordLog(filepath, encryption).append({"n": 1})
+            assert RecordLog(filepath, None).read() is None
+
+        def test_encrypted_log_has_one_header_with_its_own_key(self, encryption: Encryption, tmp_path: str) -> None:
+            filepath = os.path.join(str(tmp_path), "a.log")
+            log = RecordLog(filepath, encryption)
+            log.append({"n": 1})
+            log.append({"n": 2})
+            with open(log.path, "rb") as fp:
+                data = fp.read()
+            assert is_envelope(data)
+            assert not is_envelope(data[ENVELOPE_HEADER_SIZE:])
+            assert decode_records(data[ENVELOPE_HEADER_SIZE:], encryption, "test") == []
+
+        def test_rewrapped_header_moves_log_to_new_key(self, encryption: Encryption, tmp_path: str) -> None:
+            filepath = os.path.join(str(tmp_path), "a.log")
+            RecordLog(filepath, encryption).append({"n": 1})
+            new_encryption = Encryption(key=os.urandom(32))
+            with open(filepath + ".enc", "r+b") as fp:
+                header = encryption.rewrap(fp.read(ENVELOPE_HEADER_SIZE), new_encryption)
+                assert header is not None
+                fp.seek(0)
+                fp.write(header)
+            RecordLog(filepath, new_encryption).append({"n": 2})
+            assert RecordLog(filepath, new_encryption).read() == [{"n": 1}, {"n": 2}]
+
+        def test_reads_log_without_header(self, encryption: Encryption, tmp_path: str) -> None:
+            filepath = os.path.join(str(tmp_path), "a.log")
+            with open(filepath + ".enc", "wb") as fp:
+                fp.write(encode_record({"n": 1}, encryption))
+            RecordLog(filepath, encryption).append({"n": 2})
+            assert RecordLog(filepath, encryption).read() == [{"n": 1}, {"n": 2}]
+
+        def test_skips_frames_encrypted_with_another_key(self, encryption: Encryption, tmp_path: str) -> None:
+            filepath = os.path.join(str(tmp_path), "a.log")
+            RecordLog(filepath, Encryption(key=os.urandom(32))).append({"n": 1})
+            RecordLog(filepath, encryption).append({"n": 2})
+            assert RecordLog(filepath, encryption).read() == [{"n": 2}]
+
+    class TestRewrite:
+
+        def test_replaces_records(self, tmp_path: str) -> None:
+            log = RecordLog(os.path.join(str(tmp_path), "a.log"), None)
+            log.append({"n": 1})
+            log.rewrite([{"n": 3}])
+            assert log.read() == [{"n": 3}]
+
+        def test_removes_plaintext_copy_when_encrypted(self, encryption: Encryption, tmp_path: str) -> None:
+            filepath = os.path.join(str(tmp_path), "a.log")
+            RecordLog(filepath, None).append({"n": 1})
+            RecordLog(filepath, encryption).rewrite([{"n": 1}])
+            assert not os.path.exists(filepath)
+            assert os.path.exists(filepath + ".enc")
+
+    class TestTranscodeFrames:
+
+        def test_round_trip(self, encryption: Encryption, tmp_path: str) -> None:
+            filepath = os.path.join(str(tmp_path), "a.log")
+            RecordLog(filepath, None).append({"n": 1})
+            RecordLog(filepath, None).append({"n": 2})
+            with open(filepath, "rb") as fp:
+                plaintext = fp.read()
+            decrypted = decrypt_frames(encrypt_frames(plaintext, encryption), encryption)
+            assert decrypted == plaintext
+
+        def test_keeps_compressed_records_compressed(self, encryption: Encryption) -> None:
+            records = [{"text": "lorem ipsum " * 100}, {"text": "dolor sit amet " * 100}]
+            sealed = encode_log(records, encryption)
+            plaintext = decrypt_frames(sealed, encryption)
+            assert plaintext is not None
+            assert len(plaintext) == len(sealed) - ENVELOPE_HEADER_SIZE - 2 * CIPHERTEXT_OVERHEAD
+            assert len(plaintext) < len(encode_log(records, None)) // 4
+            assert decode_records(plaintext, None, "test") == records
+            assert decode_records(encrypt_frames(plaintext, encryption), encryption, "test") == records
+
+        def test_decrypt_fails_with_wrong_key(self, encryption: Encryption) -> None:
+            data = encrypt_frames(b"\x00\x00\x00\x02{}", encryption)
+            assert decrypt_frames(data, Encryption(key=os.urandom(32))) is None
+
+    class TestEncodeDecodeRecords:
+
+        def test_round_trip(self, encryption: Encryption) -> None:
+            data = encode_log([{"n": 1}, {"n": 2}], encryption)
+            assert decode_records(data, encryption, "test") == [{"n": 1}, {"n": 2}]
+
+        def test_decodes_frames_after_header(self, encryption: Encryption) -> None:
+            data = encode_log([{"n": 1}, {"n": 2}], encryption)
+            frame_encryption, start = open_frames(data[:ENVELOPE_HEADER_SIZE], encryption)
+            assert start == ENVELOPE_HEADER_SIZE
+            assert decode_frames(data[start:], frame_encryption, "test") == [{"n": 1}, {"n": 2}]
+
+        def test_skips_malformed_record(self) -> None:
+            data = encode_record({"n": 1}, None) + b"\x00\x00\x00\x01{"
+            assert decode_records(data, None, "test") == [{"n": 1}]
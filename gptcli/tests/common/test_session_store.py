@@ -0,0 +1,287 @@
+"""Holds all the tests for session_store.py."""
+
+import os
+import sqlite3
+from collections.abc import Iterator
+from contextlib import closing
+
+import pytest
+
+from gptcli.constants import GPTCLI_SESSION_STORE_FILENAME
+from gptcli.src.common.encryption import ENVELOPE_HEADER_SIZE, Encryption
+from gptcli.src.common.record_log import decode_records, encode_record
+from gptcli.src.common.session_store import (
+    DirectoryStore,
+    PackedStore,
+    SessionStore,
+    copy_sessions,
+    is_packed,
+    open_session_store,
+)
+
+
+class TestSessionStore:
+
+    @pytest.fixture(params=["directory", "packed"])
+    def store(self, request: pytest.FixtureRequest, tmp_path: str) -> Iterator[SessionStore]:
+        if request.param == "directory":
+            yield DirectoryStore(str(tmp_path))
+        else:
+            packed = PackedStore(str(tmp_path))
+            yield packed
+            packed.close()
+
+    class TestBackends:
+
+        def test_write_and_read_file(self, store: SessionStore) -> None:
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "session.json", b"{}", encrypted=False)
+            assert store.has_session("uuid-1")
+            assert store.read_file("uuid-1", "session.json") == (b"{}", False)
+            assert store.read_file("uuid-1", "missing.json") is None
+
+        def test_lists_sessions_and_file_names(self, store: SessionStore) -> None:
+            for session_uuid in ("uuid-2", "uuid-1"):
+                store.create_session(session_uuid)
+            store.write_file("uuid-1", "b.png", b"b", encrypted=True)
+            store.write_file("uuid-1", "a.md", b"a", encrypted=False)
+            assert store.session_uuids() == ["uuid-1", "uuid-2"]
+            assert store.file_names("uuid-1") == ["a.md", "b.png"]
+            assert store.file_names("uuid-2") == []
+
+        def test_delete_file_and_session(self, store: SessionStore) -> None:
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "a.md", b"a", encrypted=True)
+            store.delete_file("uuid-1", "a.md")
+            assert store.read_file("uuid-1", "a.md") is None
+            store.delete_session("uuid-1")
+            assert not store.has_session("uuid-1")
+
+        def test_read_text_decrypts(self, store: SessionStore) -> None:
+            encryption = Encryption(key=os.urandom(32))
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "a.md", encryption.encrypt(b"# Title"), encrypted=True)
+            assert store.read_text("uuid-1", "a.md", encryption) == "# Title"
+            assert store.read_text("uuid-1", "a.md", None) is None
+
+        def test_append_file_extends_stored_data(self, store: SessionStore) -> None:
+            store.create_session("uuid-1")
+            store.append_file("uuid-1", "a.log", b"one", encrypted=False)
+            store.append_file("uuid-1", "a.log", b"two", encrypted=False)
+            assert store.read_file("uuid-1", "a.log") == (b"onetwo", False)
+            store.write_file("uuid-1", "a.log", b"new", encrypted=False)
+            assert store.read_file("uuid-1", "a.log") == (b"new", False)
+
+        def test_read_range_spans_appended_chunks(self, store: SessionStore) -> None:
+            store.create_session("uuid-1")
+            store.append_file("uuid-1", "a.log", b"0123", encrypted=False)
+            store.append_file("uuid-1", "a.log", b"4567", encrypted=False)
+            assert store.read_range("uuid-1", "a.log", 2, 4) == (b"2345", False)
+            assert store.read_range("uuid-1", "a.log", 6, 10) == (b"67", False)
+            assert store.read_range("uuid-1", "missing.log", 0, 1) is None
+
+        def test_open_file_reads_the_stored_bytes(self, store: SessionStore) -> None:
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "document.md", b"sealed", encrypted=True)
+            opened = store.open_file("uuid-1", "document.md")
+            assert opened is not None
+            source, encrypted = opened
+            with source:
+                assert (source.read(), encrypted) == (b"sealed", True)
+            assert store.open_file("uuid-1", "missing.md") is None
+
+        def test_stamp_changes_when_session_created(self, store: SessionStore) -> None:
+            before = store.stamp()
+            store.create_session("uuid-1")
+            assert store.stamp() != before
+
+        def test_session_stamp_changes_when_files_change(self, store: SessionStore) -> None:
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "a.md", b"a", encrypted=False)
+            written = store.session_stamp("uuid-1")
+            assert store.session_stamp("uuid-1") == written
+            store.write_file("uuid-1", "a.md", b"rewritten", encrypted=False)
+            rewritten = store.session_stamp("uuid-1")
+            assert rewritten != written
+            store.append_file("uuid-1", "a.md", b"more", encrypted=False)
+            assert store.session_stamp("uuid-1") != rewritten
+
+        def test_session_stamps_skip_missing_sessions(self, store: SessionStore) -> None:
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "a.md", b"a", encrypted=False)
+            assert store.session_stamp("missing") is None
+            assert list(store.session_stamps(["uuid-1", "missing"])) == ["uuid-1"]
+
+        def test_file_name_cannot_escape_session(self, store: SessionStore, tmp_path: str) -> None:
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "../../escape.md", b"x", encrypted=False)
+            assert store.file_names("uuid-1") == ["escape.md"]
+            assert not os.path.exists(os.path.join(os.path.dirname(str(tmp_path)), "escape.md"))
+
+    class TestPackedStore:
+
+        def test_adds_session_versions_to_older_databases(self, tmp_path: str) -> None:
+            db_path = os.path.join(str(tmp_path), GPTCLI_SESSION_STORE_FILENAME)
+            with closing(sqlite3.connect(db_path)) as conn:
+                conn.executescript(
+                    """
+                    CREATE TABLE sessions (uuid TEXT PRIMARY KEY) WITHOUT ROWID;
+                    INSERT INTO sessions VALUES ('uuid-1');
+                    """
+                )
+            store = PackedStore(str(tmp_path))
+            before = store.session_stamp("uuid-1")
+            store.write_file("uuid-1", "a.md", b"a", encrypted=False)
+            assert store.session_stamp("uuid-1") != before
+            store.close()
+
+        def test_session_stamps_read_only_the_requested_sessions(self, tmp_path: str) -> None:
+            store = PackedStore(str(tmp_path))
+            for i in range(5):
+                store.create_session(f"uuid-{i}")
+                store.write_file(f"uuid-{i}", "a.md", b"a" * i, encrypted=False)
+            statements: list[str] = []
+            store._conn.set_trace_callback(statements.append)
+            stamps = store.session_stamps(["uuid-3", "uuid-1"])
+            store._conn.set_trace_callback(None)
+            assert stamps == {"uuid-1": store.session_stamps(["uuid-1"])["uuid-1"], "uuid-3": [1, 1, 3]}
+            assert len(statements) == 1 and "json_each" in statements[0]
+            store.close()
+
+        def test_transaction_commits_once(self, tmp_path: str) -> None:
+            store = PackedStore(str(tmp_path))
+            with store.transaction():
+                store.create_session("uuid-1")
+                store.write_file("uuid-1", "a.md", b"a", encrypted=False)
+                other = PackedStore(str(tmp_path))
+                assert other.session_uuids() == []
+                other.close()
+            other = PackedStore(str(tmp_path))
+            assert other.session_uuids() == ["uuid-1"]
+            other.close()
+            store.close()
+
+        def test_transaction_rolls_back_on_error(self, tmp_path: str) -> None:
+            store = PackedStore(str(tmp_path))
+            with pytest.raises(ValueError):
+                with store.transaction():
+                    store.create_session("uuid-1")
+                    raise ValueError
+            assert store.session_uuids() == []
+            store.close()
+
+        def test_recrypt_round_trip(self, tmp_path: str) -> None:
+            encryption = Encryption(key=os.urandom(32))
+            store = PackedStore(str(tmp_path))
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "a.md", b"a", encrypted=False)
+            assert store.recrypt(None, encryption) == 1
+            stored = store.read_file("uuid-1", "a.md")
+            assert stored is not None and stored[1] is True
+            assert store.recrypt(encryption, None) == 1
+            assert store.read_file("uuid-1", "a.md") == (b"a", False)
+            store.close()
+
+        def test_recrypt_reads_one_file_at_a_time(self, tmp_path: str) -> None:
+            encryption = Encryption(key=os.urandom(32))
+            store = PackedStore(str(tmp_path))
+            for i in range(3):
+                store.create_session(f"uuid-{i}")
+                store.write_file(f"uuid-{i}", "a.md", b"a", encrypted=False)
+            statements: list[str] = []
+            store._conn.set_trace_callback(statements.append)
+            assert store.recrypt(None, encryption) == 3
+            store._conn.set_trace_callback(None)
+            reads = [s for s in statements if s.lstrip().startswith("SELECT") and "data" in s]
+            assert len(reads) == 3 and all("WHERE" in s for s in reads)
+            store.close()
+
+        def test_recrypt_rewrap_never_loads_file_contents(self, tmp_path: str) -> None:
+            old_encryption, new_encryption = Encryption(key=os.urandom(32)), Encryption(key=os.urandom(32))
+            store = PackedStore(str(tmp_path))
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "a.md", old_encryption.encrypt_envelope(b"a" * 1000), encrypted=True)
+            statements: list[str] = []
+            store._conn.set_trace_callback(statements.append)
+            assert store.recrypt(old_encryption, new_encryption) == 1
+            store._conn.set_trace_callback(None)
+            assert not [s for s in statements if "SELECT data" in s]
+            stored = store.read_file("uuid-1", "a.md")
+            assert stored is not None and new_encryption.decrypt(stored[0]) == b"a" * 1000
+            store.close()
+
+        def test_recrypt_transcodes_record_logs_by_frame(self, tmp_path: str) -> None:
+            encryption = Encryption(key=os.urandom(32))
+            store = PackedStore(str(tmp_path))
+            store.create_session("uuid-1")
+            store.append_file("uuid-1", "a.log", encode_record({"n": 1}, None), encrypted=False)
+            store.append_file("uuid-1", "a.log", encode_record({"n": 2}, None), encrypted=False)
+            assert store.recrypt(None, encryption) == 1
+            stored = store.read_file("uuid-1", "a.log")
+            assert stored is not None
+            assert decode_records(stored[0], encryption, "a.log") == [{"n": 1}, {"n": 2}]
+            store.close()
+
+        def test_recrypt_rewraps_envelope_headers_only(self, tmp_path: str) -> None:
+            old_encryption, new_encryption = Encryption(key=os.urandom(32)), Encryption(key=os.urandom(32))
+            sealed = old_encryption.encrypt_envelope(b"a" * 1000)
+            store = PackedStore(str(tmp_path))
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "a.md", sealed, encrypted=True)
+            assert store.recrypt(old_encryption, new_encryption) == 1
+            stored = store.read_file("uuid-1", "a.md")
+            assert stored is not None
+            assert stored[0][ENVELOPE_HEADER_SIZE:] == sealed[ENVELOPE_HEADER_SIZE:]
+            assert new_encryption.decrypt(stored[0]) == b"a" * 1000
+            store.close()
+
+        def test_recrypt_rewraps_appended_record_log_header_only(self, tmp_path: str) -> None:
+            old_encryption, new_encryption = Encryption(key=os.urandom(32)), Encryption(key=os.urandom(32))
+            header, frame_encryption = old_encryption.new_envelope()
+            store = PackedStore(str(tmp_path))
+            store.create_session("uuid-1")
+            store.append_file("uuid-1", "a.log", header + encode_record({"n": 1}, frame_encryption), encrypted=True)
+            store.append_file("uuid-1", "a.log", encode_record({"n": 2}, frame_encryption), encrypted=True)
+            before = store.read_file("uuid-1", "a.log")
+            assert store.recrypt(old_encryption, new_encryption) == 1
+            stored = store.read_file("uuid-1", "a.log")
+            assert before is not None and stored is not None
+            assert stored[0][ENVELOPE_HEADER_SIZE:] == before[0][ENVELOPE_HEADER_SIZE:]
+            assert decode_records(stored[0], new_encryption, "a.log") == [{"n": 1}, {"n": 2}]
+            store.close()
+
+        def test_recrypt_with_wrong_key_changes_nothing(self, tmp_path: str) -> None:
+            sealed = Encryption(key=os.urandom(32)).encrypt(b"a")
+            store = PackedStore(str(tmp_path))
+            store.create_session("uuid-1")
+            store.write_file("uuid-1", "a.md", sealed, encrypted=True)
+            with pytest.raises(RuntimeError):
+                store.recrypt(Encryption(key=os.urandom(32)), None)
+            assert store.read_file("uuid-1", "a.md") == (sealed, True)
+            store.close()
+
+    class TestOpenSessionStore:
+
+        def test_uses_directory_store_by_default(self, tmp_path: str) -> None:
+            assert not is_packed(str(tmp_path))
+            assert isinstance(open_session_store(str(tmp_path)), DirectoryStore)
+
+        def test_uses_packed_store_when_database_exists(self, tmp_path: str) -> None:
+            PackedStore(str(tmp_path)).close()
+            assert os.path.exists(os.path.join(str(tmp_path), GPTCLI_SESSION_STORE_FILENAME))
+            store = open_session_store(str(tmp_path))
+            assert isinstance(store, PackedStore)
+            store.close()
+
+    class TestCopySessions:
+
+        def test_copies_stored_bytes(self, tmp_path: str) -> None:
+            source = DirectoryStore(os.path.join(str(tmp_path), "source"))
+            source.create_session("uuid-1")
+            source.write_file("uuid-1", "a.md", b"sealed", encrypted=True)
+            source.write_file("uuid-1", "b.png", b"png", encrypted=False)
+            target = PackedStore(str(tmp_path))
+            assert copy_sessions(source, target) == 1
+            assert target.read_file("uuid-1", "a.md") == (b"sealed", True)
+            assert target.read_file("uuid-1", "b.png") == (b"png", False)
+            target.close()
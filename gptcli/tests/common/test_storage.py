@@ -3,6 +3,8 @@
 import json
 import os
 import re
+import shutil
+import sqlite3
 import uuid
 from pathlib import Path
 from typing import Any
@@ -10,9 +12,22 @@ from unittest.mock import patch
 
 import pytest
 
+from gptcli.constants import (
+    GPTCLI_HASH_INDEX_FILENAME,
+    GPTCLI_JOURNAL_FILENAME,
+)
 from gptcli.constants import GPTCLI_MANIFEST_FILENAME as _MANIFEST_FILENAME
+from gptcli.constants import (
+    GPTCLI_MANIFEST_LOG_FILENAME,
+    GPTCLI_MESSAGES_INDEX_FILENAME,
+    GPTCLI_MESSAGES_LOG_FILENAME,
+)
+from gptcli.src.common import blob_store
+from gptcli.src.common.blob_store import blob_digest, blob_owner
 from gptcli.src.common.constants import MistralModelsOcr, ProviderNames
 from gptcli.src.common.encryption import Encryption
+from gptcli.src.common.fts import _DB_FILENAME, ChatFTS, OcrFTS
+from gptcli.src.common.manifest import Manifest
 from gptcli.src.common.message import MessageFactory, Messages
 from gptcli.src.common.storage import Storage, StorageEmpty
 
@@ -457,10 +472,8 @@ class TestStorage:
                 page_count=1,
                 image_data=[],
             )
-            manifest_path = os.path.join(str(tmp_path), _MANIFEST_FILENAME)
-            assert os.path.exists(manifest_path)
-            with open(manifest_path, "r", encoding="utf8") as f:
-                entries = json.load(f)
+            assert os.path.exists(os.path.join(str(tmp_path), GPTCLI_MANIFEST_LOG_FILENAME))
+            entries = storage_with_tmp_dir._read_manifest(str(tmp_path))
             assert len(entries) == 1
             assert "uuid" in entries[0]
             assert "created" in entries[0]
@@ -591,7 +604,7 @@ class TestStorage:
 
         # Image saving
 
-        def test_saves_image_files_to_session_directory(self, storage_with_tmp_dir: Storage) -> None:
+        def test_saves_images_as_blobs_instead_of_session_files(self, storage_with_tmp_dir: Storage) -> None:
             session_dir = storage_with_tmp_dir.store_ocr_result(
                 source="/path/to/doc.pdf",
                 markdown_content="# Test",
@@ -599,20 +612,36 @@ class TestStorage:
                 page_count=1,
                 image_data=[("img1.png", b"PNG image data"), ("img2.jpg", b"JPEG image data")],
             )
-            assert os.path.exists(os.path.join(session_dir, "img1.png"))
-            assert os.path.exists(os.path.join(session_dir, "img2.jpg"))
+            assert not os.path.exists(os.path.join(session_dir, "img1.png"))
+            assert not os.path.exists(os.path.join(session_dir, "img2.jpg"))
+            with open(os.path.join(session_dir, "metadata.json"), "r", encoding="utf8") as f:
+                blobs = json.load(f)["output"]["blobs"]
+            assert blobs == {"img1.png": blob_digest(b"PNG image data"), "img2.jpg": blob_digest(b"JPEG image data")}
 
         def test_saved_image_contains_correct_data(self, storage_with_tmp_dir: Storage) -> None:
             image_bytes = b"This is test image data"
-            session_dir = storage_with_tmp_dir.store_ocr_result(
+            storage_with_tmp_dir.store_ocr_result(
                 source="/path/to/doc.pdf",
                 markdown_content="# Test",
                 model=MistralModelsOcr.MISTRAL_OCR.value,
                 page_count=1,
                 image_data=[("test_image.png", image_bytes)],
             )
-            with open(os.path.join(session_dir, "test_image.png"), "rb") as f:
-                assert f.read() == image_bytes
+            assert (
+                storage_with_tmp_dir._blobs(storage_with_tmp_dir.ocr_dir).get(blob_digest(image_bytes)) == image_bytes
+            )
+
+        def test_same_image_is_stored_once_across_sessions(self, storage_with_tmp_dir: Storage) -> None:
+            for _ in range(2):
+                storage_with_tmp_dir.store_ocr_result(
+                    source="/path/to/doc.pdf",
+                    markdown_content="# Test",
+                    model=MistralModelsOcr.MISTRAL_OCR.value,
+                    page_count=1,
+                    image_data=[("img.png", b"shared image")],
+                )
+            blobs = storage_with_tmp_dir._blobs(storage_with_tmp_dir.ocr_dir)
+            assert blobs.references(blob_digest(b"shared image")) == 2
 
         # URL source edge cases
 
@@ -664,12 +693,14 @@ class TestStorage:
             uuid_pattern = r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$"
             assert re.match(uuid_pattern, subdirs[0])
 
-        def test_creates_session_json(self, storage_with_tmp_dir: Storage, tmp_path: str) -> None:
+        def test_creates_message_log(self, storage_with_tmp_dir: Storage, tmp_path: str) -> None:
             messages = self._create_messages()
             storage_with_tmp_dir.store_messages(messages)
             subdirs = [d for d in os.listdir(tmp_path) if os.path.isdir(os.path.join(tmp_path, d))]
             session_dir = os.path.join(str(tmp_path), subdirs[0])
-            assert os.path.exists(os.path.join(session_dir, "session.json"))
+            assert os.path.exists(os.path.join(session_dir, GPTCLI_MESSAGES_LOG_FILENAME))
+            assert os.path.exists(os.path.join(session_dir, GPTCLI_MESSAGES_INDEX_FILENAME))
+            assert not os.path.exists(os.path.join(session_dir, "session.json"))
 
         def test_creates_metadata_json(self, storage_with_tmp_dir: Storage, tmp_path: str) -> None:
             messages = self._create_messages()
@@ -681,10 +712,8 @@ class TestStorage:
         def test_creates_manifest(self, storage_with_tmp_dir: Storage, tmp_path: str) -> None:
             messages = self._create_messages()
             storage_with_tmp_dir.store_messages(messages)
-            manifest_path = os.path.join(str(tmp_path), _MANIFEST_FILENAME)
-            assert os.path.exists(manifest_path)
-            with open(manifest_path, "r", encoding="utf8") as f:
-                entries = json.load(f)
+            assert os.path.exists(os.path.join(str(tmp_path), GPTCLI_MANIFEST_LOG_FILENAME))
+            entries = storage_with_tmp_dir._read_manifest(str(tmp_path))
             assert len(entries) == 1
 
         def test_metadata_contains_chat_section(self, storage_with_tmp_dir: Storage, tmp_path: str) -> None:
@@ -706,6 +735,201 @@ class TestStorage:
             subdirs = [d for d in os.listdir(tmp_path) if os.path.isdir(os.path.join(tmp_path, d))]
             assert len(subdirs) == 0
 
+        def test_attachments_are_stored_as_blobs(self, storage_with_tmp_dir: Storage, tmp_path: str) -> None:
+            factory = MessageFactory(provider=ProviderNames.MISTRAL.value)
+            messages = Messages()
+            messages.add(
+                factory.attachment_message(role="user", content="ATTACHED FILE", model="mistral-large-latest")
+            )
+            storage_with_tmp_dir.store_messages(messages)
+            subdirs = [d for d in os.listdir(tmp_path) if os.path.isdir(os.path.join(tmp_path, d))]
+            with open(os.path.join(str(tmp_path), subdirs[0], GPTCLI_MESSAGES_LOG_FILENAME), "rb") as f:
+                assert b"ATTACHED FILE" not in f.read()
+            loaded = storage_with_tmp_dir.extract_messages()
+            assert loaded is not None
+            assert [(m.content, m.is_attachment) for m in loaded] == [("ATTACHED FILE", True)]
+
+    class TestChatJournal:
+
+        @pytest.fixture
+        def storage_with_tmp_dir(self, tmp_path: str) -> Storage:
+            storage = Storage(provider=ProviderNames.MISTRAL.value)
+            storage._chat_dir = str(tmp_path)
+            return storage
+
+        @staticmethod
+        def _create_messages(*contents: str) -> Messages:
+            factory = MessageFactory(provider=ProviderNames.MISTRAL.value)
+            messages = Messages()
+            for content in contents:
+                messages.add(factory.user_message(role="user", content=content, model="mistral-large-latest"))
+            return messages
+
+        def test_start_registers_session(self, storage_with_tmp_dir: Storage, tmp_path: str) -> None:
+            journal = storage_with_tmp_dir.start_chat_journal(model="mistral-large-latest")
+            assert os.path.exists(os.path.join(str(tmp_path), journal.session_uuid, "metadata.json"))
+            assert storage_with_tmp_dir._find_latest_uuid(str(tmp_path)) == journal.session_uuid
+
+        def test_unfinished_session_is_recovered(self, storage_with_tmp_dir: Storage, tmp_path: str) -> None:
+            journal = storage_with_tmp_dir.start_chat_journal()
+            journal.sync(self._create_messages("Hello!", "How are you?"))
+            assert not os.path.exists(os.path.join(str(tmp_path), journal.session_uuid, GPTCLI_MESSAGES_LOG_FILENAME))
+            loaded = storage_with_tmp_dir.extract_messages()
+            assert loaded is not None
+            assert [m.content for m in loaded] == ["Hello!", "How are you?"]
+
+        def test_finish_writes_message_log(self, storage_with_tmp_dir: Storage, tmp_path: str) -> None:
+            messages = self._create_messages("Hello!")
+            journal = storage_with_tmp_dir.start_chat_journal()
+            journal.sync(messages)
+            storage_with_tmp_dir.finish_chat_journal(journal, messages)
+            session_dir = os.path.join(str(tmp_path), journal.session_uuid)
+            assert os.path.exists(os.path.join(session_dir, GPTCLI_MESSAGES_LOG_FILENAME))
+            assert not os.path.exists(os.path.join(session_dir, GPTCLI_JOURNAL_FILENAME))
+            loaded = storage_with_tmp_dir.extract_messages_by_uuid(journal.session_uuid)
+            assert loaded is not None
+            assert [m.content for m in loaded] == ["Hello!"]
+
+        def test_discard_deletes_session(self, storage_with_tmp_dir: Storage, tmp_path: str) -> None:
+            journal = storage_with_tmp_dir.start_chat_journal()
+            storage_with_tmp_dir.discard_chat_journal(journal)
+            assert not os.path.exists(os.path.join(str(tmp_path), journal.session_uuid))
+            with pytest.raises(StorageEmpty):
+                storage_with_tmp_dir.extract_messages()
+
+        def test_discard_releases_attachment_blobs(self, storage_with_tmp_dir: Storage) -> None:
+            factory = MessageFactory(provider=ProviderNames.MISTRAL.value)
+            messages = Messages()
+            messages.add(
+                factory.attachment_message(role="user", content="ATTACHED FILE", model="mistral-large-latest")
+            )
+            journal = storage_with_tmp_dir.start_chat_journal()
+            journal.sync(messages)
+            blobs = storage_with_tmp_dir._blobs(storage_with_tmp_dir.chat_dir)
+            assert blobs.get(blob_digest(b"ATTACHED FILE")) == b"ATTACHED FILE"
+            storage_with_tmp_dir.discard_chat_journal(journal)
+            assert blobs.get(blob_digest(b"ATTACHED FILE")) is None
+
+        def test_encrypted_journal_requires_key(self, tmp_path: str) -> None:
+            storage = Storage(provider=ProviderNames.MISTRAL.value, encryption=Encryption(key=os.urandom(32)))
+            storage._chat_dir = str(tmp_path)
+            journal = storage.start_chat_journal()
+            journal.sync(self._create_messages("secret"))
+            assert os.path.exists(os.path.join(str(tmp_path), journal.session_uuid, GPTCLI_JOURNAL_FILENAME + ".enc"))
+            locked = Storage(provider=ProviderNames.MISTRAL.value)
+            locked._chat_dir = str(tmp_path)
+            with patch.object(Storage, "_warn") as mock_warn:
+                assert locked.extract_messages_by_uuid(journal.session_uuid) is None
+            mock_warn.assert_called_once_with(Storage._ENCRYPTED_DATA_WITHOUT_KEY)
+
+    class TestLoadChatWindow:
+
+        @pytest.fixture
+        def storage_with_tmp_dir(self, tmp_path: str) -> Storage:
+            storage = Storage(provider=ProviderNames.MISTRAL.value)
+            storage._chat_dir = str(tmp_path)
+            return storage
+
+        @staticmethod
+        def _create_messages() -> Messages:
+            factory = MessageFactory(provider=ProviderNames.MISTRAL.value)
+            messages = Messages()
+            messages.add(factory.user_message(role="system", content="Be brief.", model="mistral-large-latest"))
+            for content in ("one", "two", "three", "four"):
+                messages.add(factory.user_message(role="user", content=content, model="mistral-large-latest"))
+            return messages
+
+        def test_loads_system_messages_and_tail(self, storage_with_tmp_dir: Storage) -> None:
+            storage_with_tmp_dir.store_messages(self._create_messages())
+            loaded = storage_with_tmp_dir.load_chat_window(None, last=2, token_budget=None)
+            assert loaded is not None
+            window, messages = loaded
+            assert [m.content for m in messages] == ["Be brief.", "three", "four"]
+            assert window.skipped == 2
+
+        def test_raises_for_unknown_session(self, storage_with_tmp_dir: Storage) -> None:
+            with pytest.raises(StorageEmpty):
+                storage_with_tmp_dir.load_chat_window("missing", last=1, token_budget=None)
+
+        def test_continued_session_keeps_unloaded_messages(self, storage_with_tmp_dir: Storage) -> None:
+            storage_with_tmp_dir.store_messages(self._create_messages())
+            loaded = storage_with_tmp_dir.load_chat_window(None, last=1, token_budget=None)
+            assert loaded is not None
+            window, messages = loaded
+            messages.add(
+                MessageFactory(provider=ProviderNames.MISTRAL.value).user_message(
+                    "user", "five", "mistral-large-latest"
+                )
+            )
+            journal = storage_with_tmp_dir.start_chat_journal(base=window)
+            journal.sync(messages)
+
+            unfinished = storage_with_tmp_dir.extract_messages_by_uuid(journal.session_uuid)
+            assert unfinished is not None
+            assert [m.content for m in unfinished] == ["Be brief.", "one", "two", "three", "four", "five"]
+
+            storage_with_tmp_dir.finish_chat_journal(journal, messages)
+            finished = storage_with_tmp_dir.extract_messages_by_uuid(journal.session_uuid)
+            assert finished is not None
+            assert [m.content for m in finished] == ["Be brief.", "one", "two", "three", "four", "five"]
+
+        def test_continued_session_appends_to_copy_of_base_log(self, tmp_path: str) -> None:
+            storage = Storage(provider=ProviderNames.MISTRAL.value, encryption=Encryption(key=os.urandom(32)))
+            storage._chat_dir = str(tmp_path)
+            factory = MessageFactory(provider=ProviderNames.MISTRAL.value)
+            stored = self._create_messages()
+            stored.add(factory.attachment_message(role="user", content="ATTACHED FILE", model="mistral-large-latest"))
+            stored.add(factory.user_message(role="user", content="six", model="mistral-large-latest"))
+            storage.store_messages(stored)
+            loaded = storage.load_chat_window(None, last=1, token_budget=None)
+            assert loaded is not None
+            window, messages = loaded
+            messages.add(factory.user_message(role="user", content="seven", model="mistral-large-latest"))
+            journal = storage.start_chat_journal(base=window)
+            journal.sync(messages)
+            with patch.object(Storage, "_load_chat_session") as load_session:
+                storage.finish_chat_journal(journal, messages)
+            load_session.assert_not_called()
+
+            base_log = os.path.join(str(tmp_path), window.session_uuid, GPTCLI_MESSAGES_LOG_FILENAME + ".enc")
+            log = os.path.join(str(tmp_path), journal.session_uuid, GPTCLI_MESSAGES_LOG_FILENAME + ".enc")
+            with open(base_log, "rb") as base_fp, open(log, "rb") as fp:
+                assert fp.read().startswith(base_fp.read())
+            finished = storage.extract_messages_by_uuid(journal.session_uuid)
+            assert finished is not None
+            assert [m.content for m in finished] == [
+                "Be brief.",
+                "one",
+                "two",
+                "three",
+                "four",
+                "ATTACHED FILE",
+                "six",
+                "seven",
+            ]
+            blobs = storage._blobs(str(tmp_path))
+            store = storage._store(str(tmp_path))
+            blobs.release(blob_owner(store, window.session_uuid))
+            assert blobs.references(blob_digest(b"ATTACHED FILE", storage._encryption)) == 1
+
+        def test_cleared_session_drops_unloaded_messages(self, storage_with_tmp_dir: Storage) -> None:
+            storage_with_tmp_dir.store_messages(self._create_messages())
+            loaded = storage_with_tmp_dir.load_chat_window(None, last=1, token_budget=None)
+            assert loaded is not None
+            window, messages = loaded
+            messages.flush_except({"system"})
+            messages.add(
+                MessageFactory(provider=ProviderNames.MISTRAL.value).user_message(
+                    "user", "five", "mistral-large-latest"
+                )
+            )
+            journal = storage_with_tmp_dir.start_chat_journal(base=window)
+            journal.sync(messages)
+            storage_with_tmp_dir.finish_chat_journal(journal, messages)
+            finished = storage_with_tmp_dir.extract_messages_by_uuid(journal.session_uuid)
+            assert finished is not None
+            assert [m.content for m in finished] == ["Be brief.", "five"]
+
     class TestExtractMessages:
 
         @pytest.fixture
@@ -784,6 +1008,51 @@ class TestStorage:
             result = storage_with_empty_tmp_dir.display_last_chat()  # type: ignore[func-returns-value]
             assert result is None
 
+    class TestDisplayChatByUuid:
+
+        @pytest.fixture
+        def storage_with_session(self, tmp_path: str) -> tuple[Storage, str]:
+            storage = Storage(provider=ProviderNames.MISTRAL.value)
+            storage._chat_dir = str(tmp_path)
+            session_uuid = str(uuid.uuid4())
+            os.makedirs(os.path.join(str(tmp_path), session_uuid))
+            chat_data: dict[str, list[dict[str, Any]]] = {
+                "messages": [
+                    {
+                        "role": "user" if i % 2 == 0 else "assistant",
+                        "content": f"message {i}",
+                        "model": "mistral-large-latest",
+                        "provider": "mistral",
+                        "is_reply": i % 2 == 1,
+                        "created": 1704067200.0,
+                        "uuid": str(uuid.uuid4()),
+                        "tokens": 2,
+                    }
+                    for i in range(4)
+                ]
+            }
+            with open(os.path.join(str(tmp_path), session_uuid, "session.json"), "w", encoding="utf8") as f:
+                json.dump(chat_data, f)
+            TestStorage._append_manifest_entry(str(tmp_path), session_uuid, 100.0)
+            return storage, session_uuid
+
+        def test_displays_all_messages_by_default(self, storage_with_session: tuple[Storage, str]) -> None:
+            storage, session_uuid = storage_with_session
+            with patch("gptcli.src.common.storage.print_formatted_text") as mock_print:
+                storage.display_chat_by_uuid(session_uuid)
+            printed = str(mock_print.call_args_list)
+            assert "message 0" in printed and "message 3" in printed
+            assert "not shown" not in printed
+
+        def test_displays_from_start_message(self, storage_with_session: tuple[Storage, str]) -> None:
+            storage, session_uuid = storage_with_session
+            with patch("gptcli.src.common.storage.print_formatted_text") as mock_print:
+                storage.display_chat_by_uuid(session_uuid, start=2)
+            printed = str(mock_print.call_args_list)
+            assert "[2 earlier messages not shown]" in printed
+            assert "message 1" not in printed
+            assert "message 2" in printed and "message 3" in printed
+
     class TestExtractLastOcrResult:
 
         def test_returns_str_type(self, storage_with_ocr_tmp_dir: Storage, tmp_path: str) -> None:
@@ -874,29 +1143,30 @@ class TestStorage:
         ) -> None:
             messages = self._create_messages()
             storage_with_encryption.store_messages(messages)
-            # Check inside the UUID directory for session.json.enc
+            # Check inside the UUID directory for the encrypted message log and index
             subdirs = [d for d in os.listdir(tmp_path) if os.path.isdir(os.path.join(tmp_path, d))]
             assert len(subdirs) == 1
             session_dir = os.path.join(str(tmp_path), subdirs[0])
-            assert os.path.exists(os.path.join(session_dir, "session.json.enc"))
+            assert os.path.exists(os.path.join(session_dir, GPTCLI_MESSAGES_LOG_FILENAME + ".enc"))
+            assert os.path.exists(os.path.join(session_dir, GPTCLI_MESSAGES_INDEX_FILENAME + ".enc"))
 
-        def test_enc_file_content_is_not_readable_json(self, storage_with_encryption: Storage, tmp_path: str) -> None:
+        def test_enc_file_content_is_not_plaintext(self, storage_with_encryption: Storage, tmp_path: str) -> None:
             messages = self._create_messages()
             storage_with_encryption.store_messages(messages)
             subdirs = [d for d in os.listdir(tmp_path) if os.path.isdir(os.path.join(tmp_path, d))]
             session_dir = os.path.join(str(tmp_path), subdirs[0])
-            filepath = os.path.join(session_dir, "session.json.enc")
+            filepath = os.path.join(session_dir, GPTCLI_MESSAGES_LOG_FILENAME + ".enc")
             with open(filepath, "rb") as f:
                 content = f.read()
-            with pytest.raises(Exception):
-                json.loads(content)
+            assert b"Hello!" not in content
 
-        def test_does_not_create_cleartext_session_json(self, storage_with_encryption: Storage, tmp_path: str) -> None:
+        def test_does_not_create_cleartext_message_log(self, storage_with_encryption: Storage, tmp_path: str) -> None:
             messages = self._create_messages()
             storage_with_encryption.store_messages(messages)
             subdirs = [d for d in os.listdir(tmp_path) if os.path.isdir(os.path.join(tmp_path, d))]
             session_dir = os.path.join(str(tmp_path), subdirs[0])
-            assert not os.path.exists(os.path.join(session_dir, "session.json"))
+            assert not os.path.exists(os.path.join(session_dir, GPTCLI_MESSAGES_LOG_FILENAME))
+            assert not os.path.exists(os.path.join(session_dir, GPTCLI_MESSAGES_INDEX_FILENAME))
 
     class TestExtractMessagesEncrypted:
 
@@ -1009,10 +1279,12 @@ class TestStorage:
             files = os.listdir(session_dir)
             assert "document.md.enc" in files
             assert "metadata.json.enc" in files
-            assert "img1.png.enc" in files
             assert "document.md" not in files
             assert "metadata.json" not in files
-            assert "img1.png" not in files
+            digest = blob_digest(b"fake image data", storage_with_encryption._encryption)
+            blob_path = os.path.join(blob_store.blob_dir_for(str(tmp_path)), digest.removeprefix("hmac-")[:2], digest)
+            assert os.path.exists(blob_path + ".enc")
+            assert not os.path.exists(blob_path)
 
         def test_enc_markdown_content_is_not_readable(self, storage_with_encryption: Storage, tmp_path: str) -> None:
             session_dir = storage_with_encryption.store_ocr_result(
@@ -1027,6 +1299,33 @@ class TestStorage:
                 content = f.read()
             assert b"# Test content here" not in content
 
+        def test_display_prints_streamed_markdown(
+            self, storage_with_encryption: Storage, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+        ) -> None:
+            monkeypatch.setattr("gptcli.src.common.encryption._STREAM_CHUNK_SIZE", 32)
+            markdown = "".join(f"Line {i}: é\n" for i in range(100))
+            storage_with_encryption.store_ocr_result(
+                source="/path/to/doc.pdf",
+                markdown_content=markdown,
+                model=MistralModelsOcr.MISTRAL_OCR.value,
+                page_count=1,
+                image_data=[],
+            )
+            storage_with_encryption.display_last_ocr_result()
+            assert capsys.readouterr().out == markdown + "\n"
+
+        def test_enc_markdown_is_compressed_before_encryption(self, storage_with_encryption: Storage) -> None:
+            markdown = "# Repeated section\n\nThe same paragraph again.\n" * 200
+            session_dir = storage_with_encryption.store_ocr_result(
+                source="/path/to/doc.pdf",
+                markdown_content=markdown,
+                model=MistralModelsOcr.MISTRAL_OCR.value,
+                page_count=1,
+                image_data=[],
+            )
+            assert os.path.getsize(os.path.join(session_dir, "document.md.enc")) < len(markdown) // 4
+            assert storage_with_encryption.extract_last_ocr_result() == markdown
+
         def test_metadata_json_enc_is_not_readable_json(self, storage_with_encryption: Storage, tmp_path: str) -> None:
             session_dir = storage_with_encryption.store_ocr_result(
                 source="/path/to/doc.pdf",
@@ -1181,13 +1480,20 @@ class TestStorage:
             assert decrypted is not None
             assert decrypted.decode("utf-8") == "hello world"
 
-    class TestWriteImage:
+    class TestWriteSessionFile:
+
+        @staticmethod
+        def _storage_with_session(tmp_path: str, encryption: Encryption | None) -> tuple[Storage, str]:
+            storage = Storage(provider=ProviderNames.MISTRAL.value, encryption=encryption)
+            storage._ocr_dir = str(tmp_path)
+            _, session_uuid, _ = storage._create_session_dir(storage._ocr_dir)
+            return storage, session_uuid
 
         def test_writes_plaintext_when_no_encryption(self, tmp_path: str) -> None:
-            storage = Storage(provider=ProviderNames.MISTRAL.value, encryption=None)
-            filepath = os.path.join(str(tmp_path), "image.png")
+            storage, session_uuid = self._storage_with_session(tmp_path, None)
+            filepath = os.path.join(str(tmp_path), session_uuid, "image.png")
             image_data = b"\x89PNG\r\n\x1a\nfake image data"
-            storage._write_image(filepath, image_data)
+            storage._write_session_file(storage._ocr_dir, session_uuid, "image.png", image_data)
             assert os.path.exists(filepath)
             assert not os.path.exists(filepath + ".enc")
             with open(filepath, "rb") as f:
@@ -1195,22 +1501,28 @@ class TestStorage:
 
         def test_writes_encrypted_when_encryption_enabled(self, tmp_path: str) -> None:
             enc = Encryption(key=os.urandom(32))
-            storage = Storage(provider=ProviderNames.MISTRAL.value, encryption=enc)
-            filepath = os.path.join(str(tmp_path), "image.png")
-            storage._write_image(filepath, b"fake image data")
+            storage, session_uuid = self._storage_with_session(tmp_path, enc)
+            filepath = os.path.join(str(tmp_path), session_uuid, "image.png")
+            storage._write_session_file(storage._ocr_dir, session_uuid, "image.png", b"fake image data")
             assert os.path.exists(filepath + ".enc")
             assert not os.path.exists(filepath)
 
         def test_encrypted_content_is_decryptable(self, tmp_path: str) -> None:
             enc = Encryption(key=os.urandom(32))
-            storage = Storage(provider=ProviderNames.MISTRAL.value, encryption=enc)
-            filepath = os.path.join(str(tmp_path), "image.png")
+            storage, session_uuid = self._storage_with_session(tmp_path, enc)
+            filepath = os.path.join(str(tmp_path), session_uuid, "image.png")
             image_data = b"\x89PNG\r\n\x1a\nfake image data"
-            storage._write_image(filepath, image_data)
+            storage._write_session_file(storage._ocr_dir, session_uuid, "image.png", image_data)
             decrypted = enc.decrypt_file(filepath + ".enc")
             assert decrypted is not None
             assert decrypted == image_data
 
+        def test_read_round_trip(self, tmp_path: str) -> None:
+            enc = Encryption(key=os.urandom(32))
+            storage, session_uuid = self._storage_with_session(tmp_path, enc)
+            storage._write_session_file(storage._ocr_dir, session_uuid, "image.png", b"fake image data")
+            assert storage._read_session_file(storage._ocr_dir, session_uuid, "image.png") == b"fake image data"
+
     class TestReadText:
 
         def test_reads_plaintext_file(self, tmp_path: str) -> None:
@@ -1298,6 +1610,23 @@ class TestStorage:
             storage._append_to_manifest(str(tmp_path), "uuid-exists", 100.0)
             assert storage._find_latest_uuid(str(tmp_path)) == "uuid-exists"
 
+        def test_find_latest_uuid_follows_pointer_without_reading_manifest(
+            self, storage: Storage, tmp_path: str
+        ) -> None:
+            os.makedirs(os.path.join(str(tmp_path), "uuid-new"))
+            storage._append_to_manifest(str(tmp_path), "uuid-old", 100.0)
+            storage._append_to_manifest(str(tmp_path), "uuid-new", 200.0)
+            with patch.object(Manifest, "read") as mock_read:
+                assert storage._find_latest_uuid(str(tmp_path)) == "uuid-new"
+            mock_read.assert_not_called()
+
+        def test_find_latest_uuid_repairs_pointer_to_deleted_session(self, storage: Storage, tmp_path: str) -> None:
+            os.makedirs(os.path.join(str(tmp_path), "uuid-old"))
+            storage._append_to_manifest(str(tmp_path), "uuid-old", 100.0)
+            storage._append_to_manifest(str(tmp_path), "uuid-deleted", 200.0)
+            assert storage._find_latest_uuid(str(tmp_path)) == "uuid-old"
+            assert Manifest(str(tmp_path), None).latest() == {"uuid": "uuid-old", "created": 100.0}
+
     class TestFindOcrSessionsByHash:
 
         @staticmethod
@@ -1382,6 +1711,108 @@ class TestStorage:
             assert len(result) == 2
             assert set(result) == {uuid1, uuid2}
 
+    class TestHashIndex:
+
+        @staticmethod
+        def _store(storage: Storage, content_hash: str) -> str:
+            session_dir = storage.store_ocr_result(
+                source="/fake/doc.pdf",
+                markdown_content="# Doc",
+                model=MistralModelsOcr.MISTRAL_OCR.value,
+                page_count=1,
+                image_data=[],
+                content_hash=content_hash,
+            )
+            return os.path.basename(session_dir)
+
+        def test_should_persist_index_when_storing_ocr_result(
+            self, storage_with_ocr_tmp_dir: Storage, tmp_path: str
+        ) -> None:
+            session_uuid = self._store(storage_with_ocr_tmp_dir, "file:abc")
+            with open(os.path.join(str(tmp_path), GPTCLI_HASH_INDEX_FILENAME), "r", encoding="utf8") as f:
+                index = json.load(f)
+            assert index["hashes"] == {"file:abc": [session_uuid]}
+
+        def test_should_not_read_metadata_when_index_is_fresh(self, storage_with_ocr_tmp_dir: Storage) -> None:
+            session_uuid = self._store(storage_with_ocr_tmp_dir, "file:abc")
+            fresh = Storage(provider=ProviderNames.MISTRAL.value)
+            fresh._ocr_dir = storage_with_ocr_tmp_dir.ocr_dir
+            with patch.object(Storage, "_scan_ocr_hashes") as mock_scan:
+                assert fresh.find_ocr_sessions_by_hash("file:abc") == [session_uuid]
+            mock_scan.assert_not_called()
+
+        def test_should_rebuild_index_when_missing(self, storage_with_ocr_tmp_dir: Storage, tmp_path: str) -> None:
+            session_uuid = self._store(storage_with_ocr_tmp_dir, "file:abc")
+            os.remove(os.path.join(str(tmp_path), GPTCLI_HASH_INDEX_FILENAME))
+            fresh = Storage(provider=ProviderNames.MISTRAL.value)
+            fresh._ocr_dir = str(tmp_path)
+            assert fresh.find_ocr_sessions_by_hash("file:abc") == [session_uuid]
+            assert os.path.exists(os.path.join(str(tmp_path), GPTCLI_HASH_INDEX_FILENAME))
+
+        def test_should_not_rebuild_index_when_other_files_are_written(
+            self, storage_with_ocr_tmp_dir: Storage, tmp_path: str
+        ) -> None:
+            session_uuid = self._store(storage_with_ocr_tmp_dir, "file:abc")
+            # Files written next to the sessions, such as a rewritten manifest, change the directory mtime.
+            Manifest(str(tmp_path), None).rewrite([{"uuid": session_uuid, "created": 1.0}])
+            with open(os.path.join(str(tmp_path), "unrelated.tmp"), "w", encoding="utf8") as f:
+                f.write("x")
+            fresh = Storage(provider=ProviderNames.MISTRAL.value)
+            fresh._ocr_dir = str(tmp_path)
+            with patch.object(Storage, "_scan_ocr_hashes") as mock_scan:
+                assert fresh.find_ocr_sessions_by_hash("file:abc") == [session_uuid]
+            mock_scan.assert_not_called()
+
+        def test_should_rebuild_index_when_store_was_interrupted(
+            self, storage_with_ocr_tmp_dir: Storage, tmp_path: str
+        ) -> None:
+            self._store(storage_with_ocr_tmp_dir, "file:abc")
+            with patch.object(Storage, "_index_ocr_hash"):
+                interrupted_uuid = self._store(storage_with_ocr_tmp_dir, "file:xyz")
+            fresh = Storage(provider=ProviderNames.MISTRAL.value)
+            fresh._ocr_dir = str(tmp_path)
+            assert fresh.find_ocr_sessions_by_hash("file:xyz") == [interrupted_uuid]
+
+        def test_should_leave_out_sessions_deleted_outside_storage(
+            self, storage_with_ocr_tmp_dir: Storage, tmp_path: str
+        ) -> None:
+            session_uuid = self._store(storage_with_ocr_tmp_dir, "file:abc")
+            shutil.rmtree(os.path.join(str(tmp_path), session_uuid))
+            assert storage_with_ocr_tmp_dir.find_ocr_sessions_by_hash("file:abc") == []
+
+        def test_should_rebuild_index_when_index_is_corrupt(
+            self, storage_with_ocr_tmp_dir: Storage, tmp_path: str
+        ) -> None:
+            session_uuid = self._store(storage_with_ocr_tmp_dir, "file:abc")
+            with open(os.path.join(str(tmp_path), GPTCLI_HASH_INDEX_FILENAME), "w", encoding="utf8") as f:
+                f.write("not json")
+            fresh = Storage(provider=ProviderNames.MISTRAL.value)
+            fresh._ocr_dir = str(tmp_path)
+            assert fresh.find_ocr_sessions_by_hash("file:abc") == [session_uuid]
+
+        def test_should_move_session_to_new_hash_on_overwrite(self, storage_with_ocr_tmp_dir: Storage) -> None:
+            session_uuid = self._store(storage_with_ocr_tmp_dir, "file:old")
+            storage_with_ocr_tmp_dir.overwrite_ocr_result(
+                session_uuid=session_uuid,
+                source="/fake/doc.pdf",
+                markdown_content="# New",
+                model="m",
+                page_count=1,
+                image_data=[],
+                content_hash="file:new",
+            )
+            assert storage_with_ocr_tmp_dir.find_ocr_sessions_by_hash("file:old") == []
+            assert storage_with_ocr_tmp_dir.find_ocr_sessions_by_hash("file:new") == [session_uuid]
+
+        def test_should_encrypt_index_when_encryption_enabled(self, tmp_path: str) -> None:
+            storage = Storage(provider=ProviderNames.MISTRAL.value, encryption=Encryption(key=os.urandom(32)))
+            storage._ocr_dir = str(tmp_path)
+            session_uuid = self._store(storage, "file:abc")
+            assert not os.path.exists(os.path.join(str(tmp_path), GPTCLI_HASH_INDEX_FILENAME))
+            with open(os.path.join(str(tmp_path), GPTCLI_HASH_INDEX_FILENAME + ".enc"), "rb") as f:
+                assert b"file:abc" not in f.read()
+            assert storage.find_ocr_sessions_by_hash("file:abc") == [session_uuid]
+
     class TestLoadOcrSessionData:
 
         @staticmethod
@@ -1570,7 +2001,27 @@ class TestStorage:
             )
             session_dir = os.path.join(str(tmp_path), session_uuid)
             assert not os.path.exists(os.path.join(session_dir, "old_img.png"))
-            assert os.path.exists(os.path.join(session_dir, "new_img.png"))
+            loaded = storage_with_ocr_tmp_dir.load_ocr_session_data(session_uuid)
+            assert loaded is not None
+            assert loaded[1] == [("new_img.png", b"NEW")]
+
+        def test_should_delete_blobs_no_longer_referenced(
+            self, storage_with_ocr_tmp_dir: Storage, tmp_path: str
+        ) -> None:
+            session_uuid = self._create_session_for_overwrite(str(tmp_path))
+            for image in (b"FIRST", b"SECOND"):
+                storage_with_ocr_tmp_dir.overwrite_ocr_result(
+                    session_uuid=session_uuid,
+                    source="/fake/doc.pdf",
+                    markdown_content="# New",
+                    model="m",
+                    page_count=1,
+                    image_data=[("img.png", image)],
+                    content_hash="file:new",
+                )
+            blobs = storage_with_ocr_tmp_dir._blobs(storage_with_ocr_tmp_dir.ocr_dir)
+            assert blobs.get(blob_digest(b"FIRST")) is None
+            assert blobs.get(blob_digest(b"SECOND")) == b"SECOND"
 
         def test_should_update_model_and_page_count_in_metadata(
             self, storage_with_ocr_tmp_dir: Storage, tmp_path: str
@@ -1639,3 +2090,137 @@ class TestStorage:
                 content_hash="file:new",
             )
             assert result == os.path.join(str(tmp_path), session_uuid)
+
+    class TestSearchIndex:
+
+        @pytest.fixture
+        def storage_with_tmp_dirs(self, tmp_path: Path) -> Storage:
+            storage = Storage(provider=ProviderNames.MISTRAL.value)
+            storage._chat_dir = str(tmp_path / "chat")
+            storage._ocr_dir = str(tmp_path / "ocr")
+            os.makedirs(storage._chat_dir)
+            os.makedirs(storage._ocr_dir)
+            return storage
+
+        @staticmethod
+        def _store_ocr(storage: Storage, content: str) -> str:
+            session_dir = storage.store_ocr_result(
+                source="/path/to/doc.pdf",
+                markdown_content=content,
+                model=MistralModelsOcr.MISTRAL_OCR.value,
+                page_count=1,
+                image_data=[],
+            )
+            return os.path.basename(session_dir)
+
+        def test_stored_ocr_result_is_indexed_straight_away(self, storage_with_tmp_dirs: Storage) -> None:
+            self._store_ocr(storage_with_tmp_dirs, "first document")
+            OcrFTS().build(storage_with_tmp_dirs.ocr_dir, encryption=None)
+            session_uuid = self._store_ocr(storage_with_tmp_dirs, "quantum physics")
+
+            fts = OcrFTS()
+            with patch.object(OcrFTS, "_load_session") as load:
+                assert fts.build(storage_with_tmp_dirs.ocr_dir, encryption=None) == 2
+            load.assert_not_called()
+            assert [h.uuid for h in fts.search("quantum")] == [session_uuid]
+
+        def test_overwritten_ocr_result_is_reindexed(self, storage_with_tmp_dirs: Storage) -> None:
+            session_uuid = self._store_ocr(storage_with_tmp_dirs, "first draft")
+            OcrFTS().build(storage_with_tmp_dirs.ocr_dir, encryption=None)
+            storage_with_tmp_dirs.overwrite_ocr_result(
+                session_uuid=session_uuid,
+                source="/path/to/doc.pdf",
+                markdown_content="final revision",
+                model=MistralModelsOcr.MISTRAL_OCR.value,
+                page_count=1,
+                image_data=[],
+                content_hash="file:new",
+            )
+
+            fts = OcrFTS()
+            with patch.object(OcrFTS, "_load_session") as load:
+                assert fts.build(storage_with_tmp_dirs.ocr_dir, encryption=None) == 1
+            load.assert_not_called()
+            assert fts.search("draft") == []
+            assert len(fts.search("revision")) == 1
+
+        def test_stored_and_journaled_chats_are_indexed_straight_away(self, storage_with_tmp_dirs: Storage) -> None:
+            factory = MessageFactory(provider=ProviderNames.MISTRAL.value)
+            stored, journaled = Messages(), Messages()
+            stored.add(factory.user_message(role="user", content="quantum physics", model="m"))
+            journaled.add(factory.user_message(role="user", content="organic chemistry", model="m"))
+            ChatFTS().build(storage_with_tmp_dirs.chat_dir, encryption=None)
+            storage_with_tmp_dirs.store_messages(stored)
+            journal = storage_with_tmp_dirs.start_chat_journal()
+            journal.sync(journaled)
+            storage_with_tmp_dirs.finish_chat_journal(journal, journaled)
+
+            fts = ChatFTS()
+            with patch.object(ChatFTS, "_load_session") as load:
+                assert fts.build(storage_with_tmp_dirs.chat_dir, encryption=None) == 2
+            load.assert_not_called()
+            assert [h.uuid for h in fts.search("chemistry")] == [journal.session_uuid]
+            assert len(fts.search("quantum")) == 1
+
+        def test_hash_index_is_not_rebuilt_after_store(self, storage_with_tmp_dirs: Storage) -> None:
+            OcrFTS().build(storage_with_tmp_dirs.ocr_dir, encryption=None)
+            session_uuids: list[str] = []
+            for i in range(3):
+                session_uuids.append(
+                    os.path.basename(
+                        storage_with_tmp_dirs.store_ocr_result(
+                            source="/path/to/doc.pdf",
+                            markdown_content=f"document {i}",
+                            model=MistralModelsOcr.MISTRAL_OCR.value,
+                            page_count=1,
+                            image_data=[],
+                            content_hash=f"file:{i}",
+                        )
+                    )
+                )
+            assert os.path.exists(os.path.join(storage_with_tmp_dirs.ocr_dir, _DB_FILENAME))
+
+            fresh = Storage(provider=ProviderNames.MISTRAL.value)
+            fresh._ocr_dir = storage_with_tmp_dirs.ocr_dir
+            with patch.object(Storage, "_scan_ocr_hashes") as mock_scan:
+                for i, session_uuid in enumerate(session_uuids):
+                    assert storage_with_tmp_dirs.find_ocr_sessions_by_hash(f"file:{i}") == [session_uuid]
+                    assert fresh.find_ocr_sessions_by_hash(f"file:{i}") == [session_uuid]
+            mock_scan.assert_not_called()
+
+        def test_encrypted_index_is_not_rewritten_on_store(self, tmp_path: Path) -> None:
+            encryption = Encryption(key=os.urandom(32))
+            storage = Storage(provider=ProviderNames.MISTRAL.value, encryption=encryption)
+            storage._ocr_dir = str(tmp_path)
+            self._store_ocr(storage, "first document")
+            OcrFTS().build(storage.ocr_dir, encryption=encryption)
+            with patch.object(OcrFTS, "_save_snapshot") as save:
+                session_uuid = self._store_ocr(storage, "quantum physics")
+            save.assert_not_called()
+
+            fts = OcrFTS()
+            with patch.object(OcrFTS, "_load_session") as load:
+                assert fts.build(storage.ocr_dir, encryption=encryption) == 2
+            load.assert_not_called()
+            assert [h.uuid for h in fts.search("quantum")] == [session_uuid]
+
+        def test_nothing_is_indexed_without_an_index(self, storage_with_tmp_dirs: Storage) -> None:
+            self._store_ocr(storage_with_tmp_dirs, "quantum physics")
+            assert not os.path.exists(os.path.join(storage_with_tmp_dirs.ocr_dir, _DB_FILENAME))
+
+        def test_index_failure_does_not_fail_the_store(self, storage_with_tmp_dirs: Storage) -> None:
+            OcrFTS().build(storage_with_tmp_dirs.ocr_dir, encryption=None)
+            with patch.object(OcrFTS, "update_sessions", side_effect=sqlite3.OperationalError("database is locked")):
+                session_uuid = self._store_ocr(storage_with_tmp_dirs, "quantum physics")
+
+            fts = OcrFTS()
+            assert fts.build(storage_with_tmp_dirs.ocr_dir, encryption=None) == 1
+            assert [h.uuid for h in fts.search("quantum")] == [session_uuid]
+
+        def test_can_be_disabled(self, tmp_path: Path) -> None:
+            storage = Storage(provider=ProviderNames.MISTRAL.value, search_index=False)
+            storage._ocr_dir = str(tmp_path)
+            OcrFTS().build(storage.ocr_dir, encryption=None)
+            with patch.object(OcrFTS, "update_sessions") as update:
+                self._store_ocr(storage, "quantum physics")
+            update.assert_not_called()
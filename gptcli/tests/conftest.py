@@ -8,3 +8,10 @@ def _fast_scrypt(monkeypatch: pytest.MonkeyPatch) -> None:
     """Reduce scrypt cost parameter for faster test execution."""
     monkeypatch.setattr("gptcli.src.common.encryption._SCRYPT_N", 2**10)
     monkeypatch.setattr("gptcli.src.common.key_management._SCRYPT_N", 2**10)
+
+
+@pytest.fixture(autouse=True)
+def _isolated_blob_store(monkeypatch: pytest.MonkeyPatch, tmp_path_factory: pytest.TempPathFactory) -> None:
+    """Give each test its own blob store, since tests share the parent of their storage directories."""
+    blob_dir = str(tmp_path_factory.mktemp("blobs"))
+    monkeypatch.setattr("gptcli.src.common.blob_store.blob_dir_for", lambda storage_dir: blob_dir)
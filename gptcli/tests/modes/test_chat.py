@@ -1,7 +1,8 @@
 """File that will hold all the tests relating to chat.py."""
 
+import os
 from typing import Any, Generator
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 from prompt_toolkit.auto_suggest import Suggestion
@@ -18,6 +19,8 @@ from gptcli.src.common.constants import (
     ProviderNames,
     UserRoles,
 )
+from gptcli.src.common.message import MessageFactory, Messages
+from gptcli.src.common.storage import Storage, StorageEmpty
 from gptcli.src.modes.chat import (
     Chat,
     ChatInstall,
@@ -483,6 +486,71 @@ class TestChatUser:
             remaining = next(iter(chat._messages))
             assert remaining.role == "user"
 
+    class TestPersistTurn:
+        """Tests for journaling chat messages as they are produced."""
+
+        @pytest.fixture
+        def chat(self, tmp_path: str) -> ChatUser:
+            chat = ChatUser(model=MistralModelsChat.default(), provider=ProviderNames.MISTRAL.value)
+            chat._storage._chat_dir = str(tmp_path)
+            return chat
+
+        def test_does_not_create_session_without_messages(self, chat: ChatUser, tmp_path: str) -> None:
+            chat._persist_turn()
+            chat._finish_session()
+            assert os.listdir(str(tmp_path)) == []
+
+        def test_messages_are_recoverable_before_exit(self, chat: ChatUser) -> None:
+            chat._process_system_message("You are a pirate.")
+            chat._persist_turn()
+            loaded = chat._storage.extract_messages()
+            assert loaded is not None
+            assert [m.content for m in loaded] == ["You are a pirate."]
+
+        def test_finish_discards_session_when_messages_were_removed(self, chat: ChatUser) -> None:
+            chat._process_system_message("You are a pirate.")
+            chat._persist_turn()
+            chat._messages.flush_by_role({chat._role_system})
+            chat._persist_turn()
+            chat._finish_session()
+            with pytest.raises(StorageEmpty):
+                chat._storage.extract_messages()
+
+        def test_finish_stores_session(self, chat: ChatUser) -> None:
+            chat._process_system_message("You are a pirate.")
+            chat._persist_turn()
+            chat._finish_session()
+            assert chat._journal is None
+            loaded = chat._storage.extract_messages()
+            assert loaded is not None
+            assert len(loaded) == 1
+
+        def test_tail_session_is_stored_with_unloaded_messages(self, tmp_path: str) -> None:
+            storage = Storage(provider=ProviderNames.MISTRAL.value)
+            storage._chat_dir = str(tmp_path)
+            factory = MessageFactory(provider=ProviderNames.MISTRAL.value)
+            messages = Messages()
+            for content in ("one", "two", "three"):
+                messages.add(factory.user_message(role="user", content=content, model=MistralModelsChat.default()))
+            storage.store_messages(messages)
+            window = storage.load_chat_window(None, last=1, token_budget=None)
+
+            with patch.object(Storage, "load_chat_window", return_value=window) as mock_load:
+                chat = ChatUser(
+                    model=MistralModelsChat.default(), provider=ProviderNames.MISTRAL.value, load_last=True, tail=1
+                )
+            mock_load.assert_called_once_with(None, 1, None)
+            assert [m.content for m in chat._messages] == ["three"]
+
+            chat._storage._chat_dir = str(tmp_path)
+            chat._count_when_loaded = len(chat._messages)
+            chat._process_system_message("You are a pirate.")
+            chat._persist_turn()
+            chat._finish_session()
+            loaded = chat._storage.extract_messages()
+            assert loaded is not None
+            assert [m.content for m in loaded] == ["one", "two", "three", "You are a pirate."]
+
     class TestSessionSystem:
         """Tests for ChatUser._session_system."""
 
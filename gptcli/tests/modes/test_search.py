@@ -0,0 +1,238 @@
+"""Tests for search.py."""
+
+import asyncio
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Coroutine, Iterator
+from unittest.mock import patch
+
+import pytest
+
+from gptcli.constants import (
+    GPTCLI_MANIFEST_FILENAME,
+    GPTCLI_METADATA_FILENAME,
+    GPTCLI_SESSION_FILENAME,
+)
+from gptcli.src.common.constants import SearchActions
+from gptcli.src.common.fts import SearchSource
+from gptcli.src.modes.search import (
+    _TEXT_NO_RESULTS,
+    _TEXT_SEARCHING,
+    ChatSearch,
+    UnifiedSearch,
+    _BaseSearch,
+)
+
+
+class _FakeApp:
+    """Stands in for the running prompt_toolkit Application."""
+
+    def __init__(self) -> None:
+        self.tasks: list[asyncio.Task[None]] = []
+
+    def create_background_task(self, coroutine: Coroutine[Any, Any, None]) -> asyncio.Task[None]:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self.tasks.append(task)
+        return task
+
+    def invalidate(self) -> None:
+        return None
+
+
+def _write_sessions(chat_dir: str, contents: list[str]) -> None:
+    """Write one single-message chat session per content, each newer than the one before, and the manifest."""
+    entries: list[dict[str, Any]] = []
+    for i, content in enumerate(contents):
+        session_uuid = str(uuid.uuid4())
+        os.makedirs(os.path.join(chat_dir, session_uuid))
+        with open(os.path.join(chat_dir, session_uuid, GPTCLI_SESSION_FILENAME), "w", encoding="utf-8") as fp:
+            json.dump({"messages": [{"role": "user", "content": content}]}, fp)
+        entries.append({"uuid": session_uuid, "created": 1000.0 * (i + 1)})
+    with open(os.path.join(chat_dir, GPTCLI_MANIFEST_FILENAME), "w", encoding="utf-8") as fp:
+        json.dump(entries, fp)
+
+
+class TestChatSearch:
+
+    @pytest.fixture
+    def search(self, tmp_path: str) -> ChatSearch:
+        _write_sessions(str(tmp_path), ["quantum physics", "machine learning"])
+        return ChatSearch(chat_dir=str(tmp_path), encryption=None)
+
+    @staticmethod
+    def _type(search: _BaseSearch[Any], *queries: str) -> None:
+        """Schedule the queries one keystroke after another and wait for the TUI to settle."""
+
+        async def _run() -> None:
+            app = _FakeApp()
+            for query in queries:
+                search._schedule_query(app, query, 0.01)  # type: ignore[arg-type]
+            await asyncio.gather(*app.tasks, return_exceptions=True)
+
+        search._executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            asyncio.run(_run())
+        finally:
+            search._executor.shutdown()
+
+    @staticmethod
+    def _scroll(search: ChatSearch) -> None:
+        """Move the selection to the last loaded session and wait for any page it fetches."""
+
+        async def _run() -> None:
+            app = _FakeApp()
+            search._selected_idx = len(search._results) - 1
+            search._schedule_page(app)  # type: ignore[arg-type]
+            await asyncio.gather(*app.tasks, return_exceptions=True)
+
+        search._executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            asyncio.run(_run())
+        finally:
+            search._executor.shutdown()
+
+    class TestScheduleQuery:
+
+        def test_shows_results_of_query(self, search: ChatSearch) -> None:
+            TestChatSearch._type(search, "quantum")
+            assert [h.snippets[0].content for h in search._results] == ["quantum physics"]
+            assert search._query_tokens == ["quantum"]
+            assert search._searching is False
+
+        def test_runs_only_last_of_quick_keystrokes(self, search: ChatSearch) -> None:
+            with patch.object(search, "_query", wraps=search._query) as query:
+                TestChatSearch._type(search, "m", "ma", "mach")
+            query.assert_called_once_with("mach")
+            assert [h.snippets[0].content for h in search._results] == ["machine learning"]
+
+        def test_embeds_only_settled_semantic_query(self, search: ChatSearch) -> None:
+            search._embed_executor = ThreadPoolExecutor(max_workers=1)
+            with (
+                patch("gptcli.src.modes.search._SETTLE_SECONDS", 0.01),
+                patch.object(search, "_embed_query", return_value=True) as embed,
+                patch.object(search, "_query", wraps=search._query) as query,
+            ):
+                TestChatSearch._type(search, "m", "ma", "mach")
+            search._embed_executor.shutdown()
+            embed.assert_called_once_with("mach", 3)
+            assert [call.args for call in query.call_args_list] == [("mach",), ("mach",)]
+
+        def test_interrupts_query_in_flight(self, search: ChatSearch) -> None:
+            with patch.object(search._fts, "interrupt") as interrupt:
+                TestChatSearch._type(search, "quantum", "machine")
+            assert interrupt.call_count == 2
+
+        def test_drops_results_of_superseded_query(self, search: ChatSearch) -> None:
+            search._generation = 1
+            search._searching = True
+
+            async def _run() -> None:
+                await search._run_query(_FakeApp(), "quantum", 0, 0)  # type: ignore[arg-type]
+
+            asyncio.run(_run())
+            assert search._searching is True
+            assert search._query_tokens == []
+
+    class TestSearchingState:
+
+        def test_counter_shows_searching(self, search: ChatSearch) -> None:
+            search._searching = True
+            assert "[…/2]" in search._search_line_prefix(0, 0)[0][1]  # type: ignore[index]
+            search._searching = False
+            assert "[2/2]" in search._search_line_prefix(0, 0)[0][1]  # type: ignore[index]
+
+        def test_empty_results_show_searching(self, search: ChatSearch) -> None:
+            search._results = []
+            search._searching = True
+            assert search._get_results_text() == [("fg:ansigray", _TEXT_SEARCHING)]
+            search._searching = False
+            assert search._get_results_text() == [("fg:ansigray", _TEXT_NO_RESULTS)]
+
+    class TestBrowse:
+
+        @pytest.fixture
+        def search(self, tmp_path: str) -> Iterator[ChatSearch]:
+            _write_sessions(str(tmp_path), [f"session {i}" for i in range(5)])
+            with patch("gptcli.src.common.fts._BROWSE_PAGE_SIZE", 2):
+                search = ChatSearch(chat_dir=str(tmp_path), encryption=None)
+                search._results = search._query("")
+                yield search
+
+        def test_fetches_pages_as_selection_nears_end(self, search: ChatSearch) -> None:
+            assert len(search._results) == 2
+            TestChatSearch._scroll(search)
+            assert len(search._results) == 4
+            TestChatSearch._scroll(search)
+            TestChatSearch._scroll(search)
+            assert [h.snippets[0].content for h in search._results] == [f"session {i}" for i in range(4, -1, -1)]
+            assert search._exhausted is True
+
+        def test_stops_fetching_once_exhausted(self, search: ChatSearch) -> None:
+            for _ in range(3):
+                TestChatSearch._scroll(search)
+            with patch.object(search._fts, "browse") as browse:
+                TestChatSearch._scroll(search)
+            browse.assert_not_called()
+
+        def test_counter_shows_all_sessions(self, search: ChatSearch) -> None:
+            assert "[5/5]" in search._search_line_prefix(0, 0)[0][1]  # type: ignore[index]
+
+        def test_query_results_are_not_paged(self, search: ChatSearch) -> None:
+            TestChatSearch._type(search, "session 3")
+            with patch.object(search._fts, "browse") as browse:
+                TestChatSearch._scroll(search)
+            browse.assert_not_called()
+            assert "[1/5]" in search._search_line_prefix(0, 0)[0][1]  # type: ignore[index]
+
+        def test_drops_page_of_superseded_browse(self, search: ChatSearch) -> None:
+            async def _run() -> None:
+                search._paging = True
+                await search._run_page(_FakeApp(), search._browse_key(search._results[-1]), -1)  # type: ignore[arg-type]
+
+            search._executor = ThreadPoolExecutor(max_workers=1)
+            asyncio.run(_run())
+            search._executor.shutdown()
+            assert len(search._results) == 2
+
+        def test_facets_without_text_page_matching_sessions(self, search: ChatSearch) -> None:
+            TestChatSearch._type(search, "role:user")
+            assert search._browsing is True
+            TestChatSearch._scroll(search)
+            assert len(search._results) == 4
+            assert "[4/5]" in search._search_line_prefix(0, 0)[0][1]  # type: ignore[index]
+
+
+class TestUnifiedSearch:
+
+    @pytest.fixture
+    def search(self, tmp_path: str) -> UnifiedSearch:
+        chat_dir, ocr_dir = os.path.join(tmp_path, "chat"), os.path.join(tmp_path, "ocr")
+        os.makedirs(chat_dir)
+        os.makedirs(os.path.join(ocr_dir, "doc"))
+        _write_sessions(chat_dir, ["invoice for March"])
+        with open(os.path.join(ocr_dir, "doc", "document.md"), "w", encoding="utf-8") as fp:
+            fp.write("Invoice invoice")
+        with open(os.path.join(ocr_dir, "doc", GPTCLI_METADATA_FILENAME), "w", encoding="utf-8") as fp:
+            json.dump({"ocr": {"page_count": 1}, "output": {"markdown_file": "document.md"}}, fp)
+        with open(os.path.join(ocr_dir, GPTCLI_MANIFEST_FILENAME), "w", encoding="utf-8") as fp:
+            json.dump([{"uuid": "doc", "created": 5000.0}], fp)
+        sources = [SearchSource("mistral", "chat", chat_dir), SearchSource("mistral", "ocr", ocr_dir)]
+        return UnifiedSearch(sources=sources, encryption=None)
+
+    def test_results_are_labelled_with_their_source(self, search: UnifiedSearch) -> None:
+        TestChatSearch._type(search, "invoice")
+        assert sorted(h.source.label for h in search._results) == ["mistral chat", "mistral ocr"]
+        text = "".join(t for _, t, *_ in search._get_results_text())
+        assert "mistral chat" in text and "mistral ocr" in text
+
+    def test_selection_records_source_and_position(self, search: UnifiedSearch) -> None:
+        TestChatSearch._type(search, "march")
+        search._select(SearchActions.LOAD.value)
+        assert search.selected_source == SearchSource("mistral", "chat", search._results[0].source.storage_dir)
+        assert search.selected_position == 0
+        search._results = search._query("")
+        search._select(SearchActions.PRINT.value)
+        assert search.selected_source is not None and search.selected_source.target == "ocr"
+        assert search.selected_position is None
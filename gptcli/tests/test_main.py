@@ -1,7 +1,8 @@
 """Holds tests for main.py helper functions."""
 
 import os
-from unittest.mock import MagicMock
+from argparse import Namespace
+from unittest.mock import MagicMock, patch
 
 import pytest
 
@@ -10,10 +11,18 @@ from gptcli.constants import (
     GPTCLI_PROVIDER_OPENAI_KEY_FILE,
 )
 from gptcli.main import (
+    _embedding_client,
+    _enter_unified_search_mode,
     _key_file_for_provider,
     _read_encrypted_key,
+    main,
 )
-from gptcli.src.common.constants import ProviderNames
+from gptcli.src.common.constants import (
+    ProviderNames,
+    SearchActions,
+    SearchTargets,
+)
+from gptcli.src.common.fts import SearchSource
 
 
 # pylint: disable=W0212:protected-access
@@ -55,3 +64,68 @@ class TestReadEncryptedKey:
         result = _read_encrypted_key(filepath, mock_encryption)
 
         assert result == ""
+
+
+class TestEnterUnifiedSearchMode:
+    """Tests for _enter_unified_search_mode()."""
+
+    @staticmethod
+    def _run(action: str, target: str, tmp_path: str) -> tuple[MagicMock, MagicMock]:
+        key_file = os.path.join(str(tmp_path), "mistral.key")
+        with open(key_file + ".enc", "wb") as fp:
+            fp.write(b"sealed")
+        encryption = MagicMock()
+        encryption.decrypt_file.return_value = b"sk-stored-key"
+        search = MagicMock()
+        search.run.return_value = (action, "session-uuid")
+        search.selected_source = SearchSource(ProviderNames.MISTRAL.value, target, str(tmp_path))
+        search.selected_position = 3
+        with (
+            patch("gptcli.main.UnifiedSearch", return_value=search),
+            patch("gptcli.main.Storage"),
+            patch("gptcli.main._key_file_for_provider", return_value=key_file),
+            patch("gptcli.main._install_provider") as install,
+            patch("gptcli.main.ChatUser") as chat_user,
+        ):
+            args = Namespace(substring_index=None, output_dir=".", no_cache=False)
+            _enter_unified_search_mode(args=args, encryption=encryption)
+        return install, chat_user
+
+    def test_loads_chat_with_the_stored_key_of_its_provider(self, tmp_path: str) -> None:
+        install, chat_user = self._run(SearchActions.LOAD.value, SearchTargets.CHAT.value, tmp_path)
+
+        install.assert_called_once_with(ProviderNames.MISTRAL.value, no_cache=False)
+        chat_user.assert_called_once()
+        assert chat_user.call_args.kwargs["provider"] == ProviderNames.MISTRAL.value
+        assert chat_user.call_args.kwargs["api_key"] == "sk-stored-key"
+        assert chat_user.call_args.kwargs["show_from"] == 3
+
+    def test_prints_chat_without_installing_or_loading_a_key(self, tmp_path: str) -> None:
+        install, chat_user = self._run(SearchActions.PRINT.value, SearchTargets.CHAT.value, tmp_path)
+
+        install.assert_not_called()
+        chat_user.assert_not_called()
+
+    def test_rejects_semantic_search(self) -> None:
+        with (
+            patch("sys.argv", ["gptcli", "all", "search", "--semantic"]),
+            patch("gptcli.main._enter_unified_search_mode") as enter,
+            pytest.raises(SystemExit),
+        ):
+            main()
+        enter.assert_not_called()
+
+
+class TestEmbeddingClient:
+    """Tests for _embedding_client()."""
+
+    def test_returns_none_without_semantic(self) -> None:
+        assert _embedding_client(Namespace(semantic=False, provider=ProviderNames.MISTRAL.value), "key") is None
+
+    def test_rejects_semantic_search_without_numpy(self) -> None:
+        parser = MagicMock()
+        parser.error.side_effect = SystemExit(2)
+        args = Namespace(semantic=True, provider=ProviderNames.MISTRAL.value, parser=parser)
+        with patch("gptcli.main.has_numpy", return_value=False), pytest.raises(SystemExit):
+            _embedding_client(args, "key")
+        assert "numpy" in parser.error.call_args.args[0]
@@ -192,6 +192,20 @@ class TestMessageFactory:
             message = message_factory.reply_message(content="Test.", model="gpt-4-turbo")
             assert isinstance(message, Message)
 
+    class TestCreateAttachmentMessage:
+        """Holds tests for attachment_message()."""
+
+        def test_should_create_a_message_marked_as_an_attachment(self) -> None:
+            message_factory = MessageFactory(provider=ProviderNames.MISTRAL.value)
+            message = message_factory.attachment_message(role="user", content="Test.", model="mistral-large-latest")
+            assert message.is_attachment is True
+            assert message.to_dict_full_context()["attachment"] is True
+
+        def test_should_survive_a_round_trip_through_a_dict(self) -> None:
+            message_factory = MessageFactory(provider=ProviderNames.MISTRAL.value)
+            message = message_factory.attachment_message(role="user", content="Test.", model="mistral-large-latest")
+            assert MessageFactory.message_from_dict(message.to_dict_full_context()).is_attachment is True
+
     class TestCreateMessageFromDict:
         """Holds tests for create_message_from_dict()."""
 
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Compare the compression codecs available for encrypted storage.
+
+For every codec, reports the stored size relative to the plaintext and the
+time spent sealing (compress + encrypt) and opening (decrypt + decompress)
+the sample files. Samples are the files under the given directories, or a
+generated chat session and OCR Markdown document when none are given.
+
+Usage:
+    python3 scripts/benchmark_compression.py [DIR ...] [--rounds N]
+"""
+
+import argparse
+import json
+import os
+import time
+import uuid
+
+from gptcli.src.common.compression import available_codecs
+from gptcli.src.common.encryption import Encryption
+
+_MAX_SAMPLE_BYTES: int = 64 * 1024 * 1024
+
+
+def generate_samples() -> dict[str, bytes]:
+    """Build a representative chat session and OCR Markdown document.
+
+    Returns:
+        dict[str, bytes]: The sample contents, keyed by a descriptive name.
+    """
+    messages = [
+        {
+            "role": "user" if i % 2 == 0 else "assistant",
+            "content": f"Message {i}: explain how the storage layer encrypts session {i % 7} files. " * 8,
+            "model": "mistral-large-latest",
+            "provider": "mistral",
+            "is_reply": i % 2 == 1,
+            "created": 1704067200.0 + i,
+            "uuid": str(uuid.uuid4()),
+            "tokens": 120,
+            "index": i,
+        }
+        for i in range(400)
+    ]
+    markdown = "".join(
+        f"## Page {page}\n\n| Item | Quantity | Price |\n|---|---|---|\n"
+        + "".join(f"| Item {row} | {row * 3} | {row * 1.25:.2f} |\n" for row in range(30))
+        + "\nThe table above lists the items extracted from the scanned document.\n\n"
+        for page in range(40)
+    )
+    return {
+        "chat session (JSON)": json.dumps({"messages": messages}, ensure_ascii=False).encode("utf-8"),
+        "OCR document (Markdown)": markdown.encode("utf-8"),
+    }
+
+
+def read_samples(directories: list[str]) -> dict[str, bytes]:
+    """Read the plaintext files under the given directories as one sample per file extension.
+
+    Encrypted files are skipped, since their contents no longer compress.
+
+    Args:
+        directories (list[str]): The directories to read.
+
+    Returns:
+        dict[str, bytes]: The concatenated contents of each file extension.
+    """
+    samples: dict[str, list[bytes]] = {}
+    total: int = 0
+    for directory in directories:
+        for dirpath, _, filenames in os.walk(directory):
+            for filename in sorted(filenames):
+                if filename.endswith(".enc") or total >= _MAX_SAMPLE_BYTES:
+                    continue
+                with open(os.path.join(dirpath, filename), "rb") as fp:
+                    data = fp.read()
+                total += len(data)
+                samples.setdefault(os.path.splitext(filename)[1] or filename, []).append(data)
+    return {name: b"".join(parts) for name, parts in samples.items()}
+
+
+def benchmark(samples: dict[str, bytes], rounds: int) -> None:
+    """Print the size and time of sealing and opening every sample with every codec.
+
+    Args:
+        samples (dict[str, bytes]): The sample contents, keyed by name.
+        rounds (int): How many times each measurement is repeated; the fastest run is reported.
+    """
+    key: bytes = os.urandom(32)
+    codecs: list[str] = available_codecs()
+    print(f"{'sample':<28}{'codec':<8}{'size':>12}{'ratio':>8}{'seal ms':>10}{'open ms':>10}")
+    for name, data in samples.items():
+        for codec in codecs:
+            encryption = Encryption(key=key, codec=codec)
+            seal_times: list[float] = []
+            open_times: list[float] = []
+            sealed: bytes = b""
+            for _ in range(rounds):
+                start = time.perf_counter()
+                sealed = encryption.encrypt_envelope(data)
+                seal_times.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                opened = encryption.decrypt(sealed)
+                open_times.append(time.perf_counter() - start)
+                assert opened == data
+            ratio: float = len(data) / len(sealed) if sealed else 0.0
+            print(
+                f"{name[:27]:<28}{codec:<8}{len(sealed):>12}{ratio:>7.2f}x"
+                f"{min(seal_times) * 1000:>10.2f}{min(open_times) * 1000:>10.2f}"
+            )
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description="Compare compression codecs for encrypted storage.")
+    parser.add_argument("directories", nargs="*", help="Directories of plaintext files to use as samples.")
+    parser.add_argument("--rounds", type=int, default=5, help="Repetitions per measurement. Defaults to 5.")
+    args = parser.parse_args()
+    samples = read_samples(args.directories) if args.directories else generate_samples()
+    if not samples:
+        print("No plaintext files found.")
+        return
+    benchmark(samples, max(1, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Measure the throughput of `gptcli all encrypt` and `decrypt` for several job counts.
+
+Generates a provider directory of compressible session files in a temporary
+directory, then encrypts and decrypts it with each job count and reports
+files/s and MB/s of plaintext. Rekeying decrypts and re-encrypts every file,
+so it scales like the two combined.
+
+Usage:
+    python3 scripts/benchmark_encryption_jobs.py [--files N] [--size KIB] [--jobs 1 2 4 8] [--rounds N]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+
+from gptcli.src.commands.encryption_commands import EncryptionCommands
+from gptcli.src.common.encryption import Encryption
+
+
+def generate_provider(provider_dir: str, files: int, size: int) -> int:
+    """Write session files to a provider directory.
+
+    Args:
+        provider_dir (str): The directory to write to.
+        files (int): The number of files.
+        size (int): The size of each file in bytes.
+
+    Returns:
+        int: The total number of bytes written.
+    """
+    line: bytes = b'{"role": "user", "content": "explain how the storage layer encrypts session files"}\n'
+    for i in range(files):
+        session_dir = os.path.join(provider_dir, "storage", "chat", f"session-{i:05d}")
+        os.makedirs(session_dir, exist_ok=True)
+        body: bytes = (line * (size // len(line) + 1))[: size - 16] + os.urandom(8).hex().encode()
+        with open(os.path.join(session_dir, "session.json"), "wb") as fp:
+            fp.write(body)
+    return files * size
+
+
+def benchmark(files: int, size: int, job_counts: list[int], rounds: int) -> None:
+    """Print the encrypt and decrypt throughput for every job count.
+
+    Args:
+        files (int): The number of files to generate.
+        size (int): The size of each file in bytes.
+        job_counts (list[int]): The job counts to measure.
+        rounds (int): How many times each measurement is repeated; the fastest run is reported.
+    """
+    encryption = Encryption(key=os.urandom(32))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        template_dir = os.path.join(tmp_dir, "template")
+        total: int = generate_provider(template_dir, files, size)
+        print(f"{files} files, {total / 1e6:.1f} MB of plaintext\n")
+        print(f"{'jobs':>6}{'encrypt files/s':>18}{'encrypt MB/s':>14}{'decrypt files/s':>18}{'decrypt MB/s':>14}")
+        for jobs in job_counts:
+            encrypt_times: list[float] = []
+            decrypt_times: list[float] = []
+            for _ in range(rounds):
+                provider_dir = os.path.join(tmp_dir, "provider")
+                shutil.rmtree(provider_dir, ignore_errors=True)
+                shutil.copytree(template_dir, provider_dir)
+                commands = EncryptionCommands(provider_dir=provider_dir, encryption=encryption, jobs=jobs)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    commands.encrypt_provider()
+                    encrypt_times.append(time.perf_counter() - start)
+                    start = time.perf_counter()
+                    commands.decrypt_provider()
+                    decrypt_times.append(time.perf_counter() - start)
+            encrypt, decrypt = min(encrypt_times), min(decrypt_times)
+            print(
+                f"{jobs:>6}{files / encrypt:>18.0f}{total / encrypt / 1e6:>14.1f}"
+                f"{files / decrypt:>18.0f}{total / decrypt / 1e6:>14.1f}"
+            )
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description="Measure encrypt and decrypt throughput per job count.")
+    parser.add_argument("--files", type=int, default=500, help="Number of files to generate. Defaults to 500.")
+    parser.add_argument("--size", type=int, default=256, help="Size of each file in KiB. Defaults to 256.")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="Job counts to measure. Defaults to 1, 2, 4 and the number of CPUs.",
+    )
+    parser.add_argument("--rounds", type=int, default=3, help="Repetitions per measurement. Defaults to 3.")
+    args = parser.parse_args()
+    benchmark(max(1, args.files), max(1, args.size) * 1024, [max(1, j) for j in args.jobs], max(1, args.rounds))
+
+
+if __name__ == "__main__":
+    main()
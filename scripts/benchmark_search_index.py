@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Measure how long building the chat search index takes for several job counts.
+
+Generates chat storage directories of synthetic sessions in a temporary
+directory, encrypted unless --plaintext is given, then builds a fresh
+ChatFTS index over each of them with each job count and reports the build
+time, sessions/s and the speedup over a single job.
+
+Usage:
+    python3 scripts/benchmark_search_index.py [--sessions 10000 100000] [--messages N] [--jobs 1 2 4 8]
+        [--plaintext]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import uuid
+
+from gptcli.constants import GPTCLI_METADATA_FILENAME, GPTCLI_SESSION_FILENAME
+from gptcli.src.common.encryption import Encryption
+from gptcli.src.common.fts import _DB_FILENAME, _ENCRYPTED_DB_FILENAME, ChatFTS
+from gptcli.src.common.manifest import Manifest
+
+_WORDS: list[str] = (
+    "storage layer encrypts session files index search query token latency throughput decrypt parse "
+    "message assistant model provider history cache chunk stream header snapshot"
+).split()
+
+
+def _write(filepath: str, data: bytes, encryption: Encryption | None) -> None:
+    if encryption is not None:
+        filepath, data = filepath + ".enc", encryption.encrypt_envelope(data)
+    with open(filepath, "wb") as fp:
+        fp.write(data)
+
+
+def generate_chat_dir(chat_dir: str, sessions: int, messages: int, encryption: Encryption | None) -> None:
+    """Write synthetic chat sessions and their manifest to a storage directory.
+
+    Args:
+        chat_dir (str): The storage directory to write to.
+        sessions (int): The number of sessions.
+        messages (int): The number of messages per session.
+        encryption (Encryption | None): Encryption instance to seal the files with, or None for plaintext.
+    """
+    entries: list[dict[str, object]] = []
+    for i in range(sessions):
+        session_uuid = str(uuid.uuid4())
+        session_dir = os.path.join(chat_dir, session_uuid)
+        os.makedirs(session_dir)
+        body = [
+            {
+                "role": "user" if m % 2 == 0 else "assistant",
+                "content": " ".join(_WORDS[(i + m + w) % len(_WORDS)] for w in range(60)) + f" session{i}",
+            }
+            for m in range(messages)
+        ]
+        metadata = {"chat": {"uuid": session_uuid, "created": float(i), "model": "m", "provider": "mistral"}}
+        _write(os.path.join(session_dir, GPTCLI_SESSION_FILENAME), json.dumps({"messages": body}).encode(), encryption)
+        _write(os.path.join(session_dir, GPTCLI_METADATA_FILENAME), json.dumps(metadata).encode(), encryption)
+        entries.append({"uuid": session_uuid, "created": float(i)})
+    Manifest(chat_dir, encryption).rewrite(entries)
+
+
+def benchmark(session_counts: list[int], messages: int, job_counts: list[int], encrypted: bool) -> None:
+    """Print the full-build time of the chat index for every session count and job count.
+
+    Args:
+        session_counts (list[int]): The numbers of sessions to generate.
+        messages (int): The number of messages per session.
+        job_counts (list[int]): The job counts to measure.
+        encrypted (bool): Whether the sessions are encrypted.
+    """
+    encryption = Encryption(key=os.urandom(32)) if encrypted else None
+    print(f"{'sessions':>10}{'jobs':>6}{'seconds':>10}{'sessions/s':>12}{'speedup':>9}")
+    for sessions in session_counts:
+        with tempfile.TemporaryDirectory() as chat_dir:
+            generate_chat_dir(chat_dir, sessions, messages, encryption)
+            baseline: float | None = None
+            for jobs in job_counts:
+                for filename in (_DB_FILENAME, _ENCRYPTED_DB_FILENAME, _DB_FILENAME + "-wal", _DB_FILENAME + "-shm"):
+                    if os.path.exists(os.path.join(chat_dir, filename)):
+                        os.remove(os.path.join(chat_dir, filename))
+                start = time.perf_counter()
+                ChatFTS().build(chat_dir, encryption, jobs=jobs)
+                elapsed = time.perf_counter() - start
+                baseline = baseline or elapsed
+                print(f"{sessions:>10}{jobs:>6}{elapsed:>10.2f}{sessions / elapsed:>12.0f}{baseline / elapsed:>8.2f}x")
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description="Measure chat search index build time per job count.")
+    parser.add_argument(
+        "--sessions", type=int, nargs="+", default=[10000, 100000], help="Session counts. Defaults to 10000 100000."
+    )
+    parser.add_argument("--messages", type=int, default=6, help="Messages per session. Defaults to 6.")
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+        help="Job counts to measure. Defaults to 1, 2, 4 and the number of CPUs.",
+    )
+    parser.add_argument("--plaintext", action="store_true", help="Store the sessions unencrypted.")
+    args = parser.parse_args()
+    benchmark(
+        [max(1, n) for n in args.sessions],
+        max(1, args.messages),
+        [max(1, j) for j in args.jobs],
+        encrypted=not args.plaintext,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""Measure how much space the chat and OCR search indexes take.
+
+Generates plaintext chat and OCR storage directories of synthetic sessions
+in a temporary directory, builds each index and reports its size next to
+the size of the indexed text and of the same index in the earlier layout,
+whose full-text table stored a second copy of every session's text. An
+encrypted index is an in-memory database of the same size, so this is also
+its memory use while search is open.
+
+Usage:
+    python3 scripts/benchmark_search_index_size.py [--sessions 1000 10000] [--messages N]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import uuid
+from contextlib import closing
+
+from gptcli.constants import GPTCLI_METADATA_FILENAME, GPTCLI_SESSION_FILENAME
+from gptcli.src.common.fts import _DB_FILENAME, ChatFTS, OcrFTS
+from gptcli.src.common.manifest import Manifest
+
+_WORDS: list[str] = (
+    "storage layer encrypts session files index search query token latency throughput decrypt parse "
+    "message assistant model provider history cache chunk stream header snapshot"
+).split()
+
+
+def _text(seed: int, words: int) -> str:
+    return " ".join(_WORDS[(seed * 7 + w * 3) % len(_WORDS)] for w in range(words)) + f" unique{seed}"
+
+
+def _write_json(filepath: str, data: object) -> None:
+    with open(filepath, "w", encoding="utf-8") as fp:
+        json.dump(data, fp)
+
+
+def generate_chat_dir(chat_dir: str, sessions: int, messages: int) -> dict[str, str]:
+    """Write synthetic chat sessions and their manifest to a storage directory.
+
+    Args:
+        chat_dir (str): The storage directory to write to.
+        sessions (int): The number of sessions.
+        messages (int): The number of messages per session.
+
+    Returns:
+        dict[str, str]: The indexed text of each session, by UUID.
+    """
+    contents: dict[str, str] = {}
+    for i in range(sessions):
+        session_uuid = str(uuid.uuid4())
+        os.makedirs(os.path.join(chat_dir, session_uuid))
+        body = [
+            {"role": "user" if m % 2 == 0 else "assistant", "content": _text(i * messages + m, 60)}
+            for m in range(messages)
+        ]
+        metadata = {"chat": {"uuid": session_uuid, "created": float(i), "model": "m", "provider": "mistral"}}
+        _write_json(os.path.join(chat_dir, session_uuid, GPTCLI_SESSION_FILENAME), {"messages": body})
+        _write_json(os.path.join(chat_dir, session_uuid, GPTCLI_METADATA_FILENAME), metadata)
+        contents[session_uuid] = " ".join(m["content"] for m in body)
+    Manifest(chat_dir, None).rewrite([{"uuid": u, "created": float(i)} for i, u in enumerate(contents)])
+    return contents
+
+
+def generate_ocr_dir(ocr_dir: str, sessions: int, pages: int) -> dict[str, str]:
+    """Write synthetic OCR sessions and their manifest to a storage directory.
+
+    Args:
+        ocr_dir (str): The storage directory to write to.
+        sessions (int): The number of sessions.
+        pages (int): The number of pages per document, of 300 words each.
+
+    Returns:
+        dict[str, str]: The indexed text of each session, by UUID.
+    """
+    contents: dict[str, str] = {}
+    for i in range(sessions):
+        session_uuid = str(uuid.uuid4())
+        os.makedirs(os.path.join(ocr_dir, session_uuid))
+        markdown = "\n\n".join(f"# Page {p}\n\n" + _text(i * pages + p, 300) for p in range(pages))
+        metadata = {
+            "source": {"filename": f"doc{i}.pdf"},
+            "ocr": {
+                "uuid": session_uuid,
+                "created": float(i),
+                "model": "m",
+                "provider": "mistral",
+                "page_count": pages,
+            },
+            "output": {"markdown_file": "document.md"},
+        }
+        with open(os.path.join(ocr_dir, session_uuid, "document.md"), "w", encoding="utf-8") as fp:
+            fp.write(markdown)
+        _write_json(os.path.join(ocr_dir, session_uuid, GPTCLI_METADATA_FILENAME), metadata)
+        contents[session_uuid] = markdown
+    Manifest(ocr_dir, None).rewrite([{"uuid": u, "created": float(i)} for i, u in enumerate(contents)])
+    return contents
+
+
+def _index_size(storage_dir: str) -> int:
+    """Checkpoint the index out of its write-ahead log and return its size in bytes."""
+    db_path = os.path.join(storage_dir, _DB_FILENAME)
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(db_path)
+
+
+def _legacy_index_size(storage_dir: str, contents: dict[str, str], scratch_dir: str) -> int:
+    """Return the size of the index with its full-text table storing the session text, as it used to."""
+    legacy_path = os.path.join(scratch_dir, "legacy.db")
+    shutil.copyfile(os.path.join(storage_dir, _DB_FILENAME), legacy_path)
+    with closing(sqlite3.connect(legacy_path)) as conn:
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.execute("DROP TABLE IF EXISTS sessions_fts")
+        conn.execute("DROP TABLE IF EXISTS messages_fts")
+        conn.execute("CREATE VIRTUAL TABLE sessions_fts USING fts5(uuid UNINDEXED, content, tokenize='unicode61')")
+        conn.executemany("INSERT INTO sessions_fts VALUES (?, ?)", contents.items())
+        conn.commit()
+        conn.execute("VACUUM")
+    size: int = os.path.getsize(legacy_path)
+    os.remove(legacy_path)
+    return size
+
+
+def benchmark(session_counts: list[int], messages: int) -> None:
+    """Print the index sizes of the chat and OCR indexes for every session count.
+
+    Args:
+        session_counts (list[int]): The numbers of sessions to generate.
+        messages (int): The number of messages per chat session, and of pages per OCR document.
+    """
+    print(f"{'index':>6}{'sessions':>10}{'text MB':>10}{'before MB':>11}{'after MB':>10}{'saved':>8}")
+    for sessions in session_counts:
+        for kind, generate, fts in (("chat", generate_chat_dir, ChatFTS()), ("ocr", generate_ocr_dir, OcrFTS())):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                storage_dir = os.path.join(tmp_dir, kind)
+                os.makedirs(storage_dir)
+                contents = generate(storage_dir, sessions, messages)
+                fts.build(storage_dir, encryption=None)
+                fts.close()
+                text: int = sum(len(c.encode("utf-8")) for c in contents.values())
+                after: int = _index_size(storage_dir)
+                before: int = _legacy_index_size(storage_dir, contents, tmp_dir)
+                print(
+                    f"{kind:>6}{sessions:>10}{text / 1e6:>10.1f}{before / 1e6:>11.1f}{after / 1e6:>10.1f}"
+                    f"{1 - after / before:>8.0%}"
+                )
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description="Measure the size of the chat and OCR search indexes.")
+    parser.add_argument(
+        "--sessions", type=int, nargs="+", default=[1000, 10000], help="Session counts. Defaults to 1000 10000."
+    )
+    parser.add_argument(
+        "--messages", type=int, default=6, help="Messages per chat session and pages per document. Defaults to 6."
+    )
+    args = parser.parse_args()
+    benchmark([max(1, n) for n in args.sessions], max(1, args.messages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Compare the word and trigram indexes of chat search by size and query latency.
+
+Generates a plaintext chat storage directory of synthetic sessions, whose
+messages mention file paths and identifiers, in a temporary directory. It
+builds the index without and then with the trigram index and reports the
+size of each, then the median latency of word queries on the word index,
+substring queries on the trigram index and the same substrings found by a
+LIKE scan over every message, which is what a substring search costs
+without the trigram index.
+
+Usage:
+    python3 scripts/benchmark_search_tokenizers.py [--sessions 1000 10000] [--messages N] [--repeat N]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+import uuid
+from collections.abc import Callable
+from contextlib import closing
+
+from gptcli.constants import GPTCLI_METADATA_FILENAME, GPTCLI_SESSION_FILENAME
+from gptcli.src.common.fts import _DB_FILENAME, ChatFTS
+from gptcli.src.common.manifest import Manifest
+
+_WORDS: list[str] = (
+    "storage layer encrypts session files index search query token latency throughput decrypt parse "
+    "message assistant model provider history cache chunk stream header snapshot"
+).split()
+_WORD_QUERIES: list[str] = ["latency throughput ", "decrypt snapshot ", '"session files" ', "cache OR header "]
+_SUBSTRINGS: list[str] = ["ndle_42.", "mod7/handle_1", "crypt_stor", "_cache_9"]
+
+
+def _text(seed: int, words: int) -> str:
+    identifier = f"{_WORDS[seed % len(_WORDS)]}_{_WORDS[(seed * 5) % len(_WORDS)]}_{seed % 97}"
+    path = f"src/mod{seed % 13}/handle_{seed % 89}.py"
+    return " ".join(_WORDS[(seed * 7 + w * 3) % len(_WORDS)] for w in range(words)) + f" {identifier} in {path}"
+
+
+def _write_json(filepath: str, data: object) -> None:
+    with open(filepath, "w", encoding="utf-8") as fp:
+        json.dump(data, fp)
+
+
+def generate_chat_dir(chat_dir: str, sessions: int, messages: int) -> None:
+    """Write synthetic chat sessions and their manifest to a storage directory.
+
+    Args:
+        chat_dir (str): The storage directory to write to.
+        sessions (int): The number of sessions.
+        messages (int): The number of messages per session.
+    """
+    session_uuids: list[str] = []
+    for i in range(sessions):
+        session_uuid = str(uuid.uuid4())
+        os.makedirs(os.path.join(chat_dir, session_uuid))
+        body = [
+            {"role": "user" if m % 2 == 0 else "assistant", "content": _text(i * messages + m, 60)}
+            for m in range(messages)
+        ]
+        metadata = {"chat": {"uuid": session_uuid, "created": float(i), "model": "m", "provider": "mistral"}}
+        _write_json(os.path.join(chat_dir, session_uuid, GPTCLI_SESSION_FILENAME), {"messages": body})
+        _write_json(os.path.join(chat_dir, session_uuid, GPTCLI_METADATA_FILENAME), metadata)
+        session_uuids.append(session_uuid)
+    Manifest(chat_dir, None).rewrite([{"uuid": u, "created": float(i)} for i, u in enumerate(session_uuids)])
+
+
+def _index_size(chat_dir: str) -> int:
+    """Checkpoint the index out of its write-ahead log and return its size in bytes."""
+    db_path = os.path.join(chat_dir, _DB_FILENAME)
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return os.path.getsize(db_path)
+
+
+def _median_ms(run: Callable[[str], object], queries: list[str], repeat: int) -> float:
+    """Return the median time of running every query, in milliseconds."""
+    timings: list[float] = []
+    for _ in range(repeat):
+        for query in queries:
+            start = time.perf_counter()
+            run(query)
+            timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def benchmark(session_counts: list[int], messages: int, repeat: int) -> None:
+    """Print the index sizes and query latencies of the word and trigram indexes for every session count.
+
+    Args:
+        session_counts (list[int]): The numbers of sessions to generate.
+        messages (int): The number of messages per session.
+        repeat (int): The number of times every query is run.
+    """
+    print(
+        f"{'sessions':>10}{'word MB':>10}{'+trigram MB':>13}"
+        f"{'word ms':>10}{'trigram ms':>12}{'LIKE ms':>10}{'speedup':>9}"
+    )
+    for sessions in session_counts:
+        with tempfile.TemporaryDirectory() as chat_dir:
+            generate_chat_dir(chat_dir, sessions, messages)
+            fts = ChatFTS(trigram=False)
+            fts.build(chat_dir, encryption=None)
+            fts.close()
+            word_size: int = _index_size(chat_dir)
+            fts = ChatFTS(trigram=True)
+            fts.build(chat_dir, encryption=None)
+            trigram_size: int = _index_size(chat_dir)
+
+            def _search(query: str) -> object:
+                # Every run is timed, not answered from the cache of recent queries.
+                fts._cache.clear()
+                return fts.search(query)
+
+            def _like(substring: str) -> object:
+                # Ranking needs every match, so the scan cannot stop early.
+                return fts._conn.execute(
+                    "SELECT DISTINCT session_uuid FROM messages WHERE content LIKE ?", (f"%{substring}%",)
+                ).fetchall()
+
+            word: float = _median_ms(_search, _WORD_QUERIES, repeat)
+            trigram: float = _median_ms(_search, [f"`{s}`" for s in _SUBSTRINGS], repeat)
+            like: float = _median_ms(_like, _SUBSTRINGS, repeat)
+            fts.close()
+            print(
+                f"{sessions:>10}{word_size / 1e6:>10.1f}{trigram_size / 1e6:>13.1f}"
+                f"{word:>10.2f}{trigram:>12.2f}{like:>10.2f}{like / trigram:>8.1f}x"
+            )
+
+
+def main() -> None:
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description="Compare the word and trigram chat search indexes.")
+    parser.add_argument(
+        "--sessions", type=int, nargs="+", default=[1000, 10000], help="Session counts. Defaults to 1000 10000."
+    )
+    parser.add_argument("--messages", type=int, default=6, help="Messages per session. Defaults to 6.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of every query. Defaults to 5.")
+    args = parser.parse_args()
+    benchmark([max(1, n) for n in args.sessions], max(1, args.messages), max(1, args.repeat))
+
+
+if __name__ == "__main__":
+    main()